@@ -6,6 +6,7 @@
 const { spawn } = require('child_process');
 const path = require('path');
 const fs = require('fs');
+const readline = require('readline');
 
 class InternalMemoryClient {
   constructor(options = {}) {
@@ -17,8 +18,131 @@ class InternalMemoryClient {
     
     // Ruta al módulo Python interno  
     this.pythonPath = path.join(__dirname, '../../laura_memory');
+
+    // Worker Python persistente (internal_interface.py --worker)
+    this.persistentWorker = options.persistentWorker !== undefined ? options.persistentWorker :
+                            (process.env.LAURA_MEMORY_PERSISTENT_WORKER || 'false').toLowerCase() === 'true';
+    this.workerTimeoutMs = options.workerTimeoutMs || parseInt(process.env.LAURA_MEMORY_WORKER_TIMEOUT_MS || '30000', 10);
+    this.worker = null;
+    this.pendingRequests = new Map();
+    this.nextRequestId = 1;
     
-    console.log(`[LAURA_MEMORY_INTERNAL] 🧠 Cliente interno inicializado - Enabled: ${this.enabled}, URL: ${this.baseUrl}`);
+    console.log(`[LAURA_MEMORY_INTERNAL] 🧠 Cliente interno inicializado - Enabled: ${this.enabled}, URL: ${this.baseUrl}, Worker: ${this.persistentWorker}`);
+  }
+
+  /**
+   * Comando Python a usar (venv local si existe)
+   */
+  getPythonCommand() {
+    // Usar el entorno virtual donde están instaladas las dependencias
+    // En Docker, usar python3 con el path correcto al directorio de trabajo
+    const venvPath = path.join(this.pythonPath, 'venv', 'bin', 'python');
+    return fs.existsSync(venvPath) ? venvPath : 'python3';
+  }
+
+  /**
+   * Obtener (o arrancar) el worker Python persistente
+   */
+  getWorker() {
+    if (this.worker) {
+      return this.worker;
+    }
+
+    const pythonScript = path.join(this.pythonPath, 'internal_interface.py');
+    const worker = spawn(this.getPythonCommand(), [pythonScript, '--worker'], {
+      cwd: this.pythonPath,
+      stdio: ['pipe', 'pipe', 'pipe'],
+      env: {
+        ...process.env,
+        PYTHONPATH: this.pythonPath
+      }
+    });
+
+    const lines = readline.createInterface({ input: worker.stdout });
+    lines.on('line', (line) => {
+      let message;
+      try {
+        message = JSON.parse(line);
+      } catch (parseError) {
+        console.error(`[LAURA_MEMORY_INTERNAL] ❌ Error parsing worker output: ${parseError}`);
+        return;
+      }
+
+      if (message.event === 'ready') {
+        console.log(`[LAURA_MEMORY_INTERNAL] 🔥 Worker Python listo (pid ${worker.pid})`);
+        return;
+      }
+
+      const pending = this.pendingRequests.get(message.id);
+      if (pending) {
+        clearTimeout(pending.timer);
+        this.pendingRequests.delete(message.id);
+        pending.resolve(message);
+      }
+    });
+
+    worker.stderr.on('data', (data) => {
+      console.error(`[LAURA_MEMORY_INTERNAL] ⚠️ Worker stderr: ${data.toString().trim()}`);
+    });
+
+    const failPending = (error) => {
+      if (this.worker === worker) {
+        this.worker = null;
+      }
+      for (const [id, pending] of this.pendingRequests) {
+        clearTimeout(pending.timer);
+        pending.reject(error);
+        this.pendingRequests.delete(id);
+      }
+    };
+
+    worker.on('exit', (code) => {
+      console.error(`[LAURA_MEMORY_INTERNAL] ⚠️ Worker Python terminó (${code})`);
+      failPending(new Error(`Python worker exited with code ${code}`));
+    });
+
+    worker.on('error', (error) => {
+      console.error(`[LAURA_MEMORY_INTERNAL] ❌ Worker error: ${error}`);
+      failPending(error);
+    });
+
+    // EPIPE/ECONNRESET al escribir si el worker murió: sin este handler Node lanza y se cae
+    worker.stdin.on('error', (error) => {
+      console.error(`[LAURA_MEMORY_INTERNAL] ❌ Worker stdin error: ${error}`);
+      failPending(error);
+      worker.kill();
+    });
+
+    this.worker = worker;
+    return worker;
+  }
+
+  /**
+   * Enviar un comando (o lote) al worker persistente y esperar su respuesta por id
+   */
+  sendToWorker(payload, label = 'command') {
+    return new Promise((resolve, reject) => {
+      const worker = this.getWorker();
+      const id = this.nextRequestId++;
+
+      const timer = setTimeout(() => {
+        this.pendingRequests.delete(id);
+        reject(new Error(`Python worker timeout after ${this.workerTimeoutMs}ms (${label})`));
+      }, this.workerTimeoutMs);
+
+      this.pendingRequests.set(id, { resolve, reject, timer });
+      worker.stdin.write(JSON.stringify({ ...payload, id }) + '\n');
+    });
+  }
+
+  /**
+   * Detener el worker persistente (cierra stdin para que vacíe colas y salga)
+   */
+  shutdownWorker() {
+    if (this.worker) {
+      this.worker.stdin.end();
+      this.worker = null;
+    }
   }
 
   /**
@@ -29,14 +153,39 @@ class InternalMemoryClient {
       return { success: false, reason: 'Servicio deshabilitado' };
     }
 
+    if (this.persistentWorker) {
+      return this.sendToWorker({ function: functionName, args }, functionName);
+    }
+
+    return this.spawnPythonCommand({ function: functionName, args });
+  }
+
+  /**
+   * Ejecutar varios comandos en una sola llamada a Python.
+   * Los comandos corren en paralelo y los resultados vuelven en el mismo orden.
+   *
+   * @param {Array<{function: string, args: Object}>} commands
+   */
+  async executeBatch(commands) {
+    if (!this.enabled) {
+      return { success: false, reason: 'Servicio deshabilitado', results: [] };
+    }
+
+    if (this.persistentWorker) {
+      return this.sendToWorker({ commands }, `batch(${commands.length})`);
+    }
+
+    return this.spawnPythonCommand(commands);
+  }
+
+  /**
+   * Lanzar un proceso Python de un solo uso con el payload dado por stdin
+   */
+  spawnPythonCommand(payload) {
     return new Promise((resolve, reject) => {
       const pythonScript = path.join(this.pythonPath, 'internal_interface.py');
-      const argsJson = JSON.stringify({ function: functionName, args });
-      
-      // Usar el entorno virtual donde están instaladas las dependencias
-      // En Docker, usar python3 con el path correcto al directorio de trabajo
-      const venvPath = path.join(this.pythonPath, 'venv', 'bin', 'python');
-      const pythonCommand = fs.existsSync(venvPath) ? venvPath : 'python3';
+      const argsJson = JSON.stringify(payload);
+      const pythonCommand = this.getPythonCommand();
       
       const pythonProcess = spawn(pythonCommand, [pythonScript], {
         cwd: this.pythonPath,
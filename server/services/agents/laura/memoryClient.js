@@ -77,6 +77,47 @@ class LauraMemoryClient {
     }
   }
 
+  /**
+   * Encolar el procesamiento de un resultado de herramienta sin esperar la escritura a Zep
+   * Devuelve { job_id, status, status_url }; el resultado se consulta con getIngestJob o llega a callbackUrl
+   */
+  async processToolResultAsync(toolName, toolResult, userQuery = '', callbackUrl = null) {
+    if (!this.enabled || !await this.isHealthy()) {
+      return { queued: false, reason: 'Servicio no disponible' };
+    }
+
+    try {
+      const response = await this.client.post('/api/laura-memory/process-tool-result', {
+        tool_name: toolName,
+        tool_result: toolResult,
+        user_query: userQuery,
+        async: true,
+        ...(callbackUrl ? { callback_url: callbackUrl } : {})
+      });
+
+      console.log(`[LAURA_MEMORY] 📥 Resultado encolado - ${toolName}: trabajo ${response.data.job_id}`);
+      return { queued: true, ...response.data };
+
+    } catch (error) {
+      console.error(`[LAURA_MEMORY] ❌ Error encolando resultado:`, error.message);
+      return { queued: false, error: error.message };
+    }
+  }
+
+  /**
+   * Consultar el estado de un trabajo de ingesta asíncrono
+   */
+  async getIngestJob(jobId) {
+    try {
+      const response = await this.client.get(`/api/laura-memory/jobs/${encodeURIComponent(jobId)}`);
+      return response.data;
+
+    } catch (error) {
+      console.error(`[LAURA_MEMORY] ❌ Error consultando trabajo ${jobId}:`, error.message);
+      return { job_id: jobId, status: 'unknown', error: error.message };
+    }
+  }
+
   /**
    * Mejorar query con contexto de memoria
    */
@@ -314,6 +355,38 @@ class LauraMemoryClient {
     }
   }
 
+  /**
+   * Ejecutar varias operaciones de memoria en una sola petición (/api/laura-memory/batch)
+   *
+   * operations: [{ id, operation: 'enhance-query' | 'search' | 'process-tool-result' | 'save-user-discovery', args }]
+   * Devuelve una entrada por operación, en el mismo orden, con { index, id, operation, status, result | error }
+   */
+  async batch(operations) {
+    if (!this.enabled || !await this.isHealthy()) {
+      return operations.map((op, index) => ({
+        index, id: op.id ?? null, operation: op.operation, status: 503, error: 'Servicio no disponible'
+      }));
+    }
+
+    try {
+      const response = await this.client.post('/api/laura-memory/batch', { operations }, {
+        responseType: 'text',
+        transformResponse: [data => data]
+      });
+
+      const results = response.data.split('\n').filter(line => line.trim()).map(line => JSON.parse(line));
+      const failed = results.filter(result => result.status >= 400).length;
+      console.log(`[LAURA_MEMORY] 📦 Lote de ${results.length} operaciones (${failed} con error)`);
+      return results;
+
+    } catch (error) {
+      console.error(`[LAURA_MEMORY] ❌ Error ejecutando lote:`, error.message);
+      return operations.map((op, index) => ({
+        index, id: op.id ?? null, operation: op.operation, status: 500, error: error.message
+      }));
+    }
+  }
+
   /**
    * Obtener configuración del cliente
    */
@@ -0,0 +1,358 @@
+"""
+Servidor ASGI (Starlette) con las mismas rutas que ``server.py`` sobre ``memory_async``.
+
+    uvicorn asgi_server:app --host 0.0.0.0 --port 5001
+
+Las llamadas a Zep son corrutinas sobre ``AsyncZep``: un solo proceso mantiene
+muchas búsquedas lentas en vuelo sin un hilo por petición. Los cuerpos de
+petición y respuesta son los de ``server.py``, así que ``memoryClient.js`` y
+``lauraMemoryClient.js`` funcionan sin cambios.
+"""
+
+import asyncio
+import contextlib
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+import memory
+import memory_async
+from batch import NDJSON_CONTENT_TYPE, arun_batch, parse_batch
+from integration import accept_tool_result_job, close_ingest_jobs, get_ingest_job, get_ingest_jobs_stats, laura_memory_integration
+from metrics import CONTENT_TYPE, HTTP_REQUEST_DURATION, HTTP_REQUESTS, registry
+from settings import settings
+
+logger = logging.getLogger(__name__)
+
+_SEARCH_FILTERS = ("tags", "source", "since", "until", "last_hours")
+
+# Listo tras crear el cliente AsyncZep; deja de estarlo al empezar el apagado
+_state = {"ready": False, "shutting_down": False}
+
+
+async def _json_body(request: Request) -> Optional[Dict[str, Any]]:
+    try:
+        data = await request.json()
+    except Exception:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _error(message: str, status_code: int) -> JSONResponse:
+    return JSONResponse({"error": message}, status_code=status_code)
+
+
+async def process_tool_result(request: Request) -> Response:
+    """
+    Procesa el resultado de una herramienta (ver ``server.process_tool_result``).
+    """
+    try:
+        data = await _json_body(request)
+
+        if not data or 'tool_name' not in data or 'tool_result' not in data:
+            return _error("Faltan campos requeridos", 400)
+
+        if data.get('async'):
+            return await _submit_tool_result_job(data)
+
+        result = await laura_memory_integration.aprocess_tool_result(
+            tool_name=data['tool_name'],
+            tool_result=data['tool_result'],
+            user_query=data.get('user_query', '')
+        )
+
+        return JSONResponse(result)
+
+    except Exception as e:
+        logger.error(f"❌ Error procesando resultado de herramienta: {e}")
+        return _error(str(e), 500)
+
+
+async def _submit_tool_result_job(data: Dict[str, Any]) -> Response:
+    # Solo encola: la detección y la escritura a Zep corren en el pool de integration.
+    # Registrar el trabajo escribe en SQLite: fuera del loop
+    status, body = await asyncio.to_thread(accept_tool_result_job, data)
+    if status == 202:
+        return JSONResponse(body, status_code=status, headers={"Location": body["status_url"]})
+    if status == 503:
+        return JSONResponse(body, status_code=status, headers={"Retry-After": "1"})
+    return JSONResponse(body, status_code=status)
+
+
+async def ingest_job_status(request: Request) -> Response:
+    """
+    Estado de un trabajo de process-tool-result en modo asíncrono.
+    """
+    job = await asyncio.to_thread(get_ingest_job, request.path_params['job_id'])
+    if job is None:
+        return _error("Trabajo no encontrado", 404)
+    return JSONResponse(job)
+
+
+async def enhance_query(request: Request) -> Response:
+    """
+    Mejora una query con información de la memoria.
+    """
+    try:
+        data = await _json_body(request)
+
+        if not data or 'query' not in data:
+            return _error("Falta el campo 'query'", 400)
+
+        result = await laura_memory_integration.aenhance_query_with_memory(
+            query=data['query'],
+            limit=data.get('limit', 3),
+            federated=bool(data.get('federated', False))
+        )
+
+        return JSONResponse(result)
+
+    except Exception as e:
+        logger.error(f"❌ Error mejorando query: {e}")
+        return _error(str(e), 500)
+
+
+async def save_user_discovery(request: Request) -> Response:
+    """
+    Guarda información de un usuario descubierto con ML.
+    """
+    try:
+        data = await _json_body(request)
+
+        if not data or 'user_name' not in data or 'twitter_username' not in data:
+            return _error("Faltan campos requeridos", 400)
+
+        success = await laura_memory_integration.asave_user_discovery(
+            user_name=data['user_name'],
+            twitter_username=data['twitter_username'],
+            description=data.get('description', ''),
+            category=data.get('category', '')
+        )
+
+        return JSONResponse({"success": success})
+
+    except Exception as e:
+        logger.error(f"❌ Error guardando usuario: {e}")
+        return _error(str(e), 500)
+
+
+async def search_memory(request: Request) -> Response:
+    """
+    Busca en la memoria pública, con filtros opcionales de tags, fuente y fechas.
+    """
+    try:
+        data = await _json_body(request)
+
+        if not data or 'query' not in data:
+            return _error("Falta el campo 'query'", 400)
+
+        if any(data.get(field) for field in _SEARCH_FILTERS):
+            try:
+                since = data.get('since')
+                if data.get('last_hours'):
+                    since = time.time() - float(data['last_hours']) * 3600
+                items = await memory_async.asearch_public_memory_filtered(
+                    query=data['query'],
+                    limit=data.get('limit', 5),
+                    tags=data.get('tags'),
+                    source=data.get('source'),
+                    since=since,
+                    until=data.get('until')
+                )
+            except ValueError as e:
+                return _error(str(e), 400)
+            return JSONResponse({"results": [item["content"] for item in items], "items": items})
+
+        results = await memory_async.asearch_public_memory(
+            query=data['query'],
+            limit=data.get('limit', 5)
+        )
+
+        return JSONResponse({"results": results})
+
+    except Exception as e:
+        logger.error(f"❌ Error buscando en memoria: {e}")
+        return _error(str(e), 500)
+
+
+async def federated_search(request: Request) -> Response:
+    """
+    Busca en paralelo en memoria pública, PulsePolitics y UserHandles.
+    """
+    try:
+        data = await _json_body(request)
+
+        if not data or 'query' not in data:
+            return _error("Falta el campo 'query'", 400)
+
+        result = await laura_memory_integration.afederated_search(
+            query=data['query'],
+            limit=data.get('limit', 5),
+            sources=data.get('sources'),
+            deadline_ms=data.get('deadline_ms')
+        )
+
+        return JSONResponse(result)
+
+    except Exception as e:
+        logger.error(f"❌ Error en búsqueda federada: {e}")
+        return _error(str(e), 500)
+
+
+async def batch_operations(request: Request) -> Response:
+    """
+    Lote de operaciones concurrentes con respuesta NDJSON en orden (ver ``batch.py``).
+    """
+    try:
+        operations = parse_batch(await _json_body(request))
+    except ValueError as e:
+        return _error(str(e), 400)
+
+    return StreamingResponse(arun_batch(operations), media_type=NDJSON_CONTENT_TYPE)
+
+
+# Las funciones se resuelven en cada petición (lambdas) para poder sustituirlas en tests
+def _group_search(search: Callable[..., Awaitable[Any]], label: str):
+    async def endpoint(request: Request) -> Response:
+        try:
+            data = await _json_body(request)
+
+            if not data or 'query' not in data:
+                return _error("Falta el campo 'query'", 400)
+
+            results = await search(query=data['query'], limit=data.get('limit', 5))
+
+            return JSONResponse({"results": results, "source": "userhandles_shared_group"})
+
+        except Exception as e:
+            logger.error(f"❌ Error buscando en {label}: {e}")
+            return _error(str(e), 500)
+
+    return endpoint
+
+
+def _stats(get_stats: Callable[[], Any], label: str):
+    async def endpoint(request: Request) -> Response:
+        try:
+            stats = get_stats()
+            if asyncio.iscoroutine(stats):
+                stats = await stats
+            return JSONResponse(stats)
+
+        except Exception as e:
+            logger.error(f"❌ Error obteniendo estadísticas{label}: {e}")
+            return _error(str(e), 500)
+
+    return endpoint
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    """
+    Métricas en formato de texto de Prometheus.
+    """
+    return Response(registry.render(), headers={"Content-Type": CONTENT_TYPE})
+
+
+async def health_check(request: Request) -> Response:
+    return JSONResponse({"status": "healthy", "service": "laura-memory"})
+
+
+async def _initialize() -> bool:
+    if _state["ready"] or _state["shutting_down"]:
+        return _state["ready"]
+    try:
+        await memory_async.awarm_up()
+    except Exception as e:
+        logger.error(f"❌ Laura Memory no está lista: {e}")
+        return False
+    _state["ready"] = True
+    logger.info("✅ Laura Memory (ASGI) lista para recibir tráfico")
+    return True
+
+
+async def readiness_check(request: Request) -> Response:
+    """
+    Readiness: 200 con el cliente de Zep inicializado, 503 al arrancar o apagar.
+    """
+    if not _state["ready"] and not _state["shutting_down"]:
+        await _initialize()
+    write_behind = memory.get_write_queue_health()
+    if _state["ready"]:
+        return JSONResponse({"status": "ready", "service": "laura-memory", "write_behind": write_behind})
+    status = "shutting_down" if _state["shutting_down"] else "starting"
+    return JSONResponse({"status": status, "service": "laura-memory", "write_behind": write_behind}, status_code=503)
+
+
+def _timed(path: str, endpoint: Callable[[Request], Awaitable[Response]]):
+    # Métricas HTTP por regla de ruta, igual que los hooks de Flask en server.py
+    async def wrapper(request: Request) -> Response:
+        started_at = time.perf_counter()
+        response = await endpoint(request)
+        HTTP_REQUESTS.inc(route=path, method=request.method, status=str(response.status_code))
+        HTTP_REQUEST_DURATION.observe(time.perf_counter() - started_at, route=path, method=request.method)
+        return response
+
+    return wrapper
+
+
+def _route(path: str, endpoint: Callable[[Request], Awaitable[Response]], methods) -> Route:
+    return Route(path, _timed(path, endpoint), methods=methods)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app: Starlette):
+    _state["shutting_down"] = False
+    if settings.metrics_multiprocess_dir:
+        # uvicorn --workers: cada proceso publica sus métricas en el directorio compartido
+        registry.start_multiprocess(settings.metrics_multiprocess_dir, settings.metrics_snapshot_interval_seconds)
+    await _initialize()
+    yield
+    # uvicorn ya terminó las peticiones en curso: terminar trabajos, vaciar cola y persistir índices
+    _state["shutting_down"] = True
+    _state["ready"] = False
+    await asyncio.to_thread(close_ingest_jobs, settings.server_graceful_timeout_seconds)
+    await asyncio.to_thread(memory.shutdown, settings.server_graceful_timeout_seconds)
+    registry.stop_multiprocess()
+
+
+routes = [
+    _route('/api/laura-memory/process-tool-result', process_tool_result, ['POST']),
+    _route('/api/laura-memory/enhance-query', enhance_query, ['POST']),
+    _route('/api/laura-memory/save-user-discovery', save_user_discovery, ['POST']),
+    _route('/api/laura-memory/search', search_memory, ['POST']),
+    _route('/api/laura-memory/federated-search', federated_search, ['POST']),
+    _route('/api/laura-memory/batch', batch_operations, ['POST']),
+    _route('/api/laura-memory/stats', _stats(lambda: memory_async.aget_memory_stats(), ""), ['GET']),
+    _route('/api/laura-memory/search-pulsepolitics',
+           _group_search(lambda **kwargs: memory_async.asearch_pulsepolitics(**kwargs), "PulsePolitics"), ['POST']),
+    _route('/api/laura-memory/pulsepolitics-stats',
+           _stats(lambda: memory_async.aget_pulsepolitics_stats(), " PulsePolitics"), ['GET']),
+    _route('/api/laura-memory/search-userhandles',
+           _group_search(lambda **kwargs: memory_async.asearch_userhandles(**kwargs), "UserHandles"), ['POST']),
+    _route('/api/laura-memory/userhandles-stats',
+           _stats(lambda: memory_async.aget_userhandles_stats(), " UserHandles"), ['GET']),
+    _route('/api/laura-memory/cache-stats', _stats(lambda: memory.get_search_cache_stats(), " de caché"), ['GET']),
+    _route('/api/laura-memory/queue-stats', _stats(lambda: memory.get_write_queue_stats(), " de la cola"), ['GET']),
+    _route('/api/laura-memory/resilience-stats',
+           _stats(lambda: memory.get_resilience_stats(), " de resiliencia"), ['GET']),
+    _route('/api/laura-memory/jobs/{job_id}', ingest_job_status, ['GET']),
+    _route('/api/laura-memory/jobs-stats', _stats(lambda: asyncio.to_thread(get_ingest_jobs_stats), " de trabajos"), ['GET']),
+    _route('/api/laura-memory/metadata-stats', _stats(lambda: asyncio.to_thread(memory.get_metadata_store_stats), " de metadatos"), ['GET']),
+    _route('/metrics', metrics_endpoint, ['GET']),
+    _route('/health', health_check, ['GET']),
+    _route('/ready', readiness_check, ['GET']),
+]
+
+app = Starlette(routes=routes, lifespan=lifespan)
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    host, port = settings.server_bind.rsplit(':', 1)
+    uvicorn.run(app, host=host, port=int(port), timeout_graceful_shutdown=settings.server_graceful_timeout_seconds)
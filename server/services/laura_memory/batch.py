@@ -0,0 +1,279 @@
+"""
+Lote de operaciones de memoria en una sola petición HTTP (``/api/laura-memory/batch``).
+
+Un turno del agente suele hacer ``enhance-query``, ``search``,
+``process-tool-result`` y ``save-user-discovery`` seguidas. El lote las ejecuta
+de forma concurrente y devuelve una línea NDJSON por operación, en el orden
+recibido y en cuanto están listas todas las anteriores:
+
+    {"index": 0, "id": "q1", "operation": "search", "status": 200, "result": {"results": [...]}}
+    {"index": 1, "id": null, "operation": "search", "status": 400, "error": "Falta el campo 'query'"}
+
+``status`` y ``result``/``error`` son los que devolvería el endpoint
+individual de la operación.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+import memory
+import memory_async
+from integration import accept_tool_result_job, laura_memory_integration
+from settings import settings
+
+logger = logging.getLogger(__name__)
+
+NDJSON_CONTENT_TYPE = "application/x-ndjson"
+
+_SEARCH_FILTERS = ("tags", "source", "since", "until", "last_hours")
+
+OperationResult = Tuple[int, Dict[str, Any]]
+
+_MISSING_QUERY: OperationResult = (400, {"error": "Falta el campo 'query'"})
+_MISSING_FIELDS: OperationResult = (400, {"error": "Faltan campos requeridos"})
+
+
+def _search_filters(args: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    if not any(args.get(field) for field in _SEARCH_FILTERS):
+        return None
+    since = args.get('since')
+    if args.get('last_hours'):
+        since = time.time() - float(args['last_hours']) * 3600
+    return {
+        "tags": args.get('tags'),
+        "source": args.get('source'),
+        "since": since,
+        "until": args.get('until')
+    }
+
+
+# --- Operaciones (bloqueantes, servidor Flask) ---
+
+def _enhance_query(args: Dict[str, Any]) -> OperationResult:
+    if 'query' not in args:
+        return _MISSING_QUERY
+    return 200, laura_memory_integration.enhance_query_with_memory(
+        query=args['query'],
+        limit=args.get('limit', 3),
+        federated=bool(args.get('federated', False))
+    )
+
+
+def _search(args: Dict[str, Any]) -> OperationResult:
+    if 'query' not in args:
+        return _MISSING_QUERY
+    try:
+        filters = _search_filters(args)
+        if filters is not None:
+            items = memory.search_public_memory_filtered(query=args['query'], limit=args.get('limit', 5), **filters)
+            return 200, {"results": [item["content"] for item in items], "items": items}
+    except ValueError as e:
+        return 400, {"error": str(e)}
+    return 200, {"results": memory.search_public_memory(query=args['query'], limit=args.get('limit', 5))}
+
+
+def _process_tool_result(args: Dict[str, Any]) -> OperationResult:
+    if 'tool_name' not in args or 'tool_result' not in args:
+        return _MISSING_FIELDS
+    if args.get('async'):
+        return accept_tool_result_job(args)
+    return 200, laura_memory_integration.process_tool_result(
+        tool_name=args['tool_name'],
+        tool_result=args['tool_result'],
+        user_query=args.get('user_query', '')
+    )
+
+
+def _save_user_discovery(args: Dict[str, Any]) -> OperationResult:
+    if 'user_name' not in args or 'twitter_username' not in args:
+        return _MISSING_FIELDS
+    success = laura_memory_integration.save_user_discovery(
+        user_name=args['user_name'],
+        twitter_username=args['twitter_username'],
+        description=args.get('description', ''),
+        category=args.get('category', '')
+    )
+    return 200, {"success": success}
+
+
+# --- Operaciones (corrutinas, servidor ASGI) ---
+
+async def _aenhance_query(args: Dict[str, Any]) -> OperationResult:
+    if 'query' not in args:
+        return _MISSING_QUERY
+    return 200, await laura_memory_integration.aenhance_query_with_memory(
+        query=args['query'],
+        limit=args.get('limit', 3),
+        federated=bool(args.get('federated', False))
+    )
+
+
+async def _asearch(args: Dict[str, Any]) -> OperationResult:
+    if 'query' not in args:
+        return _MISSING_QUERY
+    try:
+        filters = _search_filters(args)
+        if filters is not None:
+            items = await memory_async.asearch_public_memory_filtered(
+                query=args['query'], limit=args.get('limit', 5), **filters
+            )
+            return 200, {"results": [item["content"] for item in items], "items": items}
+    except ValueError as e:
+        return 400, {"error": str(e)}
+    return 200, {"results": await memory_async.asearch_public_memory(query=args['query'], limit=args.get('limit', 5))}
+
+
+async def _aprocess_tool_result(args: Dict[str, Any]) -> OperationResult:
+    if 'tool_name' not in args or 'tool_result' not in args:
+        return _MISSING_FIELDS
+    if args.get('async'):
+        return await asyncio.to_thread(accept_tool_result_job, args)
+    return 200, await laura_memory_integration.aprocess_tool_result(
+        tool_name=args['tool_name'],
+        tool_result=args['tool_result'],
+        user_query=args.get('user_query', '')
+    )
+
+
+async def _asave_user_discovery(args: Dict[str, Any]) -> OperationResult:
+    if 'user_name' not in args or 'twitter_username' not in args:
+        return _MISSING_FIELDS
+    success = await laura_memory_integration.asave_user_discovery(
+        user_name=args['user_name'],
+        twitter_username=args['twitter_username'],
+        description=args.get('description', ''),
+        category=args.get('category', '')
+    )
+    return 200, {"success": success}
+
+
+BATCH_OPERATIONS: Dict[str, Callable[[Dict[str, Any]], OperationResult]] = {
+    "enhance-query": _enhance_query,
+    "search": _search,
+    "process-tool-result": _process_tool_result,
+    "save-user-discovery": _save_user_discovery
+}
+
+ASYNC_BATCH_OPERATIONS: Dict[str, Callable[[Dict[str, Any]], Awaitable[OperationResult]]] = {
+    "enhance-query": _aenhance_query,
+    "search": _asearch,
+    "process-tool-result": _aprocess_tool_result,
+    "save-user-discovery": _asave_user_discovery
+}
+
+
+def parse_batch(data: Any) -> List[Dict[str, Any]]:
+    """
+    Valida el cuerpo ``{"operations": [{"id": ..., "operation": ..., "args": {...}}]}``.
+
+    Las operaciones individuales no se validan aquí: una operación inválida
+    produce su propia línea con ``status`` 400 sin afectar al resto.
+
+    Raises:
+        ValueError: Si el cuerpo no contiene una lista de operaciones válida.
+    """
+    operations = data.get('operations') if isinstance(data, dict) else None
+    if not isinstance(operations, list) or not operations:
+        raise ValueError("Falta la lista 'operations'")
+    if len(operations) > settings.batch_max_operations:
+        raise ValueError(f"Máximo {settings.batch_max_operations} operaciones por lote")
+    return operations
+
+
+def _describe(index: int, operation: Any) -> Tuple[Dict[str, Any], Optional[OperationResult]]:
+    # Cabecera de la línea NDJSON y, si la operación es inválida, su error
+    if not isinstance(operation, dict):
+        line = {"index": index, "id": None, "operation": None}
+        return line, (400, {"error": "Operación inválida: se esperaba un objeto JSON"})
+    name = operation.get('operation')
+    line = {"index": index, "id": operation.get('id'), "operation": name}
+    if name not in BATCH_OPERATIONS:
+        return line, (400, {"error": f"Operación desconocida: {name}"})
+    if not isinstance(operation.get('args', {}), dict):
+        return line, (400, {"error": "'args' debe ser un objeto JSON"})
+    return line, None
+
+
+def _encode(line: Dict[str, Any], outcome: OperationResult) -> str:
+    status, body = outcome
+    line["status"] = status
+    if status >= 400:
+        line["error"] = body.get("error")
+    else:
+        line["result"] = body
+    return json.dumps(line, ensure_ascii=False) + "\n"
+
+
+def _failed(line: Dict[str, Any], e: Exception) -> OperationResult:
+    logger.error(f"❌ Error en operación del lote ({line['operation']}): {e}")
+    return 500, {"error": str(e)}
+
+
+# Pool para ejecutar las operaciones del lote (se crea bajo demanda)
+_batch_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_batch_executor() -> ThreadPoolExecutor:
+    global _batch_executor
+    if _batch_executor is None:
+        _batch_executor = ThreadPoolExecutor(
+            max_workers=max(1, settings.batch_max_workers),
+            thread_name_prefix="laura-http-batch"
+        )
+    return _batch_executor
+
+
+def run_batch(operations: List[Any]) -> Iterator[str]:
+    """
+    Ejecuta las operaciones en un pool acotado y produce una línea NDJSON por
+    operación, en orden.
+    """
+    executor = _get_batch_executor()
+    pending = []
+    for index, operation in enumerate(operations):
+        line, invalid = _describe(index, operation)
+        future = None if invalid else executor.submit(BATCH_OPERATIONS[line["operation"]], operation.get('args', {}))
+        pending.append((line, invalid, future))
+
+    for line, invalid, future in pending:
+        if future is None:
+            yield _encode(line, invalid)
+            continue
+        try:
+            outcome = future.result()
+        except Exception as e:
+            outcome = _failed(line, e)
+        yield _encode(line, outcome)
+
+
+async def arun_batch(operations: List[Any]) -> AsyncIterator[str]:
+    """
+    Versión asíncrona de ``run_batch``: las operaciones son corrutinas en el
+    event loop actual. Si el cliente se desconecta se cancelan las pendientes.
+    """
+    pending = []
+    for index, operation in enumerate(operations):
+        line, invalid = _describe(index, operation)
+        task = None if invalid else asyncio.ensure_future(
+            ASYNC_BATCH_OPERATIONS[line["operation"]](operation.get('args', {}))
+        )
+        pending.append((line, invalid, task))
+
+    try:
+        for line, invalid, task in pending:
+            if task is None:
+                yield _encode(line, invalid)
+                continue
+            try:
+                outcome = await task
+            except Exception as e:
+                outcome = _failed(line, e)
+            yield _encode(line, outcome)
+    finally:
+        for _, _, task in pending:
+            if task is not None and not task.done():
+                task.cancel()
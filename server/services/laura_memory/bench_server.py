@@ -0,0 +1,101 @@
+"""
+Benchmark de throughput del servidor HTTP de Laura Memory.
+
+Lanza ``--concurrency`` clientes con conexiones keep-alive contra una ruta
+durante ``--duration`` segundos e informa peticiones/s y latencias.
+
+Uso:
+    gunicorn -c gunicorn.conf.py server:app &
+    python bench_server.py --path /health --concurrency 16 --duration 10
+    python bench_server.py --method POST --path /api/laura-memory/search \\
+        --body '{"query": "congreso", "limit": 5}'
+"""
+
+import argparse
+import http.client
+import json
+import threading
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+
+def _percentile(samples: List[float], fraction: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run_benchmark(url: str, path: str, method: str = "GET", body: Optional[str] = None,
+                  concurrency: int = 16, duration: float = 10.0, warmup: float = 1.0) -> Dict[str, float]:
+    """
+    Ejecuta el benchmark y devuelve throughput, latencias (ms) y errores.
+    """
+    target = urlparse(url)
+    headers = {"Content-Type": "application/json"} if body else {}
+    latencies: List[List[float]] = [[] for _ in range(concurrency)]
+    errors = [0] * concurrency
+    start_at = time.perf_counter() + warmup
+    stop_at = start_at + duration
+
+    def client(index: int) -> None:
+        conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=30)
+        while True:
+            began = time.perf_counter()
+            if began >= stop_at:
+                break
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                ok = response.status < 400
+            except Exception:
+                ok = False
+                conn.close()
+                conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=30)
+            ended = time.perf_counter()
+            if began < start_at:
+                continue
+            if ok:
+                latencies[index].append(ended - began)
+            else:
+                errors[index] += 1
+        conn.close()
+
+    threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    samples = [latency for per_client in latencies for latency in per_client]
+    return {
+        "requests": len(samples),
+        "errors": sum(errors),
+        "rps": round(len(samples) / duration, 1),
+        "p50_ms": round(_percentile(samples, 0.50) * 1000, 2),
+        "p95_ms": round(_percentile(samples, 0.95) * 1000, 2),
+        "p99_ms": round(_percentile(samples, 0.99) * 1000, 2)
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de throughput de Laura Memory")
+    parser.add_argument("--url", default="http://127.0.0.1:5001", help="URL base del servidor")
+    parser.add_argument("--path", default="/health", help="Ruta a medir")
+    parser.add_argument("--method", default="GET", help="Método HTTP")
+    parser.add_argument("--body", default=None, help="Cuerpo JSON (para POST)")
+    parser.add_argument("--concurrency", type=int, default=16, help="Clientes concurrentes")
+    parser.add_argument("--duration", type=float, default=10.0, help="Segundos de medición")
+    parser.add_argument("--warmup", type=float, default=1.0, help="Segundos de calentamiento (no se miden)")
+    args = parser.parse_args()
+
+    result = run_benchmark(args.url, args.path, args.method, args.body,
+                           args.concurrency, args.duration, args.warmup)
+    result.update({"path": args.path, "concurrency": args.concurrency})
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
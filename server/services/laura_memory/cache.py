@@ -0,0 +1,151 @@
+"""
+Caché en proceso (LRU + TTL) para resultados de búsqueda en Zep.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class SearchCache:
+    """
+    Caché LRU acotado con TTL por store.
+
+    Las claves son tuplas ``(store, query_normalizada, limit)`` para poder
+    invalidar todas las entradas de un store cuando se escribe en él. Cada
+    invalidación incrementa la generación del store: un resultado obtenido
+    con una generación anterior (búsqueda iniciada antes de la escritura) no
+    se guarda.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttls: Optional[Dict[str, float]] = None,
+                 default_ttl: float = 60.0):
+        self.max_entries = max_entries
+        self.ttls = dict(ttls or {})
+        self.default_ttl = default_ttl
+        self._entries: "OrderedDict[Tuple[Hashable, ...], Tuple[float, Any]]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.discarded = 0
+
+    @staticmethod
+    def make_key(store: str, query: str, limit: int) -> Tuple[str, str, int]:
+        """
+        Construye la clave de caché normalizando espacios y mayúsculas.
+        """
+        normalized = " ".join(query.split()).casefold()
+        return (store, normalized, int(limit))
+
+    def _ttl_for(self, store: str) -> float:
+        return self.ttls.get(store, self.default_ttl)
+
+    def get(self, key: Tuple[Hashable, ...], allow_stale: bool = False) -> Optional[Any]:
+        """
+        Devuelve el valor cacheado o None si no existe o expiró.
+
+        Las entradas expiradas se conservan hasta que el LRU las expulse para
+        poder servirlas con ``allow_stale=True`` (p. ej. con el circuito abierto).
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at <= now and not allow_stale:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            if expires_at <= now:
+                self.stale_hits += 1
+            else:
+                self.hits += 1
+            return value
+
+    def generation(self, store: str) -> int:
+        """
+        Devuelve la generación actual del store (se incrementa en cada invalidación).
+        """
+        with self._lock:
+            return self._generations.get(store, 0)
+
+    def set(self, key: Tuple[Hashable, ...], value: Any, generation: Optional[int] = None) -> bool:
+        """
+        Guarda un valor aplicando el TTL de su store y la política LRU.
+
+        Con ``generation`` (leída antes de consultar Zep) el valor se descarta
+        si el store se invalidó mientras tanto.
+
+        Returns:
+            True si el valor se guardó.
+        """
+        ttl = self._ttl_for(key[0])
+        if ttl <= 0 or self.max_entries <= 0:
+            return False
+
+        with self._lock:
+            if generation is not None and generation != self._generations.get(key[0], 0):
+                self.discarded += 1
+                return False
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            return True
+
+    def invalidate_store(self, store: str) -> int:
+        """
+        Elimina todas las entradas de un store.
+
+        Returns:
+            Número de entradas eliminadas.
+        """
+        with self._lock:
+            stale = [key for key in self._entries if key[0] == store]
+            for key in stale:
+                del self._entries[key]
+            self._generations[store] = self._generations.get(store, 0) + 1
+            self.invalidations += 1
+            return len(stale)
+
+    def clear(self) -> None:
+        """
+        Vacía la caché y reinicia los contadores.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.stale_hits = 0
+            self.evictions = 0
+            self.invalidations = 0
+            self.discarded = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Devuelve contadores de uso de la caché.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "stale_hits": self.stale_hits,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "discarded": self.discarded,
+                "ttls": dict(self.ttls)
+            }
@@ -1,48 +1,356 @@
 """
-Detectores heurísticos para determinar qué información es relevante 
+Detectores heurísticos para determinar qué información es relevante
 para guardar en la memoria pública de Laura.
+
+Todas las reglas (usuario nuevo, términos, hechos y tags automáticos) se
+compilan una sola vez en un motor que recorre el contenido en una pasada:
+un escáner de prefijos literales localiza las posiciones candidatas y en
+cada una solo se verifican las reglas que pueden empezar ahí. Los escáneres
+se reanudan en la posición siguiente, así que los prefijos solapados
+(``nuevo`` / ``nuevo usuario``) también se detectan.
 """
 
+import atexit
+import multiprocessing
+import os
 import re
-from typing import Dict, List, Any
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, FrozenSet, List, Any, Optional, Pattern, Sequence, Set, Tuple
 from datetime import datetime
 
+from metrics import DETECTOR_DECISIONS
+from settings import settings
 
-def is_new_user(content: str, metadata: Dict[str, Any] = None) -> bool:
+# Patrones para detectar usuarios nuevos
+NEW_USER_PATTERNS = [
+    r'nuevo usuario.*?(@\w+)',
+    r'descubrí.*?(@\w+)',
+    r'encontré.*?(@\w+)',
+    r'ml discovery.*?(@\w+)',  # Buscar en minúsculas
+    r'persona.*?(@\w+)',
+    r'usuario.*?(@\w+)'
+]
+
+# Patrones para términos importantes
+IMPORTANT_TERM_PATTERNS = [
+    r'\b(ley|decreto|acuerdo|resolución)\s+\w+',
+    r'\b(proyecto|iniciativa)\s+\w+',
+    r'\b(reforma|modificación)\s+\w+',
+    r'\b(congreso|diputado|ministro)\s+\w+',
+    r'\b(elección|candidato|partido)\s+\w+',
+    r'\b(crisis|emergencia|alerta)\s+\w+',
+    r'\b(política|gobierno|estado)\s+\w+',
+    r'#\w+',  # Hashtags (sin word boundary al principio)
+    r'@\w+',  # Mentions
+]
+
+# Patrones para hechos relevantes
+FACT_PATTERNS = [
+    r'\b(aprobó|rechazó|votó|decidió)\b',
+    r'\b(anunció|declaró|confirmó|negó)\b',
+    r'\b(presentó|propuso|sugirió)\b',
+    r'\b(ocurrió|sucedió|pasó)\b',
+    r'\b(ganó|perdió|empató)\b',
+    r'\b(aumentó|aumentaron|disminuyó|disminuyeron|cambió|cambiaron)\b',  # Incluir formas plurales
+    r'\b(nueva|nuevo|primer|primera)\b',
+    r'\b(crisis|problema|conflicto)\b',
+    r'\b(acuerdo|tratado|convenio)\b',
+    r'\b(elección|resultado|ganador)\b'
+]
+
+# Tags automáticos por categoría (en el orden en que se añaden)
+CATEGORY_TAG_PATTERNS = [
+    ("politica", r'\b(congreso|diputado|política)\b'),
+    ("electoral", r'\b(elección|candidato|partido)\b'),
+    ("legal", r'\b(ley|decreto|legal)\b'),
+    ("urgente", r'\b(crisis|emergencia|problema)\b'),
+]
+
+TRUSTED_SOURCES = ['nitter_profile', 'nitter_context', 'perplexity_search']
+RELEVANT_TAGS = ['politica', 'gobierno', 'congreso', 'noticia', 'importante']
+
+NEW_USER = "new_user"
+NEW_TERM = "new_term"
+RELEVANT_FACT = "relevant_fact"
+
+_REGEX_META = set(".^$*+?{}[]\\|()")
+
+
+def _literal_prefixes(pattern: str) -> List[str]:
     """
-    Detecta si el contenido menciona un usuario nuevo relevante.
+    Devuelve los literales con los que puede empezar un match de ``pattern``.
     
-    Args:
-        content: Contenido a analizar.
-        metadata: Metadatos adicionales del contexto.
+    Soporta la forma de las reglas de este módulo: ``\\b`` opcional seguido de
+    un grupo de alternativas literales o de un literal.
+    """
+    body = pattern[2:] if pattern.startswith(r'\b') else pattern
+    if body.startswith('('):
+        alternatives = body[1:body.index(')')].split('|')
+    else:
+        literal = []
+        for char in body:
+            if char in _REGEX_META:
+                break
+            literal.append(char)
+        alternatives = [''.join(literal)]
+        
+    if not all(alternatives) or any(set(alt) & _REGEX_META for alt in alternatives):
+        raise ValueError(f"Patrón sin prefijo literal: {pattern}")
+    return alternatives
+
+
+def _trie_pattern(words: Set[str]) -> str:
+    """
+    Construye una alternancia factorizada por prefijos comunes (trie).
+    
+    ``re`` prueba las alternativas de una en una; factorizarlas evita
+    reintentar cada palabra en cada posición del texto.
+    """
+    trie: Dict[str, Any] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
         
+    def build(node: Dict[str, Any]) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        optional = '' in node
+        if len(branches) == 1 and not optional:
+            return branches[0]
+        return '(?:' + '|'.join(branches) + ')' + ('?' if optional else '')
+        
+    return build(trie)
+
+
+# Reglas "prefijo.*?(@\w+)": solo importa si hay una mención después en la misma línea
+_MENTION_SUFFIX = r'.*?(@\w+)'
+_WORD_CHAR = re.compile(r'\w')
+
+
+def _compile_rule(pattern: str) -> Tuple[str, Optional[Pattern[str]]]:
+    r"""
+    Compila una regla para comprobar solo su existencia en tiempo acotado.
+    
     Returns:
-        True si parece ser un usuario nuevo relevante.
+        ``("mention", None)`` para reglas ``prefijo.*?(@\w+)`` (se resuelven con
+        un índice de menciones por línea) o ``("regex", patrón)`` con el ``\w+``
+        final reducido a ``\w``, equivalente para saber si hay coincidencia.
     """
-    # Patrones para detectar usuarios nuevos
-    new_user_patterns = [
-        r'nuevo usuario.*?(@\w+)',
-        r'descubrí.*?(@\w+)',
-        r'encontré.*?(@\w+)',
-        r'ml discovery.*?(@\w+)',  # Buscar en minúsculas
-        r'persona.*?(@\w+)',
-        r'usuario.*?(@\w+)'
-    ]
+    if pattern.endswith(_MENTION_SUFFIX):
+        return "mention", None
+    if pattern.endswith(r'\w+'):
+        pattern = pattern[:-1]
+    return "regex", re.compile(pattern)
+
+
+def _last_mention(text: str, start: int, end: int) -> int:
+    """
+    Posición de la última mención (``@`` seguido de carácter de palabra) en
+    ``text[start:end]`` o -1.
+    """
+    i = text.rfind('@', start, end)
+    while i >= 0:
+        if _WORD_CHAR.match(text, i + 1):
+            return i
+        i = text.rfind('@', start, i)
+    return -1
+
+
+class DetectorEngine:
+    """
+    Motor de reglas compilado que evalúa todas las familias en una pasada.
     
-    content_lower = content.lower()
+    Cada regla pertenece a una familia (``new_user``, ``new_term``,
+    ``relevant_fact`` o un tag de categoría); ``scan`` devuelve las familias
+    con al menos una regla que coincide, con la misma semántica que aplicar
+    ``re.search`` a cada patrón por separado.
     
-    # Verificar patrones de usuario nuevo
-    for pattern in new_user_patterns:
-        if re.search(pattern, content_lower):
-            return True
+    El recorrido es lineal en la longitud del texto: las verificaciones
+    locales no retroceden más allá del token siguiente y las reglas
+    ``prefijo.*?@usuario`` consultan la última mención de la línea, calculada
+    una sola vez por línea, en lugar de volver a recorrerla desde cada prefijo.
+    """
     
+    def __init__(self, families: List[Tuple[str, List[str]]]):
+        self.families = tuple(name for name, _ in families)
+        # Primer carácter → [(familia, tipo, patrón, prefijos)], en orden de declaración
+        self._rules_by_char: Dict[str, List[Tuple[str, str, Optional[Pattern[str]], Tuple[str, ...]]]] = {}
+        self._prefixes: Dict[str, Set[str]] = {}
+        self._scanners: Dict[FrozenSet[str], Pattern[str]] = {}
+        
+        for family, patterns in families:
+            family_prefixes = self._prefixes.setdefault(family, set())
+            for pattern in patterns:
+                kind, compiled = _compile_rule(pattern)
+                # Más cortos primero: el prefijo más corto deja más texto para la mención
+                prefixes = tuple(sorted(_literal_prefixes(pattern), key=len))
+                first_chars = []
+                for prefix in prefixes:
+                    family_prefixes.add(prefix)
+                    if prefix[0] not in first_chars:
+                        first_chars.append(prefix[0])
+                for char in first_chars:
+                    self._rules_by_char.setdefault(char, []).append((family, kind, compiled, prefixes))
+                    
+        self._scanner_for(frozenset(self.families))
+        
+    def _scanner_for(self, pending: FrozenSet[str]) -> Pattern[str]:
+        """
+        Escáner de posiciones candidatas para las familias aún sin coincidencia.
+        
+        Se compila bajo demanda y se reutiliza: al cumplirse una familia sus
+        prefijos dejan de generar paradas en el resto del texto.
+        """
+        scanner = self._scanners.get(pending)
+        if scanner is None:
+            prefixes = set().union(*(self._prefixes[family] for family in pending))
+            scanner = re.compile(_trie_pattern(prefixes))
+            self._scanners[pending] = scanner
+        return scanner
+        
+    def scan(self, content_lower: str) -> FrozenSet[str]:
+        """
+        Evalúa todas las reglas sobre ``content_lower`` en una sola pasada.
+        
+        Se deja de recorrer el texto en cuanto todas las familias coinciden.
+        
+        Returns:
+            Conjunto de familias que coinciden.
+        """
+        pending = set(self.families)
+        scanner = self._scanner_for(frozenset(pending))
+        pos = 0
+        length = len(content_lower)
+        # Tramo [line_start, line_end) sin saltos de línea y última mención en él
+        line_start = line_end = -1
+        last_mention = -1
+        
+        while True:
+            anchor = scanner.search(content_lower, pos)
+            if anchor is None:
+                break
+                
+            pos = anchor.start()
+            fired = False
+            for family, kind, compiled, prefixes in self._rules_by_char.get(content_lower[pos], ()):
+                if family not in pending:
+                    continue
+                    
+                if kind == "regex":
+                    matched = compiled.match(content_lower, pos) is not None
+                else:
+                    matched = False
+                    for prefix in prefixes:
+                        if not content_lower.startswith(prefix, pos):
+                            continue
+                        end = pos + len(prefix)
+                        if not line_start <= end <= line_end:
+                            if line_start - 16 <= end < line_start and content_lower.find('\n', end, line_start) < 0:
+                                # Extender el tramo hacia atrás unos pocos caracteres
+                                if last_mention < 0:
+                                    last_mention = _last_mention(content_lower, end, line_start)
+                                line_start = end
+                            else:
+                                line_end = content_lower.find('\n', end)
+                                if line_end < 0:
+                                    line_end = length
+                                line_start = end
+                                last_mention = _last_mention(content_lower, end, line_end)
+                        matched = last_mention >= end
+                        break
+                        
+                if matched:
+                    pending.discard(family)
+                    fired = True
+                    
+            if not pending:
+                break
+            if fired:
+                scanner = self._scanner_for(frozenset(pending))
+            pos += 1
+            
+        return frozenset(family for family in self.families if family not in pending)
+
+
+_ENGINE = DetectorEngine(
+    [
+        (NEW_USER, NEW_USER_PATTERNS),
+        (NEW_TERM, IMPORTANT_TERM_PATTERNS),
+        (RELEVANT_FACT, FACT_PATTERNS),
+    ]
+    + [(tag, [pattern]) for tag, pattern in CATEGORY_TAG_PATTERNS]
+)
+
+
+def _bounded(content: str) -> str:
+    """
+    Recorta el contenido a ``detector_max_scan_chars`` (0 = sin límite) para
+    que un resultado gigante (p. ej. de perplexity_search) no bloquee la petición.
+    """
+    limit = settings.detector_max_scan_chars
+    if limit and len(content) > limit:
+        return content[:limit]
+    return content
+
+
+def _new_user_from(hits: FrozenSet[str], metadata: Dict[str, Any] = None) -> bool:
+    if NEW_USER in hits:
+        return True
+        
     # Verificar en metadatos si viene de ML Discovery
     if metadata and metadata.get('source') == 'ml_discovery':
         return True
-    
+        
     return False
 
 
+def _new_term_from(hits: FrozenSet[str], content: str) -> bool:
+    if NEW_TERM in hits:
+        return True
+        
+    # Verificar longitud mínima para considerar relevante (sin partir todo el texto)
+    if len(content.split(None, 4)) >= 5:
+        return True
+        
+    return False
+
+
+def _relevant_fact_from(hits: FrozenSet[str], metadata: Dict[str, Any] = None) -> bool:
+    if RELEVANT_FACT in hits:
+        return True
+        
+    # Verificar si viene de fuentes confiables
+    if metadata:
+        source = metadata.get('source', '')
+        if source in TRUSTED_SOURCES:
+            return True
+            
+        # Verificar tags relevantes
+        tags = metadata.get('tags', [])
+        if any(tag in RELEVANT_TAGS for tag in tags):
+            return True
+            
+    return False
+
+
+def is_new_user(content: str, metadata: Dict[str, Any] = None) -> bool:
+    """
+    Detecta si el contenido menciona un usuario nuevo relevante.
+    
+    Args:
+        content: Contenido a analizar.
+        metadata: Metadatos adicionales del contexto.
+        
+    Returns:
+        True si parece ser un usuario nuevo relevante.
+    """
+    return _new_user_from(_ENGINE.scan(_bounded(content).lower()), metadata)
+
+
 def is_new_term(content: str, metadata: Dict[str, Any] = None) -> bool:
     """
     Detecta si el contenido contiene términos nuevos relevantes.
@@ -54,31 +362,8 @@ def is_new_term(content: str, metadata: Dict[str, Any] = None) -> bool:
     Returns:
         True si contiene términos nuevos relevantes.
     """
-    # Patrones para términos importantes
-    important_terms = [
-        r'\b(ley|decreto|acuerdo|resolución)\s+\w+',
-        r'\b(proyecto|iniciativa)\s+\w+',
-        r'\b(reforma|modificación)\s+\w+',
-        r'\b(congreso|diputado|ministro)\s+\w+',
-        r'\b(elección|candidato|partido)\s+\w+',
-        r'\b(crisis|emergencia|alerta)\s+\w+',
-        r'\b(política|gobierno|estado)\s+\w+',
-        r'#\w+',  # Hashtags (sin word boundary al principio)
-        r'@\w+',  # Mentions
-    ]
-    
-    content_lower = content.lower()
-    
-    # Verificar patrones de términos importantes
-    for pattern in important_terms:
-        if re.search(pattern, content_lower):
-            return True
-    
-    # Verificar longitud mínima para considerar relevante
-    if len(content.split()) >= 5:
-        return True
-    
-    return False
+    content = _bounded(content)
+    return _new_term_from(_ENGINE.scan(content.lower()), content)
 
 
 def is_relevant_fact(content: str, metadata: Dict[str, Any] = None) -> bool:
@@ -92,67 +377,32 @@ def is_relevant_fact(content: str, metadata: Dict[str, Any] = None) -> bool:
     Returns:
         True si es un hecho relevante para guardar.
     """
-    # Patrones para hechos relevantes
-    fact_patterns = [
-        r'\b(aprobó|rechazó|votó|decidió)\b',
-        r'\b(anunció|declaró|confirmó|negó)\b',
-        r'\b(presentó|propuso|sugirió)\b',
-        r'\b(ocurrió|sucedió|pasó)\b',
-        r'\b(ganó|perdió|empató)\b',
-        r'\b(aumentó|aumentaron|disminuyó|disminuyeron|cambió|cambiaron)\b',  # Incluir formas plurales
-        r'\b(nueva|nuevo|primer|primera)\b',
-        r'\b(crisis|problema|conflicto)\b',
-        r'\b(acuerdo|tratado|convenio)\b',
-        r'\b(elección|resultado|ganador)\b'
-    ]
-    
-    content_lower = content.lower()
-    
-    # Verificar patrones de hechos
-    for pattern in fact_patterns:
-        if re.search(pattern, content_lower):
-            return True
-    
-    # Verificar si viene de fuentes confiables
-    if metadata:
-        source = metadata.get('source', '')
-        if source in ['nitter_profile', 'nitter_context', 'perplexity_search']:
-            return True
-        
-        # Verificar tags relevantes
-        tags = metadata.get('tags', [])
-        relevant_tags = ['politica', 'gobierno', 'congreso', 'noticia', 'importante']
-        if any(tag in relevant_tags for tag in tags):
-            return True
-    
-    return False
+    return _relevant_fact_from(_ENGINE.scan(_bounded(content).lower()), metadata)
 
 
-def should_save_to_memory(content: str, metadata: Dict[str, Any] = None) -> Dict[str, Any]:
+def _evaluate(content: str, metadata: Dict[str, Any] = None) -> Tuple[Dict[str, Any], str, str]:
     """
-    Determina si el contenido debe guardarse en memoria y con qué metadatos.
+    Evalúa un contenido sin registrar métricas (se puede ejecutar en otro proceso).
     
-    Args:
-        content: Contenido a evaluar.
-        metadata: Metadatos existentes.
-        
     Returns:
-        Dict con información sobre si guardar y metadatos sugeridos.
+        Tupla (decisión, "save"/"skip", motivo para métricas).
     """
     if not content or len(content.strip()) < 10:
-        return {"should_save": False, "reason": "Contenido demasiado corto"}
-    
-    # Verificar condiciones
-    new_user = is_new_user(content, metadata)
-    new_term = is_new_term(content, metadata)
-    relevant_fact = is_relevant_fact(content, metadata)
+        return {"should_save": False, "reason": "Contenido demasiado corto"}, "skip", "too_short"
+        
+    # Verificar condiciones (una sola pasada, acotada, para todas las reglas)
+    scanned = _bounded(content)
+    hits = _ENGINE.scan(scanned.lower())
+    new_user = _new_user_from(hits, metadata)
+    new_term = _new_term_from(hits, scanned)
+    relevant_fact = _relevant_fact_from(hits, metadata)
     
     # Determinar si guardar
     should_save = new_user or new_term or relevant_fact
     
     if not should_save:
-        return {"should_save": False, "reason": "No cumple criterios de relevancia"}
-    
+        return {"should_save": False, "reason": "No cumple criterios de relevancia"}, "skip", "not_relevant"
+        
     # Preparar metadatos sugeridos
     suggested_metadata = metadata.copy() if metadata else {}
     
@@ -164,17 +414,12 @@ def should_save_to_memory(content: str, metadata: Dict[str, Any] = None) -> Dict
         auto_tags.append("new_term")
     if relevant_fact:
         auto_tags.append("relevant_fact")
-    
+        
     # Detectar categorías adicionales
-    if re.search(r'\b(congreso|diputado|política)\b', content.lower()):
-        auto_tags.append("politica")
-    if re.search(r'\b(elección|candidato|partido)\b', content.lower()):
-        auto_tags.append("electoral")
-    if re.search(r'\b(ley|decreto|legal)\b', content.lower()):
-        auto_tags.append("legal")
-    if re.search(r'\b(crisis|emergencia|problema)\b', content.lower()):
-        auto_tags.append("urgente")
-    
+    for tag, _ in CATEGORY_TAG_PATTERNS:
+        if tag in hits:
+            auto_tags.append(tag)
+            
     # Combinar tags existentes con automáticos
     existing_tags = suggested_metadata.get('tags', [])
     all_tags = list(set(existing_tags + auto_tags))
@@ -185,6 +430,9 @@ def should_save_to_memory(content: str, metadata: Dict[str, Any] = None) -> Dict
         'confidence': 'high' if (new_user and relevant_fact) else 'medium'
     })
     
+    matched = [name for name, hit in ((NEW_USER, new_user), (NEW_TERM, new_term),
+                                      (RELEVANT_FACT, relevant_fact)) if hit]
+    
     return {
         "should_save": True,
         "metadata": suggested_metadata,
@@ -193,4 +441,131 @@ def should_save_to_memory(content: str, metadata: Dict[str, Any] = None) -> Dict
             "new_term": new_term,
             "relevant_fact": relevant_fact
         }
-    }
\ No newline at end of file
+    }, "save", "+".join(matched)
+
+
+def _evaluate_chunk(items: List[Tuple[str, Optional[Dict[str, Any]]]]) -> List[Tuple[Dict[str, Any], str, str]]:
+    return [_evaluate(content, metadata) for content, metadata in items]
+
+
+def should_save_to_memory(content: str, metadata: Dict[str, Any] = None,
+                          novelty_score: Optional[Callable[[str], float]] = None) -> Dict[str, Any]:
+    """
+    Determina si el contenido debe guardarse en memoria y con qué metadatos.
+    
+    Args:
+        content: Contenido a evaluar.
+        metadata: Metadatos existentes.
+        novelty_score: Estimador opcional de novedad (0.0-1.0). Solo se
+            consulta si los detectores deciden guardar; por debajo de
+            ``settings.novelty_threshold`` la decisión pasa a ``skip``
+            (motivo ``low_novelty``) y se registra una sola vez.
+        
+    Returns:
+        Dict con información sobre si guardar y metadatos sugeridos.
+    """
+    result, decision, reason = _evaluate(content, metadata)
+    if decision == "save" and novelty_score is not None:
+        novelty = novelty_score(content)
+        result["metadata"]["novelty"] = round(novelty, 3)
+        if novelty < settings.novelty_threshold:
+            result = {
+                "should_save": False,
+                "reason": f"Contenido redundante (novedad {novelty:.2f})",
+                "novelty": round(novelty, 3)
+            }
+            decision, reason = "skip", "low_novelty"
+    DETECTOR_DECISIONS.inc(decision=decision, reason=reason)
+    return result
+
+
+# Pool de procesos para lotes grandes (se crea bajo demanda)
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_workers = 0
+_process_pool_lock = threading.Lock()
+
+
+def _get_process_pool(max_workers: int) -> ProcessPoolExecutor:
+    global _process_pool, _process_pool_workers
+    with _process_pool_lock:
+        if _process_pool is None or _process_pool_workers != max_workers:
+            if _process_pool is not None:
+                _process_pool.shutdown(wait=False)
+            # "spawn": el servidor tiene hilos vivos y fork podría copiar locks tomados
+            _process_pool = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            _process_pool_workers = max_workers
+        return _process_pool
+
+
+def shutdown_process_pool() -> None:
+    """
+    Detiene el pool de procesos de clasificación por lotes, si existe.
+    """
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=True)
+            _process_pool = None
+
+
+atexit.register(shutdown_process_pool)
+
+
+def should_save_to_memory_batch(contents: Sequence[str],
+                                metadatas: Optional[Sequence[Optional[Dict[str, Any]]]] = None,
+                                process_threshold: Optional[int] = None,
+                                max_workers: Optional[int] = None,
+                                chunk_size: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Clasifica muchos contenidos de una vez con la misma lógica que ``should_save_to_memory``.
+    
+    Los lotes pequeños se evalúan en el propio proceso; a partir de
+    ``process_threshold`` elementos se reparten en trozos de ``chunk_size``
+    entre un pool de procesos para usar todos los núcleos (p. ej. al
+    reprocesar un día de resultados de nitter_context).
+    
+    Args:
+        contents: Contenidos a evaluar.
+        metadatas: Metadatos por contenido (misma longitud) o None.
+        process_threshold: Tamaño mínimo para usar el pool de procesos.
+        max_workers: Procesos del pool (por defecto, uno por núcleo).
+        chunk_size: Elementos por tarea enviada al pool.
+        
+    Returns:
+        Lista de decisiones en el mismo orden que ``contents``.
+        
+    Raises:
+        ValueError: Si ``metadatas`` no tiene la misma longitud que ``contents``.
+    """
+    if metadatas is None:
+        metadatas = [None] * len(contents)
+    if len(metadatas) != len(contents):
+        raise ValueError("contents y metadatas deben tener la misma longitud")
+    
+    if process_threshold is None:
+        process_threshold = settings.detector_batch_process_threshold
+    if max_workers is None:
+        max_workers = settings.detector_batch_max_workers or os.cpu_count() or 1
+    if chunk_size is None:
+        chunk_size = settings.detector_batch_chunk_size
+    chunk_size = max(1, chunk_size)
+    
+    items = list(zip(contents, metadatas))
+    if len(items) < process_threshold or max_workers <= 1:
+        evaluated = _evaluate_chunk(items)
+    else:
+        pool = _get_process_pool(max_workers)
+        chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+        evaluated = []
+        for chunk_result in pool.map(_evaluate_chunk, chunks):
+            evaluated.extend(chunk_result)
+    
+    # Las métricas se registran aquí: los contadores de los procesos hijos se pierden
+    results = []
+    for result, decision, reason in evaluated:
+        DETECTOR_DECISIONS.inc(decision=decision, reason=reason)
+        results.append(result)
+    return results
@@ -0,0 +1,73 @@
+"""
+Configuración de gunicorn para servir Laura Memory en producción.
+
+    gunicorn -c gunicorn.conf.py server:app
+
+La aplicación, la configuración y el cliente de Zep se cargan en el proceso
+maestro (``preload_app``) antes de crear los workers; cada worker atiende
+``LAURA_SERVER_THREADS`` peticiones a la vez (worker ``gthread``), lo
+adecuado para rutas que esperan sobre todo a Zep.
+
+Cada worker tiene su propio registro de métricas: con más de un worker, cada
+uno publica las suyas en ``LAURA_METRICS_MULTIPROCESS_DIR`` (un directorio
+temporal si no se configura) y ``/metrics`` devuelve las de todos.
+"""
+
+import glob
+import os
+import signal
+import tempfile
+
+from settings import settings
+
+bind = settings.server_bind
+workers = settings.server_workers
+threads = settings.server_threads
+worker_class = "gthread"
+preload_app = True
+timeout = settings.server_timeout_seconds
+graceful_timeout = settings.server_graceful_timeout_seconds
+keepalive = settings.server_keepalive_seconds
+accesslog = "-"
+errorlog = "-"
+
+
+def on_starting(server):
+    # Maestro: preparar el directorio de métricas compartido antes de crear los workers
+    if settings.server_workers > 1 and not settings.metrics_multiprocess_dir:
+        settings.metrics_multiprocess_dir = tempfile.mkdtemp(prefix="laura-metrics-")
+    if settings.metrics_multiprocess_dir:
+        # Instantáneas de un arranque anterior (los pids pueden repetirse en un contenedor nuevo)
+        for path in glob.glob(os.path.join(settings.metrics_multiprocess_dir, "*.json")):
+            os.remove(path)
+
+
+def when_ready(server):
+    # Maestro, tras cargar la app y antes de crear los workers
+    from server import initialize
+    initialize()
+
+
+def post_worker_init(worker):
+    # Al recibir SIGTERM, /ready responde 503 mientras se drenan las peticiones en curso
+    from server import mark_draining
+    previous = signal.getsignal(signal.SIGTERM)
+
+    def handle_term(signum, frame):
+        mark_draining()
+        if callable(previous):
+            previous(signum, frame)
+
+    signal.signal(signal.SIGTERM, handle_term)
+
+    if settings.metrics_multiprocess_dir:
+        from metrics import registry
+        registry.start_multiprocess(settings.metrics_multiprocess_dir, settings.metrics_snapshot_interval_seconds)
+
+
+def worker_exit(server, worker):
+    # Tras atender las peticiones en curso: vaciar la cola write-behind y persistir índices
+    from server import begin_shutdown
+    begin_shutdown(settings.server_graceful_timeout_seconds)
+    from metrics import registry
+    registry.stop_multiprocess()
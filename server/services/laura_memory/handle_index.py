@@ -0,0 +1,297 @@
+"""
+Índice de handles en disco, mapeado en memoria y compartido entre procesos.
+
+Los workers de ``server.py`` y las invocaciones de ``internal_interface.py``
+abren el mismo archivo en solo lectura con ``mmap``: el sistema operativo
+comparte las páginas, así que los datos no se duplican por proceso ni hace
+falta recargarlos desde Zep al arrancar. Las reconstrucciones escriben un
+archivo nuevo y lo sustituyen con ``os.replace`` bajo ``flock``; los lectores
+detectan el cambio de inodo y vuelven a mapear.
+
+Formato (little-endian, tablas ordenadas para búsqueda binaria)::
+
+    cabecera   magic, versión, n_entradas, n_trigramas, bits/hashes del Bloom,
+               offsets de cada sección
+    entradas   n × (off_clave, len_clave, off_ficha, len_ficha) ordenadas por clave
+    trigramas  n × (off_trigrama, len_trigrama, inicio_postings, n_postings) ordenados
+    postings   uint32 con el índice de la entrada
+    bloom      bits del filtro de Bloom sobre las claves
+    blob       claves (UTF-8) y fichas (JSON)
+"""
+
+import fcntl
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from handle_registry import BloomFilter, normalize_handle
+from text_index import min_shared_trigrams, trigram_score, trigrams
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"LHX1"
+VERSION = 1
+_HEADER = struct.Struct("<4sIIIII5Q")
+_ROW = struct.Struct("<IIII")
+_U32 = struct.Struct("<I")
+
+
+def _record_grams(record: Dict[str, str]) -> List[Set[str]]:
+    return [g for g in (trigrams(record.get("full_name", "")), trigrams(record["handle"])) if g]
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def build_handle_index(records: Iterable[Dict[str, str]], capacity: int = 100000,
+                       error_rate: float = 0.001) -> bytes:
+    """
+    Serializa las fichas (clave normalizada → ficha) en el formato del índice.
+    """
+    by_key: Dict[bytes, Dict[str, str]] = {}
+    for record in records:
+        by_key[normalize_handle(record["handle"]).encode("utf-8")] = record
+    keys = sorted(by_key)
+
+    blob = bytearray()
+    entries = []
+    postings_by_gram: Dict[bytes, List[int]] = {}
+    bloom = BloomFilter(max(capacity, len(keys)), error_rate)
+    for index, key in enumerate(keys):
+        record = by_key[key]
+        payload = json.dumps(record, ensure_ascii=False, sort_keys=True).encode("utf-8")
+        entries.append((len(blob), len(key), len(blob) + len(key), len(payload)))
+        blob += key
+        blob += payload
+        bloom.add(key.decode("utf-8"))
+        for gram in set().union(*_record_grams(record)):
+            postings_by_gram.setdefault(gram.encode("utf-8"), []).append(index)
+
+    grams = []
+    postings: List[int] = []
+    for gram in sorted(postings_by_gram):
+        grams.append((len(blob), len(gram), len(postings), len(postings_by_gram[gram])))
+        blob += gram
+        postings.extend(postings_by_gram[gram])
+
+    entries_off = _align(_HEADER.size)
+    grams_off = _align(entries_off + len(entries) * _ROW.size)
+    postings_off = _align(grams_off + len(grams) * _ROW.size)
+    bloom_off = _align(postings_off + len(postings) * _U32.size)
+    bloom_bits = bytes(bloom.bits)
+    blob_off = _align(bloom_off + len(bloom_bits))
+
+    out = bytearray(blob_off + len(blob))
+    _HEADER.pack_into(out, 0, MAGIC, VERSION, len(entries), len(grams), bloom.num_bits, bloom.num_hashes,
+                      entries_off, grams_off, postings_off, bloom_off, blob_off)
+    for i, row in enumerate(entries):
+        _ROW.pack_into(out, entries_off + i * _ROW.size, *row)
+    for i, row in enumerate(grams):
+        _ROW.pack_into(out, grams_off + i * _ROW.size, *row)
+    if postings:
+        struct.pack_into(f"<{len(postings)}I", out, postings_off, *postings)
+    out[bloom_off:bloom_off + len(bloom_bits)] = bloom_bits
+    out[blob_off:] = blob
+    return bytes(out)
+
+
+@contextmanager
+def index_lock(path: str) -> Iterator[None]:
+    """
+    Bloqueo exclusivo entre procesos (``flock`` sobre ``<path>.lock``).
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    with open(f"{path}.lock", "a") as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def write_handle_index(path: str, records: Iterable[Dict[str, str]], capacity: int = 100000,
+                       error_rate: float = 0.001) -> None:
+    """
+    Escribe el índice en un temporal y lo sustituye de forma atómica.
+
+    Quien llame debe tener ``index_lock(path)`` si otros procesos reconstruyen.
+    """
+    data = build_handle_index(records, capacity, error_rate)
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+class _MappedBits:
+    """
+    Vista de los bits del Bloom dentro del mmap (sin copiarlos).
+    """
+
+    __slots__ = ("_mm", "_offset")
+
+    def __init__(self, mm: mmap.mmap, offset: int):
+        self._mm = mm
+        self._offset = offset
+
+    def __getitem__(self, index: int) -> int:
+        return self._mm[self._offset + index]
+
+
+class SharedHandleIndex:
+    """
+    Lector de solo lectura del índice mapeado en memoria.
+
+    ``get`` y ``search`` leen directamente del mapeo; ``is_stale`` indica si
+    otro proceso sustituyó el archivo (el llamador abre uno nuevo). No es
+    seguro cerrar el índice mientras otro hilo lo lee: el llamador serializa
+    con su lock.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._inode = os.fstat(f.fileno()).st_ino
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            (magic, version, self._n_entries, self._n_grams, bloom_bits, bloom_hashes,
+             self._entries_off, self._grams_off, self._postings_off, bloom_off,
+             self._blob_off) = _HEADER.unpack_from(self._mm, 0)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"formato de índice no reconocido en {path}")
+        except Exception:
+            self._mm.close()
+            raise
+        self._bloom = BloomFilter.from_bits(_MappedBits(self._mm, bloom_off), bloom_bits, bloom_hashes)
+
+    @classmethod
+    def open(cls, path: str) -> Optional["SharedHandleIndex"]:
+        """
+        Abre el índice si existe y es válido; None en caso contrario.
+        """
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            return cls(path)
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo abrir el índice de handles {path}: {e}")
+            return None
+
+    def __len__(self) -> int:
+        return self._n_entries
+
+    def _blob(self, offset: int, length: int) -> bytes:
+        start = self._blob_off + offset
+        return self._mm[start:start + length]
+
+    def _entry(self, index: int) -> Tuple[int, int, int, int]:
+        return _ROW.unpack_from(self._mm, self._entries_off + index * _ROW.size)
+
+    def _record(self, index: int) -> Dict[str, str]:
+        _, _, rec_off, rec_len = self._entry(index)
+        return json.loads(self._blob(rec_off, rec_len))
+
+    def _find(self, table_off: int, count: int, target: bytes) -> int:
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            off, length, _, _ = _ROW.unpack_from(self._mm, table_off + mid * _ROW.size)
+            if self._blob(off, length) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < count:
+            off, length, _, _ = _ROW.unpack_from(self._mm, table_off + lo * _ROW.size)
+            if self._blob(off, length) == target:
+                return lo
+        return -1
+
+    def might_contain(self, key: str) -> bool:
+        return key in self._bloom
+
+    def get_key(self, key: str) -> Optional[Dict[str, str]]:
+        """
+        Busca una clave ya normalizada (búsqueda binaria sobre la tabla ordenada).
+        """
+        index = self._find(self._entries_off, self._n_entries, key.encode("utf-8"))
+        return self._record(index) if index >= 0 else None
+
+    def get(self, handle: str) -> Optional[Dict[str, str]]:
+        return self.get_key(normalize_handle(handle))
+
+    def records(self) -> Iterator[Dict[str, str]]:
+        for index in range(self._n_entries):
+            yield self._record(index)
+
+    def _postings(self, gram: str) -> Tuple[int, int]:
+        index = self._find(self._grams_off, self._n_grams, gram.encode("utf-8"))
+        if index < 0:
+            return 0, 0
+        _, _, start, count = _ROW.unpack_from(self._mm, self._grams_off + index * _ROW.size)
+        return start, count
+
+    def search(self, query: str, limit: int = 5, min_score: float = 0.0) -> List[Tuple[str, Dict[str, str], float]]:
+        """
+        Búsqueda difusa por trigramas (misma puntuación que ``TrigramIndex``).
+
+        Returns:
+            Lista de (clave, ficha, puntuación) de mayor a menor.
+        """
+        query_grams = trigrams(query)
+        if not query_grams:
+            return []
+        size = len(query_grams)
+        min_shared = min_shared_trigrams(size, min_score)
+
+        # Filtro de prefijo sobre los trigramas más raros de la consulta
+        postings = sorted((self._postings(gram) for gram in query_grams), key=lambda item: item[1])
+        candidates: Set[int] = set()
+        for start, count in postings[:size - min_shared + 1]:
+            if count:
+                candidates.update(struct.unpack_from(f"<{count}I", self._mm, self._postings_off + start * _U32.size))
+
+        scored = []
+        for index in candidates:
+            record = self._record(index)
+            grams = _record_grams(record)
+            best = max((trigram_score(query_grams, g) for g in grams), default=0.0)
+            if best >= min_score:
+                scored.append((normalize_handle(record["handle"]), record, best))
+        scored.sort(key=lambda item: (-item[2], item[0]))
+        return scored[:limit]
+
+    def is_stale(self) -> bool:
+        """
+        True si el archivo en disco ya no es el mapeado (otro proceso lo sustituyó).
+        """
+        try:
+            return os.stat(self.path).st_ino != self._inode
+        except FileNotFoundError:
+            return False
+
+    def close(self) -> None:
+        self._mm.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "entries": self._n_entries,
+            "trigrams": self._n_grams,
+            "bytes": len(self._mm)
+        }
@@ -0,0 +1,333 @@
+"""
+Registro local canónico de handles de UserHandles.
+
+Evita la búsqueda semántica en Zep antes de cada escritura: la deduplicación
+se resuelve en O(1) con claves normalizadas (mayúsculas y Unicode), un filtro
+de Bloom delante y un diccionario exacto detrás.
+"""
+
+import hashlib
+import math
+import re
+import threading
+import unicodedata
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from text_index import TrigramIndex
+
+# Formatos que se escriben hoy en UserHandles:
+#   integration.save_user_discovery      → "el usuario es @juanperez_gt"
+#   internal_interface.execute_function  → "Usuario: Juan Pérez (@juanperez_gt) - Diputado"
+_DISCOVERY_RE = re.compile(r"^\s*el usuario es\s+@(\w+)", re.IGNORECASE)
+_AGENT_RE = re.compile(r"^\s*Usuario:\s*(.*?)\s*\(@(\w+)\)(?:\s*-\s*(.*))?\s*$", re.IGNORECASE | re.DOTALL)
+
+RECORD_FIELDS = ("full_name", "description", "category")
+
+
+def normalize_handle(handle: str) -> str:
+    """
+    Clave canónica de un handle: sin ``@`` ni espacios, NFKC y casefold.
+
+    ``@JuanPerez_GT``, ``juanperez_gt`` y ``＠ｊｕａｎｐｅｒｅｚ_ｇｔ`` dan la misma clave.
+    """
+    return unicodedata.normalize("NFKC", handle or "").strip().lstrip("@").strip().casefold()
+
+
+def parse_handle_record(content: str) -> Optional[Dict[str, str]]:
+    """
+    Extrae handle, nombre y descripción de un contenido de UserHandles.
+
+    Returns:
+        Dict con ``handle`` y los campos presentes, o None si no se reconoce.
+    """
+    if not content:
+        return None
+    match = _AGENT_RE.match(content)
+    if match:
+        full_name, handle, description = match.groups()
+        record = {"handle": handle}
+        if full_name:
+            record["full_name"] = full_name
+        if description and description.strip():
+            record["description"] = description.strip()
+        return record
+    match = _DISCOVERY_RE.match(content)
+    if match:
+        return {"handle": match.group(1)}
+    return None
+
+
+def handle_record(content: str, metadata: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, str]]:
+    """
+    Combina lo que se puede extraer del contenido con los metadatos de la escritura.
+
+    ``twitter_username``, ``full_name`` y ``category`` de los metadatos tienen
+    prioridad sobre lo extraído del texto.
+    """
+    record = parse_handle_record(content) or {}
+    metadata = metadata or {}
+    if metadata.get("twitter_username"):
+        record["handle"] = str(metadata["twitter_username"]).lstrip("@")
+    for field in RECORD_FIELDS:
+        value = metadata.get(field)
+        if value:
+            record[field] = str(value)
+    return record if record.get("handle") else None
+
+
+def format_handle_record(record: Dict[str, str]) -> str:
+    """
+    Representa una ficha con el mismo formato que se guarda en UserHandles.
+    """
+    if not record.get("full_name"):
+        return f"el usuario es @{record['handle']}"
+    text = f"Usuario: {record['full_name']} (@{record['handle']})"
+    if record.get("description"):
+        text += f" - {record['description']}"
+    return text
+
+
+class BloomFilter:
+    """
+    Filtro de Bloom sobre un ``bytearray`` (doble hashing con BLAKE2b).
+    """
+
+    def __init__(self, capacity: int = 100000, error_rate: float = 0.001):
+        capacity = max(1, capacity)
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+
+    @classmethod
+    def from_bits(cls, bits, num_bits: int, num_hashes: int) -> "BloomFilter":
+        """
+        Filtro de solo lectura sobre bits existentes (p. ej. dentro de un mmap).
+        """
+        bloom = cls.__new__(cls)
+        bloom.num_bits = num_bits
+        bloom.num_hashes = num_hashes
+        bloom._bits = bits
+        return bloom
+
+    @property
+    def bits(self):
+        return self._bits
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def add(self, key: str) -> None:
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def clear(self) -> None:
+        self._bits = bytearray(len(self._bits))
+
+
+class HandleRegistry:
+    """
+    Registro handle → ficha (``handle``, ``full_name``, ``description``, ``category``).
+
+    ``upsert`` inserta o completa la ficha de forma atómica e indica si hubo
+    cambios, de modo que solo se escriba en Zep lo que aporta información
+    nueva. ``loaded`` indica si el registro se sembró (desde Zep o desde el
+    índice compartido); hasta entonces quien lo use debe recurrir a la
+    verificación remota.
+
+    Las fichas viven en dos capas: una base de solo lectura compartida entre
+    procesos (``handle_index.SharedHandleIndex``, opcional) y una capa local
+    con lo escrito por este proceso desde la última reconstrucción. Un índice
+    de trigramas sobre ``full_name`` y ``handle`` permite resolver nombres con
+    acentos o erratas (``search``).
+    """
+
+    def __init__(self, capacity: int = 100000, error_rate: float = 0.001):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._records: Dict[str, Dict[str, str]] = {}
+        self._fuzzy = TrigramIndex()
+        self._base = None
+        self._lock = threading.Lock()
+        self.loaded = False
+        self.lookups = 0
+        self.bloom_negatives = 0
+        self.bloom_false_positives = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            if self._base is None:
+                return len(self._records)
+            return len(self._base) + sum(1 for key in self._records if self._base.get_key(key) is None)
+
+    def _lookup(self, key: str) -> Optional[Dict[str, str]]:
+        self.lookups += 1
+        in_base = self._base is not None and self._base.might_contain(key)
+        if key not in self._bloom and not in_base:
+            self.bloom_negatives += 1
+            return None
+        record = self._records.get(key)
+        if record is None and in_base:
+            record = self._base.get_key(key)
+        if record is None:
+            self.bloom_false_positives += 1
+        return record
+
+    def get(self, handle: str) -> Optional[Dict[str, str]]:
+        key = normalize_handle(handle)
+        with self._lock:
+            record = self._lookup(key)
+            return dict(record) if record else None
+
+    def __contains__(self, handle: str) -> bool:
+        return self.get(handle) is not None
+
+    def upsert(self, record: Dict[str, str]) -> Tuple[bool, Optional[Dict[str, str]]]:
+        """
+        Inserta la ficha o completa la existente con los campos no vacíos.
+
+        Returns:
+            Tupla (cambió, ficha anterior o None) para poder revertir con ``restore``.
+        """
+        key = normalize_handle(record["handle"])
+        with self._lock:
+            previous = self._lookup(key)
+            if previous is None:
+                self._set_local(key, {name: value for name, value in record.items() if value})
+                return True, None
+            merged = dict(previous)
+            for field in RECORD_FIELDS:
+                value = record.get(field)
+                if value and merged.get(field) != value:
+                    merged[field] = value
+            if merged == previous:
+                return False, dict(previous)
+            self._set_local(key, merged)
+            return True, dict(previous)
+
+    def restore(self, handle: str, previous: Optional[Dict[str, str]]) -> None:
+        """
+        Deshace un ``upsert`` (p. ej. si la escritura en Zep falló).
+        """
+        key = normalize_handle(handle)
+        with self._lock:
+            base_record = self._base.get_key(key) if self._base is not None else None
+            if previous is None or previous == base_record:
+                # El filtro de Bloom no admite borrados: solo queda un falso positivo
+                self._records.pop(key, None)
+                self._fuzzy.remove(key)
+            else:
+                self._set_local(key, dict(previous))
+
+    def _set_local(self, key: str, record: Dict[str, str]) -> None:
+        self._records[key] = record
+        self._bloom.add(key)
+        self._fuzzy.set(key, (record.get("full_name", ""), record["handle"]))
+
+    def search(self, query: str, limit: int = 5, min_score: float = 0.0) -> List[Tuple[Dict[str, str], float]]:
+        """
+        Busca fichas por nombre o handle aproximados en ambas capas.
+
+        Returns:
+            Lista de (ficha, puntuación) ordenada de mayor a menor.
+        """
+        with self._lock:
+            local = [(key, dict(self._records[key]), score)
+                     for key, score in self._fuzzy.search(query, limit=limit, min_score=min_score)
+                     if key in self._records]
+            shared = self._base.search(query, limit=limit + len(self._records), min_score=min_score) \
+                if self._base is not None else []
+        # La capa local tiene prioridad sobre la base para la misma clave
+        seen = {key for key, _, _ in local}
+        matches = local + [match for match in shared if match[0] not in seen]
+        matches.sort(key=lambda item: (-item[2], item[0]))
+        return [(record, score) for _, record, score in matches[:limit]]
+
+    def load(self, contents: Iterable[str]) -> int:
+        """
+        Siembra el registro con contenidos ya guardados en UserHandles.
+
+        Returns:
+            Número de contenidos reconocidos.
+        """
+        recognized = 0
+        for content in contents:
+            record = parse_handle_record(content)
+            if record:
+                self.upsert(record)
+                recognized += 1
+        self.loaded = True
+        return recognized
+
+    @property
+    def base(self):
+        return self._base
+
+    @property
+    def pending(self) -> int:
+        """
+        Fichas locales que aún no están en la base compartida.
+        """
+        return len(self._records)
+
+    def attach(self, base) -> None:
+        """
+        Usa ``base`` como capa compartida y descarta de la capa local lo que
+        ya contiene (el registro queda cargado).
+        """
+        with self._lock:
+            old = self._base
+            self._base = base
+            for key, record in list(self._records.items()):
+                if base.get_key(key) == record:
+                    del self._records[key]
+                    self._fuzzy.remove(key)
+            self.loaded = True
+        if old is not None and old is not base:
+            old.close()
+
+    def snapshot(self) -> List[Dict[str, str]]:
+        """
+        Todas las fichas (base + capa local) para reconstruir el índice compartido.
+        """
+        with self._lock:
+            records = {}
+            if self._base is not None:
+                for record in self._base.records():
+                    records[normalize_handle(record["handle"])] = record
+            for key, record in self._records.items():
+                records[key] = dict(record)
+            return list(records.values())
+
+    def clear(self) -> None:
+        with self._lock:
+            old = self._base
+            self._base = None
+            self._records.clear()
+            self._bloom.clear()
+            self._fuzzy.clear()
+            self.loaded = False
+        if old is not None:
+            old.close()
+
+    def stats(self) -> Dict[str, Any]:
+        handles = len(self)
+        with self._lock:
+            return {
+                "handles": handles,
+                "pending": len(self._records),
+                "loaded": self.loaded,
+                "lookups": self.lookups,
+                "bloom_negatives": self.bloom_negatives,
+                "bloom_false_positives": self.bloom_false_positives,
+                "bloom_bits": self._bloom.num_bits,
+                "bloom_hashes": self._bloom.num_hashes,
+                "fuzzy_index": self._fuzzy.stats(),
+                "shared_index": self._base.stats() if self._base is not None else None
+            }
@@ -0,0 +1,387 @@
+"""
+Trabajos de ingesta en segundo plano con estado consultable.
+
+El estado de cada trabajo se guarda en SQLite (``JobStore``): con una ruta en
+disco lo comparten todos los workers, así que ``GET /jobs/<id>`` responde
+aunque la petición llegue a un worker distinto del que encoló el trabajo.
+"""
+
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+import urllib.request
+import uuid
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ingest_jobs (
+    job_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    result TEXT,
+    error TEXT,
+    callback_url TEXT,
+    callback_status TEXT,
+    worker_pid INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ingest_jobs_finished ON ingest_jobs (finished_at);
+CREATE INDEX IF NOT EXISTS ingest_jobs_created ON ingest_jobs (created_at);
+"""
+
+_JOB_FIELDS = ("job_id", "status", "created_at", "started_at", "finished_at", "result", "error",
+               "callback_url", "callback_status")
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobStore:
+    """
+    Estado de los trabajos en SQLite (modo WAL con ruta en disco; ``""`` = solo en memoria).
+
+    Cada fila guarda el pid del worker que ejecuta el trabajo: si ese proceso
+    ya no existe, un trabajo sin terminar se informa como ``failed``.
+    """
+
+    def __init__(self, path: str = ""):
+        self.path = path
+        if path:
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path or ":memory:", check_same_thread=False, timeout=5.0,
+                                     isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            if path:
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+
+    def insert(self, job: Dict[str, Any]) -> None:
+        row = dict(job, result=json.dumps(job["result"], ensure_ascii=False, default=str),
+                   worker_pid=os.getpid())
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO ingest_jobs (job_id, status, created_at, started_at, finished_at, result, error, "
+                "callback_url, callback_status, worker_pid) VALUES (:job_id, :status, :created_at, :started_at, "
+                ":finished_at, :result, :error, :callback_url, :callback_status, :worker_pid)",
+                row
+            )
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        if "result" in fields:
+            fields["result"] = json.dumps(fields["result"], ensure_ascii=False, default=str)
+        assignments = ", ".join(f"{name} = :{name}" for name in fields if name in _JOB_FIELDS)
+        with self._lock:
+            self._conn.execute(f"UPDATE ingest_jobs SET {assignments} WHERE job_id = :job_id",
+                               dict(fields, job_id=job_id))
+
+    def get(self, job_id: str, ttl_seconds: float) -> Optional[Dict[str, Any]]:
+        """
+        Devuelve el trabajo, o None si no existe o terminó hace más de ``ttl_seconds``.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM ingest_jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        if row["finished_at"] is not None and time.time() - row["finished_at"] >= ttl_seconds:
+            return None
+        job = {field: row[field] for field in _JOB_FIELDS}
+        job["result"] = json.loads(row["result"]) if row["result"] is not None else None
+        if job["status"] in (QUEUED, RUNNING) and row["worker_pid"] != os.getpid() \
+                and not _process_alive(row["worker_pid"]):
+            job.update(status=FAILED, error="El worker que ejecutaba el trabajo terminó")
+        return job
+
+    def evict(self, now: float, ttl_seconds: float, max_jobs: int) -> int:
+        """
+        Borra los trabajos terminados expirados y, por orden de creación, los que sobran de ``max_jobs``.
+
+        Returns:
+            Número de trabajos borrados.
+        """
+        with self._lock:
+            deleted = self._conn.execute("DELETE FROM ingest_jobs WHERE finished_at <= ?",
+                                         (now - ttl_seconds,)).rowcount
+            excess = self._conn.execute("SELECT COUNT(*) FROM ingest_jobs").fetchone()[0] - max_jobs
+            if excess > 0:
+                deleted += self._conn.execute(
+                    "DELETE FROM ingest_jobs WHERE job_id IN (SELECT job_id FROM ingest_jobs "
+                    "WHERE finished_at IS NOT NULL ORDER BY created_at LIMIT ?)", (excess,)
+                ).rowcount
+            return deleted
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM ingest_jobs").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    # Una redirección podría llevar la notificación a un host fuera de la lista permitida
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+_callback_opener = urllib.request.build_opener(_NoRedirect)
+
+
+def callback_host_allowed(hostname: str, allowed_hosts: Iterable[str]) -> bool:
+    """
+    Indica si ``hostname`` está en la lista: nombres exactos o ``.dominio`` / ``*.dominio`` para subdominios.
+    """
+    hostname = (hostname or "").lower().rstrip(".")
+    for allowed in allowed_hosts:
+        allowed = allowed.strip().lower().rstrip(".")
+        if not allowed:
+            continue
+        if allowed.startswith("*."):
+            allowed = allowed[1:]
+        if allowed.startswith("."):
+            if hostname.endswith(allowed) or hostname == allowed[1:]:
+                return True
+        elif hostname == allowed:
+            return True
+    return False
+
+
+class IngestJobs:
+    """
+    Pool acotado de workers que ejecuta ``run_fn(payload)`` fuera de la petición HTTP.
+
+    ``submit`` devuelve enseguida un id de trabajo; el estado (``queued``,
+    ``running``, ``done`` o ``failed``) y el resultado se consultan con ``get``
+    (desde cualquier proceso que comparta ``store``) y, si se indicó
+    ``callback_url``, se envían por POST al terminar. Solo se aceptan
+    callbacks a hosts de ``allowed_callback_hosts``. Con ``max_pending``
+    trabajos en espera ``submit`` lanza ``queue.Full``. Los trabajos
+    terminados se conservan ``ttl_seconds`` (como máximo ``max_jobs``).
+    """
+
+    def __init__(self, run_fn: Callable[[Dict[str, Any]], Any], max_workers: int = 4,
+                 max_pending: int = 256, ttl_seconds: float = 900.0, max_jobs: int = 10000,
+                 callback_timeout: float = 5.0, name: str = "ingest-jobs",
+                 store: Optional[JobStore] = None, allowed_callback_hosts: Iterable[str] = ()):
+        self.run_fn = run_fn
+        self.max_workers = max(1, max_workers)
+        self.max_pending = max(1, max_pending)
+        self.ttl_seconds = ttl_seconds
+        self.max_jobs = max(1, max_jobs)
+        self.callback_timeout = callback_timeout
+        self.name = name
+        self.store = store if store is not None else JobStore()
+        self.allowed_callback_hosts = tuple(allowed_callback_hosts)
+
+        self._cond = threading.Condition()
+        self._queue: Deque[str] = deque()
+        # Trabajos de este proceso aún sin terminar; el estado consultable está en ``store``
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._payloads: Dict[str, Dict[str, Any]] = {}
+        self._running = 0
+        self._closed = False
+        self._threads: List[threading.Thread] = []
+
+        self.submitted = 0
+        self.rejected = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.callbacks_sent = 0
+        self.callbacks_failed = 0
+
+    def _ensure_workers(self) -> None:
+        self._threads = [thread for thread in self._threads if thread.is_alive()]
+        while len(self._threads) < min(self.max_workers, len(self._queue) + self._running):
+            thread = threading.Thread(target=self._run, name=f"{self.name}-{len(self._threads)}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, payload: Dict[str, Any], callback_url: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Encola un trabajo y devuelve su estado inicial.
+
+        Args:
+            payload: Argumentos para ``run_fn``.
+            callback_url: URL http(s) a la que enviar el estado final por POST.
+
+        Raises:
+            ValueError: Si ``callback_url`` no es una URL http(s) a un host permitido.
+            queue.Full: Si ya hay ``max_pending`` trabajos en espera.
+            RuntimeError: Si el pool ya fue cerrado.
+        """
+        if callback_url is not None:
+            parsed = urlparse(callback_url)
+            if parsed.scheme not in ("http", "https") or not parsed.hostname:
+                raise ValueError("callback_url debe ser una URL http(s)")
+            if not callback_host_allowed(parsed.hostname, self.allowed_callback_hosts):
+                raise ValueError(f"callback_url a un host no permitido: {parsed.hostname}")
+
+        with self._cond:
+            if self._closed:
+                raise RuntimeError(f"Pool {self.name} cerrado")
+            if len(self._queue) >= self.max_pending:
+                self.rejected += 1
+                raise queue.Full(f"Pool {self.name} lleno ({len(self._queue)} trabajos en espera)")
+
+            now = time.time()
+            self.store.evict(now, self.ttl_seconds, self.max_jobs)
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = {
+                "job_id": job_id,
+                "status": QUEUED,
+                "created_at": now,
+                "started_at": None,
+                "finished_at": None,
+                "result": None,
+                "error": None,
+                "callback_url": callback_url,
+                "callback_status": None
+            }
+            self.store.insert(self._jobs[job_id])
+            self._payloads[job_id] = payload
+            self._queue.append(job_id)
+            self.submitted += 1
+            self._ensure_workers()
+            self._cond.notify()
+            return dict(self._jobs[job_id])
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Devuelve el estado del trabajo, o None si no existe o expiró.
+        """
+        return self.store.get(job_id, self.ttl_seconds)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._queue:
+                    if self._closed:
+                        return
+                    self._cond.wait()
+                job_id = self._queue.popleft()
+                payload = self._payloads.pop(job_id)
+                job = self._jobs.get(job_id)
+                if job is None:
+                    continue
+                job["status"] = RUNNING
+                job["started_at"] = time.time()
+                self.store.update(job_id, status=RUNNING, started_at=job["started_at"])
+                self._running += 1
+
+            status, result, error = DONE, None, None
+            try:
+                result = self.run_fn(payload)
+            except Exception as e:
+                logger.error(f"❌ Error en trabajo de ingesta {job_id}: {e}")
+                status, error = FAILED, str(e)
+
+            with self._cond:
+                job.update(status=status, result=result, error=error, finished_at=time.time())
+                self.store.update(job_id, status=status, result=result, error=error,
+                                  finished_at=job["finished_at"])
+                if status == DONE:
+                    self.succeeded += 1
+                else:
+                    self.failed += 1
+                snapshot = dict(job)
+
+            if snapshot["callback_url"]:
+                callback_status = self._send_callback(snapshot)
+                with self._cond:
+                    self.store.update(job_id, callback_status=callback_status)
+
+            with self._cond:
+                del self._jobs[job_id]
+                self._running -= 1
+                self._cond.notify_all()
+
+    def _send_callback(self, job: Dict[str, Any]) -> str:
+        body = json.dumps({key: value for key, value in job.items() if key != "callback_url"},
+                          ensure_ascii=False, default=str).encode("utf-8")
+        request = urllib.request.Request(job["callback_url"], data=body, method="POST",
+                                         headers={"Content-Type": "application/json"})
+        try:
+            with _callback_opener.open(request, timeout=self.callback_timeout) as response:
+                response.read()
+            with self._cond:
+                self.callbacks_sent += 1
+            return "sent"
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo notificar el trabajo {job['job_id']} a {job['callback_url']}: {e}")
+            with self._cond:
+                self.callbacks_failed += 1
+            return "failed"
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """
+        Espera a que terminen los trabajos en espera y en curso.
+
+        Returns:
+            True si no quedan trabajos al terminar.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._queue or self._running:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def close(self, timeout: Optional[float] = None) -> bool:
+        """
+        Deja de aceptar trabajos, espera a los pendientes y detiene los workers. Hook para el apagado.
+
+        Returns:
+            True si todos los trabajos terminaron antes del timeout.
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        return self.drain(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Devuelve contadores del pool.
+        """
+        with self._cond:
+            return {
+                "name": self.name,
+                "queued": len(self._queue),
+                "running": self._running,
+                "max_pending": self.max_pending,
+                "max_workers": self.max_workers,
+                "tracked_jobs": self.store.count(),
+                "submitted": self.submitted,
+                "rejected": self.rejected,
+                "succeeded": self.succeeded,
+                "failed": self.failed,
+                "callbacks_sent": self.callbacks_sent,
+                "callbacks_failed": self.callbacks_failed,
+                "closed": self._closed
+            }
@@ -0,0 +1,272 @@
+"""
+Cola de escritura diferida (write-behind) para agrupar escrituras a Zep.
+"""
+
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from resilience import backoff_delay
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindQueue:
+    """
+    Agrupa elementos por clave (p. ej. session_id) y los envía en lotes.
+
+    Un lote se envía cuando alcanza ``max_batch_size`` elementos o cuando su
+    elemento más antiguo lleva ``flush_interval_ms`` esperando. Cuando hay
+    ``max_pending`` elementos sin confirmar, ``put`` bloquea (backpressure)
+    y lanza ``queue.Full`` si no hay espacio antes del timeout.
+
+    Un lote que falla se reencola con backoff exponencial (hasta
+    ``max_retries`` veces, si ``should_retry(error)`` y ``retry_allowed()`` lo
+    permiten); agotados los reintentos pasa a una lista de dead-letter acotada
+    a ``dead_letter_max`` elementos que se consulta con ``dead_letters``.
+    """
+
+    def __init__(self, flush_fn: Callable[[str, List[Any]], None], max_batch_size: int = 20,
+                 flush_interval_ms: float = 250.0, max_pending: int = 1000,
+                 name: str = "write-behind", max_retries: int = 5,
+                 retry_base_delay: float = 1.0, retry_max_delay: float = 30.0,
+                 should_retry: Optional[Callable[[BaseException], bool]] = None,
+                 retry_allowed: Optional[Callable[[], bool]] = None,
+                 dead_letter_max: int = 1000):
+        self.flush_fn = flush_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.flush_interval = max(0.0, flush_interval_ms) / 1000.0
+        self.max_pending = max(1, max_pending)
+        self.name = name
+        self.max_retries = max(0, max_retries)
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.should_retry = should_retry
+        self.retry_allowed = retry_allowed
+        self.dead_letter_max = max(1, dead_letter_max)
+
+        self._cond = threading.Condition()
+        self._buffers: Dict[str, List[Any]] = {}
+        self._oldest: Dict[str, float] = {}
+        self._pending = 0
+        self._flush_requested = False
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+        # Lotes fallidos esperando reintento: (vence, clave, lote, intentos)
+        self._retries: List[tuple] = []
+        self._dead_letters: Deque[Dict[str, Any]] = deque()
+        self._dead_letter_items = 0
+
+        self.enqueued = 0
+        self.batches_sent = 0
+        self.items_sent = 0
+        self.batches_failed = 0
+        self.items_failed = 0
+        self.items_retried = 0
+        self.items_dropped = 0
+
+    def _ensure_worker(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def put(self, key: str, item: Any, timeout: Optional[float] = None) -> None:
+        """
+        Encola un elemento para enviarlo en el próximo lote de su clave.
+
+        Args:
+            key: Clave de agrupación (session_id).
+            item: Elemento a enviar.
+            timeout: Segundos máximos de espera si la cola está llena.
+
+        Raises:
+            queue.Full: Si la cola sigue llena al agotar el timeout.
+            RuntimeError: Si la cola ya fue cerrada.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            if self._closed:
+                raise RuntimeError(f"Cola {self.name} cerrada")
+
+            while self._pending >= self.max_pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise queue.Full(f"Cola {self.name} llena ({self._pending} pendientes)")
+                self._cond.wait(remaining)
+
+            buffer = self._buffers.setdefault(key, [])
+            if not buffer:
+                self._oldest[key] = time.monotonic()
+            buffer.append(item)
+            self._pending += 1
+            self.enqueued += 1
+            self._ensure_worker()
+            self._cond.notify_all()
+
+    def _take_ready_batches(self, now: float) -> List[tuple]:
+        ready = []
+        # Al vaciar o cerrar la cola los reintentos se envían sin esperar su backoff
+        urgent = self._flush_requested or self._closed
+        waiting = []
+        for entry in self._retries:
+            if urgent or entry[0] <= now:
+                ready.append(entry[1:])
+            else:
+                waiting.append(entry)
+        self._retries = waiting
+        for key in list(self._buffers):
+            buffer = self._buffers[key]
+            age = now - self._oldest.get(key, now)
+            if self._flush_requested or self._closed or len(buffer) >= self.max_batch_size \
+                    or age >= self.flush_interval:
+                batch = buffer[:self.max_batch_size]
+                rest = buffer[self.max_batch_size:]
+                if rest:
+                    self._buffers[key] = rest
+                    self._oldest[key] = now
+                else:
+                    del self._buffers[key]
+                    self._oldest.pop(key, None)
+                ready.append((key, batch, 0))
+        return ready
+
+    def _next_wait(self, now: float) -> Optional[float]:
+        deadlines = [entry[0] for entry in self._retries]
+        if self._oldest:
+            deadlines.append(min(self._oldest.values()) + self.flush_interval)
+        if not deadlines:
+            return None
+        return max(0.0, min(deadlines) - now)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while True:
+                    now = time.monotonic()
+                    batches = self._take_ready_batches(now)
+                    if batches:
+                        break
+                    if not self._buffers and not self._retries:
+                        self._flush_requested = False
+                        if self._closed:
+                            return
+                    self._cond.wait(self._next_wait(now))
+
+            for key, batch, attempts in batches:
+                error: Optional[BaseException] = None
+                try:
+                    self.flush_fn(key, batch)
+                except Exception as e:
+                    error = e
+                    logger.error(f"❌ Error enviando lote de {len(batch)} elementos ({key}, intento {attempts + 1}): {e}")
+                # Decidir el reintento fuera del lock: retry_allowed consume presupuesto
+                retry = error is not None and self._may_retry(error, attempts)
+                with self._cond:
+                    if error is None:
+                        self.batches_sent += 1
+                        self.items_sent += len(batch)
+                        self._pending -= len(batch)
+                    elif retry:
+                        delay = backoff_delay(attempts, self.retry_base_delay, self.retry_max_delay)
+                        self._retries.append((time.monotonic() + delay, key, batch, attempts + 1))
+                        self.items_retried += len(batch)
+                    else:
+                        self.batches_failed += 1
+                        self.items_failed += len(batch)
+                        self._pending -= len(batch)
+                        self._dead_letter(key, batch, attempts + 1, error)
+                    self._cond.notify_all()
+
+    def _may_retry(self, error: BaseException, attempts: int) -> bool:
+        if attempts >= self.max_retries:
+            return False
+        if self.should_retry is not None and not self.should_retry(error):
+            return False
+        return self.retry_allowed is None or self.retry_allowed()
+
+    def _dead_letter(self, key: str, batch: List[Any], attempts: int, error: BaseException) -> None:
+        # Llamar con el lock tomado
+        self._dead_letters.append({
+            "key": key,
+            "items": list(batch),
+            "attempts": attempts,
+            "error": str(error),
+            "failed_at": time.time()
+        })
+        self._dead_letter_items += len(batch)
+        logger.error(f"☠️ Lote de {len(batch)} elementos ({key}) movido a dead-letter tras {attempts} intentos")
+        while self._dead_letter_items > self.dead_letter_max and len(self._dead_letters) > 1:
+            dropped = self._dead_letters.popleft()
+            self._dead_letter_items -= len(dropped["items"])
+            self.items_dropped += len(dropped["items"])
+            logger.error(f"🗑️ Descartados {len(dropped['items'])} elementos de dead-letter ({dropped['key']})")
+
+    def dead_letters(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Devuelve los lotes en dead-letter (los más recientes al final).
+        """
+        with self._cond:
+            entries = list(self._dead_letters)
+        if limit is not None:
+            entries = entries[-limit:] if limit > 0 else []
+        return [dict(entry, items=list(entry["items"])) for entry in entries]
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Fuerza el envío de todo lo pendiente y espera a que termine.
+
+        Returns:
+            True si no quedan elementos pendientes al terminar.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            if self._pending == 0:
+                return True
+            self._flush_requested = True
+            self._ensure_worker()
+            self._cond.notify_all()
+            while self._pending > 0:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def close(self, timeout: Optional[float] = None) -> bool:
+        """
+        Envía lo pendiente y detiene el hilo de envío. Hook para el apagado.
+
+        Returns:
+            True si todo lo pendiente se envió antes del timeout.
+        """
+        flushed = self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        return flushed
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Devuelve contadores de la cola.
+        """
+        with self._cond:
+            return {
+                "name": self.name,
+                "pending": self._pending,
+                "max_pending": self.max_pending,
+                "max_batch_size": self.max_batch_size,
+                "flush_interval_ms": self.flush_interval * 1000,
+                "enqueued": self.enqueued,
+                "batches_sent": self.batches_sent,
+                "items_sent": self.items_sent,
+                "batches_failed": self.batches_failed,
+                "items_failed": self.items_failed,
+                "retry_pending": sum(len(entry[2]) for entry in self._retries),
+                "items_retried": self.items_retried,
+                "dead_letter_items": self._dead_letter_items,
+                "items_dropped": self.items_dropped,
+                "closed": self._closed
+            }
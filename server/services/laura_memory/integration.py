@@ -2,16 +2,71 @@
 Integración de Laura Memory con el agente JavaScript.
 """
 
+import asyncio
 import json
 import logging
-from typing import Dict, Any, Optional, List
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, Any, Optional, List, Tuple
 from datetime import datetime
 
-from memory import add_public_memory, search_public_memory, add_to_pulsepolitics, search_pulsepolitics, add_to_userhandles, search_userhandles
+import memory_async
+from memory import zep_call_limits, add_public_memory, score_public_novelty, search_public_memory, add_to_pulsepolitics, search_pulsepolitics, add_to_userhandles, search_userhandles
 from detectors import should_save_to_memory
+from ingest_jobs import IngestJobs, JobStore
+from settings import settings
 
 logger = logging.getLogger(__name__)
 
+# Fuentes disponibles para la búsqueda federada (en orden de prioridad)
+FEDERATED_SOURCES = {
+    "public_memory": search_public_memory,
+    "pulsepolitics": search_pulsepolitics,
+    "userhandles": search_userhandles
+}
+
+# Mismas fuentes como corrutinas (servidor ASGI)
+ASYNC_FEDERATED_SOURCES = {
+    "public_memory": memory_async.asearch_public_memory,
+    "pulsepolitics": memory_async.asearch_pulsepolitics,
+    "userhandles": memory_async.asearch_userhandles
+}
+
+# Pool compartido para consultar las fuentes en paralelo
+_federated_executor = ThreadPoolExecutor(
+    max_workers=settings.federated_search_max_workers,
+    thread_name_prefix="laura-federated-search"
+)
+
+# Consultas federadas en el pool (incluye las que siguen corriendo tras su deadline).
+# Con todos los hilos ocupados no se encola: la fuente se reporta como "saturated".
+_federated_in_flight = 0
+_federated_lock = threading.Lock()
+
+
+def _reserve_federated_slot() -> bool:
+    global _federated_in_flight
+    with _federated_lock:
+        if _federated_in_flight >= settings.federated_search_max_workers:
+            return False
+        _federated_in_flight += 1
+        return True
+
+
+def _release_federated_slot(_future=None) -> None:
+    global _federated_in_flight
+    with _federated_lock:
+        _federated_in_flight -= 1
+
+
+def _run_federated_source(name: str, query: str, limit: int, timeout_seconds: float) -> List[str]:
+    # Pasado el deadline el resultado ya no sirve: sin reintentos y con timeout del cliente
+    with zep_call_limits(max_retries=0, timeout_seconds=timeout_seconds):
+        return FEDERATED_SOURCES[name](query, limit)
+
 
 class LauraMemoryIntegration:
     """
@@ -35,40 +90,86 @@ class LauraMemoryIntegration:
             Dict con información sobre el procesamiento.
         """
         try:
-            # Extraer contenido relevante del resultado
-            content = self._extract_content_from_tool_result(tool_name, tool_result)
-            
-            if not content:
-                return {"saved": False, "reason": "No hay contenido relevante"}
-            
-            # Preparar metadatos
-            metadata = {
-                "source": tool_name,
-                "user_query": user_query,
-                "tool_result_keys": list(tool_result.keys()),
-                "ts": datetime.utcnow().isoformat()
-            }
-            
-            # Determinar si guardar
-            save_decision = should_save_to_memory(content, metadata)
-            
-            if not save_decision["should_save"]:
-                return {"saved": False, "reason": save_decision["reason"]}
+            content, save_decision, response = self._decide_tool_result(tool_name, tool_result, user_query)
+            if response is not None:
+                return response
             
             # Guardar en memoria
             add_public_memory(content, save_decision["metadata"])
             
-            return {
-                "saved": True,
-                "content": content[:100] + "..." if len(content) > 100 else content,
-                "metadata": save_decision["metadata"],
-                "reasons": save_decision["reasons"]
-            }
+            return self._saved_response(content, save_decision)
             
         except Exception as e:
             logger.error(f"❌ Error procesando resultado de {tool_name}: {e}")
             return {"saved": False, "error": str(e)}
     
+    async def aprocess_tool_result(self, tool_name: str, tool_result: Dict[str, Any],
+                                   user_query: str = "") -> Dict[str, Any]:
+        """
+        Versión asíncrona de ``process_tool_result`` (escritura con ``memory_async``).
+        
+        Los detectores y el cálculo de novedad recorren hasta 32 KB de texto:
+        se ejecutan fuera del event loop.
+        """
+        try:
+            content, save_decision, response = await asyncio.to_thread(
+                self._decide_tool_result, tool_name, tool_result, user_query
+            )
+            if response is not None:
+                return response
+            
+            await memory_async.aadd_public_memory(content, save_decision["metadata"])
+            
+            return self._saved_response(content, save_decision)
+            
+        except Exception as e:
+            logger.error(f"❌ Error procesando resultado de {tool_name}: {e}")
+            return {"saved": False, "error": str(e)}
+    
+    def _decide_tool_result(self, tool_name: str, tool_result: Dict[str, Any], user_query: str):
+        """
+        Extrae el contenido y aplica detectores y novedad.
+        
+        Returns:
+            Tupla (contenido, decisión, respuesta). Si la respuesta no es None
+            no hay que guardar y se devuelve tal cual.
+        """
+        # Extraer contenido relevante del resultado
+        content = self._extract_content_from_tool_result(tool_name, tool_result)
+        
+        if not content:
+            return content, None, {"saved": False, "reason": "No hay contenido relevante"}
+        
+        # Preparar metadatos
+        metadata = {
+            "source": tool_name,
+            "user_query": user_query,
+            "tool_result_keys": list(tool_result.keys()),
+            "ts": datetime.utcnow().isoformat()
+        }
+        
+        # Determinar si guardar, omitiendo contenido que ya está (casi todo) en memoria
+        save_decision = should_save_to_memory(
+            content, metadata, novelty_score=score_public_novelty if settings.novelty_enabled else None
+        )
+        
+        if not save_decision["should_save"]:
+            response = {"saved": False, "reason": save_decision["reason"]}
+            if "novelty" in save_decision:
+                response["novelty"] = save_decision["novelty"]
+            return content, save_decision, response
+        
+        return content, save_decision, None
+    
+    @staticmethod
+    def _saved_response(content: str, save_decision: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "saved": True,
+            "content": content[:100] + "..." if len(content) > 100 else content,
+            "metadata": save_decision["metadata"],
+            "reasons": save_decision["reasons"]
+        }
+    
     def _extract_content_from_tool_result(self, tool_name: str, tool_result: Dict[str, Any]) -> str:
         """
         Extrae contenido relevante del resultado de una herramienta.
@@ -130,50 +231,212 @@ class LauraMemoryIntegration:
         
         return " | ".join(content_parts)
     
-    def enhance_query_with_memory(self, query: str, limit: int = 3) -> Dict[str, Any]:
+    def federated_search(self, query: str, limit: int = 3, sources: Optional[List[str]] = None,
+                         deadline_ms: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Busca en memoria pública, PulsePolitics y UserHandles en paralelo.
+        
+        Cada fuente tiene el mismo deadline; las que no respondan a tiempo se
+        reportan como "timeout" y se devuelven los resultados parciales del resto.
+        Las llamadas a Zep no se reintentan y usan el deadline como timeout del
+        cliente; si el pool está lleno la fuente se reporta como "saturated".
+        
+        Args:
+            query: Consulta de búsqueda.
+            limit: Número máximo de resultados por fuente.
+            sources: Fuentes a consultar (por defecto todas las de FEDERATED_SOURCES).
+            deadline_ms: Tiempo máximo de espera por fuente en milisegundos.
+            
+        Returns:
+            Dict con resultados combinados y sin duplicados etiquetados por fuente,
+            resultados por fuente y estado de cada fuente.
+        """
+        selected = [name for name in (sources or FEDERATED_SOURCES) if name in FEDERATED_SOURCES]
+        deadline = (deadline_ms if deadline_ms is not None else settings.federated_search_deadline_ms) / 1000.0
+        started = time.monotonic()
+        
+        by_source: Dict[str, List[str]] = {}
+        status: Dict[str, str] = {}
+        futures = {}
+        for name in selected:
+            if not _reserve_federated_slot():
+                logger.warning(f"⚠️ Pool de búsqueda federada saturado, se omite {name}")
+                status[name] = "saturated"
+                by_source[name] = []
+                continue
+            future = _federated_executor.submit(_run_federated_source, name, query, limit, deadline)
+            future.add_done_callback(_release_federated_slot)
+            futures[name] = future
+        wait(list(futures.values()), timeout=deadline)
+        
+        for name, future in futures.items():
+            if not future.done():
+                future.cancel()
+                status[name] = "timeout"
+                by_source[name] = []
+                continue
+            try:
+                by_source[name] = future.result() or []
+                status[name] = "ok"
+            except Exception as e:
+                logger.error(f"❌ Error en búsqueda federada ({name}): {e}")
+                status[name] = "error"
+                by_source[name] = []
+        
+        return self._federated_response(query, selected, by_source, status, started)
+    
+    async def afederated_search(self, query: str, limit: int = 3, sources: Optional[List[str]] = None,
+                                deadline_ms: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Versión asíncrona de ``federated_search``: las fuentes se consultan como
+        corrutinas en el event loop, sin hilos.
+        """
+        selected = [name for name in (sources or ASYNC_FEDERATED_SOURCES) if name in ASYNC_FEDERATED_SOURCES]
+        deadline = (deadline_ms if deadline_ms is not None else settings.federated_search_deadline_ms) / 1000.0
+        started = time.monotonic()
+        
+        # Las tareas copian el contexto al crearse: heredan los límites de las llamadas a Zep
+        with zep_call_limits(max_retries=0, timeout_seconds=deadline):
+            tasks = {
+                name: asyncio.ensure_future(ASYNC_FEDERATED_SOURCES[name](query, limit))
+                for name in selected
+            }
+        if tasks:
+            await asyncio.wait(list(tasks.values()), timeout=deadline)
+        
+        by_source: Dict[str, List[str]] = {}
+        status: Dict[str, str] = {}
+        for name, task in tasks.items():
+            if not task.done():
+                task.cancel()
+                status[name] = "timeout"
+                by_source[name] = []
+                continue
+            try:
+                by_source[name] = task.result() or []
+                status[name] = "ok"
+            except Exception as e:
+                logger.error(f"❌ Error en búsqueda federada ({name}): {e}")
+                status[name] = "error"
+                by_source[name] = []
+        
+        return self._federated_response(query, selected, by_source, status, started)
+    
+    @staticmethod
+    def _federated_response(query: str, selected: List[str], by_source: Dict[str, List[str]],
+                            status: Dict[str, str], started: float) -> Dict[str, Any]:
+        # Combinar intercalando por ranking y eliminando duplicados entre fuentes
+        merged: List[Dict[str, Any]] = []
+        seen: Dict[str, Dict[str, Any]] = {}
+        for rank in range(max((len(r) for r in by_source.values()), default=0)):
+            for name in selected:
+                results = by_source[name]
+                if rank >= len(results):
+                    continue
+                content = results[rank]
+                key = " ".join(str(content).split()).casefold()
+                if key in seen:
+                    if name not in seen[key]["sources"]:
+                        seen[key]["sources"].append(name)
+                    continue
+                item = {"content": content, "source": name, "sources": [name]}
+                seen[key] = item
+                merged.append(item)
+        
+        elapsed_ms = round((time.monotonic() - started) * 1000, 1)
+        partial = any(state != "ok" for state in status.values())
+        logger.info(f"🔀 Búsqueda federada: '{query}' → {len(merged)} resultados en {elapsed_ms}ms"
+                    f"{' (parcial)' if partial else ''}")
+        
+        return {
+            "query": query,
+            "results": merged,
+            "by_source": by_source,
+            "sources_status": status,
+            "partial": partial,
+            "elapsed_ms": elapsed_ms
+        }
+    
+    def enhance_query_with_memory(self, query: str, limit: int = 3,
+                                  federated: bool = False) -> Dict[str, Any]:
         """
         Mejora una query buscando información relevante en la memoria.
         
         Args:
             query: Query original.
             limit: Número máximo de resultados de memoria.
+            federated: Si es True busca también en PulsePolitics y UserHandles.
             
         Returns:
             Dict con query mejorada y contexto de memoria.
         """
         try:
             # Buscar en memoria
-            memory_results = search_public_memory(query, limit)
-            
-            if not memory_results:
-                return {
-                    "enhanced_query": query,
-                    "memory_context": "",
-                    "memory_results": []
-                }
+            if federated:
+                federated_results = self.federated_search(query, limit)["results"]
+                memory_results = [item["content"] for item in federated_results]
+                labels = [f"[{item['source']}] " for item in federated_results]
+            else:
+                memory_results = search_public_memory(query, limit)
+                labels = [""] * len(memory_results)
             
-            # Crear contexto de memoria
-            memory_context = "Información relevante de memoria:\n"
-            for i, result in enumerate(memory_results, 1):
-                memory_context += f"{i}. {result}\n"
+            return self._enhanced_response(query, memory_results, labels)
             
-            # Mejorar query con contexto
-            enhanced_query = f"{query}\n\nCONTEXTO DE MEMORIA:\n{memory_context}"
+        except Exception as e:
+            logger.error(f"❌ Error mejorando query con memoria: {e}")
+            return self._enhance_error(query, e)
+    
+    async def aenhance_query_with_memory(self, query: str, limit: int = 3,
+                                         federated: bool = False) -> Dict[str, Any]:
+        """
+        Versión asíncrona de ``enhance_query_with_memory``.
+        """
+        try:
+            if federated:
+                federated_results = (await self.afederated_search(query, limit))["results"]
+                memory_results = [item["content"] for item in federated_results]
+                labels = [f"[{item['source']}] " for item in federated_results]
+            else:
+                memory_results = await memory_async.asearch_public_memory(query, limit)
+                labels = [""] * len(memory_results)
             
-            return {
-                "enhanced_query": enhanced_query,
-                "memory_context": memory_context,
-                "memory_results": memory_results
-            }
+            return self._enhanced_response(query, memory_results, labels)
             
         except Exception as e:
             logger.error(f"❌ Error mejorando query con memoria: {e}")
+            return self._enhance_error(query, e)
+    
+    @staticmethod
+    def _enhanced_response(query: str, memory_results: List[str], labels: List[str]) -> Dict[str, Any]:
+        if not memory_results:
             return {
                 "enhanced_query": query,
                 "memory_context": "",
-                "memory_results": [],
-                "error": str(e)
+                "memory_results": []
             }
+        
+        # Crear contexto de memoria
+        memory_context = "Información relevante de memoria:\n"
+        for i, (label, result) in enumerate(zip(labels, memory_results), 1):
+            memory_context += f"{i}. {label}{result}\n"
+        
+        # Mejorar query con contexto
+        enhanced_query = f"{query}\n\nCONTEXTO DE MEMORIA:\n{memory_context}"
+        
+        return {
+            "enhanced_query": enhanced_query,
+            "memory_context": memory_context,
+            "memory_results": memory_results
+        }
+    
+    @staticmethod
+    def _enhance_error(query: str, error: Exception) -> Dict[str, Any]:
+        return {
+            "enhanced_query": query,
+            "memory_context": "",
+            "memory_results": [],
+            "error": str(error)
+        }
     
     def save_user_discovery(self, user_name: str, twitter_username: str, 
                            description: str = "", category: str = "") -> bool:
@@ -190,29 +453,53 @@ class LauraMemoryIntegration:
             True si se guardó exitosamente.
         """
         try:
-            # Formato simplificado: solo "el usuario es @xxx"
-            content = f"el usuario es @{twitter_username}"
-            
-            metadata = {
-                "source": "ml_discovery",
-                "twitter_username": twitter_username,
-                "full_name": user_name,
-                "category": category,
-                "ts": datetime.utcnow().isoformat()
-            }
+            content, metadata = self._user_discovery(user_name, twitter_username, category)
             
             # Guardar en UserHandles (grupo compartido para handles descubiertos)
             saved = add_to_userhandles(content, metadata)
-            if saved:
-                logger.info(f"👥 Usuario NUEVO guardado en UserHandles: {user_name} (@{twitter_username})")
-            else:
-                logger.info(f"👥 Usuario YA EXISTE en UserHandles: {user_name} (@{twitter_username})")
+            self._log_user_discovery(saved, user_name, twitter_username)
+            return saved
+            
+        except Exception as e:
+            logger.error(f"❌ Error guardando usuario en UserHandles: {e}")
+            return False
+    
+    async def asave_user_discovery(self, user_name: str, twitter_username: str,
+                                   description: str = "", category: str = "") -> bool:
+        """
+        Versión asíncrona de ``save_user_discovery``.
+        """
+        try:
+            content, metadata = self._user_discovery(user_name, twitter_username, category)
+            saved = await memory_async.aadd_to_userhandles(content, metadata)
+            self._log_user_discovery(saved, user_name, twitter_username)
             return saved
             
         except Exception as e:
             logger.error(f"❌ Error guardando usuario en UserHandles: {e}")
             return False
     
+    @staticmethod
+    def _user_discovery(user_name: str, twitter_username: str, category: str):
+        # Formato simplificado: solo "el usuario es @xxx"
+        content = f"el usuario es @{twitter_username}"
+        
+        metadata = {
+            "source": "ml_discovery",
+            "twitter_username": twitter_username,
+            "full_name": user_name,
+            "category": category,
+            "ts": datetime.utcnow().isoformat()
+        }
+        return content, metadata
+    
+    @staticmethod
+    def _log_user_discovery(saved: bool, user_name: str, twitter_username: str) -> None:
+        if saved:
+            logger.info(f"👥 Usuario NUEVO guardado en UserHandles: {user_name} (@{twitter_username})")
+        else:
+            logger.info(f"👥 Usuario YA EXISTE en UserHandles: {user_name} (@{twitter_username})")
+    
     def search_political_context(self, query: str, limit: int = 3) -> List[str]:
         """
         Busca contexto político en PulsePolitics (grupo compartido).
@@ -233,4 +520,120 @@ class LauraMemoryIntegration:
 
 
 # Instancia global para uso desde JavaScript
-laura_memory_integration = LauraMemoryIntegration()
\ No newline at end of file
+laura_memory_integration = LauraMemoryIntegration()
+
+
+# Trabajos de process-tool-result en segundo plano (modo asíncrono, se crea bajo demanda)
+_ingest_jobs: Optional[IngestJobs] = None
+_ingest_jobs_lock = threading.Lock()
+
+
+def _run_tool_result_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    return laura_memory_integration.process_tool_result(**payload)
+
+
+def get_ingest_jobs() -> IngestJobs:
+    """
+    Obtiene el pool de trabajos de ingesta, creándolo si es necesario.
+    """
+    global _ingest_jobs
+    
+    with _ingest_jobs_lock:
+        if _ingest_jobs is None:
+            _ingest_jobs = IngestJobs(
+                run_fn=_run_tool_result_job,
+                max_workers=settings.ingest_jobs_max_workers,
+                max_pending=settings.ingest_jobs_max_pending,
+                ttl_seconds=settings.ingest_jobs_ttl_seconds,
+                max_jobs=settings.ingest_jobs_max_jobs,
+                callback_timeout=settings.ingest_jobs_callback_timeout_seconds,
+                name="laura-ingest-jobs",
+                store=JobStore(settings.ingest_jobs_store_path),
+                allowed_callback_hosts=settings.ingest_jobs_callback_allowed_hosts.split(",")
+            )
+    return _ingest_jobs
+
+
+def submit_tool_result_job(tool_name: str, tool_result: Dict[str, Any], user_query: str = "",
+                           callback_url: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Encola ``process_tool_result`` para ejecutarlo fuera de la petición.
+    
+    Returns:
+        Estado inicial del trabajo (incluye "job_id").
+        
+    Raises:
+        ValueError: Si ``callback_url`` no es una URL http(s) a un host permitido.
+        queue.Full: Si la cola de trabajos está llena.
+    """
+    return get_ingest_jobs().submit(
+        {"tool_name": tool_name, "tool_result": tool_result, "user_query": user_query},
+        callback_url=callback_url
+    )
+
+
+def accept_tool_result_job(data: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+    """
+    Encola un body de process-tool-result con "async": true.
+    
+    Returns:
+        (202, trabajo con "status_url"), (400, error) si la callback_url no es
+        válida o (503, error) si la cola está llena o cerrándose.
+    """
+    try:
+        job = submit_tool_result_job(
+            tool_name=data['tool_name'],
+            tool_result=data['tool_result'],
+            user_query=data.get('user_query', ''),
+            callback_url=data.get('callback_url')
+        )
+    except ValueError as e:
+        return 400, {"error": str(e)}
+    except (queue.Full, RuntimeError) as e:
+        logger.warning(f"⚠️ Trabajo de ingesta rechazado: {e}")
+        return 503, {"error": str(e)}
+    
+    job["status_url"] = f"/api/laura-memory/jobs/{job['job_id']}"
+    return 202, job
+
+
+def get_ingest_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Estado de un trabajo de ingesta, o None si no existe o ya expiró.
+    
+    El estado se lee del almacén compartido: el trabajo puede haberlo encolado otro worker.
+    """
+    return get_ingest_jobs().get(job_id)
+
+
+def get_ingest_jobs_stats() -> Dict[str, Any]:
+    """
+    Estadísticas del pool de trabajos de ingesta.
+    """
+    if _ingest_jobs is None:
+        return {"started": False, "queued": 0, "running": 0}
+    stats = _ingest_jobs.stats()
+    stats["started"] = True
+    return stats
+
+
+def close_ingest_jobs(timeout: Optional[float] = None) -> bool:
+    """
+    Termina los trabajos pendientes antes del apagado (antes de vaciar la cola write-behind).
+    """
+    if _ingest_jobs is None:
+        return True
+    finished = _ingest_jobs.close(timeout)
+    if not finished:
+        logger.warning("⚠️ Quedaron trabajos de ingesta sin terminar al apagar")
+    return finished
+
+
+def _reset_ingest_jobs_after_fork() -> None:
+    # Los hilos del pool y la conexión SQLite pertenecen al proceso padre
+    global _ingest_jobs, _ingest_jobs_lock
+    _ingest_jobs = None
+    _ingest_jobs_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_ingest_jobs_after_fork)
@@ -2,12 +2,18 @@
 """
 Interfaz interna entre JavaScript y el módulo Python laura_memory
 Recibe comandos via stdin y devuelve resultados via stdout
+
+Modos de uso:
+    python internal_interface.py            # un comando JSON por proceso
+    python internal_interface.py --worker   # proceso persistente, un JSON por línea
 """
 
 import sys
 import json
 import logging
-from typing import Dict, Any
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
 
 # Importar funciones del módulo memory
 try:
@@ -34,6 +40,7 @@ except:
     USE_GRAPH_API = False
 
 from integration import LauraMemoryIntegration
+from settings import settings
 
 # Configurar logging para que no interfiera con stdout
 logging.basicConfig(
@@ -205,10 +212,178 @@ def execute_function(function_name: str, args: Dict[str, Any]) -> Dict[str, Any]
             "error_type": type(e).__name__
         }
 
+# Pool para ejecutar lotes de comandos (se crea bajo demanda)
+_batch_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_batch_executor() -> ThreadPoolExecutor:
+    global _batch_executor
+    if _batch_executor is None:
+        _batch_executor = ThreadPoolExecutor(
+            max_workers=max(1, settings.internal_batch_max_workers),
+            thread_name_prefix="laura-internal-batch"
+        )
+    return _batch_executor
+
+
+def execute_batch(commands: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Ejecuta varios comandos de forma concurrente en un pool acotado.
+    
+    Los comandos se consideran independientes entre sí; los resultados se
+    devuelven en el mismo orden que los comandos, cada uno con su propio
+    "success"/"error".
+    
+    Args:
+        commands: Lista de {"function": ..., "args": {...}}
+        
+    Returns:
+        Dict con la lista ordenada de resultados
+    """
+    if not isinstance(commands, list):
+        return {
+            "success": False,
+            "function": "batch",
+            "error": "El lote debe ser una lista de comandos"
+        }
+    
+    def _run(command: Any) -> Dict[str, Any]:
+        if not isinstance(command, dict):
+            return {"success": False, "error": "Comando inválido: se esperaba un objeto JSON"}
+        return execute_function(command.get('function', ''), command.get('args', {}))
+    
+    executor = _get_batch_executor()
+    futures = [executor.submit(_run, command) for command in commands]
+    
+    results = []
+    for future in futures:
+        try:
+            results.append(future.result())
+        except Exception as e:
+            results.append({
+                "success": False,
+                "error": str(e),
+                "error_type": type(e).__name__
+            })
+    
+    return {
+        "success": all(result.get("success") for result in results),
+        "function": "batch",
+        "count": len(results),
+        "results": results
+    }
+
+
+def _dispatch(command_data: Any) -> Dict[str, Any]:
+    """
+    Ejecuta un comando individual o un lote según la forma del JSON recibido.
+    
+    Acepta {"function": ..., "args": ...}, {"commands": [...]} o una lista de comandos.
+    """
+    if isinstance(command_data, list):
+        return execute_batch(command_data)
+    if 'commands' in command_data:
+        return execute_batch(command_data['commands'])
+    return execute_function(command_data.get('function', ''), command_data.get('args', {}))
+
+
+# Serializa las escrituras a stdout: los comandos del worker terminan en varios hilos
+_stdout_lock = threading.Lock()
+
+
+def _write_response(payload: Dict[str, Any]) -> None:
+    """
+    Escribe una respuesta JSON en una sola línea de stdout.
+    """
+    line = json.dumps(payload, ensure_ascii=False, indent=None) + "\n"
+    with _stdout_lock:
+        sys.stdout.write(line)
+        sys.stdout.flush()
+
+
+def _warm_up() -> None:
+    """
+    Inicializa el cliente Zep y los grupos antes de atender comandos.
+    """
+    if not USE_GRAPH_API:
+        return
+    try:
+        from memory import _get_zep_client
+        _get_zep_client()
+    except Exception as e:
+        logging.getLogger(__name__).warning(f"⚠️ No se pudo precalentar el cliente Zep: {e}")
+
+
+def _handle_line(line: str) -> None:
+    """
+    Ejecuta un comando del worker y escribe su respuesta con el mismo "id".
+    """
+    request_id = None
+    try:
+        command_data = json.loads(line)
+        if isinstance(command_data, dict):
+            request_id = command_data.get('id')
+        result = _dispatch(command_data)
+    except json.JSONDecodeError as e:
+        result = {
+            "success": False,
+            "error": f"Error parsing JSON: {str(e)}",
+            "input_received": line[:100]
+        }
+    except Exception as e:
+        result = {
+            "success": False,
+            "error": f"Error inesperado: {str(e)}",
+            "error_type": type(e).__name__
+        }
+    
+    result["id"] = request_id
+    _write_response(result)
+
+
+def run_worker() -> None:
+    """
+    Modo worker persistente: lee comandos JSON por línea (NDJSON) desde stdin.
+    
+    Cada línea tiene la forma {"id": ..., "function": ..., "args": {...}}
+    (o {"id": ..., "commands": [...]} para un lote) y se responde con una
+    línea que incluye el mismo "id". Los comandos se ejecutan en un pool
+    acotado (``internal_worker_max_workers``), así que las respuestas pueden
+    llegar en otro orden; con el pool ocupado se deja de leer stdin. El
+    cliente Zep, la caché y los índices se mantienen calientes entre
+    comandos. El proceso termina al cerrarse stdin, tras responder los
+    comandos en curso.
+    """
+    _warm_up()
+    _write_response({"id": None, "event": "ready", "success": True, "graph_api": USE_GRAPH_API})
+    
+    max_workers = max(1, settings.internal_worker_max_workers)
+    slots = threading.BoundedSemaphore(max_workers)
+    
+    def _run(line: str) -> None:
+        try:
+            _handle_line(line)
+        finally:
+            slots.release()
+    
+    # Pool propio: los lotes esperan al pool de lotes y no deben bloquear a este
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="laura-internal-worker") as executor:
+        for line in sys.stdin:
+            line = line.strip()
+            if not line:
+                continue
+            slots.acquire()
+            executor.submit(_run, line)
+
+
 def main():
     """
     Función principal que lee de stdin y ejecuta comandos
     """
+    if "--worker" in sys.argv[1:]:
+        run_worker()
+        return
+    
     try:
         # Leer input JSON desde stdin
         input_data = sys.stdin.read().strip()
@@ -221,11 +396,9 @@ def main():
         else:
             # Parse JSON
             command_data = json.loads(input_data)
-            function_name = command_data.get('function', '')
-            args = command_data.get('args', {})
             
-            # Ejecutar función
-            result = execute_function(function_name, args)
+            # Ejecutar función (o lote de funciones)
+            result = _dispatch(command_data)
             
     except json.JSONDecodeError as e:
         result = {
@@ -2,48 +2,369 @@
 Módulo principal para la memoria pública de Laura usando Zep Cloud.
 """
 
+import atexit
+import contextlib
+import contextvars
 import json
 import logging
+import math
+import os
+import queue
+import threading
 import time
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 
 from zep_cloud.client import Zep
 from zep_cloud.types import Message
 
+from cache import SearchCache
+from handle_index import SharedHandleIndex, index_lock, write_handle_index
+from handle_registry import HandleRegistry, format_handle_record, handle_record, normalize_handle, parse_handle_record
+from ingest_queue import WriteBehindQueue
+from metadata_store import MetadataStore
+from metrics import counter, gauge, registry, NEAR_DUPLICATES_SKIPPED, ZEP_CIRCUIT_REJECTIONS, ZEP_REQUEST_DURATION, ZEP_RETRIES, ZEP_RETRIES_DENIED
+from resilience import CircuitBreaker, CircuitOpenError, RetryBudget, backoff_delay, is_retryable
 from settings import settings
+from singleflight import AsyncSingleFlight, SingleFlight
+from text_index import InvertedIndex, fold, tokenize
+from near_duplicates import MinHashLSH
+from novelty import NoveltyModel
+from pending_writes import PendingWrites
 
 logger = logging.getLogger(__name__)
 
 # Cliente global de Zep
 _zep: Optional[Zep] = None
+_zep_groups_ready = False
 
+# Identificadores de store usados como prefijo en las claves de caché
+PUBLIC_STORE = "public"
+PULSEPOLITICS_STORE = "pulsepolitics"
+USERHANDLES_STORE = "userhandles"
 
-def _retry_with_backoff(func, max_retries: int = 3, base_delay: float = 1.0):
+# Caché global de resultados de búsqueda
+_search_cache = SearchCache(
+    max_entries=settings.search_cache_max_entries,
+    ttls={
+        PUBLIC_STORE: settings.search_cache_ttl_public,
+        PULSEPOLITICS_STORE: settings.search_cache_ttl_pulsepolitics,
+        USERHANDLES_STORE: settings.search_cache_ttl_userhandles
+    }
+)
+
+# Coalescencia de búsquedas idénticas concurrentes (misma clave que la caché)
+_search_flights = SingleFlight()
+_asearch_flights = AsyncSingleFlight()
+
+
+# Circuit breakers por tipo de operación de Zep y presupuesto global de reintentos
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+_retry_budget = RetryBudget(
+    ratio=settings.retry_budget_ratio,
+    min_per_second=settings.retry_budget_min_per_second
+)
+
+
+def _get_breaker(operation: str) -> CircuitBreaker:
+    """
+    Obtiene (o crea) el circuit breaker compartido de una operación de Zep.
+    
+    Args:
+        operation: Tipo de operación, p. ej. "memory.search" o "graph.add".
+    """
+    breaker = _breakers.get(operation)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.get(operation)
+            if breaker is None:
+                breaker = CircuitBreaker(
+                    operation,
+                    failure_threshold=settings.breaker_failure_threshold,
+                    reset_timeout=settings.breaker_reset_timeout_seconds,
+                    half_open_max_calls=settings.breaker_half_open_max_calls
+                )
+                _breakers[operation] = breaker
+    return breaker
+
+
+def get_resilience_stats() -> Dict[str, Any]:
+    """
+    Obtiene el estado de los circuit breakers y del presupuesto de reintentos.
+    
+    Returns:
+        Dict con el estado de cada breaker por operación y el presupuesto global.
+    """
+    return {
+        "circuit_breakers": {name: breaker.stats() for name, breaker in sorted(_breakers.items())},
+        "retry_budget": _retry_budget.stats()
+    }
+
+
+def reset_circuit_breakers() -> None:
+    """
+    Cierra todos los circuit breakers y rellena el presupuesto de reintentos.
+    """
+    for breaker in list(_breakers.values()):
+        breaker.reset()
+    _retry_budget.reset()
+
+
+# Límites de las llamadas a Zep del contexto actual: (reintentos máximos, timeout en segundos)
+_call_limits: contextvars.ContextVar[Optional[tuple]] = contextvars.ContextVar("laura_zep_call_limits", default=None)
+
+
+@contextlib.contextmanager
+def zep_call_limits(max_retries: int = 0, timeout_seconds: Optional[float] = None):
+    """
+    Acota las llamadas a Zep hechas dentro del bloque (hilo o tarea asyncio actual).
+    
+    Lo usa la búsqueda federada: una fuente que no responde dentro del deadline
+    ya no sirve, así que no debe reintentarse ni quedarse esperando más que él.
+    
+    Args:
+        max_retries: Reintentos máximos (propios y del SDK de Zep).
+        timeout_seconds: Timeout del cliente HTTP por llamada (None = el del SDK).
+    """
+    token = _call_limits.set((max_retries, timeout_seconds))
+    try:
+        yield
+    finally:
+        _call_limits.reset(token)
+
+
+def _limited_retries(max_retries: int) -> int:
+    limits = _call_limits.get()
+    return max_retries if limits is None else min(max_retries, limits[0])
+
+
+def _zep_request_options() -> Dict[str, Any]:
+    """
+    Kwargs ``request_options`` para el SDK de Zep según ``zep_call_limits`` (vacío fuera de él).
+    """
+    limits = _call_limits.get()
+    if limits is None:
+        return {}
+    max_retries, timeout_seconds = limits
+    options: Dict[str, Any] = {"max_retries": max_retries}
+    if timeout_seconds is not None:
+        # El SDK solo acepta segundos enteros
+        options["timeout_in_seconds"] = max(1, math.ceil(timeout_seconds))
+    return {"request_options": options}
+
+
+def _retry_with_backoff(func, max_retries: int = 3, base_delay: float = 1.0, operation: str = "zep"):
     """
-    Ejecuta una función con reintentos y backoff exponencial.
+    Ejecuta una función con circuit breaker, reintentos y backoff exponencial con jitter.
+    
+    Solo se reintentan errores transitorios (red, 408/429/5xx) y cada reintento
+    consume del presupuesto global; con el circuito abierto se falla de inmediato.
     
     Args:
         func: Función a ejecutar
         max_retries: Número máximo de reintentos
         base_delay: Delay base en segundos
+        operation: Tipo de operación de Zep (clave del circuit breaker)
         
     Returns:
         Resultado de la función
         
     Raises:
+        CircuitOpenError: Si el circuito de la operación está abierto.
         La última excepción si todos los reintentos fallan
     """
+    breaker = _get_breaker(operation)
+    _retry_budget.record_request()
+    max_retries = _limited_retries(max_retries)
+    
     for attempt in range(max_retries + 1):
         try:
-            return func()
+            breaker.before_call()
+        except CircuitOpenError:
+            ZEP_CIRCUIT_REJECTIONS.inc(operation=operation)
+            raise
+        
+        start = time.perf_counter()
+        try:
+            result = func()
         except Exception as e:
-            if attempt == max_retries:
+            retryable = is_retryable(e)
+            ZEP_REQUEST_DURATION.observe(time.perf_counter() - start, operation=operation,
+                                         outcome="error" if retryable else "client_error")
+            if retryable:
+                breaker.record_failure()
+            else:
+                # Errores del cliente (4xx): Zep está respondiendo
+                breaker.record_success()
+            
+            if not retryable or attempt == max_retries:
+                raise e
+            if not _retry_budget.try_acquire():
+                ZEP_RETRIES_DENIED.inc(operation=operation)
+                logger.warning(f"⛔ Presupuesto de reintentos agotado ({operation}): {e}")
                 raise e
             
-            delay = base_delay * (2 ** attempt)
-            logger.warning(f"⏳ Intento {attempt + 1} falló, reintentando en {delay}s: {e}")
+            delay = backoff_delay(attempt, base_delay, settings.retry_max_delay_seconds)
+            logger.warning(f"⏳ Intento {attempt + 1} falló ({operation}), reintentando en {delay:.2f}s: {e}")
+            ZEP_RETRIES.inc(operation=operation)
             time.sleep(delay)
+            continue
+        
+        ZEP_REQUEST_DURATION.observe(time.perf_counter() - start, operation=operation, outcome="success")
+        breaker.record_success()
+        return result
+
+
+# Índice invertido local de la memoria pública (fallback de búsqueda)
+_public_index = InvertedIndex(max_documents=settings.public_index_max_documents)
+_public_index_load_lock = threading.Lock()
+
+# Modelo de novedad de la memoria pública (shingles de lo ya guardado)
+_public_novelty = NoveltyModel(
+    shingle_size=settings.novelty_shingle_size,
+    max_shingles=settings.novelty_max_shingles
+)
+
+# Bocetos MinHash por grupo del grafo (se crean y cargan bajo demanda)
+_near_duplicate_indexes: Dict[str, MinHashLSH] = {}
+_near_duplicate_lock = threading.Lock()
+
+# Registro local de handles de UserHandles (se siembra desde Zep bajo demanda)
+_handle_registry = HandleRegistry(
+    capacity=settings.handle_registry_capacity,
+    error_rate=settings.handle_registry_error_rate
+)
+_handle_registry_load_lock = threading.Lock()
+_handle_index_checked_at = 0.0
+_handle_index_saved_at = 0.0
+
+# Escrituras al grafo aún no procesadas por Zep (read-your-writes)
+_pending_writes = PendingWrites(
+    ttl_seconds=settings.pending_writes_ttl_seconds,
+    max_entries=settings.pending_writes_max_entries,
+    poll_interval=settings.pending_writes_poll_seconds,
+    confirm_fn=lambda episode_uuid: _episode_processed(episode_uuid),
+    name="laura-pending-writes"
+)
+
+# Índice local de metadatos de las escrituras (se abre bajo demanda)
+_metadata_store: Optional[MetadataStore] = None
+_metadata_store_lock = threading.Lock()
+
+# Cola de escritura diferida para la memoria pública (se crea bajo demanda)
+_public_write_queue: Optional[WriteBehindQueue] = None
+_public_write_queue_lock = threading.Lock()
+
+
+def _cache_hit(key: Tuple[str, str, int], query: str) -> Optional[List[str]]:
+    """
+    Resultados cacheados y vigentes para ``key`` (copia), o None.
+    """
+    if not settings.search_cache_enabled:
+        return None
+    cached = _search_cache.get(key)
+    if cached is None:
+        return None
+    logger.debug(f"⚡ Cache hit [{key[0]}]: '{query}'")
+    return list(cached)
+
+
+def _stale_hit(key: Tuple[str, str, int], query: str) -> Optional[Tuple[str, ...]]:
+    """
+    Con el circuito abierto: la última entrada de ``key`` aunque haya expirado, o None.
+    """
+    stale = _search_cache.get(key, allow_stale=True) if settings.search_cache_enabled else None
+    if stale is not None:
+        logger.warning(f"🔌 Circuito abierto, sirviendo caché expirada [{key[0]}]: '{query}'")
+    return stale
+
+
+def _cache_results(key: Tuple[str, str, int], results: Tuple[str, ...], generation: int) -> None:
+    # Se descarta si el store se invalidó después de leer ``generation``
+    if settings.search_cache_enabled:
+        _search_cache.set(key, results, generation)
+
+
+def _cached_search(store: str, query: str, limit: int, fetch) -> List[str]:
+    """
+    Resuelve una búsqueda desde la caché o delega en ``fetch`` si no hay entrada.
+    
+    Las búsquedas idénticas concurrentes (misma clave ``(store, query
+    normalizada, limit)``) comparten una sola llamada a Zep en vuelo.
+    Solo se cachean resultados exitosos: si ``fetch`` lanza una excepción
+    se propaga sin guardar nada. Con el circuito abierto se sirve, si existe,
+    la última entrada aunque haya expirado.
+    
+    Args:
+        store: Store consultado (public, pulsepolitics, userhandles).
+        query: Consulta de búsqueda.
+        limit: Número máximo de resultados.
+        fetch: Función sin argumentos que consulta Zep.
+        
+    Returns:
+        Lista de resultados (copia, segura para mutar).
+    """
+    key = SearchCache.make_key(store, query, limit)
+    cached = _cache_hit(key, query)
+    if cached is not None:
+        return cached
+    
+    def _fetch_and_cache():
+        # Si una escritura invalida el store durante la consulta, el resultado no se cachea
+        generation = _search_cache.generation(store)
+        try:
+            results = tuple(fetch())
+        except CircuitOpenError:
+            stale = _stale_hit(key, query)
+            if stale is not None:
+                return stale
+            raise
+        
+        _cache_results(key, results, generation)
+        return results
+    
+    if settings.single_flight_enabled:
+        return list(_search_flights.do(key, _fetch_and_cache))
+    return list(_fetch_and_cache())
+
+
+def _invalidate_search_cache(store: str) -> None:
+    """
+    Invalida las búsquedas cacheadas de un store tras una escritura.
+    """
+    removed = _search_cache.invalidate_store(store)
+    # Las búsquedas en vuelo pueden no incluir la escritura: las nuevas no se unen a ellas
+    _search_flights.forget(lambda key: key[0] == store)
+    _asearch_flights.forget(lambda key: key[0] == store)
+    if removed:
+        logger.debug(f"🧹 Caché invalidada [{store}]: {removed} entradas")
+
+
+def get_search_cache_stats() -> Dict[str, Any]:
+    """
+    Obtiene los contadores de la caché de búsquedas.
+    
+    Returns:
+        Dict con tamaño, hits, misses, TTL por store y llamadas coalescidas.
+    """
+    stats = _search_cache.stats()
+    stats["enabled"] = settings.search_cache_enabled
+    stats["single_flight"] = _search_flights.stats()
+    stats["single_flight"]["async"] = _asearch_flights.stats()
+    stats["single_flight"]["enabled"] = settings.single_flight_enabled
+    return stats
+
+
+# Grupos que deben existir en Zep
+_GROUPS_TO_CREATE = [
+    {
+        "group_id": "userhandles",
+        "name": "User Handles", 
+        "description": "Grupo para almacenar usuarios descubiertos con ML"
+    }
+    # pulsepolitics ya existe, no lo creamos
+]
 
 
 def _create_groups_if_needed(client: Zep) -> None:
@@ -53,16 +374,7 @@ def _create_groups_if_needed(client: Zep) -> None:
     Args:
         client: Cliente Zep configurado.
     """
-    groups_to_create = [
-        {
-            "group_id": "userhandles",
-            "name": "User Handles", 
-            "description": "Grupo para almacenar usuarios descubiertos con ML"
-        }
-        # pulsepolitics ya existe, no lo creamos
-    ]
-    
-    for group_info in groups_to_create:
+    for group_info in _GROUPS_TO_CREATE:
         try:
             client.group.add(
                 group_id=group_info["group_id"],
@@ -88,37 +400,636 @@ def _get_zep_client() -> Zep:
     Raises:
         ValueError: Si no se puede inicializar el cliente.
     """
-    global _zep
+    global _zep, _zep_groups_ready
+    
+    if _zep is None:
+        try:
+            # Validar configuración antes de inicializar
+            if not settings.zep_api_key:
+                raise ValueError("ZEP_API_KEY no está configurada")
+            
+            if settings.zep_api_key in ["test_key_for_development", "your_zep_api_key_here"]:
+                logger.warning("⚠️ Usando API key de prueba - funcionalidad limitada")
+            
+            _zep = Zep(
+                api_key=settings.zep_api_key
+            )
+            
+            # Crear grupos necesarios si no existen (una vez por despliegue: los
+            # workers que heredan el cliente del proceso maestro ya los tienen)
+            if not _zep_groups_ready:
+                _create_groups_if_needed(_zep)
+                _zep_groups_ready = True
+            
+            logger.info("✅ Cliente Zep inicializado correctamente con grupos")
+            
+        except Exception as e:
+            logger.error(f"❌ Error inicializando cliente Zep: {e}")
+            raise ValueError(f"No se pudo inicializar cliente Zep: {e}")
+    
+    return _zep
+
+
+def _flush_public_batch(session_id: str, messages: List[Message]) -> None:
+    """
+    Envía un lote de mensajes de la cola write-behind con una sola llamada a Zep.
+    
+    Args:
+        session_id: Sesión de Zep destino.
+        messages: Mensajes acumulados para esa sesión.
+    """
+    client = _get_zep_client()
+    
+    _retry_with_backoff(lambda: client.memory.add(
+        session_id=session_id,
+        messages=messages
+    ), operation="memory.add")
+    
+    for message in messages:
+        _public_index.add(str(message.content))
+        _public_novelty.add(str(message.content))
+    _record_public_messages(messages)
+    _invalidate_search_cache(PUBLIC_STORE)
+    logger.info(f"📚 Lote añadido a memoria: {len(messages)} mensajes ({session_id})")
+
+
+def _should_retry_public_batch(error: BaseException) -> bool:
+    # Con el circuito abierto Zep no recibió el lote: reintentar cuando se cierre
+    return isinstance(error, CircuitOpenError) or is_retryable(error)
+
+
+def _get_public_write_queue() -> WriteBehindQueue:
+    """
+    Obtiene la cola write-behind de la memoria pública, creándola si es necesario.
+    
+    Al crearla registra ``flush_public_memory_queue`` con atexit para no perder
+    mensajes pendientes al terminar el proceso.
+    """
+    global _public_write_queue
+    
+    with _public_write_queue_lock:
+        if _public_write_queue is None:
+            _public_write_queue = WriteBehindQueue(
+                flush_fn=_flush_public_batch,
+                max_batch_size=settings.write_behind_batch_size,
+                flush_interval_ms=settings.write_behind_flush_ms,
+                max_pending=settings.write_behind_max_pending,
+                name="laura-public-memory-writer",
+                max_retries=settings.write_behind_max_retries,
+                retry_base_delay=settings.write_behind_retry_base_delay_seconds,
+                retry_max_delay=settings.write_behind_retry_max_delay_seconds,
+                should_retry=_should_retry_public_batch,
+                retry_allowed=_retry_budget.try_acquire,
+                dead_letter_max=settings.write_behind_dead_letter_max
+            )
+            atexit.register(flush_public_memory_queue)
+            logger.info("📮 Cola write-behind de memoria pública inicializada")
+    
+    return _public_write_queue
+
+
+def flush_public_memory_queue(timeout: Optional[float] = 10.0) -> bool:
+    """
+    Envía a Zep todos los mensajes pendientes de la cola write-behind.
+    
+    Pensado como hook de apagado (atexit, señales del servidor).
+    
+    Args:
+        timeout: Segundos máximos de espera.
+        
+    Returns:
+        True si no quedaron mensajes pendientes.
+    """
+    if _public_write_queue is None:
+        return True
+    
+    flushed = _public_write_queue.flush(timeout)
+    if not flushed:
+        logger.warning("⚠️ Quedaron mensajes pendientes en la cola write-behind")
+    dead_letter_items = _public_write_queue.stats()["dead_letter_items"]
+    if dead_letter_items:
+        logger.error(f"☠️ {dead_letter_items} mensajes de la cola write-behind no llegaron a Zep (dead-letter)")
+    return flushed
+
+
+def warm_up() -> None:
+    """
+    Valida la configuración, crea el cliente de Zep y los grupos antes de atender tráfico.
+    
+    Con ``preload_app`` de gunicorn se llama en el proceso maestro: los
+    workers heredan la configuración y no repiten la creación de grupos.
+    También siembra el modelo de novedad con la sesión pública; sin él cada
+    worker arrancaría vacío y el filtro dejaría pasar casi todas las repeticiones.
+    
+    Raises:
+        ValueError: Si el cliente no se puede inicializar.
+    """
+    client = _get_zep_client()
+    if settings.novelty_enabled:
+        try:
+            _refresh_public_index(client)
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo sembrar el modelo de novedad al arrancar: {e}")
+
+
+def shutdown(timeout: Optional[float] = 10.0) -> bool:
+    """
+    Apagado ordenado: vacía la cola write-behind y persiste los índices locales.
+    
+    Returns:
+        True si no quedaron mensajes pendientes en la cola.
+    """
+    flushed = flush_public_memory_queue(timeout)
+    save_near_duplicate_indexes()
+    _persist_handle_index(force=True)
+    logger.info("👋 Memoria de Laura detenida")
+    return flushed
+
+
+def _reset_after_fork() -> None:
+    """
+    Descarta en el proceso hijo lo que no se puede compartir tras ``fork``.
+    
+    El pool de conexiones HTTP del cliente, la conexión SQLite y el hilo de la
+    cola write-behind pertenecen al proceso padre; el hijo abre los suyos bajo
+    demanda. La caché, los bocetos y el registro de handles se heredan tal cual.
+    """
+    global _zep, _public_write_queue, _metadata_store
+    
+    _zep = None
+    _public_write_queue = None
+    _metadata_store = None
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_write_queue_stats() -> Dict[str, Any]:
+    """
+    Obtiene los contadores de la cola write-behind de memoria pública.
+    
+    Returns:
+        Dict con pendientes, lotes enviados, reintentos y los últimos lotes en
+        dead-letter (contenido recortado).
+    """
+    if _public_write_queue is None:
+        return {"enabled": settings.write_behind_enabled, "pending": 0}
+    
+    stats = _public_write_queue.stats()
+    stats["enabled"] = settings.write_behind_enabled
+    stats["dead_letters"] = [
+        {
+            "session_id": entry["key"],
+            "attempts": entry["attempts"],
+            "error": entry["error"],
+            "failed_at": entry["failed_at"],
+            "contents": [str(getattr(item, "content", item))[:200] for item in entry["items"]]
+        }
+        for entry in _public_write_queue.dead_letters(limit=20)
+    ]
+    return stats
+
+
+def get_write_queue_health() -> Dict[str, Any]:
+    """
+    Resumen de la cola write-behind para /ready: mensajes sin confirmar,
+    esperando reintento, en dead-letter y descartados.
+    """
+    stats = _public_write_queue.stats() if _public_write_queue is not None else {}
+    return {
+        "pending": stats.get("pending", 0),
+        "retry_pending": stats.get("retry_pending", 0),
+        "dead_letter_items": stats.get("dead_letter_items", 0),
+        "items_dropped": stats.get("items_dropped", 0)
+    }
+
+
+def _get_near_duplicate_index(group_id: str) -> MinHashLSH:
+    """
+    Obtiene (o crea y carga desde disco) el boceto de casi-duplicados de un grupo.
+    """
+    index = _near_duplicate_indexes.get(group_id)
+    if index is not None:
+        return index
+    with _near_duplicate_lock:
+        index = _near_duplicate_indexes.get(group_id)
+        if index is None:
+            state_dir = settings.near_duplicate_state_dir
+            index = MinHashLSH(
+                threshold=settings.near_duplicate_threshold,
+                num_perm=settings.near_duplicate_num_perm,
+                bands=settings.near_duplicate_bands,
+                shingle_size=settings.near_duplicate_shingle_size,
+                max_signatures=settings.near_duplicate_max_signatures,
+                path=os.path.join(state_dir, f"{group_id}.npz") if state_dir else None
+            )
+            _near_duplicate_indexes[group_id] = index
+        return index
+
+
+def _claim_near_duplicate(group_id: str, content: str):
+    """
+    Comprueba si ``content`` es casi-duplicado de algo ya enviado al grupo y, si no, reclama su firma.
+    
+    La comprobación y el registro son atómicos: dos casi-duplicados enviados a
+    la vez no pasan ambos. Si la escritura en Zep falla hay que llamar a
+    ``_release_near_duplicate``. Los casi-duplicados se cuentan en la métrica
+    y se registran en el log.
+    
+    Returns:
+        Tupla (similitud o None, firma reclamada o None).
+    """
+    if not settings.near_duplicate_enabled:
+        return None, None
+    similarity, signature = _get_near_duplicate_index(group_id).claim(content)
+    if similarity is not None:
+        NEAR_DUPLICATES_SKIPPED.inc(group=group_id)
+        logger.info(f"🧬 Casi-duplicado en {group_id} (similitud {similarity:.2f}), no se guarda: {content[:50]}...")
+    return similarity, signature
+
+
+def _release_near_duplicate(group_id: str, signature) -> None:
+    """
+    Libera la firma reclamada de un contenido que Zep no llegó a guardar.
+    """
+    if signature is None or not settings.near_duplicate_enabled:
+        return
+    _get_near_duplicate_index(group_id).release(signature)
+
+
+def _record_near_duplicate(group_id: str) -> None:
+    """
+    Persiste el boceto tras una escritura confirmada por Zep (como mucho cada ``save_interval``).
+    """
+    if not settings.near_duplicate_enabled:
+        return
+    try:
+        _get_near_duplicate_index(group_id).maybe_save(settings.near_duplicate_save_interval_seconds)
+    except Exception as e:
+        logger.warning(f"⚠️ No se pudo persistir el boceto de casi-duplicados ({group_id}): {e}")
+
+
+def save_near_duplicate_indexes() -> None:
+    """
+    Persiste los bocetos de casi-duplicados con cambios pendientes.
+    """
+    for group_id, index in list(_near_duplicate_indexes.items()):
+        try:
+            index.save()
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo persistir el boceto de casi-duplicados ({group_id}): {e}")
+
+
+def reset_near_duplicate_indexes() -> None:
+    """
+    Descarta los bocetos cargados (se recrean en el siguiente uso).
+    """
+    with _near_duplicate_lock:
+        _near_duplicate_indexes.clear()
+
+
+def get_near_duplicate_stats() -> Dict[str, Any]:
+    """
+    Obtiene el estado de los bocetos de casi-duplicados por grupo.
+    """
+    return {
+        "enabled": settings.near_duplicate_enabled,
+        "threshold": settings.near_duplicate_threshold,
+        "groups": {group_id: index.stats() for group_id, index in list(_near_duplicate_indexes.items())}
+    }
+
+
+atexit.register(save_near_duplicate_indexes)
+
+
+def _episode_processed(episode_uuid: str) -> bool:
+    """
+    Indica si Zep ya procesó (indexó) un episodio de ``graph.add``.
+    """
+    client = _get_zep_client()
+    episode = _retry_with_backoff(
+        lambda: client.graph.episode.get(uuid_=episode_uuid),
+        max_retries=0,
+        operation="graph.episode.get"
+    )
+    return bool(getattr(episode, "processed", False))
+
+
+def _track_pending_write(group_id: str, content: str, episode: Any) -> None:
+    """
+    Registra un ``graph.add`` confirmado para mezclarlo en las búsquedas del grupo.
+    """
+    if not settings.pending_writes_enabled:
+        return
+    episode_uuid = getattr(episode, "uuid_", None)
+    _pending_writes.add(group_id, content, episode_uuid if isinstance(episode_uuid, str) else None)
+
+
+def _merge_pending_writes(group_id: str, query: str, results: List[str], limit: int) -> List[str]:
+    if not settings.pending_writes_enabled:
+        return results
+    return _pending_writes.merge(group_id, query, results, limit)
+
+
+def get_pending_writes_stats() -> Dict[str, Any]:
+    """
+    Obtiene las escrituras al grafo pendientes de ingesta por grupo.
+    """
+    stats = _pending_writes.stats()
+    stats["enabled"] = settings.pending_writes_enabled
+    return stats
+
+
+def _get_metadata_store() -> MetadataStore:
+    """
+    Obtiene (o abre) el índice local de metadatos de escrituras.
+    """
+    global _metadata_store
+    
+    if _metadata_store is not None:
+        return _metadata_store
+    with _metadata_store_lock:
+        if _metadata_store is None:
+            _metadata_store = MetadataStore(settings.metadata_store_path)
+        return _metadata_store
+
+
+def _record_write_metadata(store: str, content: str, metadata: Optional[Dict[str, Any]],
+                           episode: Any = None) -> None:
+    """
+    Guarda los metadatos de una escritura confirmada por Zep.
+    
+    Los errores solo se registran: la escritura en Zep ya se hizo.
+    """
+    if not settings.metadata_store_enabled:
+        return
+    episode_uuid = getattr(episode, "uuid_", None)
+    try:
+        _get_metadata_store().record(store, content, metadata,
+                                     episode_uuid=episode_uuid if isinstance(episode_uuid, str) else None)
+    except Exception as e:
+        logger.warning(f"⚠️ No se pudieron guardar los metadatos de la escritura ({store}): {e}")
+
+
+# --- Pasos comunes de escritura (API síncrona y memory_async) ---
+# Los pasos con E/S local (SQLite, bocetos e índices en disco) la API
+# asíncrona los ejecuta con ``asyncio.to_thread``.
+
+_GROUP_MARKERS: Dict[str, Dict[str, str]] = {
+    "pulsepolitics": {
+        "source_system": "pulsepolitics",
+        "memory_type": "shared_political_graph",
+        "entity_type": "political_content"
+    },
+    "userhandles": {
+        "source_system": "userhandles",
+        "memory_type": "shared_user_handles",
+        "entity_type": "twitter_user"
+    }
+}
+
+
+def _public_message(content: str, metadata: Optional[Dict[str, Any]]) -> Tuple[Message, Dict[str, Any]]:
+    """
+    Prepara el mensaje de la memoria pública (con ``ts`` por defecto) y sus metadatos.
+    """
+    final_metadata = metadata or {}
+    if "ts" not in final_metadata:
+        final_metadata["ts"] = datetime.utcnow().isoformat()
+    return Message(role="assistant", content=content, metadata=final_metadata), final_metadata
+
+
+def _enqueue_public_write(message: Message) -> bool:
+    """
+    Encola el mensaje en la cola write-behind si está habilitada.
+    
+    Returns:
+        True si quedó encolado; False si hay que escribirlo ya (deshabilitada o llena).
+    """
+    if not settings.write_behind_enabled:
+        return False
+    try:
+        _get_public_write_queue().put(
+            settings.session_id,
+            message,
+            timeout=settings.write_behind_enqueue_timeout_ms / 1000.0
+        )
+    except queue.Full:
+        logger.warning("⚠️ Cola write-behind llena, escribiendo de forma síncrona")
+        return False
+    logger.info(f"📮 Memoria encolada: {str(message.content)[:50]}...")
+    return True
+
+
+def _record_public_write(content: str, final_metadata: Dict[str, Any]) -> None:
+    """
+    Registro local tras un ``memory.add`` confirmado: índice, novedad, metadatos y caché.
+    """
+    _public_index.add(content)
+    _public_novelty.add(content)
+    _record_write_metadata(PUBLIC_STORE, content, final_metadata)
+    _invalidate_search_cache(PUBLIC_STORE)
+    logger.info(f"📚 Memoria añadida: {content[:50]}...")
+
+
+def _group_write_metadata(group_id: str, metadata: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Metadatos de un ``graph.add``: los del llamante con ``ts`` y los marcadores del grupo.
+    """
+    final_metadata = metadata or {}
+    final_metadata.update({"ts": datetime.utcnow().isoformat(), **_GROUP_MARKERS[group_id]})
+    return final_metadata
+
+
+def _handle_already_listed(handle: str, results: List[str]) -> bool:
+    """
+    Comprobación de duplicados de UserHandles cuando el registro local no está disponible.
+    """
+    if any(f"@{handle}" in result for result in results):
+        logger.info(f"👥 Usuario ya existe en UserHandles: @{handle}")
+        return True
+    return False
+
+
+def _record_group_write(group_id: str, content: str, final_metadata: Dict[str, Any], episode: Any,
+                        persist_handles: bool = False) -> None:
+    """
+    Registro local tras un ``graph.add`` confirmado.
+    
+    Persiste el boceto de casi-duplicados (PulsePolitics), registra la
+    escritura pendiente y sus metadatos, invalida la caché del store y, con
+    ``persist_handles``, reescribe el índice de handles compartido.
+    """
+    if group_id == "pulsepolitics":
+        _record_near_duplicate(group_id)
+    _track_pending_write(group_id, content, episode)
+    _record_write_metadata(group_id, content, final_metadata, episode)
+    _invalidate_search_cache(group_id)
+    if persist_handles:
+        _persist_handle_index()
+
+
+def _record_public_messages(messages: List[Any]) -> None:
+    """
+    Registra en el índice de metadatos un lote de mensajes de la memoria pública.
+    
+    Si un mensaje no trae ``ts`` se usa su ``created_at`` de Zep.
+    """
+    if not settings.metadata_store_enabled:
+        return
+    items = []
+    for message in messages:
+        content = getattr(message, "content", None)
+        if not content:
+            continue
+        metadata = getattr(message, "metadata", None)
+        metadata = dict(metadata) if isinstance(metadata, dict) else {}
+        created_at = getattr(message, "created_at", None)
+        if "ts" not in metadata and isinstance(created_at, str):
+            metadata["ts"] = created_at
+        items.append((str(content), metadata, None))
+    try:
+        _get_metadata_store().record_many(PUBLIC_STORE, items)
+    except Exception as e:
+        logger.warning(f"⚠️ No se pudieron guardar los metadatos de la memoria pública: {e}")
+
+
+def query_write_metadata(store: Optional[str] = None, source: Optional[str] = None,
+                         tags: Optional[List[str]] = None, since: Any = None, until: Any = None,
+                         limit: Optional[int] = 100) -> List[Dict[str, Any]]:
+    """
+    Consulta el índice local de metadatos sin llamar a Zep.
+    
+    Args:
+        store: Grupo (``public``, ``pulsepolitics``, ``userhandles``).
+        source: Fuente de la escritura (``metadata["source"]`` o ``source_system``).
+        tags: Tags que deben estar todos presentes.
+        since: Fecha mínima (ISO 8601, datetime o epoch).
+        until: Fecha máxima (excluida).
+        limit: Máximo de escrituras.
+        
+    Returns:
+        Escrituras de la más reciente a la más antigua, con contenido, hash,
+        episodio y metadatos.
+    """
+    return _get_metadata_store().query(store=store, source=source, tags=tags,
+                                       since=since, until=until, limit=limit)
+
+
+def count_writes_by_source(store: Optional[str] = None) -> Dict[str, int]:
+    """
+    Cuenta las escrituras registradas por fuente.
+    """
+    return _get_metadata_store().count_by_source(store)
+
+
+def _writes_by_source(store: str) -> Dict[str, int]:
+    if not settings.metadata_store_enabled:
+        return {}
+    try:
+        return count_writes_by_source(store)
+    except Exception as e:
+        logger.warning(f"⚠️ No se pudo leer el índice de metadatos: {e}")
+        return {}
+
+
+def reset_metadata_store() -> None:
+    """
+    Cierra el índice de metadatos (se reabre con la configuración actual en el siguiente uso).
+    """
+    global _metadata_store
+    
+    with _metadata_store_lock:
+        if _metadata_store is not None:
+            _metadata_store.close()
+        _metadata_store = None
+
+
+def get_metadata_store_stats() -> Dict[str, Any]:
+    """
+    Obtiene el tamaño del índice de metadatos y los conteos por fuente.
+    """
+    if not settings.metadata_store_enabled:
+        return {"enabled": False}
+    store = _get_metadata_store()
+    stats = store.stats()
+    stats["enabled"] = True
+    stats["by_source"] = store.count_by_source()
+    return stats
+
+
+# Métricas de caché, cola, índice y breakers (se actualizan al renderizar /metrics).
+# Los acumulados se exponen como contadores copiando los contadores de cada componente.
+_SEARCH_CACHE_ENTRIES = gauge("laura_memory_search_cache_entries", "Entradas en la caché de búsquedas.")
+_SEARCH_CACHE_LOOKUPS = counter(
+    "laura_memory_search_cache_lookups_total",
+    "Consultas a la caché de búsquedas desde el último clear, por resultado.",
+    ("result",)
+)
+_SEARCH_IN_FLIGHT = gauge("laura_memory_search_in_flight", "Búsquedas distintas en vuelo hacia Zep.", ("api",))
+_SEARCH_COALESCED = counter(
+    "laura_memory_search_coalesced_total",
+    "Búsquedas que compartieron una llamada en vuelo.",
+    ("api",)
+)
+_WRITE_QUEUE_PENDING = gauge("laura_memory_write_queue_pending", "Mensajes pendientes en la cola write-behind.")
+_WRITE_QUEUE_ITEMS = counter(
+    "laura_memory_write_queue_items_total",
+    "Mensajes procesados por la cola write-behind, por resultado.",
+    ("result",)
+)
+_WRITE_QUEUE_DEAD_LETTER = gauge(
+    "laura_memory_write_queue_dead_letter_items",
+    "Mensajes en dead-letter tras agotar los reintentos de la cola write-behind."
+)
+_PUBLIC_INDEX_DOCUMENTS = gauge("laura_memory_public_index_documents", "Documentos en el índice local de memoria pública.")
+_CIRCUIT_STATE = gauge(
+    "laura_memory_circuit_breaker_state",
+    "Estado de cada circuit breaker (1 en el estado actual).",
+    ("operation", "state")
+)
+_RETRY_BUDGET_TOKENS = gauge("laura_memory_retry_budget_tokens", "Tokens disponibles en el presupuesto de reintentos.")
+
+
+def _collect_metrics() -> None:
+    cache_stats = _search_cache.stats()
+    _SEARCH_CACHE_ENTRIES.set(cache_stats["size"])
+    for result in ("hits", "misses", "stale_hits", "evictions"):
+        _SEARCH_CACHE_LOOKUPS.set_total(cache_stats[result], result=result)
     
-    if _zep is None:
-        try:
-            # Validar configuración antes de inicializar
-            if not settings.zep_api_key:
-                raise ValueError("ZEP_API_KEY no está configurada")
-            
-            if settings.zep_api_key in ["test_key_for_development", "your_zep_api_key_here"]:
-                logger.warning("⚠️ Usando API key de prueba - funcionalidad limitada")
-            
-            _zep = Zep(
-                api_key=settings.zep_api_key
-            )
-            
-            # Crear grupos necesarios si no existen
-            _create_groups_if_needed(_zep)
-            
-            logger.info("✅ Cliente Zep inicializado correctamente con grupos")
-            
-        except Exception as e:
-            logger.error(f"❌ Error inicializando cliente Zep: {e}")
-            raise ValueError(f"No se pudo inicializar cliente Zep: {e}")
+    for api, flights in (("sync", _search_flights), ("async", _asearch_flights)):
+        flight_stats = flights.stats()
+        _SEARCH_IN_FLIGHT.set(flight_stats["in_flight"], api=api)
+        _SEARCH_COALESCED.set_total(flight_stats["shared"], api=api)
     
-    return _zep
+    queue_stats = get_write_queue_stats()
+    _WRITE_QUEUE_PENDING.set(queue_stats.get("pending", 0))
+    _WRITE_QUEUE_ITEMS.set_total(queue_stats.get("enqueued", 0), result="enqueued")
+    _WRITE_QUEUE_ITEMS.set_total(queue_stats.get("items_sent", 0), result="sent")
+    _WRITE_QUEUE_ITEMS.set_total(queue_stats.get("items_failed", 0), result="failed")
+    _WRITE_QUEUE_ITEMS.set_total(queue_stats.get("items_retried", 0), result="retried")
+    _WRITE_QUEUE_ITEMS.set_total(queue_stats.get("items_dropped", 0), result="dropped")
+    _WRITE_QUEUE_DEAD_LETTER.set(queue_stats.get("dead_letter_items", 0))
+    
+    _PUBLIC_INDEX_DOCUMENTS.set(len(_public_index))
+    
+    for operation, breaker in list(_breakers.items()):
+        current = breaker.state
+        for state in (CircuitBreaker.CLOSED, CircuitBreaker.OPEN, CircuitBreaker.HALF_OPEN):
+            _CIRCUIT_STATE.set(1 if state == current else 0, operation=operation, state=state)
+    _RETRY_BUDGET_TOKENS.set(_retry_budget.stats()["available_tokens"])
+
+
+registry.register_collector(_collect_metrics)
 
 
 def add_public_memory(content: str, metadata: Optional[Dict[str, Any]] = None) -> None:
     """
     Añade contenido a la memoria pública de Laura.
     
+    Con ``write_behind_enabled`` el mensaje se encola y se envía en lote desde
+    un hilo de fondo; si la cola está llena se escribe de forma síncrona.
+    
     Args:
         content: Contenido a guardar en la memoria.
         metadata: Metadatos opcionales con información adicional.
@@ -133,90 +1044,201 @@ def add_public_memory(content: str, metadata: Optional[Dict[str, Any]] = None) -
     
     try:
         client = _get_zep_client()
-        
-        # Preparar metadatos con timestamp por defecto
-        final_metadata = metadata or {}
-        if "ts" not in final_metadata:
-            final_metadata["ts"] = datetime.utcnow().isoformat()
-        
-        # Crear mensaje para Zep
-        message = Message(
-            role="assistant",
-            content=content,
-            metadata=final_metadata
-        )
+        message, final_metadata = _public_message(content, metadata)
+        if _enqueue_public_write(message):
+            return
         
         # Añadir a la memoria
-        client.memory.add(
+        _retry_with_backoff(lambda: client.memory.add(
             session_id=settings.session_id,
             messages=[message]
-        )
+        ), operation="memory.add")
         
-        logger.info(f"📚 Memoria añadida: {content[:50]}...")
+        _record_public_write(content, final_metadata)
         
     except Exception as e:
         logger.error(f"❌ Error guardando en memoria: {e}")
         raise ValueError(f"Error al guardar en memoria pública: {e}")
 
 
+def score_public_novelty(content: str) -> float:
+    """
+    Estima qué fracción del contenido no está ya en la memoria pública.
+    
+    Usa el modelo local de shingles, alimentado con cada escritura confirmada
+    y con la sesión al arrancar (``warm_up``) y al refrescar el índice local;
+    no consulta Zep. Las escrituras de otros workers solo entran al refrescar
+    (``public_index_refresh_seconds``).
+    
+    Returns:
+        Novedad entre 0.0 (todo repetido) y 1.0 (totalmente nuevo).
+    """
+    return _public_novelty.score(content)
+
+
+def get_novelty_stats() -> Dict[str, Any]:
+    """
+    Obtiene el tamaño del modelo de novedad y el umbral configurado.
+    """
+    stats = _public_novelty.stats()
+    stats["enabled"] = settings.novelty_enabled
+    stats["threshold"] = settings.novelty_threshold
+    return stats
+
+
+def _extract_public_results(search_results: Any) -> List[str]:
+    """
+    Extrae el contenido de los resultados de ``memory.search``.
+    """
+    facts = []
+    if hasattr(search_results, 'results') and search_results.results:
+        for result in search_results.results:
+            try:
+                # Extraer contenido del resultado de búsqueda
+                if hasattr(result, 'message') and result.message:
+                    content = str(result.message.content)
+                    facts.append(content)
+                elif hasattr(result, 'content'):
+                    content = str(result.content)
+                    facts.append(content)
+            except Exception as e:
+                logger.error(f"[DEBUG] Error procesando resultado de búsqueda: {e}")
+                continue
+    return facts
+
+
+def _match_session_messages(session: Any, query: str, limit: int) -> List[str]:
+    """
+    Búsqueda básica por subcadena sobre los mensajes de una sesión.
+    """
+    facts = []
+    if hasattr(session, 'messages') and session.messages:
+        for message in session.messages:
+            try:
+                content = str(message.content)
+                if query.lower() in content.lower():
+                    facts.append(content)
+                    if len(facts) >= limit:
+                        break
+            except Exception as e:
+                logger.error(f"[DEBUG] Error en fallback: {e}")
+                continue
+    return facts
+
+
+def _public_index_needs_load() -> bool:
+    """
+    Indica si el índice local debe (re)cargarse desde la sesión de Zep.
+    
+    Se carga una vez por proceso y se refresca cada
+    ``public_index_refresh_seconds`` para incorporar escrituras de otros procesos.
+    """
+    loaded_at = _public_index.loaded_at
+    if loaded_at is None:
+        return True
+    refresh = settings.public_index_refresh_seconds
+    return refresh > 0 and time.monotonic() - loaded_at >= refresh
+
+
+def _load_public_index(session: Any) -> None:
+    """
+    Incorpora al índice local los mensajes de una sesión de Zep.
+    """
+    contents = []
+    if hasattr(session, 'messages') and session.messages:
+        for message in session.messages:
+            try:
+                contents.append(str(message.content))
+            except Exception as e:
+                logger.error(f"[DEBUG] Error indexando mensaje: {e}")
+                continue
+    total = _public_index.load(contents)
+    _public_novelty.clear()
+    _public_novelty.load(contents)
+    if hasattr(session, 'messages') and session.messages:
+        _record_public_messages(session.messages)
+    logger.info(f"🗂️ Índice local de memoria cargado: {total} documentos")
+
+
+def _search_public_index(client: Zep, query: str, limit: int) -> List[str]:
+    """
+    Fallback local: busca en el índice invertido sin descargar la sesión.
+    
+    Solo consulta Zep para la carga inicial o el refresco periódico del índice.
+    """
+    _refresh_public_index(client)
+    return _public_index.search(query, limit)
+
+
+def _refresh_public_index(client: Zep) -> None:
+    """
+    Carga (o refresca) el índice local y los metadatos desde la sesión de Zep.
+    """
+    if _public_index_needs_load():
+        with _public_index_load_lock:
+            if _public_index_needs_load():
+                _load_public_index(_retry_with_backoff(
+                    lambda: client.memory.get(session_id=settings.session_id),
+                    operation="memory.get"
+                ))
+
+
+def _fetch_public_memory(query: str, limit: int) -> List[str]:
+    """
+    Consulta Zep para la memoria pública (búsqueda semántica + fallback básico).
+    
+    Raises:
+        Exception: Cualquier error de Zep, para que no se cachee.
+    """
+    client = _get_zep_client()
+    
+    # Usar búsqueda semántica de Zep con retry
+    def _search_operation():
+        return client.memory.search(
+            session_id=settings.session_id,
+            text=query,
+            limit=limit,
+            **_zep_request_options()
+        )
+    
+    search_results = _retry_with_backoff(_search_operation, operation="memory.search")
+    facts = _extract_public_results(search_results)
+    
+    # Fallback: índice local (o búsqueda básica) si no hay resultados semánticos
+    if not facts:
+        if settings.public_index_enabled:
+            logger.info("🔄 Fallback a índice local")
+            facts = _search_public_index(client, query, limit)
+        else:
+            logger.info("🔄 Fallback a búsqueda básica")
+            session = _retry_with_backoff(
+                lambda: client.memory.get(session_id=settings.session_id, **_zep_request_options()),
+                operation="memory.get"
+            )
+            facts = _match_session_messages(session, query, limit)
+    
+    return facts
+
+
 def search_public_memory(query: str, limit: int = 5) -> List[str]:
     """
     Busca en la memoria pública de Laura usando búsqueda semántica de Zep.
+    
+    Los resultados se sirven desde la caché en proceso mientras no expiren
+    ni se escriba en la memoria pública.
+    
     Args:
         query: Consulta de búsqueda.
         limit: Número máximo de resultados a retornar.
     Returns:
         Lista de strings con los mensajes más relevantes encontrados.
-    Raises:
-        ValueError: Si hay error en la búsqueda.
     """
     if not query or not query.strip():
         logger.warning("⚠️ Query vacía para búsqueda en memoria")
         return []
     
     try:
-        client = _get_zep_client()
-        
-        # Usar búsqueda semántica de Zep con retry
-        def _search_operation():
-            return client.memory.search(
-                session_id=settings.session_id,
-                text=query,
-                limit=limit
-            )
-        
-        search_results = _retry_with_backoff(_search_operation)
-        
-        facts = []
-        if hasattr(search_results, 'results') and search_results.results:
-            for result in search_results.results:
-                try:
-                    # Extraer contenido del resultado de búsqueda
-                    if hasattr(result, 'message') and result.message:
-                        content = str(result.message.content)
-                        facts.append(content)
-                    elif hasattr(result, 'content'):
-                        content = str(result.content)
-                        facts.append(content)
-                except Exception as e:
-                    logger.error(f"[DEBUG] Error procesando resultado de búsqueda: {e}")
-                    continue
-        
-        # Fallback: búsqueda básica si no hay resultados semánticos
-        if not facts:
-            logger.info("🔄 Fallback a búsqueda básica")
-            session = client.memory.get(session_id=settings.session_id)
-            if hasattr(session, 'messages') and session.messages:
-                for message in session.messages:
-                    try:
-                        content = str(message.content)
-                        if query.lower() in content.lower():
-                            facts.append(content)
-                            if len(facts) >= limit:
-                                break
-                    except Exception as e:
-                        logger.error(f"[DEBUG] Error en fallback: {e}")
-                        continue
+        facts = _cached_search(PUBLIC_STORE, query, limit, lambda: _fetch_public_memory(query, limit))
         
         logger.info(f"🔍 Búsqueda en memoria: '{query}' → {len(facts)} resultados")
         return facts
@@ -226,6 +1248,101 @@ def search_public_memory(query: str, limit: int = 5) -> List[str]:
         return []  # Return empty list instead of raising exception
 
 
+def _rank_public_candidates(query: str, limit: int, tags: Optional[List[str]] = None,
+                            source: Optional[str] = None, since: Any = None,
+                            until: Any = None) -> List[Dict[str, Any]]:
+    """
+    Filtra con el índice de metadatos y ordena los candidatos por la consulta.
+    
+    La puntuación es la fracción de términos de la consulta (sin acentos ni
+    mayúsculas) presentes en el contenido; a igual puntuación gana el más
+    reciente. Sin consulta se devuelven los más recientes.
+    """
+    candidates = _get_metadata_store().query(
+        store=PUBLIC_STORE, source=source, tags=tags, since=since, until=until,
+        limit=settings.filtered_search_max_candidates
+    )
+    query_tokens = set(tokenize(fold(query or "")))
+    if not query_tokens:
+        return [_public_item(item, None) for item in candidates[:limit]]
+    
+    scored = []
+    for position, item in enumerate(candidates):
+        shared = len(query_tokens & set(tokenize(fold(item["content"]))))
+        if shared:
+            scored.append((shared / len(query_tokens), position, item))
+    # Los candidatos llegan del más reciente al más antiguo
+    scored.sort(key=lambda entry: (-entry[0], entry[1]))
+    return [_public_item(item, score) for score, _, item in scored[:limit]]
+
+
+def _public_item(item: Dict[str, Any], score: Optional[float]) -> Dict[str, Any]:
+    return {
+        "content": item["content"],
+        "source": item["source"],
+        "tags": item["tags"],
+        "ts": item["ts"],
+        "score": round(score, 3) if score is not None else None
+    }
+
+
+def search_public_memory_filtered(query: str = "", limit: int = 5, tags: Optional[List[str]] = None,
+                                  source: Optional[str] = None, since: Any = None,
+                                  until: Any = None) -> List[Dict[str, Any]]:
+    """
+    Busca en la memoria pública restringiendo por tags, fuente y rango de fechas.
+    
+    Los filtros se resuelven con el índice local de metadatos (alimentado con
+    cada escritura y con la sesión de Zep al cargar el índice local), de modo
+    que no hace falta pedir de más a Zep y filtrar después.
+    
+    Args:
+        query: Consulta de búsqueda (vacía = los más recientes).
+        limit: Número máximo de resultados.
+        tags: Tags que deben estar todos presentes (p. ej. ``["legal"]``).
+        source: Fuente exacta (p. ej. ``perplexity_search``).
+        since: Fecha mínima (ISO 8601, datetime o epoch).
+        until: Fecha máxima (excluida).
+        
+    Returns:
+        Lista de dicts con ``content``, ``source``, ``tags``, ``ts`` y ``score``.
+    
+    Raises:
+        ValueError: Si el índice de metadatos está desactivado o una fecha no es válida.
+    """
+    if not settings.metadata_store_enabled:
+        raise ValueError("La búsqueda filtrada requiere LAURA_METADATA_STORE_ENABLED")
+    
+    try:
+        _refresh_public_index(_get_zep_client())
+    except Exception as e:
+        logger.warning(f"⚠️ No se pudo refrescar la memoria pública, se usan los metadatos locales: {e}")
+    
+    results = _rank_public_candidates(query, limit, tags=tags, source=source, since=since, until=until)
+    logger.info(f"🔍 Búsqueda filtrada en memoria: '{query}' (tags={tags}, source={source}) → {len(results)} resultados")
+    return results
+
+
+def _memory_stats(session_info: Any) -> Dict[str, Any]:
+    """
+    Estadísticas de la memoria pública a partir de la sesión de Zep (API síncrona y asíncrona).
+    """
+    return {
+        "session_id": settings.session_id,
+        "message_count": len(session_info.messages) if session_info.messages else 0,
+        "created_at": session_info.created_at if hasattr(session_info, 'created_at') else None,
+        "updated_at": session_info.updated_at if hasattr(session_info, 'updated_at') else None,
+        "local_index": _public_index.stats(),
+        "novelty": get_novelty_stats(),
+        "resilience": get_resilience_stats()
+    }
+
+
+def _memory_stats_error(error: Exception) -> Dict[str, Any]:
+    logger.error(f"❌ Error obteniendo estadísticas: {error}")
+    return {"error": str(error), "resilience": get_resilience_stats()}
+
+
 def get_memory_stats() -> Dict[str, Any]:
     """
     Obtiene estadísticas de la memoria pública.
@@ -237,18 +1354,15 @@ def get_memory_stats() -> Dict[str, Any]:
         client = _get_zep_client()
         
         # Obtener información de la sesión
-        session_info = client.memory.get(session_id=settings.session_id)
+        session_info = _retry_with_backoff(
+            lambda: client.memory.get(session_id=settings.session_id),
+            operation="memory.get"
+        )
         
-        return {
-            "session_id": settings.session_id,
-            "message_count": len(session_info.messages) if session_info.messages else 0,
-            "created_at": session_info.created_at if hasattr(session_info, 'created_at') else None,
-            "updated_at": session_info.updated_at if hasattr(session_info, 'updated_at') else None
-        }
+        return _memory_stats(session_info)
         
     except Exception as e:
-        logger.error(f"❌ Error obteniendo estadísticas: {e}")
-        return {"error": str(e)}
+        return _memory_stats_error(e)
 
 
 def clear_memory() -> None:
@@ -262,8 +1376,15 @@ def clear_memory() -> None:
         client = _get_zep_client()
         
         # Eliminar toda la memoria de la sesión
-        client.memory.delete(session_id=settings.session_id)
+        _retry_with_backoff(
+            lambda: client.memory.delete(session_id=settings.session_id),
+            max_retries=0,
+            operation="memory.delete"
+        )
         
+        _public_index.clear()
+        _public_novelty.clear()
+        _invalidate_search_cache(PUBLIC_STORE)
         logger.info("🗑️ Memoria pública limpiada completamente")
         
     except Exception as e:
@@ -289,24 +1410,28 @@ def add_to_pulsepolitics(content: str, metadata: Optional[Dict[str, Any]] = None
         return False
     
     try:
-        client = _get_zep_client()
+        # Evitar pagar la ingesta de la misma noticia con otra redacción
+        similarity, signature = _claim_near_duplicate("pulsepolitics", content)
+        if similarity is not None:
+            return False
         
         # Preparar metadatos con timestamp y marcador de PulsePolitics
-        final_metadata = metadata or {}
-        final_metadata.update({
-            "ts": datetime.utcnow().isoformat(),
-            "source_system": "pulsepolitics",
-            "memory_type": "shared_political_graph",
-            "entity_type": "political_content"
-        })
+        final_metadata = _group_write_metadata("pulsepolitics", metadata)
         
-        # Añadir al grupo usando Graph API con texto plano (mejor para indexación)
-        client.graph.add(
-            group_id="pulsepolitics",
-            data=content,  # Usar contenido como texto plano
-            type="text"
-        )
+        try:
+            client = _get_zep_client()
+            
+            # Añadir al grupo usando Graph API con texto plano (mejor para indexación)
+            episode = _retry_with_backoff(lambda: client.graph.add(
+                group_id="pulsepolitics",
+                data=content,  # Usar contenido como texto plano
+                type="text"
+            ), operation="graph.add")
+        except Exception:
+            _release_near_duplicate("pulsepolitics", signature)
+            raise
         
+        _record_group_write("pulsepolitics", content, final_metadata, episode)
         logger.info(f"🏛️ Nuevo en PulsePolitics: {content[:50]}...")
         return True
         
@@ -315,6 +1440,51 @@ def add_to_pulsepolitics(content: str, metadata: Optional[Dict[str, Any]] = None
         return False
 
 
+def _extract_episode_data(search_results: Any) -> List[str]:
+    """
+    Extrae el texto de los episodios devueltos por ``graph.search``.
+    """
+    facts = []
+    # Procesar episodios (la respuesta principal para datos guardados con graph.add)
+    if hasattr(search_results, 'episodes') and search_results.episodes:
+        for episode in search_results.episodes:
+            try:
+                # Los datos están en episode.data según el formato de episodios
+                if hasattr(episode, 'data') and episode.data:
+                    facts.append(episode.data)
+                    logger.debug(f"[DEBUG] Episode data encontrado: {episode.data[:100]}")
+                elif hasattr(episode, 'content') and episode.content:
+                    facts.append(episode.content)
+                    logger.debug(f"[DEBUG] Episode content encontrado: {episode.content[:100]}")
+            except Exception as e:
+                logger.error(f"[DEBUG] Error procesando episode PulsePolitics: {e}")
+                continue
+    return facts
+
+
+def _fetch_pulsepolitics(query: str, limit: int) -> List[str]:
+    """
+    Consulta los episodios del grupo PulsePolitics en Zep.
+    
+    Raises:
+        Exception: Cualquier error de Zep, para que no se cachee.
+    """
+    client = _get_zep_client()
+    
+    # Usar búsqueda en grupo de Graph API con retry
+    def _search_operation():
+        return client.graph.search(
+            group_id="pulsepolitics",
+            query=query,
+            scope="episodes",  # Buscar en episodios (datos guardados con graph.add)
+            limit=limit,
+            **_zep_request_options()
+        )
+    
+    search_results = _retry_with_backoff(_search_operation, operation="graph.search")
+    return _extract_episode_data(search_results)
+
+
 def search_pulsepolitics(query: str, limit: int = 5) -> List[str]:
     """
     Busca en el grupo PulsePolitics usando Zep Graph API.
@@ -331,34 +1501,9 @@ def search_pulsepolitics(query: str, limit: int = 5) -> List[str]:
         return []
     
     try:
-        client = _get_zep_client()
-        
-        # Usar búsqueda en grupo de Graph API con retry
-        def _search_operation():
-            return client.graph.search(
-                group_id="pulsepolitics",
-                query=query,
-                scope="episodes",  # Buscar en episodios (datos guardados con graph.add)
-                limit=limit
-            )
-        
-        search_results = _retry_with_backoff(_search_operation)
-        
-        facts = []
-        # Procesar episodios (la respuesta principal para datos guardados con graph.add)
-        if hasattr(search_results, 'episodes') and search_results.episodes:
-            for episode in search_results.episodes:
-                try:
-                    # Los datos están en episode.data según el formato de episodios
-                    if hasattr(episode, 'data') and episode.data:
-                        facts.append(episode.data)
-                        logger.debug(f"[DEBUG] Episode data encontrado: {episode.data[:100]}")
-                    elif hasattr(episode, 'content') and episode.content:
-                        facts.append(episode.content)
-                        logger.debug(f"[DEBUG] Episode content encontrado: {episode.content[:100]}")
-                except Exception as e:
-                    logger.error(f"[DEBUG] Error procesando episode PulsePolitics: {e}")
-                    continue
+        facts = _cached_search(PULSEPOLITICS_STORE, query, limit, lambda: _fetch_pulsepolitics(query, limit))
+        # Lo recién guardado que Zep aún no indexó
+        facts = _merge_pending_writes("pulsepolitics", query, facts, limit)
         
         logger.info(f"🏛️ Búsqueda PulsePolitics: '{query}' → {len(facts)} resultados")
         return facts
@@ -380,14 +1525,20 @@ def get_pulsepolitics_stats() -> Dict[str, Any]:
         
         # Obtener nodes del grupo PulsePolitics
         try:
-            nodes = client.graph.node.get_by_group_id(group_id="pulsepolitics")
+            nodes = _retry_with_backoff(
+                lambda: client.graph.node.get_by_group_id(group_id="pulsepolitics"),
+                operation="graph.node.get_by_group_id"
+            )
             node_count = len(nodes.nodes) if hasattr(nodes, 'nodes') and nodes.nodes else 0
         except Exception:
             node_count = 0
             
         # Obtener edges del grupo PulsePolitics  
         try:
-            edges = client.graph.edge.get_by_group_id(group_id="pulsepolitics")
+            edges = _retry_with_backoff(
+                lambda: client.graph.edge.get_by_group_id(group_id="pulsepolitics"),
+                operation="graph.edge.get_by_group_id"
+            )
             edge_count = len(edges.edges) if hasattr(edges, 'edges') and edges.edges else 0
         except Exception:
             edge_count = 0
@@ -397,7 +1548,10 @@ def get_pulsepolitics_stats() -> Dict[str, Any]:
             "node_count": node_count,
             "edge_count": edge_count,
             "total_items": node_count + edge_count,
-            "memory_type": "shared_political_graph"
+            "memory_type": "shared_political_graph",
+            "near_duplicates": get_near_duplicate_stats(),
+            "pending_writes": get_pending_writes_stats()["by_group"].get("pulsepolitics", 0),
+            "writes_by_source": _writes_by_source("pulsepolitics")
         }
         
     except Exception as e:
@@ -425,33 +1579,46 @@ def add_to_userhandles(content: str, metadata: Optional[Dict[str, Any]] = None)
     try:
         client = _get_zep_client()
         
-        # Verificar si ya existe usando el twitter_username como clave única
-        twitter_username = metadata.get("twitter_username", "") if metadata else ""
-        if twitter_username:
-            # Buscar si ya existe este usuario
-            existing_results = search_userhandles(f"@{twitter_username}", limit=10)
-            for result in existing_results:
-                if f"@{twitter_username}" in result:
-                    logger.info(f"👥 Usuario ya existe en UserHandles: @{twitter_username}")
-                    return False
+        # Verificar si ya existe usando el handle como clave única
+        record = handle_record(content, metadata)
+        previous = None
+        use_registry = record is not None and settings.handle_registry_enabled and _ensure_handle_registry(client)
+        if use_registry:
+            # Upsert local O(1): solo se escribe si el handle es nuevo o aporta datos nuevos
+            changed, previous = _handle_registry.upsert(record)
+            if not changed:
+                logger.info(f"👥 Usuario ya existe en UserHandles: @{record['handle']}")
+                return False
+        elif record is not None:
+            # Registro no disponible: buscar si ya existe (sin caché: necesitamos el estado actual)
+            try:
+                existing_results = _fetch_userhandles(f"@{record['handle']}", limit=10)
+            except Exception as e:
+                logger.warning(f"⚠️ No se pudo verificar duplicados en UserHandles: {e}")
+                existing_results = []
+            if _handle_already_listed(record["handle"], existing_results):
+                return False
         
         # Preparar metadatos con timestamp y marcador de UserHandles
-        final_metadata = metadata or {}
-        final_metadata.update({
-            "ts": datetime.utcnow().isoformat(),
-            "source_system": "userhandles",
-            "memory_type": "shared_user_handles",
-            "entity_type": "twitter_user"
-        })
+        final_metadata = _group_write_metadata("userhandles", metadata)
         
         # Añadir al grupo usando Graph API con texto plano (mejor para indexación)
-        client.graph.add(
-            group_id="userhandles",
-            data=content,  # Usar contenido como texto plano
-            type="text"
-        )
+        try:
+            episode = _retry_with_backoff(lambda: client.graph.add(
+                group_id="userhandles",
+                data=content,  # Usar contenido como texto plano
+                type="text"
+            ), operation="graph.add")
+        except Exception:
+            if use_registry:
+                _handle_registry.restore(record["handle"], previous)
+            raise
         
-        logger.info(f"👥 Nuevo en UserHandles: {content[:50]}...")
+        _record_group_write("userhandles", content, final_metadata, episode, persist_handles=use_registry)
+        if previous is not None:
+            logger.info(f"👥 Actualizado en UserHandles: {content[:50]}...")
+        else:
+            logger.info(f"👥 Nuevo en UserHandles: {content[:50]}...")
         return True
         
     except Exception as e:
@@ -459,6 +1626,239 @@ def add_to_userhandles(content: str, metadata: Optional[Dict[str, Any]] = None)
         return False
 
 
+def _attach_shared_handle_index() -> bool:
+    """
+    Usa el índice de handles en disco como base del registro, si existe.
+    
+    Returns:
+        True si se adjuntó (el registro queda cargado sin consultar Zep).
+    """
+    shared = SharedHandleIndex.open(settings.handle_index_path)
+    if shared is None:
+        return False
+    _handle_registry.attach(shared)
+    logger.info(f"👥 Índice de handles compartido abierto: {len(shared)} handles ({shared.path})")
+    return True
+
+
+def _claim_handle_index_refresh() -> bool:
+    """
+    Indica si toca comprobar el índice en disco y, si es así, reserva la comprobación.
+    
+    Solo compara relojes (sin E/S): como mucho una llamada cada
+    ``handle_index_reload_seconds`` devuelve True.
+    """
+    global _handle_index_checked_at
+    if _handle_registry.base is None or not settings.handle_index_path:
+        return False
+    now = time.monotonic()
+    if now - _handle_index_checked_at < settings.handle_index_reload_seconds:
+        return False
+    _handle_index_checked_at = now
+    return True
+
+
+def _reload_stale_handle_index() -> None:
+    """
+    Vuelve a mapear el índice si otro proceso lo reconstruyó (``os.stat`` y ``mmap``).
+    """
+    base = _handle_registry.base
+    if base is not None and base.is_stale():
+        _attach_shared_handle_index()
+
+
+def _refresh_handle_index() -> None:
+    """
+    Vuelve a mapear el índice si otro proceso lo reconstruyó (como mucho cada
+    ``handle_index_reload_seconds``).
+    """
+    if _claim_handle_index_refresh():
+        _reload_stale_handle_index()
+
+
+def _persist_handle_index(force: bool = False) -> None:
+    """
+    Reconstruye el índice compartido con las fichas locales pendientes.
+    
+    Bajo ``flock`` se adjunta primero la versión más reciente en disco (para
+    no perder lo que escribieron otros procesos), se escribe base + capa
+    local en un archivo nuevo y se sustituye con ``os.replace``.
+    """
+    global _handle_index_saved_at
+    path = settings.handle_index_path
+    if not path or not _handle_registry.loaded or not _handle_registry.pending:
+        return
+    now = time.monotonic()
+    if not force and now - _handle_index_saved_at < settings.handle_index_save_interval_seconds:
+        return
+    _handle_index_saved_at = now
+    try:
+        with index_lock(path):
+            base = _handle_registry.base
+            if base is None or base.is_stale():
+                _attach_shared_handle_index()
+            write_handle_index(
+                path,
+                _handle_registry.snapshot(),
+                capacity=_handle_registry.capacity,
+                error_rate=_handle_registry.error_rate
+            )
+            _attach_shared_handle_index()
+    except Exception as e:
+        logger.warning(f"⚠️ No se pudo reconstruir el índice de handles {path}: {e}")
+
+
+atexit.register(_persist_handle_index, force=True)
+
+
+def _ensure_handle_registry(client: Zep) -> bool:
+    """
+    Carga el registro de handles la primera vez: desde el índice compartido en
+    disco si existe y, si no, con los episodios de UserHandles en Zep.
+    
+    Returns:
+        True si el registro está listo; False si no se pudo cargar desde Zep
+        (se reintentará en la siguiente escritura).
+    """
+    if _handle_registry.loaded:
+        _refresh_handle_index()
+        return True
+    with _handle_registry_load_lock:
+        if _handle_registry.loaded:
+            return True
+        if settings.handle_index_path and _attach_shared_handle_index():
+            return True
+        try:
+            response = _retry_with_backoff(
+                lambda: client.graph.episode.get_by_group_id(
+                    group_id="userhandles",
+                    lastn=settings.handle_registry_seed_lastn
+                ),
+                operation="graph.episode.get_by_group_id"
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo cargar el registro de handles: {e}")
+            return False
+        recognized = _handle_registry.load(_episode_contents(response))
+        logger.info(f"👥 Registro de handles cargado: {len(_handle_registry)} handles ({recognized} episodios)")
+        _persist_handle_index(force=True)
+        return True
+
+
+def _episode_contents(response: Any) -> List[str]:
+    episodes = getattr(response, "episodes", None) or []
+    return [episode.content for episode in episodes if isinstance(getattr(episode, "content", None), str)]
+
+
+def _fuzzy_handle_matches(query: str, limit: int) -> List[Tuple[str, float]]:
+    """
+    Busca nombres o handles parecidos a ``query`` en el registro local.
+    
+    Returns:
+        (ficha, puntuación) con puntuación ≥ ``userhandles_fuzzy_min_score``, de
+        mayor a menor; la ficha tiene el formato con que se guarda en UserHandles.
+    """
+    matches = _handle_registry.search(query, limit=limit, min_score=settings.userhandles_fuzzy_min_score)
+    return [(format_handle_record(record), score) for record, score in matches]
+
+
+def _answers_locally(local: List[Tuple[str, float]]) -> bool:
+    # Solo una coincidencia casi exacta evita la consulta a Zep
+    return bool(local) and local[0][1] >= settings.userhandles_local_min_score
+
+
+def _merge_userhandles_results(query: str, local: List[Tuple[str, float]], remote: List[str],
+                               limit: int) -> List[str]:
+    """
+    Combina fichas del registro local, escrituras pendientes de ingesta y facts
+    de Zep, en ese orden y sin repetir handles.
+    
+    Returns:
+        Lista de strings como la de la búsqueda en Zep (como máximo ``limit``).
+    """
+    pending = _pending_writes.match("userhandles", query, limit) if settings.pending_writes_enabled else []
+    merged: List[str] = []
+    seen = set()
+    for text in [text for text, _ in local] + list(pending) + list(remote):
+        record = parse_handle_record(text)
+        key = ("handle", normalize_handle(record["handle"])) if record else ("text", " ".join(text.split()).casefold())
+        if key in seen:
+            continue
+        seen.add(key)
+        merged.append(text)
+    return merged[:limit]
+
+
+def _search_handle_registry(query: str, limit: int) -> List[Tuple[str, float]]:
+    """
+    Consulta local de UserHandles; lista vacía si el registro no está cargado.
+    """
+    if not (settings.handle_registry_enabled and settings.userhandles_fuzzy_enabled):
+        return []
+    if not _handle_registry.loaded:
+        try:
+            if not _ensure_handle_registry(_get_zep_client()):
+                return []
+        except Exception as e:
+            logger.warning(f"⚠️ Registro de handles no disponible: {e}")
+            return []
+    return _fuzzy_handle_matches(query, limit)
+
+
+def get_handle_registry_stats() -> Dict[str, Any]:
+    """
+    Obtiene el tamaño y los contadores del registro local de handles.
+    """
+    stats = _handle_registry.stats()
+    stats["enabled"] = settings.handle_registry_enabled
+    return stats
+
+
+def _extract_edge_facts(search_results: Any) -> List[str]:
+    """
+    Extrae los facts de los edges devueltos por ``graph.search``.
+    """
+    facts = []
+    # Procesar edges (la respuesta principal para datos guardados con graph.add)
+    if hasattr(search_results, 'edges') and search_results.edges:
+        for edge in search_results.edges:
+            try:
+                # Los datos están en edge.fact según la documentación de Zep
+                if hasattr(edge, 'fact') and edge.fact:
+                    facts.append(edge.fact)
+                    logger.debug(f"[DEBUG] Edge fact encontrado: {edge.fact[:100]}")
+                elif hasattr(edge, 'data') and edge.data:
+                    facts.append(edge.data)
+                    logger.debug(f"[DEBUG] Edge data encontrado: {edge.data[:100]}")
+            except Exception as e:
+                logger.error(f"[DEBUG] Error procesando edge UserHandles: {e}")
+                continue
+    return facts
+
+
+def _fetch_userhandles(query: str, limit: int) -> List[str]:
+    """
+    Consulta los edges del grupo UserHandles en Zep.
+    
+    Raises:
+        Exception: Cualquier error de Zep, para que no se cachee.
+    """
+    client = _get_zep_client()
+    
+    # Usar búsqueda en grupo de Graph API con retry
+    def _search_operation():
+        return client.graph.search(
+            group_id="userhandles",
+            query=query,
+            scope="edges",  # Buscar en edges (datos guardados con graph.add)
+            limit=limit,
+            **_zep_request_options()
+        )
+    
+    search_results = _retry_with_backoff(_search_operation, operation="graph.search")
+    return _extract_edge_facts(search_results)
+
+
 def search_userhandles(query: str, limit: int = 5) -> List[str]:
     """
     Busca en el grupo UserHandles usando Zep Graph API.
@@ -475,34 +1875,16 @@ def search_userhandles(query: str, limit: int = 5) -> List[str]:
         return []
     
     try:
-        client = _get_zep_client()
-        
-        # Usar búsqueda en grupo de Graph API con retry
-        def _search_operation():
-            return client.graph.search(
-                group_id="userhandles",
-                query=query,
-                scope="edges",  # Buscar en edges (datos guardados con graph.add)
-                limit=limit
-            )
+        # Primero el índice local de nombres/handles; Zep salvo coincidencia casi exacta
+        local = _search_handle_registry(query, limit)
+        if _answers_locally(local):
+            facts = _merge_userhandles_results(query, local, [], limit)
+            logger.info(f"👥 Búsqueda UserHandles (local): '{query}' → {len(facts)} resultados")
+            return facts
         
-        search_results = _retry_with_backoff(_search_operation)
-        
-        facts = []
-        # Procesar edges (la respuesta principal para datos guardados con graph.add)
-        if hasattr(search_results, 'edges') and search_results.edges:
-            for edge in search_results.edges:
-                try:
-                    # Los datos están en edge.fact según la documentación de Zep
-                    if hasattr(edge, 'fact') and edge.fact:
-                        facts.append(edge.fact)
-                        logger.debug(f"[DEBUG] Edge fact encontrado: {edge.fact[:100]}")
-                    elif hasattr(edge, 'data') and edge.data:
-                        facts.append(edge.data)
-                        logger.debug(f"[DEBUG] Edge data encontrado: {edge.data[:100]}")
-                except Exception as e:
-                    logger.error(f"[DEBUG] Error procesando edge UserHandles: {e}")
-                    continue
+        remote = _cached_search(USERHANDLES_STORE, query, limit, lambda: _fetch_userhandles(query, limit))
+        # Coincidencias locales parciales y lo recién guardado que Zep aún no indexó
+        facts = _merge_userhandles_results(query, local, remote, limit)
         
         logger.info(f"👥 Búsqueda UserHandles: '{query}' → {len(facts)} resultados")
         return facts
@@ -524,14 +1906,20 @@ def get_userhandles_stats() -> Dict[str, Any]:
         
         # Obtener nodes del grupo UserHandles
         try:
-            nodes = client.graph.node.get_by_group_id(group_id="userhandles")
+            nodes = _retry_with_backoff(
+                lambda: client.graph.node.get_by_group_id(group_id="userhandles"),
+                operation="graph.node.get_by_group_id"
+            )
             node_count = len(nodes.nodes) if hasattr(nodes, 'nodes') and nodes.nodes else 0
         except Exception:
             node_count = 0
             
         # Obtener edges del grupo UserHandles
         try:
-            edges = client.graph.edge.get_by_group_id(group_id="userhandles")
+            edges = _retry_with_backoff(
+                lambda: client.graph.edge.get_by_group_id(group_id="userhandles"),
+                operation="graph.edge.get_by_group_id"
+            )
             edge_count = len(edges.edges) if hasattr(edges, 'edges') and edges.edges else 0
         except Exception:
             edge_count = 0
@@ -541,7 +1929,10 @@ def get_userhandles_stats() -> Dict[str, Any]:
             "node_count": node_count,
             "edge_count": edge_count,
             "total_items": node_count + edge_count,
-            "memory_type": "shared_user_handles"
+            "memory_type": "shared_user_handles",
+            "handle_registry": get_handle_registry_stats(),
+            "pending_writes": get_pending_writes_stats()["by_group"].get("userhandles", 0),
+            "writes_by_source": _writes_by_source("userhandles")
         }
         
     except Exception as e:
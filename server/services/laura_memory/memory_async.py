@@ -0,0 +1,653 @@
+"""
+API asíncrona (asyncio) para la memoria de Laura usando el cliente AsyncZep.
+
+Replica las funciones de ``memory.py`` con reintentos no bloqueantes, de modo
+que un solo proceso pueda mantener muchas operaciones de memoria en vuelo.
+Comparte con la API síncrona la caché de búsquedas y el parseo de resultados.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from zep_cloud.client import AsyncZep
+
+import memory
+from cache import SearchCache
+from handle_registry import handle_record
+from memory import (
+    PUBLIC_STORE,
+    PULSEPOLITICS_STORE,
+    USERHANDLES_STORE,
+    _GROUPS_TO_CREATE,
+    _episode_contents,
+    _extract_edge_facts,
+    _extract_episode_data,
+    _extract_public_results,
+    _match_session_messages,
+)
+from metrics import ZEP_CIRCUIT_REJECTIONS, ZEP_REQUEST_DURATION, ZEP_RETRIES, ZEP_RETRIES_DENIED
+from resilience import CircuitOpenError, backoff_delay, is_retryable
+from settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Cliente asíncrono global (ligado al event loop en el que se creó)
+_azep: Optional[AsyncZep] = None
+_azep_loop: Optional[asyncio.AbstractEventLoop] = None
+_azep_lock: Optional[asyncio.Lock] = None
+
+# Serializa la primera carga del registro de handles (ligado a su event loop, como _azep_lock)
+_handle_registry_lock: Optional[asyncio.Lock] = None
+_handle_registry_lock_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+async def _aretry_with_backoff(func: Callable[[], Awaitable[Any]], max_retries: int = 3,
+                               base_delay: float = 1.0, operation: str = "zep") -> Any:
+    """
+    Ejecuta una corrutina con reintentos y backoff exponencial sin bloquear el loop.
+
+    Comparte con ``memory._retry_with_backoff`` los circuit breakers por
+    operación y el presupuesto global de reintentos.
+
+    Args:
+        func: Función sin argumentos que devuelve la corrutina a ejecutar
+        max_retries: Número máximo de reintentos
+        base_delay: Delay base en segundos
+        operation: Tipo de operación de Zep (clave del circuit breaker)
+
+    Returns:
+        Resultado de la corrutina
+
+    Raises:
+        CircuitOpenError: Si el circuito de la operación está abierto.
+        La última excepción si todos los reintentos fallan
+    """
+    breaker = memory._get_breaker(operation)
+    memory._retry_budget.record_request()
+    max_retries = memory._limited_retries(max_retries)
+
+    for attempt in range(max_retries + 1):
+        try:
+            breaker.before_call()
+        except CircuitOpenError:
+            ZEP_CIRCUIT_REJECTIONS.inc(operation=operation)
+            raise
+
+        start = time.perf_counter()
+        try:
+            result = await func()
+        except Exception as e:
+            retryable = is_retryable(e)
+            ZEP_REQUEST_DURATION.observe(time.perf_counter() - start, operation=operation,
+                                         outcome="error" if retryable else "client_error")
+            if retryable:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+
+            if not retryable or attempt == max_retries:
+                raise e
+            if not memory._retry_budget.try_acquire():
+                ZEP_RETRIES_DENIED.inc(operation=operation)
+                logger.warning(f"⛔ Presupuesto de reintentos agotado ({operation}): {e}")
+                raise e
+
+            delay = backoff_delay(attempt, base_delay, settings.retry_max_delay_seconds)
+            logger.warning(f"⏳ Intento {attempt + 1} falló ({operation}), reintentando en {delay:.2f}s: {e}")
+            ZEP_RETRIES.inc(operation=operation)
+            await asyncio.sleep(delay)
+            continue
+
+        ZEP_REQUEST_DURATION.observe(time.perf_counter() - start, operation=operation, outcome="success")
+        breaker.record_success()
+        return result
+
+
+async def _acreate_groups_if_needed(client: AsyncZep) -> None:
+    """
+    Crea los grupos necesarios si no existen (versión asíncrona).
+
+    Args:
+        client: Cliente AsyncZep configurado.
+    """
+    for group_info in _GROUPS_TO_CREATE:
+        try:
+            await client.group.add(
+                group_id=group_info["group_id"],
+                name=group_info["name"],
+                description=group_info["description"]
+            )
+            logger.info(f"✅ Grupo creado: {group_info['group_id']}")
+        except Exception as e:
+            # Si el grupo ya existe, ignorar el error
+            if "already exists" in str(e).lower() or "conflict" in str(e).lower():
+                logger.info(f"📋 Grupo ya existe: {group_info['group_id']}")
+            else:
+                logger.warning(f"⚠️ Error creando grupo {group_info['group_id']}: {e}")
+
+
+async def _aget_zep_client() -> AsyncZep:
+    """
+    Obtiene el cliente AsyncZep del event loop actual, inicializándolo si es necesario.
+
+    Returns:
+        AsyncZep: Cliente asíncrono configurado de Zep Cloud.
+
+    Raises:
+        ValueError: Si no se puede inicializar el cliente.
+    """
+    global _azep, _azep_loop, _azep_lock
+
+    loop = asyncio.get_running_loop()
+    if _azep is not None and _azep_loop is loop:
+        return _azep
+
+    if _azep_lock is None or _azep_loop is not loop:
+        _azep_lock = asyncio.Lock()
+        _azep_loop = loop
+        _azep = None
+
+    async with _azep_lock:
+        if _azep is None:
+            try:
+                if not settings.zep_api_key:
+                    raise ValueError("ZEP_API_KEY no está configurada")
+
+                if settings.zep_api_key in ["test_key_for_development", "your_zep_api_key_here"]:
+                    logger.warning("⚠️ Usando API key de prueba - funcionalidad limitada")
+
+                client = AsyncZep(api_key=settings.zep_api_key)
+                await _acreate_groups_if_needed(client)
+                _azep = client
+
+                logger.info("✅ Cliente AsyncZep inicializado correctamente con grupos")
+
+            except Exception as e:
+                logger.error(f"❌ Error inicializando cliente AsyncZep: {e}")
+                raise ValueError(f"No se pudo inicializar cliente AsyncZep: {e}")
+
+    return _azep
+
+
+async def awarm_up() -> None:
+    """
+    Crea el cliente AsyncZep y los grupos en el event loop actual (arranque del servidor ASGI).
+
+    Como ``memory.warm_up``, siembra el modelo de novedad con la sesión pública.
+    """
+    client = await _aget_zep_client()
+    if settings.novelty_enabled:
+        try:
+            await _arefresh_public_index(client)
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo sembrar el modelo de novedad al arrancar: {e}")
+
+
+async def _acached_search(store: str, query: str, limit: int,
+                          fetch: Callable[[], Awaitable[List[str]]]) -> List[str]:
+    """
+    Versión asíncrona de ``memory._cached_search`` sobre la misma caché.
+    """
+    key = SearchCache.make_key(store, query, limit)
+    cached = memory._cache_hit(key, query)
+    if cached is not None:
+        return cached
+
+    async def _fetch_and_cache():
+        # Si una escritura invalida el store durante la consulta, el resultado no se cachea
+        generation = memory._search_cache.generation(store)
+        try:
+            results = tuple(await fetch())
+        except CircuitOpenError:
+            stale = memory._stale_hit(key, query)
+            if stale is not None:
+                return stale
+            raise
+
+        memory._cache_results(key, results, generation)
+        return results
+
+    if settings.single_flight_enabled:
+        return list(await memory._asearch_flights.do(key, _fetch_and_cache))
+    return list(await _fetch_and_cache())
+
+
+# === MEMORIA PÚBLICA ===
+
+async def aadd_public_memory(content: str, metadata: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Añade contenido a la memoria pública de Laura (versión asíncrona).
+
+    Con ``write_behind_enabled`` el mensaje se encola igual que en
+    ``memory.add_public_memory``; si la cola está llena se escribe con AsyncZep.
+
+    Args:
+        content: Contenido a guardar en la memoria.
+        metadata: Metadatos opcionales ('source', 'tags', 'ts', etc.).
+
+    Raises:
+        ValueError: Si hay error al guardar en Zep.
+    """
+    if not content or not content.strip():
+        logger.warning("⚠️ Contenido vacío, no se guardará en memoria")
+        return
+
+    try:
+        client = await _aget_zep_client()
+        message, final_metadata = memory._public_message(content, metadata)
+        # Como add_public_memory: con write-behind se encola (put puede esperar si la cola está llena)
+        if await asyncio.to_thread(memory._enqueue_public_write, message):
+            return
+
+        await _aretry_with_backoff(lambda: client.memory.add(
+            session_id=settings.session_id,
+            messages=[message]
+        ), operation="memory.add")
+
+        await asyncio.to_thread(memory._record_public_write, content, final_metadata)
+
+    except Exception as e:
+        logger.error(f"❌ Error guardando en memoria: {e}")
+        raise ValueError(f"Error al guardar en memoria pública: {e}")
+
+
+async def _afetch_public_memory(query: str, limit: int) -> List[str]:
+    client = await _aget_zep_client()
+
+    search_results = await _aretry_with_backoff(lambda: client.memory.search(
+        session_id=settings.session_id,
+        text=query,
+        limit=limit,
+        **memory._zep_request_options()
+    ), operation="memory.search")
+    facts = _extract_public_results(search_results)
+
+    if not facts:
+        if settings.public_index_enabled:
+            logger.info("🔄 Fallback a índice local")
+            await _arefresh_public_index(client)
+            facts = memory._public_index.search(query, limit)
+        else:
+            logger.info("🔄 Fallback a búsqueda básica")
+            session = await _aretry_with_backoff(
+                lambda: client.memory.get(session_id=settings.session_id, **memory._zep_request_options()),
+                operation="memory.get"
+            )
+            facts = _match_session_messages(session, query, limit)
+
+    return facts
+
+
+async def _arefresh_public_index(client: AsyncZep) -> None:
+    if memory._public_index_needs_load():
+        session = await _aretry_with_backoff(
+            lambda: client.memory.get(session_id=settings.session_id),
+            operation="memory.get"
+        )
+        # Indexar la sesión completa y registrar sus metadatos en SQLite no debe bloquear el loop
+        await asyncio.to_thread(memory._load_public_index, session)
+
+
+async def asearch_public_memory(query: str, limit: int = 5) -> List[str]:
+    """
+    Busca en la memoria pública de Laura (versión asíncrona).
+
+    Args:
+        query: Consulta de búsqueda.
+        limit: Número máximo de resultados a retornar.
+
+    Returns:
+        Lista de strings con los mensajes más relevantes encontrados.
+    """
+    if not query or not query.strip():
+        logger.warning("⚠️ Query vacía para búsqueda en memoria")
+        return []
+
+    try:
+        facts = await _acached_search(PUBLIC_STORE, query, limit,
+                                      lambda: _afetch_public_memory(query, limit))
+
+        logger.info(f"🔍 Búsqueda en memoria: '{query}' → {len(facts)} resultados")
+        return facts
+
+    except Exception as e:
+        logger.error(f"❌ Error buscando en memoria: {e}")
+        return []
+
+
+async def asearch_public_memory_filtered(query: str = "", limit: int = 5,
+                                         tags: Optional[List[str]] = None, source: Optional[str] = None,
+                                         since: Any = None, until: Any = None) -> List[Dict[str, Any]]:
+    """
+    Busca en la memoria pública filtrando por tags, fuente y fechas (versión asíncrona).
+
+    Ver ``memory.search_public_memory_filtered``.
+    """
+    if not settings.metadata_store_enabled:
+        raise ValueError("La búsqueda filtrada requiere LAURA_METADATA_STORE_ENABLED")
+
+    try:
+        await _arefresh_public_index(await _aget_zep_client())
+    except Exception as e:
+        logger.warning(f"⚠️ No se pudo refrescar la memoria pública, se usan los metadatos locales: {e}")
+
+    results = await asyncio.to_thread(memory._rank_public_candidates, query, limit,
+                                      tags=tags, source=source, since=since, until=until)
+    logger.info(f"🔍 Búsqueda filtrada en memoria: '{query}' (tags={tags}, source={source}) → {len(results)} resultados")
+    return results
+
+
+async def aget_memory_stats() -> Dict[str, Any]:
+    """
+    Obtiene estadísticas de la memoria pública (versión asíncrona).
+    """
+    try:
+        client = await _aget_zep_client()
+        session_info = await _aretry_with_backoff(
+            lambda: client.memory.get(session_id=settings.session_id),
+            operation="memory.get"
+        )
+
+        return memory._memory_stats(session_info)
+
+    except Exception as e:
+        return memory._memory_stats_error(e)
+
+
+# === PULSEPOLITICS ===
+
+async def aadd_to_pulsepolitics(content: str, metadata: Optional[Dict[str, Any]] = None) -> bool:
+    """
+    Añade contenido al grupo PulsePolitics (versión asíncrona).
+
+    Returns:
+        bool: True si se guardó, False si era casi-duplicado o hubo error.
+    """
+    if not content or not content.strip():
+        logger.warning("⚠️ Contenido vacío, no se guardará en PulsePolitics")
+        return False
+
+    try:
+        # El boceto se lee y reclama bajo un lock de hilo: fuera del loop
+        similarity, signature = await asyncio.to_thread(memory._claim_near_duplicate, "pulsepolitics", content)
+        if similarity is not None:
+            return False
+
+        final_metadata = memory._group_write_metadata("pulsepolitics", metadata)
+
+        try:
+            client = await _aget_zep_client()
+            episode = await _aretry_with_backoff(lambda: client.graph.add(
+                group_id="pulsepolitics",
+                data=content,
+                type="text"
+            ), operation="graph.add")
+        except BaseException:
+            memory._release_near_duplicate("pulsepolitics", signature)
+            raise
+
+        # Guardar el boceto (fusión bajo flock) y los metadatos en SQLite: fuera del loop
+        await asyncio.to_thread(memory._record_group_write, "pulsepolitics", content, final_metadata, episode)
+        logger.info(f"🏛️ Nuevo en PulsePolitics: {content[:50]}...")
+        return True
+
+    except Exception as e:
+        logger.error(f"❌ Error guardando en PulsePolitics: {e}")
+        return False
+
+
+async def _afetch_pulsepolitics(query: str, limit: int) -> List[str]:
+    client = await _aget_zep_client()
+
+    search_results = await _aretry_with_backoff(lambda: client.graph.search(
+        group_id="pulsepolitics",
+        query=query,
+        scope="episodes",
+        limit=limit,
+        **memory._zep_request_options()
+    ), operation="graph.search")
+    return _extract_episode_data(search_results)
+
+
+async def asearch_pulsepolitics(query: str, limit: int = 5) -> List[str]:
+    """
+    Busca en el grupo PulsePolitics (versión asíncrona).
+
+    Args:
+        query: Consulta de búsqueda.
+        limit: Número máximo de resultados a retornar.
+
+    Returns:
+        Lista de strings con los episodios más relevantes.
+    """
+    if not query or not query.strip():
+        logger.warning("⚠️ Query vacía para búsqueda en PulsePolitics")
+        return []
+
+    try:
+        facts = await _acached_search(PULSEPOLITICS_STORE, query, limit,
+                                      lambda: _afetch_pulsepolitics(query, limit))
+        facts = memory._merge_pending_writes("pulsepolitics", query, facts, limit)
+
+        logger.info(f"🏛️ Búsqueda PulsePolitics: '{query}' → {len(facts)} resultados")
+        return facts
+
+    except Exception as e:
+        logger.error(f"❌ Error buscando en PulsePolitics: {e}")
+        return []
+
+
+async def _aget_group_stats(group_id: str, memory_type: str) -> Dict[str, Any]:
+    client = await _aget_zep_client()
+
+    try:
+        nodes = await _aretry_with_backoff(
+            lambda: client.graph.node.get_by_group_id(group_id=group_id),
+            operation="graph.node.get_by_group_id"
+        )
+        node_count = len(nodes.nodes) if hasattr(nodes, 'nodes') and nodes.nodes else 0
+    except Exception:
+        node_count = 0
+
+    try:
+        edges = await _aretry_with_backoff(
+            lambda: client.graph.edge.get_by_group_id(group_id=group_id),
+            operation="graph.edge.get_by_group_id"
+        )
+        edge_count = len(edges.edges) if hasattr(edges, 'edges') and edges.edges else 0
+    except Exception:
+        edge_count = 0
+
+    return {
+        "group_id": group_id,
+        "node_count": node_count,
+        "edge_count": edge_count,
+        "total_items": node_count + edge_count,
+        "memory_type": memory_type
+    }
+
+
+async def aget_pulsepolitics_stats() -> Dict[str, Any]:
+    """
+    Obtiene estadísticas del grupo PulsePolitics (versión asíncrona).
+    """
+    try:
+        stats = await _aget_group_stats("pulsepolitics", "shared_political_graph")
+        stats["near_duplicates"] = memory.get_near_duplicate_stats()
+        stats["pending_writes"] = memory.get_pending_writes_stats()["by_group"].get("pulsepolitics", 0)
+        stats["writes_by_source"] = await asyncio.to_thread(memory._writes_by_source, "pulsepolitics")
+        return stats
+    except Exception as e:
+        logger.error(f"❌ Error obteniendo estadísticas PulsePolitics: {e}")
+        return {"error": str(e)}
+
+
+# === USERHANDLES ===
+
+async def aadd_to_userhandles(content: str, metadata: Optional[Dict[str, Any]] = None) -> bool:
+    """
+    Añade contenido al grupo UserHandles (versión asíncrona).
+
+    Returns:
+        bool: True si se guardó, False si ya existía o hubo error.
+    """
+    if not content or not content.strip():
+        logger.warning("⚠️ Contenido vacío, no se guardará en UserHandles")
+        return False
+
+    try:
+        client = await _aget_zep_client()
+
+        record = handle_record(content, metadata)
+        previous = None
+        use_registry = record is not None and settings.handle_registry_enabled and await _aensure_handle_registry(client)
+        if use_registry:
+            changed, previous = memory._handle_registry.upsert(record)
+            if not changed:
+                logger.info(f"👥 Usuario ya existe en UserHandles: @{record['handle']}")
+                return False
+        elif record is not None:
+            try:
+                existing_results = await _afetch_userhandles(f"@{record['handle']}", limit=10)
+            except Exception as e:
+                logger.warning(f"⚠️ No se pudo verificar duplicados en UserHandles: {e}")
+                existing_results = []
+            if memory._handle_already_listed(record["handle"], existing_results):
+                return False
+
+        final_metadata = memory._group_write_metadata("userhandles", metadata)
+
+        try:
+            episode = await _aretry_with_backoff(lambda: client.graph.add(
+                group_id="userhandles",
+                data=content,
+                type="text"
+            ), operation="graph.add")
+        except Exception:
+            if use_registry:
+                memory._handle_registry.restore(record["handle"], previous)
+            raise
+
+        # Metadatos en SQLite e índice de handles en disco (bajo flock): fuera del loop
+        await asyncio.to_thread(memory._record_group_write, "userhandles", content, final_metadata, episode,
+                                use_registry)
+        if previous is not None:
+            logger.info(f"👥 Actualizado en UserHandles: {content[:50]}...")
+        else:
+            logger.info(f"👥 Nuevo en UserHandles: {content[:50]}...")
+        return True
+
+    except Exception as e:
+        logger.error(f"❌ Error guardando en UserHandles: {e}")
+        return False
+
+
+def _get_handle_registry_lock() -> asyncio.Lock:
+    global _handle_registry_lock, _handle_registry_lock_loop
+    loop = asyncio.get_running_loop()
+    if _handle_registry_lock is None or _handle_registry_lock_loop is not loop:
+        _handle_registry_lock = asyncio.Lock()
+        _handle_registry_lock_loop = loop
+    return _handle_registry_lock
+
+
+def _seed_handle_registry(contents: List[str]) -> None:
+    memory._handle_registry.load(contents)
+    memory._persist_handle_index(force=True)
+
+
+async def _aensure_handle_registry(client: AsyncZep) -> bool:
+    """
+    Carga el registro de handles compartido con la API síncrona (versión asíncrona).
+
+    Solo una corrutina lo siembra; las demás esperan su resultado. Abrir el
+    índice en disco, comprobar si cambió y reescribirlo se hace en un hilo.
+    """
+    if memory._handle_registry.loaded:
+        if memory._claim_handle_index_refresh():
+            await asyncio.to_thread(memory._reload_stale_handle_index)
+        return True
+    async with _get_handle_registry_lock():
+        if memory._handle_registry.loaded:
+            return True
+        if settings.handle_index_path and await asyncio.to_thread(memory._attach_shared_handle_index):
+            return True
+        try:
+            response = await _aretry_with_backoff(lambda: client.graph.episode.get_by_group_id(
+                group_id="userhandles",
+                lastn=settings.handle_registry_seed_lastn
+            ), operation="graph.episode.get_by_group_id")
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo cargar el registro de handles: {e}")
+            return False
+        # Una escritura síncrona pudo sembrarlo mientras tanto; upsert es idempotente
+        await asyncio.to_thread(_seed_handle_registry, _episode_contents(response))
+        return True
+
+
+async def _afetch_userhandles(query: str, limit: int) -> List[str]:
+    client = await _aget_zep_client()
+
+    search_results = await _aretry_with_backoff(lambda: client.graph.search(
+        group_id="userhandles",
+        query=query,
+        scope="edges",
+        limit=limit,
+        **memory._zep_request_options()
+    ), operation="graph.search")
+    return _extract_edge_facts(search_results)
+
+
+async def asearch_userhandles(query: str, limit: int = 5) -> List[str]:
+    """
+    Busca en el grupo UserHandles (versión asíncrona).
+
+    Args:
+        query: Consulta de búsqueda.
+        limit: Número máximo de resultados a retornar.
+
+    Returns:
+        Lista de strings con los facts más relevantes.
+    """
+    if not query or not query.strip():
+        logger.warning("⚠️ Query vacía para búsqueda en UserHandles")
+        return []
+
+    try:
+        local = []
+        if settings.handle_registry_enabled and settings.userhandles_fuzzy_enabled:
+            client = await _aget_zep_client()
+            if await _aensure_handle_registry(client):
+                local = memory._fuzzy_handle_matches(query, limit)
+                if memory._answers_locally(local):
+                    facts = memory._merge_userhandles_results(query, local, [], limit)
+                    logger.info(f"👥 Búsqueda UserHandles (local): '{query}' → {len(facts)} resultados")
+                    return facts
+
+        remote = await _acached_search(USERHANDLES_STORE, query, limit,
+                                       lambda: _afetch_userhandles(query, limit))
+        facts = memory._merge_userhandles_results(query, local, remote, limit)
+
+        logger.info(f"👥 Búsqueda UserHandles: '{query}' → {len(facts)} resultados")
+        return facts
+
+    except Exception as e:
+        logger.error(f"❌ Error buscando en UserHandles: {e}")
+        return []
+
+
+async def aget_userhandles_stats() -> Dict[str, Any]:
+    """
+    Obtiene estadísticas del grupo UserHandles (versión asíncrona).
+    """
+    try:
+        stats = await _aget_group_stats("userhandles", "shared_user_handles")
+        stats["handle_registry"] = memory.get_handle_registry_stats()
+        stats["pending_writes"] = memory.get_pending_writes_stats()["by_group"].get("userhandles", 0)
+        stats["writes_by_source"] = await asyncio.to_thread(memory._writes_by_source, "userhandles")
+        return stats
+    except Exception as e:
+        logger.error(f"❌ Error obteniendo estadísticas UserHandles: {e}")
+        return {"error": str(e)}
@@ -0,0 +1,293 @@
+"""
+Índice local de metadatos de las escrituras en Zep (SQLite).
+
+``graph.add`` solo recibe el texto: ``ts``, ``source``, ``tags`` o
+``twitter_username`` se pierden en Zep. Este índice guarda, por escritura
+confirmada, el contenido, su hash y los metadatos, con índices por fuente,
+tag y fecha para filtrar y contar sin llamadas remotas. Con una ruta en disco
+lo comparten todos los workers (modo WAL); con ``""`` vive solo en memoria.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS writes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    store TEXT NOT NULL,
+    episode_uuid TEXT UNIQUE,
+    content_hash TEXT NOT NULL,
+    content TEXT NOT NULL,
+    source TEXT,
+    ts REAL NOT NULL,
+    metadata TEXT NOT NULL,
+    UNIQUE (store, content_hash)
+);
+CREATE INDEX IF NOT EXISTS writes_store_ts ON writes (store, ts);
+CREATE INDEX IF NOT EXISTS writes_store_source_ts ON writes (store, source, ts);
+CREATE TABLE IF NOT EXISTS write_tags (
+    write_id INTEGER NOT NULL,
+    tag TEXT NOT NULL,
+    PRIMARY KEY (tag, write_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS write_tags_write ON write_tags (write_id);
+"""
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def to_timestamp(value: Any) -> Optional[float]:
+    """
+    Convierte un ``ts`` (ISO 8601, datetime o epoch) a segundos epoch.
+
+    Las fechas sin zona se interpretan como UTC (se generan con ``utcnow``).
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+    raise ValueError(f"Fecha no reconocida: {value!r}")
+
+
+def _normalize_tags(tags: Optional[Iterable[Any]]) -> List[str]:
+    if not tags:
+        return []
+    if isinstance(tags, str):
+        tags = [tags]
+    return sorted({str(tag).strip().lower() for tag in tags if str(tag).strip()})
+
+
+class MetadataStore:
+    """
+    Escrituras por grupo (``store``) con contenido, hash y metadatos.
+
+    Una escritura se identifica por su episodio de Zep cuando lo hay y, en
+    todo caso, por (store, hash del contenido): registrar de nuevo el mismo
+    contenido actualiza la fila en lugar de duplicarla.
+    """
+
+    def __init__(self, path: str = ""):
+        self.path = path
+        if path:
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path or ":memory:", check_same_thread=False, timeout=5.0,
+                                     isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            if path:
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+        self.recorded = 0
+        self.queries = 0
+
+    def record(self, store: str, content: str, metadata: Optional[Dict[str, Any]] = None,
+               episode_uuid: Optional[str] = None) -> int:
+        """
+        Guarda (o actualiza) los metadatos de una escritura confirmada.
+
+        ``source`` se toma de ``metadata["source"]`` o, si falta, de
+        ``source_system``; ``ts`` de ``metadata["ts"]`` o la hora actual.
+
+        Returns:
+            Id local de la escritura.
+        """
+        return self.record_many(store, [(content, metadata, episode_uuid)])[0]
+
+    def record_many(self, store: str,
+                    items: Iterable[Tuple[str, Optional[Dict[str, Any]], Optional[str]]]) -> List[int]:
+        """
+        Registra varias escrituras (contenido, metadatos, episodio) en una sola transacción.
+        """
+        rows = [self._prepare(content, metadata) + (episode_uuid,) for content, metadata, episode_uuid in items]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                ids = [self._upsert(store, *row) for row in rows]
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self.recorded += len(ids)
+            return ids
+
+    @staticmethod
+    def _prepare(content: str, metadata: Optional[Dict[str, Any]]):
+        metadata = dict(metadata or {})
+        source = metadata.get("source") or metadata.get("source_system")
+        try:
+            ts = to_timestamp(metadata.get("ts"))
+        except ValueError:
+            ts = None
+        if ts is None:
+            ts = datetime.now(timezone.utc).timestamp()
+        payload = json.dumps(metadata, ensure_ascii=False, default=str)
+        return content, content_hash(content), source, ts, _normalize_tags(metadata.get("tags")), payload
+
+    def _upsert(self, store: str, content: str, digest: str, source: Optional[str], ts: float,
+                tags: List[str], payload: str, episode_uuid: Optional[str]) -> int:
+        row = self._conn.execute(
+            "SELECT id, episode_uuid FROM writes WHERE store = ? AND content_hash = ?", (store, digest)
+        ).fetchone()
+        if row is None and episode_uuid:
+            row = self._conn.execute(
+                "SELECT id, episode_uuid FROM writes WHERE episode_uuid = ?", (episode_uuid,)
+            ).fetchone()
+        if row is None:
+            write_id = self._conn.execute(
+                "INSERT INTO writes (store, episode_uuid, content_hash, content, source, ts, metadata)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (store, episode_uuid, digest, content, source, ts, payload)
+            ).lastrowid
+        else:
+            write_id = row["id"]
+            self._conn.execute(
+                "UPDATE writes SET store = ?, episode_uuid = ?, content_hash = ?, content = ?,"
+                " source = ?, ts = ?, metadata = ? WHERE id = ?",
+                (store, episode_uuid or row["episode_uuid"], digest, content, source, ts, payload, write_id)
+            )
+            self._conn.execute("DELETE FROM write_tags WHERE write_id = ?", (write_id,))
+        self._conn.executemany(
+            "INSERT INTO write_tags (write_id, tag) VALUES (?, ?)", [(write_id, tag) for tag in tags]
+        )
+        return write_id
+
+    def _where(self, store: Optional[str], source: Optional[str], tags: Optional[Iterable[Any]],
+               since: Any, until: Any):
+        clauses, params = [], []
+        if store is not None:
+            clauses.append("w.store = ?")
+            params.append(store)
+        if source is not None:
+            clauses.append("w.source = ?")
+            params.append(source)
+        since_ts, until_ts = to_timestamp(since), to_timestamp(until)
+        if since_ts is not None:
+            clauses.append("w.ts >= ?")
+            params.append(since_ts)
+        if until_ts is not None:
+            clauses.append("w.ts < ?")
+            params.append(until_ts)
+        for tag in _normalize_tags(tags):
+            clauses.append("EXISTS (SELECT 1 FROM write_tags t WHERE t.tag = ? AND t.write_id = w.id)")
+            params.append(tag)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def query(self, store: Optional[str] = None, source: Optional[str] = None,
+              tags: Optional[Iterable[Any]] = None, since: Any = None, until: Any = None,
+              limit: Optional[int] = 100) -> List[Dict[str, Any]]:
+        """
+        Escrituras que cumplen todos los filtros, de la más reciente a la más antigua.
+
+        Args:
+            store: Grupo (``public``, ``pulsepolitics``, ``userhandles``).
+            source: Fuente exacta (p. ej. ``perplexity_search``).
+            tags: Tags que deben estar todos presentes.
+            since: Fecha mínima incluida (ISO 8601, datetime o epoch).
+            until: Fecha máxima excluida.
+            limit: Máximo de filas (None = sin límite).
+        """
+        where, params = self._where(store, source, tags, since, until)
+        sql = f"SELECT w.* FROM writes w{where} ORDER BY w.ts DESC, w.id DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            self.queries += 1
+            rows = self._conn.execute(sql, params).fetchall()
+            tags_by_id = self._tags_for([row["id"] for row in rows])
+        return [self._row_to_dict(row, tags_by_id.get(row["id"], [])) for row in rows]
+
+    def count(self, store: Optional[str] = None, source: Optional[str] = None,
+              tags: Optional[Iterable[Any]] = None, since: Any = None, until: Any = None) -> int:
+        where, params = self._where(store, source, tags, since, until)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM writes w{where}", params).fetchone()[0]
+
+    def count_by_source(self, store: Optional[str] = None) -> Dict[str, int]:
+        """
+        Número de escrituras por fuente (resuelto con el índice, sin leer filas).
+        """
+        sql = "SELECT source, COUNT(*) AS n FROM writes"
+        params: List[Any] = []
+        if store is not None:
+            sql += " WHERE store = ?"
+            params.append(store)
+        sql += " GROUP BY source"
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return {row["source"] or "unknown": row["n"] for row in rows}
+
+    def get_episode(self, episode_uuid: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM writes WHERE episode_uuid = ?", (episode_uuid,)).fetchone()
+            if row is None:
+                return None
+            tags = self._tags_for([row["id"]]).get(row["id"], [])
+        return self._row_to_dict(row, tags)
+
+    def _tags_for(self, ids: List[int]) -> Dict[int, List[str]]:
+        tags: Dict[int, List[str]] = {}
+        # Por tramos para no superar el límite de parámetros de SQLite
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            for write_id, tag in self._conn.execute(
+                f"SELECT write_id, tag FROM write_tags WHERE write_id IN ({placeholders}) ORDER BY tag", chunk
+            ):
+                tags.setdefault(write_id, []).append(tag)
+        return tags
+
+    @staticmethod
+    def _row_to_dict(row: sqlite3.Row, tags: List[str]) -> Dict[str, Any]:
+        return {
+            "id": row["id"],
+            "store": row["store"],
+            "episode_uuid": row["episode_uuid"],
+            "content": row["content"],
+            "content_hash": row["content_hash"],
+            "source": row["source"],
+            "tags": tags,
+            "ts": datetime.fromtimestamp(row["ts"], timezone.utc).isoformat(),
+            "metadata": json.loads(row["metadata"])
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM write_tags")
+            self._conn.execute("DELETE FROM writes")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            by_store = {row["store"]: row["n"] for row in self._conn.execute(
+                "SELECT store, COUNT(*) AS n FROM writes GROUP BY store"
+            )}
+        return {
+            "path": self.path or ":memory:",
+            "writes": sum(by_store.values()),
+            "by_store": by_store,
+            "recorded": self.recorded,
+            "queries": self.queries
+        }
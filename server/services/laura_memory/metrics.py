@@ -0,0 +1,451 @@
+"""
+Métricas en proceso con exposición en formato de texto de Prometheus.
+
+Registro mínimo (contadores, gauges e histogramas con etiquetas) sin
+dependencias externas; ``registry.render()`` produce el cuerpo de ``/metrics``.
+Con varios workers, ``registry.start_multiprocess(directorio)`` hace que cada
+proceso publique sus series (etiquetadas con ``worker``) y que ``/metrics``
+devuelva las de todos.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Buckets por defecto (segundos), pensados para latencias HTTP/Zep
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: etiquetas esperadas {self.labelnames}, recibidas {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+
+    def samples(self, extra: str = "") -> List[str]:
+        """
+        Líneas de muestras sin cabecera; ``extra`` es un par ``nombre="valor"`` para todas.
+        """
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return self._header() + self.samples()
+
+
+class Counter(_Metric):
+    """
+    Contador monótono con etiquetas.
+    """
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set_total(self, value: float, **labels: str) -> None:
+        """
+        Fija el total desde un contador propio de otro componente (para collectors).
+        """
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def samples(self, extra: str = "") -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key, extra)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Gauge(_Metric):
+    """
+    Valor instantáneo con etiquetas (p. ej. tamaño de una cola).
+    """
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def samples(self, extra: str = "") -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key, extra)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Histogram(_Metric):
+    """
+    Histograma acumulativo con buckets fijos, ``_sum`` y ``_count`` por etiqueta.
+    """
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Por etiqueta: [conteo por bucket..., conteo +Inf], suma
+        self._series: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = ([0] * (len(self.buckets) + 1), [0.0])
+                self._series[key] = series
+            counts, total = series
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+            total[0] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """
+        Observa la duración del bloque ``with`` en segundos.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels: str) -> int:
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return sum(series[0]) if series else 0
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+    def samples(self, extra: str = "") -> List[str]:
+        with self._lock:
+            items = sorted((key, (list(counts), total[0])) for key, (counts, total) in self._series.items())
+
+        lines: List[str] = []
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                bucket_extra = f"{extra},{le}" if extra else le
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, bucket_extra)} {cumulative}")
+            labels = _format_labels(self.labelnames, key, extra)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    """
+    Conjunto de métricas más "collectors" que actualizan gauges al renderizar.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+        # Modo multiproceso (start_multiprocess): directorio compartido y parada del hilo
+        self._multiprocess_dir: Optional[str] = None
+        self._snapshot_stop: Optional[threading.Event] = None
+
+    def register(self, metric: _Metric) -> _Metric:
+        """
+        Registra una métrica. Si ya existe una idéntica (mismo tipo y etiquetas,
+        p. ej. al importar el módulo como ``memory`` y ``laura_memory.memory``)
+        devuelve la existente.
+        """
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Métrica duplicada: {metric.name}")
+                return existing
+            self._metrics[metric.name] = metric
+        return metric
+
+    def register_collector(self, collector: Callable[[], None]) -> None:
+        with self._lock:
+            self._collectors.append(collector)
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def _collect(self) -> List[_Metric]:
+        with self._lock:
+            collectors = list(self._collectors)
+            metrics = list(self._metrics.values())
+
+        for collector in collectors:
+            try:
+                collector()
+            except Exception as e:
+                logger.warning(f"⚠️ Error actualizando métricas: {e}")
+        return metrics
+
+    def render(self) -> str:
+        metrics = self._collect()
+        directory = self._multiprocess_dir
+        if directory is None:
+            lines: List[str] = []
+            for metric in metrics:
+                lines.extend(metric.render())
+            return "\n".join(lines) + "\n"
+
+        # Las series propias se publican frescas; las de los demás workers, desde su última instantánea
+        own = self._snapshot(metrics)
+        self._write_snapshot(directory, own)
+        merged: Dict[str, Dict[str, Any]] = {name: dict(entry, samples=list(entry["samples"]))
+                                             for name, entry in own.items()}
+        for pid, snapshot in self._read_snapshots(directory):
+            if pid == os.getpid():
+                continue
+            for name, entry in snapshot.items():
+                target = merged.setdefault(name, dict(entry, samples=[]))
+                target["samples"].extend(entry["samples"])
+
+        lines = []
+        for name, entry in merged.items():
+            lines.append(f"# HELP {name} {entry['help']}")
+            lines.append(f"# TYPE {name} {entry['type']}")
+            lines.extend(entry["samples"])
+        return "\n".join(lines) + "\n"
+
+    # --- Modo multiproceso (varios workers de gunicorn/uvicorn) ---
+
+    def start_multiprocess(self, directory: str, interval: float = 5.0) -> None:
+        """
+        Publica las métricas de este proceso en ``directory`` cada ``interval``
+        segundos y hace que ``render()`` agregue las de los demás procesos
+        vivos. Cada serie lleva la etiqueta ``worker`` con el pid.
+
+        Se llama en cada worker (no en el maestro), tras el fork.
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.stop_multiprocess(remove=False)
+        stop = threading.Event()
+        with self._lock:
+            self._multiprocess_dir = directory
+            self._snapshot_stop = stop
+        self.write_snapshot()
+
+        def _loop() -> None:
+            while not stop.wait(interval):
+                self.write_snapshot()
+
+        threading.Thread(target=_loop, name="laura-metrics-snapshot", daemon=True).start()
+
+    def stop_multiprocess(self, remove: bool = True) -> None:
+        """
+        Detiene la publicación y, con ``remove``, borra la instantánea de este proceso.
+        """
+        with self._lock:
+            directory, stop = self._multiprocess_dir, self._snapshot_stop
+            self._multiprocess_dir = None
+            self._snapshot_stop = None
+        if stop is not None:
+            stop.set()
+        if remove and directory is not None:
+            try:
+                os.remove(self._snapshot_path(directory, os.getpid()))
+            except FileNotFoundError:
+                pass
+
+    def write_snapshot(self) -> None:
+        directory = self._multiprocess_dir
+        if directory is not None:
+            self._write_snapshot(directory, self._snapshot(self._collect()))
+
+    @staticmethod
+    def _snapshot_path(directory: str, pid: int) -> str:
+        return os.path.join(directory, f"{pid}.json")
+
+    @staticmethod
+    def _snapshot(metrics: List[_Metric]) -> Dict[str, Dict[str, Any]]:
+        worker = f'worker="{os.getpid()}"'
+        return {
+            metric.name: {"help": metric.documentation, "type": metric.type_name, "samples": metric.samples(worker)}
+            for metric in metrics
+        }
+
+    def _write_snapshot(self, directory: str, snapshot: Dict[str, Dict[str, Any]]) -> None:
+        path = self._snapshot_path(directory, os.getpid())
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"⚠️ No se pudo publicar la instantánea de métricas: {e}")
+
+    def _read_snapshots(self, directory: str) -> Iterator[Tuple[int, Dict[str, Dict[str, Any]]]]:
+        try:
+            names = sorted(os.listdir(directory))
+        except OSError:
+            return
+        for name in names:
+            stem, ext = os.path.splitext(name)
+            if ext != ".json" or not stem.isdigit():
+                continue
+            pid = int(stem)
+            path = os.path.join(directory, name)
+            if not _process_alive(pid):
+                # Worker terminado sin limpiar (p. ej. SIGKILL): sus series desaparecen
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            try:
+                with open(path, encoding="utf-8") as f:
+                    yield pid, json.load(f)
+            except (OSError, ValueError):
+                continue
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+registry = Registry()
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+    return registry.register(Counter(name, documentation, labelnames))
+
+
+def gauge(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+    return registry.register(Gauge(name, documentation, labelnames))
+
+
+def histogram(name: str, documentation: str, labelnames: Sequence[str] = (),
+              buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+    return registry.register(Histogram(name, documentation, labelnames, buckets))
+
+
+# === MÉTRICAS DE LAURA MEMORY ===
+
+ZEP_REQUEST_DURATION = histogram(
+    "laura_memory_zep_request_duration_seconds",
+    "Latencia de cada intento de llamada a Zep por operación y resultado.",
+    ("operation", "outcome")
+)
+ZEP_RETRIES = counter(
+    "laura_memory_zep_retries_total",
+    "Reintentos de llamadas a Zep por operación.",
+    ("operation",)
+)
+ZEP_RETRIES_DENIED = counter(
+    "laura_memory_zep_retries_denied_total",
+    "Reintentos descartados por presupuesto agotado, por operación.",
+    ("operation",)
+)
+ZEP_CIRCUIT_REJECTIONS = counter(
+    "laura_memory_zep_circuit_rejections_total",
+    "Llamadas a Zep rechazadas con el circuito abierto, por operación.",
+    ("operation",)
+)
+HTTP_REQUESTS = counter(
+    "laura_memory_http_requests_total",
+    "Peticiones HTTP atendidas por ruta, método y estado.",
+    ("route", "method", "status")
+)
+HTTP_REQUEST_DURATION = histogram(
+    "laura_memory_http_request_duration_seconds",
+    "Duración de las peticiones HTTP por ruta y método.",
+    ("route", "method")
+)
+DETECTOR_DECISIONS = counter(
+    "laura_memory_detector_decisions_total",
+    "Decisiones de should_save_to_memory por resultado y motivo.",
+    ("decision", "reason")
+)
+NEAR_DUPLICATES_SKIPPED = counter(
+    "laura_memory_near_duplicates_skipped_total",
+    "Escrituras al grafo omitidas por ser casi-duplicados, por grupo.",
+    ("group",)
+)
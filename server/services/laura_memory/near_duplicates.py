@@ -0,0 +1,338 @@
+"""
+Detección de casi-duplicados con MinHash + LSH (vectorizado con NumPy).
+
+Cada grupo del grafo mantiene un boceto acotado (las últimas ``max_signatures``
+firmas) que se persiste en disco, de modo que un reinicio no vuelva a enviar
+a Zep las mismas noticias con otra redacción. Varios workers comparten el
+archivo: cada ``save()`` fusiona, bajo ``flock``, las firmas que otros
+procesos guardaron desde la última lectura.
+"""
+
+import logging
+import os
+import tempfile
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from handle_index import index_lock
+from text_index import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Primo mayor que 2^32 para las permutaciones (a*x + b) mod p
+_PRIME = np.uint64(4294967311)
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+_FORMAT_VERSION = 1
+
+
+def shingle_hashes(text: str, shingle_size: int = 3) -> np.ndarray:
+    """
+    Hashes estables (CRC32) de los shingles de palabras de ``text``.
+
+    Se usa CRC32 y no ``hash()`` porque las firmas se persisten entre procesos.
+    """
+    tokens = tokenize(text)
+    if not tokens:
+        return np.empty(0, dtype=np.uint64)
+    if len(tokens) < shingle_size:
+        shingles = {" ".join(tokens)}
+    else:
+        shingles = {" ".join(tokens[i:i + shingle_size]) for i in range(len(tokens) - shingle_size + 1)}
+    return np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+
+
+class MinHashLSH:
+    """
+    Almacén de firmas MinHash con índice LSH por bandas.
+
+    ``find(text)`` devuelve la similitud de Jaccard estimada con el documento
+    más parecido ya registrado si supera ``threshold``. Las firmas viven en un
+    búfer circular de ``max_signatures`` filas; al llenarse se reemplazan las
+    más antiguas. Con ``path`` el boceto se carga al crear la instancia y
+    ``save()`` lo escribe de forma atómica.
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 128, bands: int = 32,
+                 shingle_size: int = 3, max_signatures: int = 10000,
+                 path: Optional[str] = None, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm debe ser múltiplo de bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = max(1, shingle_size)
+        self.max_signatures = max(1, max_signatures)
+        self.path = path
+        self.seed = seed
+
+        # Permutaciones h(x) = (a*x + b) mod p; a < 2^31 para no desbordar uint64
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, 2 ** 31, size=num_perm, dtype=np.int64).astype(np.uint64)
+        self._b = rng.randint(0, 2 ** 31, size=num_perm, dtype=np.int64).astype(np.uint64)
+
+        self._signatures = np.zeros((self.max_signatures, num_perm), dtype=np.uint32)
+        self._count = 0
+        self._next = 0
+        self._buckets: List[Dict[bytes, Set[int]]] = [{} for _ in range(bands)]
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._saved_at = time.monotonic()
+
+        self.checked = 0
+        self.duplicates = 0
+
+        if path:
+            self._load()
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """
+        Firma MinHash de ``text`` (None si no tiene tokens).
+        """
+        hashes = shingle_hashes(text, self.shingle_size)
+        if hashes.size == 0:
+            return None
+        permuted = (np.outer(self._a, hashes) + self._b[:, None]) % _PRIME
+        return (permuted & _MAX_HASH).min(axis=1).astype(np.uint32)
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def _candidates(self, keys: List[bytes]) -> Set[int]:
+        candidates: Set[int] = set()
+        for band, key in enumerate(keys):
+            slots = self._buckets[band].get(key)
+            if slots:
+                candidates.update(slots)
+        return candidates
+
+    def _find_locked(self, signature: np.ndarray) -> Optional[float]:
+        self.checked += 1
+        candidates = self._candidates(self._band_keys(signature))
+        if not candidates:
+            return None
+        slots = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+        similarities = (self._signatures[slots] == signature).mean(axis=1)
+        best = float(similarities.max())
+        if best >= self.threshold:
+            self.duplicates += 1
+            return best
+        return None
+
+    def _unbucket_locked(self, slot: int) -> None:
+        for band, key in enumerate(self._band_keys(self._signatures[slot])):
+            slots = self._buckets[band].get(key)
+            if slots is not None:
+                slots.discard(slot)
+                if not slots:
+                    del self._buckets[band][key]
+
+    def _add_locked(self, signature: np.ndarray) -> None:
+        slot = self._next
+        if self._count == self.max_signatures:
+            # Búfer lleno: sacar la firma más antigua de los buckets
+            self._unbucket_locked(slot)
+        else:
+            self._count += 1
+
+        self._signatures[slot] = signature
+        for band, key in enumerate(self._band_keys(signature)):
+            self._buckets[band].setdefault(key, set()).add(slot)
+        self._next = (slot + 1) % self.max_signatures
+        self._dirty = True
+
+    def find(self, text: str, signature: Optional[np.ndarray] = None) -> Optional[float]:
+        """
+        Busca un casi-duplicado de ``text``.
+
+        Returns:
+            Similitud estimada del mejor candidato si supera el umbral, o None.
+        """
+        if signature is None:
+            signature = self.signature(text)
+        if signature is None:
+            return None
+
+        with self._lock:
+            return self._find_locked(signature)
+
+    def add(self, text: str, signature: Optional[np.ndarray] = None) -> bool:
+        """
+        Registra la firma de un contenido ya guardado.
+
+        Returns:
+            False si el contenido no tiene tokens.
+        """
+        if signature is None:
+            signature = self.signature(text)
+        if signature is None:
+            return False
+
+        with self._lock:
+            self._add_locked(signature)
+        return True
+
+    def claim(self, text: str) -> Tuple[Optional[float], Optional[np.ndarray]]:
+        """
+        Busca un casi-duplicado y, si no lo hay, registra la firma en la misma sección crítica.
+
+        Dos contenidos casi iguales enviados a la vez no pueden pasar ambos la
+        comprobación. Si la escritura posterior falla hay que llamar a ``release``.
+
+        Returns:
+            Tupla (similitud o None, firma reclamada o None). Con similitud no se reclama nada.
+        """
+        signature = self.signature(text)
+        if signature is None:
+            return None, None
+
+        with self._lock:
+            similarity = self._find_locked(signature)
+            if similarity is not None:
+                return similarity, None
+            self._add_locked(signature)
+        return None, signature
+
+    def release(self, signature: np.ndarray) -> bool:
+        """
+        Retira una firma reclamada con ``claim`` cuya escritura no se completó.
+
+        Returns:
+            True si la firma seguía en el boceto.
+        """
+        with self._lock:
+            for slot in self._candidates(self._band_keys(signature)):
+                if np.array_equal(self._signatures[slot], signature):
+                    self._unbucket_locked(slot)
+                    # Fila a cero: no se persiste (ver ``_ordered_locked``)
+                    self._signatures[slot] = 0
+                    self._dirty = True
+                    return True
+        return False
+
+    def clear(self) -> None:
+        with self._lock:
+            self._signatures[:] = 0
+            self._count = 0
+            self._next = 0
+            self._buckets = [{} for _ in range(self.bands)]
+            self._dirty = True
+
+    def _params(self) -> np.ndarray:
+        return np.array([_FORMAT_VERSION, self.num_perm, self.bands, self.shingle_size, self.seed], dtype=np.int64)
+
+    def _ordered_locked(self) -> np.ndarray:
+        # Orden de inserción para conservar la antigüedad al recortar; sin firmas liberadas
+        if self._count < self.max_signatures:
+            ordered = self._signatures[:self._count].copy()
+        else:
+            ordered = np.roll(self._signatures, -self._next, axis=0)
+        return ordered[ordered.any(axis=1)]
+
+    def _merge(self, signatures: np.ndarray) -> int:
+        # Añade las firmas que otros procesos guardaron y este aún no tiene
+        with self._lock:
+            known = {row.tobytes() for row in self._signatures[:self._count]}
+            merged = 0
+            for signature in signatures[-self.max_signatures:]:
+                if signature.tobytes() not in known:
+                    self._add_locked(signature)
+                    merged += 1
+            return merged
+
+    def save(self) -> bool:
+        """
+        Escribe el boceto en ``path`` (archivo temporal + ``os.replace``).
+
+        Bajo un bloqueo entre procesos relee el archivo y fusiona las firmas que
+        otros workers guardaron, para que el último en escribir no las pise.
+
+        Returns:
+            True si se escribió, False si no hay ruta o no había cambios.
+        """
+        if not self.path:
+            return False
+        with self._lock:
+            if not self._dirty:
+                return False
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        with index_lock(self.path):
+            on_disk = self._read()
+            if on_disk is not None:
+                merged = self._merge(on_disk)
+                if merged:
+                    logger.debug(f"🧬 {merged} firmas de otros procesos fusionadas ({self.path})")
+            with self._lock:
+                ordered = self._ordered_locked()
+                self._dirty = False
+                self._saved_at = time.monotonic()
+
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    np.savez(f, params=self._params(), signatures=ordered)
+                os.replace(tmp_path, self.path)
+            except Exception:
+                with self._lock:
+                    self._dirty = True
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise
+        return True
+
+    def maybe_save(self, interval: float) -> bool:
+        """
+        Guarda solo si pasaron ``interval`` segundos desde la última escritura.
+        """
+        if time.monotonic() - self._saved_at < interval:
+            return False
+        return self.save()
+
+    def _read(self) -> Optional[np.ndarray]:
+        # Firmas guardadas en ``path``, o None si no existe, no se puede leer o usa otros parámetros
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with np.load(self.path) as data:
+                params = data["params"]
+                signatures = data["signatures"]
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo leer el boceto de casi-duplicados {self.path}: {e}")
+            return None
+        if not np.array_equal(params, self._params()):
+            logger.warning(f"⚠️ Boceto {self.path} creado con otros parámetros, se descarta")
+            return None
+        return signatures
+
+    def _load(self) -> None:
+        signatures = self._read()
+        if signatures is None:
+            return
+
+        # Conservar solo las más recientes si max_signatures se redujo
+        with self._lock:
+            for signature in signatures[-self.max_signatures:]:
+                self._add_locked(signature)
+            self._dirty = False
+        logger.info(f"🧬 Boceto de casi-duplicados cargado: {self._count} firmas ({self.path})")
+
+    def __len__(self) -> int:
+        return self._count
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "signatures": self._count,
+                "max_signatures": self.max_signatures,
+                "threshold": self.threshold,
+                "num_perm": self.num_perm,
+                "bands": self.bands,
+                "checked": self.checked,
+                "duplicates": self.duplicates,
+                "path": self.path
+            }
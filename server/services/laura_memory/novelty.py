@@ -0,0 +1,85 @@
+"""
+Modelo local de novedad: qué fracción de un contenido no está ya en memoria.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Set
+
+from text_index import tokenize
+
+
+class NoveltyModel:
+    """
+    Estadística de shingles (n-gramas de palabras) de lo ya guardado.
+
+    ``score`` devuelve la fracción de shingles del contenido que nunca se han
+    visto (1.0 = totalmente nuevo, 0.0 = todo repetido). Se alimenta con cada
+    escritura confirmada y está acotado a ``max_shingles`` (LRU).
+    """
+
+    def __init__(self, shingle_size: int = 3, max_shingles: int = 200000):
+        self.shingle_size = max(1, shingle_size)
+        self.max_shingles = max_shingles
+        self._shingles: "OrderedDict[int, None]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.documents = 0
+        self.evictions = 0
+
+    def _shingle_hashes(self, text: str) -> Set[int]:
+        tokens = tokenize(text)
+        size = self.shingle_size
+        if len(tokens) < size:
+            # Textos muy cortos: comparar el texto completo como un solo shingle
+            return {hash(tuple(tokens))} if tokens else set()
+        return {hash(tuple(tokens[i:i + size])) for i in range(len(tokens) - size + 1)}
+
+    def score(self, text: str) -> float:
+        """
+        Calcula la novedad de ``text`` frente a lo ya registrado.
+        """
+        shingles = self._shingle_hashes(text)
+        if not shingles:
+            return 1.0
+        with self._lock:
+            seen = sum(1 for shingle in shingles if shingle in self._shingles)
+        return 1.0 - seen / len(shingles)
+
+    def add(self, text: str) -> None:
+        """
+        Registra los shingles de un contenido guardado.
+        """
+        shingles = self._shingle_hashes(text)
+        if not shingles:
+            return
+        with self._lock:
+            for shingle in shingles:
+                self._shingles[shingle] = None
+                self._shingles.move_to_end(shingle)
+            while len(self._shingles) > self.max_shingles:
+                self._shingles.popitem(last=False)
+                self.evictions += 1
+            self.documents += 1
+
+    def load(self, texts: Iterable[str]) -> None:
+        """
+        Registra varios contenidos (p. ej. la sesión al cargar el índice local).
+        """
+        for text in texts:
+            self.add(text)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._shingles.clear()
+            self.documents = 0
+            self.evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "shingles": len(self._shingles),
+                "max_shingles": self.max_shingles,
+                "shingle_size": self.shingle_size,
+                "documents": self.documents,
+                "evictions": self.evictions
+            }
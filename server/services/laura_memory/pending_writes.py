@@ -0,0 +1,204 @@
+"""
+Capa "read-your-writes" para escrituras al grafo que Zep aún no indexó.
+
+``graph.add`` devuelve antes de que Zep procese el episodio, así que lo recién
+guardado no aparece en las búsquedas durante unos segundos. Esta capa guarda
+esos contenidos y las búsquedas los mezclan con la respuesta de Zep hasta que
+el episodio figura como procesado o vence el TTL.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+from text_index import fold, tokenize
+
+logger = logging.getLogger(__name__)
+
+
+class _PendingWrite:
+    __slots__ = ("group", "content", "tokens", "episode_uuid", "created_at", "checked_at")
+
+    def __init__(self, group: str, content: str, episode_uuid: Optional[str], now: float):
+        self.group = group
+        self.content = content
+        self.tokens = set(tokenize(fold(content)))
+        self.episode_uuid = episode_uuid
+        self.created_at = now
+        self.checked_at = now
+
+
+class PendingWrites:
+    """
+    Escrituras pendientes de ingesta por grupo, con desalojo por confirmación o TTL.
+
+    Un hilo de fondo consulta ``confirm_fn(episode_uuid)`` cada
+    ``poll_interval`` segundos para las entradas con uuid y las elimina cuando
+    devuelve True; el hilo termina cuando no quedan entradas por confirmar.
+    """
+
+    def __init__(self, ttl_seconds: float = 120.0, max_entries: int = 1000,
+                 poll_interval: float = 2.0,
+                 confirm_fn: Optional[Callable[[str], bool]] = None,
+                 name: str = "pending-writes"):
+        self.ttl = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self.poll_interval = max(0.01, poll_interval)
+        self.confirm_fn = confirm_fn
+        self.name = name
+
+        self._entries: "OrderedDict[int, _PendingWrite]" = OrderedDict()
+        self._next_id = 0
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+        self.added = 0
+        self.confirmed = 0
+        self.expired = 0
+        self.served = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, group: str, content: str, episode_uuid: Optional[str] = None) -> None:
+        """
+        Registra un contenido recién enviado a ``group``.
+        """
+        if not content:
+            return
+        with self._cond:
+            entry = _PendingWrite(group, content, episode_uuid, time.monotonic())
+            self._entries[self._next_id] = entry
+            self._next_id += 1
+            self.added += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.expired += 1
+            if episode_uuid and self.confirm_fn is not None:
+                self._ensure_worker()
+                self._cond.notify_all()
+
+    def _expire(self, now: float) -> None:
+        while self._entries:
+            entry_id, entry = next(iter(self._entries.items()))
+            if now - entry.created_at < self.ttl:
+                break
+            del self._entries[entry_id]
+            self.expired += 1
+
+    def match(self, group: str, query: str, limit: int = 5) -> List[str]:
+        """
+        Contenidos pendientes de ``group`` que comparten al menos la mitad de
+        los tokens de la consulta, de más a menos parecidos y recientes.
+        """
+        query_tokens = set(tokenize(fold(query)))
+        if not query_tokens:
+            return []
+        needed = max(1, (len(query_tokens) + 1) // 2)
+        with self._cond:
+            self._expire(time.monotonic())
+            scored = []
+            for entry_id, entry in self._entries.items():
+                if entry.group != group:
+                    continue
+                shared = len(query_tokens & entry.tokens)
+                if shared >= needed:
+                    scored.append((shared, entry_id, entry.content))
+        scored.sort(key=lambda item: (-item[0], -item[1]))
+        results = []
+        for _, _, content in scored:
+            if content not in results:
+                results.append(content)
+        results = results[:limit]
+        self.served += len(results)
+        return results
+
+    def merge(self, group: str, query: str, results: List[str], limit: int) -> List[str]:
+        """
+        Antepone los pendientes que coinciden a ``results`` (sin duplicados).
+        """
+        pending = self.match(group, query, limit)
+        if not pending:
+            return results
+        merged = list(pending)
+        for result in results:
+            if result not in merged:
+                merged.append(result)
+        return merged[:limit]
+
+    def confirm(self, episode_uuid: str) -> int:
+        """
+        Elimina las entradas del episodio ya procesado por Zep.
+        """
+        with self._cond:
+            ids = [entry_id for entry_id, entry in self._entries.items() if entry.episode_uuid == episode_uuid]
+            for entry_id in ids:
+                del self._entries[entry_id]
+            self.confirmed += len(ids)
+            return len(ids)
+
+    def poll_once(self) -> int:
+        """
+        Consulta a Zep las entradas por confirmar que no se revisaron en el
+        último ``poll_interval``.
+
+        Returns:
+            Número de entradas confirmadas.
+        """
+        if self.confirm_fn is None:
+            return 0
+        now = time.monotonic()
+        with self._cond:
+            self._expire(now)
+            due = []
+            for entry in self._entries.values():
+                if entry.episode_uuid and now - entry.checked_at >= self.poll_interval:
+                    entry.checked_at = now
+                    due.append(entry.episode_uuid)
+
+        confirmed = 0
+        for episode_uuid in dict.fromkeys(due):
+            try:
+                processed = self.confirm_fn(episode_uuid)
+            except Exception as e:
+                logger.debug(f"No se pudo confirmar el episodio {episode_uuid}: {e}")
+                continue
+            if processed:
+                confirmed += self.confirm(episode_uuid)
+        return confirmed
+
+    def _ensure_worker(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if not any(entry.episode_uuid for entry in self._entries.values()):
+                    self._thread = None
+                    return
+                self._cond.wait(self.poll_interval)
+            self.poll_once()
+
+    def clear(self) -> None:
+        with self._cond:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            self._expire(time.monotonic())
+            by_group: Dict[str, int] = {}
+            for entry in self._entries.values():
+                by_group[entry.group] = by_group.get(entry.group, 0) + 1
+            return {
+                "pending": len(self._entries),
+                "by_group": by_group,
+                "added": self.added,
+                "confirmed": self.confirmed,
+                "expired": self.expired,
+                "served": self.served,
+                "ttl_seconds": self.ttl
+            }
@@ -0,0 +1,216 @@
+"""
+Circuit breaker, presupuesto de reintentos y clasificación de errores para Zep.
+"""
+
+import random
+import threading
+import time
+from typing import Any, Dict
+
+from zep_cloud.core.api_error import ApiError
+
+# Códigos HTTP que indican un fallo transitorio
+RETRYABLE_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+
+# Errores de programación / validación que nunca se reintentan
+_NON_RETRYABLE_TYPES = (ValueError, TypeError, AttributeError, KeyError, NotImplementedError)
+
+
+class CircuitOpenError(Exception):
+    """
+    Se lanza cuando el circuito de una operación está abierto y la llamada se rechaza.
+    """
+
+    def __init__(self, operation: str, retry_after: float):
+        self.operation = operation
+        self.retry_after = retry_after
+        super().__init__(f"Circuito abierto para {operation}, reintentar en {retry_after:.1f}s")
+
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    Indica si un error de Zep merece reintento.
+
+    Los ApiError se reintentan solo con 408/425/429/5xx; los 4xx restantes son
+    errores del cliente. Los errores de red (timeouts, conexión) se reintentan.
+    """
+    if isinstance(error, CircuitOpenError):
+        return False
+    if isinstance(error, ApiError):
+        return error.status_code is None or error.status_code in RETRYABLE_STATUS_CODES
+    if isinstance(error, _NON_RETRYABLE_TYPES):
+        return False
+    return True
+
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float) -> float:
+    """
+    Backoff exponencial con "full jitter": uniforme entre 0 y base * 2^attempt.
+    """
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker con estados closed → open → half_open.
+
+    - closed: las llamadas pasan; ``failure_threshold`` fallos consecutivos lo abren.
+    - open: las llamadas se rechazan con CircuitOpenError durante ``reset_timeout``.
+    - half_open: se permiten ``half_open_max_calls`` llamadas de prueba; un éxito
+      lo cierra y un fallo lo vuelve a abrir.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 half_open_max_calls: int = 1):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = max(1, half_open_max_calls)
+
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._half_open_in_flight = 0
+
+        self.total_failures = 0
+        self.total_successes = 0
+        self.rejected = 0
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open(time.monotonic())
+            return self._state
+
+    def _maybe_half_open(self, now: float) -> None:
+        if self._state == self.OPEN and now - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._half_open_in_flight = 0
+
+    def before_call(self) -> None:
+        """
+        Reserva permiso para una llamada.
+
+        Raises:
+            CircuitOpenError: Si el circuito está abierto o sin cupo en half_open.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._maybe_half_open(now)
+
+            if self._state == self.OPEN:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, self._opened_at + self.reset_timeout - now)
+
+            if self._state == self.HALF_OPEN:
+                if self._half_open_in_flight >= self.half_open_max_calls:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, 0.0)
+                self._half_open_in_flight += 1
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.total_successes += 1
+            self._consecutive_failures = 0
+            if self._state == self.HALF_OPEN:
+                self._state = self.CLOSED
+                self._half_open_in_flight = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.total_failures += 1
+            self._consecutive_failures += 1
+            if self._state == self.HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self.times_opened += 1
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._half_open_in_flight = 0
+
+    def reset(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._consecutive_failures = 0
+            self._half_open_in_flight = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._maybe_half_open(time.monotonic())
+            return {
+                "state": self._state,
+                "consecutive_failures": self._consecutive_failures,
+                "failure_threshold": self.failure_threshold,
+                "reset_timeout_s": self.reset_timeout,
+                "total_failures": self.total_failures,
+                "total_successes": self.total_successes,
+                "rejected": self.rejected,
+                "times_opened": self.times_opened
+            }
+
+
+class RetryBudget:
+    """
+    Presupuesto global de reintentos (token bucket).
+
+    Cada llamada deposita ``ratio`` tokens y cada reintento consume uno, de modo
+    que los reintentos no superen ~``ratio`` de las llamadas. Además se repone
+    ``min_per_second`` tokens por segundo para permitir reintentos con poco tráfico.
+    """
+
+    def __init__(self, ratio: float = 0.2, min_per_second: float = 1.0, max_tokens: float = 20.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+
+        self._lock = threading.Lock()
+        self._tokens = max_tokens
+        self._last_refill = time.monotonic()
+
+        self.granted = 0
+        self.denied = 0
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        self._tokens = min(self.max_tokens, self._tokens + elapsed * self.min_per_second)
+
+    def record_request(self) -> None:
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_acquire(self) -> bool:
+        """
+        Intenta consumir un token para un reintento.
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                self.granted += 1
+                return True
+            self.denied += 1
+            return False
+
+    def reset(self) -> None:
+        with self._lock:
+            self._tokens = self.max_tokens
+            self._last_refill = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._refill(time.monotonic())
+            return {
+                "available_tokens": round(self._tokens, 2),
+                "max_tokens": self.max_tokens,
+                "ratio": self.ratio,
+                "min_per_second": self.min_per_second,
+                "granted": self.granted,
+                "denied": self.denied
+            }
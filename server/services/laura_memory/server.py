@@ -2,12 +2,21 @@
 Servidor HTTP para exponer la funcionalidad de Laura Memory al backend JavaScript.
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
 import logging
-from typing import Dict, Any
+import signal
+import sys
+import threading
+import time
+from typing import Dict, Any, Optional
 
-from integration import laura_memory_integration
-from memory import search_public_memory, get_memory_stats, search_pulsepolitics, get_pulsepolitics_stats, search_userhandles, get_userhandles_stats
+import memory
+
+from batch import NDJSON_CONTENT_TYPE, parse_batch, run_batch
+from integration import accept_tool_result_job, close_ingest_jobs, get_ingest_job, get_ingest_jobs_stats, laura_memory_integration
+from metrics import CONTENT_TYPE, HTTP_REQUEST_DURATION, HTTP_REQUESTS, registry
+from settings import settings
+from memory import search_public_memory, search_public_memory_filtered, get_memory_stats, search_pulsepolitics, get_pulsepolitics_stats, search_userhandles, get_userhandles_stats, get_search_cache_stats, get_write_queue_stats, get_resilience_stats, get_metadata_store_stats
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -15,6 +24,75 @@ logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
+# Listo tras inicializar Zep; deja de estarlo al empezar el apagado
+_ready = threading.Event()
+_shutting_down = threading.Event()
+_init_lock = threading.Lock()
+
+
+def initialize() -> bool:
+    """
+    Inicializa el cliente de Zep y marca el servicio como listo.
+    
+    Con gunicorn (``preload_app``) se ejecuta en el proceso maestro antes de
+    crear los workers. Si Zep no responde el servicio arranca sin estar listo
+    y ``/ready`` lo reintenta.
+    
+    Returns:
+        True si el servicio quedó listo.
+    """
+    with _init_lock:
+        if _ready.is_set() or _shutting_down.is_set():
+            return _ready.is_set()
+        try:
+            memory.warm_up()
+        except Exception as e:
+            logger.error(f"❌ Laura Memory no está lista: {e}")
+            return False
+        _ready.set()
+        logger.info("✅ Laura Memory lista para recibir tráfico")
+        return True
+
+
+def begin_shutdown(timeout: float = 10.0) -> bool:
+    """
+    Deja de anunciarse como listo, termina los trabajos de ingesta y vacía la
+    cola y los índices locales.
+    
+    Returns:
+        True si no quedaron trabajos ni mensajes pendientes.
+    """
+    mark_draining()
+    jobs_finished = close_ingest_jobs(timeout)
+    return memory.shutdown(timeout) and jobs_finished
+
+
+def mark_draining() -> None:
+    _shutting_down.set()
+    _ready.clear()
+
+
+@app.before_request
+def _start_request_timer():
+    g.request_started_at = time.perf_counter()
+
+
+@app.after_request
+def _record_request_metrics(response):
+    started_at = g.pop('request_started_at', None)
+    if started_at is not None:
+        # Usar la regla de la ruta (no la URL) para acotar la cardinalidad
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        HTTP_REQUESTS.inc(route=route, method=request.method, status=str(response.status_code))
+        HTTP_REQUEST_DURATION.observe(time.perf_counter() - started_at, route=route, method=request.method)
+    return response
+
+
+def _json_body() -> Optional[Dict[str, Any]]:
+    # JSON malformado o que no es un objeto: None, y la ruta responde 400 (como asgi_server)
+    data = request.get_json(silent=True)
+    return data if isinstance(data, dict) else None
+
 
 @app.route('/api/laura-memory/process-tool-result', methods=['POST'])
 def process_tool_result():
@@ -27,13 +105,19 @@ def process_tool_result():
         "tool_result": {...},
         "user_query": "busca a Juan Pérez"
     }
+    
+    Con "async": true (y opcionalmente "callback_url") responde 202 con el
+    trabajo encolado; el resultado se consulta en /api/laura-memory/jobs/<job_id>.
     """
     try:
-        data = request.get_json()
+        data = _json_body()
         
         if not data or 'tool_name' not in data or 'tool_result' not in data:
             return jsonify({"error": "Faltan campos requeridos"}), 400
         
+        if data.get('async'):
+            return _submit_tool_result_job(data)
+        
         result = laura_memory_integration.process_tool_result(
             tool_name=data['tool_name'],
             tool_result=data['tool_result'],
@@ -47,6 +131,26 @@ def process_tool_result():
         return jsonify({"error": str(e)}), 500
 
 
+def _submit_tool_result_job(data: Dict[str, Any]):
+    status, body = accept_tool_result_job(data)
+    if status == 202:
+        return jsonify(body), status, {"Location": body["status_url"]}
+    if status == 503:
+        return jsonify(body), status, {"Retry-After": "1"}
+    return jsonify(body), status
+
+
+@app.route('/api/laura-memory/jobs/<job_id>', methods=['GET'])
+def ingest_job_status(job_id: str):
+    """
+    Estado de un trabajo de process-tool-result en modo asíncrono.
+    """
+    job = get_ingest_job(job_id)
+    if job is None:
+        return jsonify({"error": "Trabajo no encontrado"}), 404
+    return jsonify(job)
+
+
 @app.route('/api/laura-memory/enhance-query', methods=['POST'])
 def enhance_query():
     """
@@ -55,18 +159,20 @@ def enhance_query():
     Expected JSON:
     {
         "query": "¿Qué pasó con el congreso?",
-        "limit": 3
+        "limit": 3,
+        "federated": false
     }
     """
     try:
-        data = request.get_json()
+        data = _json_body()
         
         if not data or 'query' not in data:
             return jsonify({"error": "Falta el campo 'query'"}), 400
         
         result = laura_memory_integration.enhance_query_with_memory(
             query=data['query'],
-            limit=data.get('limit', 3)
+            limit=data.get('limit', 3),
+            federated=bool(data.get('federated', False))
         )
         
         return jsonify(result)
@@ -90,7 +196,7 @@ def save_user_discovery():
     }
     """
     try:
-        data = request.get_json()
+        data = _json_body()
         
         if not data or 'user_name' not in data or 'twitter_username' not in data:
             return jsonify({"error": "Faltan campos requeridos"}), 400
@@ -109,6 +215,9 @@ def save_user_discovery():
         return jsonify({"error": str(e)}), 500
 
 
+_SEARCH_FILTERS = ("tags", "source", "since", "until", "last_hours")
+
+
 @app.route('/api/laura-memory/search', methods=['POST'])
 def search_memory():
     """
@@ -119,13 +228,40 @@ def search_memory():
         "query": "congreso",
         "limit": 5
     }
+    
+    Filtros opcionales (se resuelven con el índice local de metadatos):
+    {
+        "query": "amparo",
+        "tags": ["legal"],
+        "source": "perplexity_search",
+        "last_hours": 24,
+        "since": "2025-01-10T00:00:00",
+        "until": "2025-01-11T00:00:00"
+    }
     """
     try:
-        data = request.get_json()
+        data = _json_body()
         
         if not data or 'query' not in data:
             return jsonify({"error": "Falta el campo 'query'"}), 400
         
+        if any(data.get(field) for field in _SEARCH_FILTERS):
+            try:
+                since = data.get('since')
+                if data.get('last_hours'):
+                    since = time.time() - float(data['last_hours']) * 3600
+                items = search_public_memory_filtered(
+                    query=data['query'],
+                    limit=data.get('limit', 5),
+                    tags=data.get('tags'),
+                    source=data.get('source'),
+                    since=since,
+                    until=data.get('until')
+                )
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            return jsonify({"results": [item["content"] for item in items], "items": items})
+        
         results = search_public_memory(
             query=data['query'],
             limit=data.get('limit', 5)
@@ -138,6 +274,65 @@ def search_memory():
         return jsonify({"error": str(e)}), 500
 
 
+@app.route('/api/laura-memory/federated-search', methods=['POST'])
+def federated_search():
+    """
+    Busca en paralelo en memoria pública, PulsePolitics y UserHandles.
+    
+    Expected JSON:
+    {
+        "query": "Bernardo Arévalo",
+        "limit": 5,
+        "sources": ["public_memory", "pulsepolitics", "userhandles"],
+        "deadline_ms": 1500
+    }
+    """
+    try:
+        data = _json_body()
+        
+        if not data or 'query' not in data:
+            return jsonify({"error": "Falta el campo 'query'"}), 400
+        
+        result = laura_memory_integration.federated_search(
+            query=data['query'],
+            limit=data.get('limit', 5),
+            sources=data.get('sources'),
+            deadline_ms=data.get('deadline_ms')
+        )
+        
+        return jsonify(result)
+        
+    except Exception as e:
+        logger.error(f"❌ Error en búsqueda federada: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/laura-memory/batch', methods=['POST'])
+def batch_operations():
+    """
+    Ejecuta varias operaciones de memoria de forma concurrente en una sola petición.
+    
+    Expected JSON:
+    {
+        "operations": [
+            {"id": "q", "operation": "enhance-query", "args": {"query": "congreso"}},
+            {"id": "s", "operation": "search", "args": {"query": "congreso", "limit": 5}},
+            {"operation": "process-tool-result", "args": {"tool_name": "...", "tool_result": {...}}},
+            {"operation": "save-user-discovery", "args": {"user_name": "...", "twitter_username": "..."}}
+        ]
+    }
+    
+    Responde NDJSON: una línea por operación, en orden, con su "status" y
+    "result" o "error" (ver batch.py).
+    """
+    try:
+        operations = parse_batch(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    return Response(run_batch(operations), content_type=NDJSON_CONTENT_TYPE)
+
+
 @app.route('/api/laura-memory/stats', methods=['GET'])
 def memory_stats():
     """
@@ -164,7 +359,7 @@ def search_pulsepolitics_endpoint():
     }
     """
     try:
-        data = request.get_json()
+        data = _json_body()
         
         if not data or 'query' not in data:
             return jsonify({"error": "Falta el campo 'query'"}), 400
@@ -207,7 +402,7 @@ def search_userhandles_endpoint():
     }
     """
     try:
-        data = request.get_json()
+        data = _json_body()
         
         if not data or 'query' not in data:
             return jsonify({"error": "Falta el campo 'query'"}), 400
@@ -238,6 +433,103 @@ def userhandles_stats():
         return jsonify({"error": str(e)}), 500
 
 
+@app.route('/api/laura-memory/cache-stats', methods=['GET'])
+def cache_stats():
+    """
+    Obtiene los contadores de la caché de búsquedas (hits, misses, tamaño).
+    """
+    try:
+        stats = get_search_cache_stats()
+        return jsonify(stats)
+        
+    except Exception as e:
+        logger.error(f"❌ Error obteniendo estadísticas de caché: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/laura-memory/queue-stats', methods=['GET'])
+def queue_stats():
+    """
+    Obtiene el estado de la cola write-behind de memoria pública.
+    """
+    try:
+        stats = get_write_queue_stats()
+        return jsonify(stats)
+        
+    except Exception as e:
+        logger.error(f"❌ Error obteniendo estadísticas de la cola: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/laura-memory/resilience-stats', methods=['GET'])
+def resilience_stats():
+    """
+    Obtiene el estado de los circuit breakers de Zep y del presupuesto de reintentos.
+    """
+    try:
+        stats = get_resilience_stats()
+        return jsonify(stats)
+        
+    except Exception as e:
+        logger.error(f"❌ Error obteniendo estadísticas de resiliencia: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/laura-memory/jobs-stats', methods=['GET'])
+def ingest_jobs_stats():
+    """
+    Obtiene los contadores de los trabajos de ingesta en segundo plano.
+    """
+    try:
+        stats = get_ingest_jobs_stats()
+        return jsonify(stats)
+        
+    except Exception as e:
+        logger.error(f"❌ Error obteniendo estadísticas de trabajos: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/laura-memory/metadata-stats', methods=['GET'])
+def metadata_stats():
+    """
+    Obtiene el tamaño del índice local de metadatos y las escrituras por fuente.
+    """
+    try:
+        stats = get_metadata_store_stats()
+        return jsonify(stats)
+        
+    except Exception as e:
+        logger.error(f"❌ Error obteniendo estadísticas de metadatos: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """
+    Métricas en formato de texto de Prometheus (latencias de Zep, rutas, reintentos,
+    decisiones de detectores y gauges de caché/cola).
+    """
+    return Response(registry.render(), content_type=CONTENT_TYPE)
+
+
+@app.route('/ready', methods=['GET'])
+def readiness_check():
+    """
+    Readiness: 200 cuando el cliente de Zep está inicializado, 503 mientras
+    arranca o durante el apagado (el balanceador deja de enviar tráfico).
+    
+    "write_behind" informa de los mensajes en reintento, en dead-letter y
+    descartados de la cola write-behind (no afecta al estado).
+    """
+    if not _ready.is_set() and not _shutting_down.is_set():
+        initialize()
+    write_behind = memory.get_write_queue_health()
+    if _ready.is_set():
+        return jsonify({"status": "ready", "service": "laura-memory", "write_behind": write_behind})
+    status = "shutting_down" if _shutting_down.is_set() else "starting"
+    return jsonify({"status": status, "service": "laura-memory", "write_behind": write_behind}), 503
+
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """
@@ -246,5 +538,14 @@ def health_check():
     return jsonify({"status": "healthy", "service": "laura-memory"})
 
 
+def _handle_sigterm(signum, frame):
+    begin_shutdown(settings.server_graceful_timeout_seconds)
+    sys.exit(0)
+
+
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5001, debug=True)
\ No newline at end of file
+    # Servidor de desarrollo. En producción: gunicorn -c gunicorn.conf.py server:app
+    signal.signal(signal.SIGTERM, _handle_sigterm)
+    initialize()
+    host, port = settings.server_bind.rsplit(':', 1)
+    app.run(host=host, port=int(port), debug=settings.debug)
\ No newline at end of file
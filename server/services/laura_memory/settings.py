@@ -4,7 +4,7 @@ Configuración para Laura Memory usando Pydantic BaseSettings.
 
 import os
 import logging
-from pydantic import Field, field_validator
+from pydantic import AliasChoices, Field, field_validator
 from pydantic_settings import BaseSettings
 
 logger = logging.getLogger(__name__)
@@ -13,26 +13,151 @@ logger = logging.getLogger(__name__)
 class LauraMemorySettings(BaseSettings):
     """Configuración para el sistema de memoria de Laura."""
     
-    zep_api_key: str = Field(..., env="ZEP_API_KEY")
-    zep_url: str = Field("https://api.getzep.com", env="ZEP_URL")
-    session_id: str = Field("laura_memory_session", env="LAURA_SESSION_ID")
+    zep_api_key: str = Field(..., validation_alias=AliasChoices("ZEP_API_KEY"))
+    zep_url: str = Field("https://api.getzep.com", validation_alias=AliasChoices("ZEP_URL"))
+    session_id: str = Field("laura_memory_session", validation_alias=AliasChoices("LAURA_SESSION_ID", "SESSION_ID"))
     
     # Configuración para PulsePolitics (memoria compartida de grupo)
-    pulsepolitics_session_id: str = Field("group:pulsepolitics", env="PULSE_POLITICS_SESSION_ID")
+    pulsepolitics_session_id: str = Field("group:pulsepolitics", validation_alias=AliasChoices("PULSE_POLITICS_SESSION_ID", "PULSEPOLITICS_SESSION_ID"))
     
     # Configuración para UserHandles (memoria compartida de grupo para handles de usuarios)
-    userhandles_session_id: str = Field("userhandles_shared_session", env="USERHANDLES_SESSION_ID")
-    userhandles_user_id: str = Field("pulse_politics_system", env="USERHANDLES_USER_ID")
+    userhandles_session_id: str = Field("userhandles_shared_session", validation_alias=AliasChoices("USERHANDLES_SESSION_ID"))
+    userhandles_user_id: str = Field("pulse_politics_system", validation_alias=AliasChoices("USERHANDLES_USER_ID"))
     
     # Configuración adicional
-    memory_enabled: bool = Field(True, env="LAURA_MEMORY_ENABLED")
-    memory_url: str = Field("http://localhost:5001", env="LAURA_MEMORY_URL")
-    debug: bool = Field(False, env="DEBUG")
-    
+    memory_enabled: bool = Field(True, validation_alias=AliasChoices("LAURA_MEMORY_ENABLED", "MEMORY_ENABLED"))
+    memory_url: str = Field("http://localhost:5001", validation_alias=AliasChoices("LAURA_MEMORY_URL", "MEMORY_URL"))
+    debug: bool = Field(False, validation_alias=AliasChoices("DEBUG"))
+
+    # Caché de búsquedas (LRU + TTL por store)
+    search_cache_enabled: bool = Field(True, validation_alias=AliasChoices("LAURA_SEARCH_CACHE_ENABLED", "SEARCH_CACHE_ENABLED"))
+    search_cache_max_entries: int = Field(1024, validation_alias=AliasChoices("LAURA_SEARCH_CACHE_MAX_ENTRIES", "SEARCH_CACHE_MAX_ENTRIES"))
+    search_cache_ttl_public: float = Field(30.0, validation_alias=AliasChoices("LAURA_SEARCH_CACHE_TTL_PUBLIC", "SEARCH_CACHE_TTL_PUBLIC"))
+    search_cache_ttl_pulsepolitics: float = Field(120.0, validation_alias=AliasChoices("LAURA_SEARCH_CACHE_TTL_PULSEPOLITICS", "SEARCH_CACHE_TTL_PULSEPOLITICS"))
+    search_cache_ttl_userhandles: float = Field(300.0, validation_alias=AliasChoices("LAURA_SEARCH_CACHE_TTL_USERHANDLES", "SEARCH_CACHE_TTL_USERHANDLES"))
+
+    # Coalescencia de búsquedas idénticas concurrentes (single-flight)
+    single_flight_enabled: bool = Field(True, validation_alias=AliasChoices("LAURA_SINGLE_FLIGHT_ENABLED", "SINGLE_FLIGHT_ENABLED"))
+
+    # Escritura diferida (write-behind) para add_public_memory
+    write_behind_enabled: bool = Field(False, validation_alias=AliasChoices("LAURA_WRITE_BEHIND_ENABLED", "WRITE_BEHIND_ENABLED"))
+    write_behind_batch_size: int = Field(20, validation_alias=AliasChoices("LAURA_WRITE_BEHIND_BATCH_SIZE", "WRITE_BEHIND_BATCH_SIZE"))
+    write_behind_flush_ms: float = Field(250.0, validation_alias=AliasChoices("LAURA_WRITE_BEHIND_FLUSH_MS", "WRITE_BEHIND_FLUSH_MS"))
+    write_behind_max_pending: int = Field(1000, validation_alias=AliasChoices("LAURA_WRITE_BEHIND_MAX_PENDING", "WRITE_BEHIND_MAX_PENDING"))
+    write_behind_enqueue_timeout_ms: float = Field(50.0, validation_alias=AliasChoices("LAURA_WRITE_BEHIND_ENQUEUE_TIMEOUT_MS", "WRITE_BEHIND_ENQUEUE_TIMEOUT_MS"))
+    write_behind_max_retries: int = Field(5, validation_alias=AliasChoices("LAURA_WRITE_BEHIND_MAX_RETRIES", "WRITE_BEHIND_MAX_RETRIES"))
+    write_behind_retry_base_delay_seconds: float = Field(1.0, validation_alias=AliasChoices("LAURA_WRITE_BEHIND_RETRY_BASE_DELAY_SECONDS", "WRITE_BEHIND_RETRY_BASE_DELAY_SECONDS"))
+    write_behind_retry_max_delay_seconds: float = Field(30.0, validation_alias=AliasChoices("LAURA_WRITE_BEHIND_RETRY_MAX_DELAY_SECONDS", "WRITE_BEHIND_RETRY_MAX_DELAY_SECONDS"))
+    write_behind_dead_letter_max: int = Field(1000, validation_alias=AliasChoices("LAURA_WRITE_BEHIND_DEAD_LETTER_MAX", "WRITE_BEHIND_DEAD_LETTER_MAX"))
+
+    # Índice invertido local para el fallback de search_public_memory
+    public_index_enabled: bool = Field(True, validation_alias=AliasChoices("LAURA_PUBLIC_INDEX_ENABLED", "PUBLIC_INDEX_ENABLED"))
+    public_index_max_documents: int = Field(50000, validation_alias=AliasChoices("LAURA_PUBLIC_INDEX_MAX_DOCUMENTS", "PUBLIC_INDEX_MAX_DOCUMENTS"))
+    public_index_refresh_seconds: float = Field(600.0, validation_alias=AliasChoices("LAURA_PUBLIC_INDEX_REFRESH_SECONDS", "PUBLIC_INDEX_REFRESH_SECONDS"))
+
+    # Caracteres máximos analizados por los detectores (0 = sin límite)
+    detector_max_scan_chars: int = Field(32768, validation_alias=AliasChoices("LAURA_DETECTOR_MAX_SCAN_CHARS", "DETECTOR_MAX_SCAN_CHARS"))
+
+    # Clasificación por lotes de detectores (should_save_to_memory_batch)
+    detector_batch_process_threshold: int = Field(2000, validation_alias=AliasChoices("LAURA_DETECTOR_BATCH_PROCESS_THRESHOLD", "DETECTOR_BATCH_PROCESS_THRESHOLD"))
+    detector_batch_max_workers: int = Field(0, validation_alias=AliasChoices("LAURA_DETECTOR_BATCH_MAX_WORKERS", "DETECTOR_BATCH_MAX_WORKERS"))  # 0 = un proceso por núcleo
+    detector_batch_chunk_size: int = Field(500, validation_alias=AliasChoices("LAURA_DETECTOR_BATCH_CHUNK_SIZE", "DETECTOR_BATCH_CHUNK_SIZE"))
+
+    # Detección de novedad frente a la memoria pública (evita reescribir noticias repetidas).
+    # El modelo es local a cada proceso: se siembra con la sesión al arrancar y ve las
+    # escrituras de otros workers solo al refrescar el índice (public_index_refresh_seconds)
+    novelty_enabled: bool = Field(True, validation_alias=AliasChoices("LAURA_NOVELTY_ENABLED", "NOVELTY_ENABLED"))
+    novelty_threshold: float = Field(0.2, validation_alias=AliasChoices("LAURA_NOVELTY_THRESHOLD", "NOVELTY_THRESHOLD"))
+    novelty_shingle_size: int = Field(3, validation_alias=AliasChoices("LAURA_NOVELTY_SHINGLE_SIZE", "NOVELTY_SHINGLE_SIZE"))
+    novelty_max_shingles: int = Field(200000, validation_alias=AliasChoices("LAURA_NOVELTY_MAX_SHINGLES", "NOVELTY_MAX_SHINGLES"))
+
+    # Supresión de casi-duplicados antes de graph.add (MinHash + LSH por grupo)
+    near_duplicate_enabled: bool = Field(True, validation_alias=AliasChoices("LAURA_NEAR_DUPLICATE_ENABLED", "NEAR_DUPLICATE_ENABLED"))
+    near_duplicate_threshold: float = Field(0.8, validation_alias=AliasChoices("LAURA_NEAR_DUPLICATE_THRESHOLD", "NEAR_DUPLICATE_THRESHOLD"))
+    near_duplicate_num_perm: int = Field(128, validation_alias=AliasChoices("LAURA_NEAR_DUPLICATE_NUM_PERM", "NEAR_DUPLICATE_NUM_PERM"))
+    near_duplicate_bands: int = Field(32, validation_alias=AliasChoices("LAURA_NEAR_DUPLICATE_BANDS", "NEAR_DUPLICATE_BANDS"))
+    near_duplicate_shingle_size: int = Field(3, validation_alias=AliasChoices("LAURA_NEAR_DUPLICATE_SHINGLE_SIZE", "NEAR_DUPLICATE_SHINGLE_SIZE"))
+    near_duplicate_max_signatures: int = Field(20000, validation_alias=AliasChoices("LAURA_NEAR_DUPLICATE_MAX_SIGNATURES", "NEAR_DUPLICATE_MAX_SIGNATURES"))
+    near_duplicate_state_dir: str = Field("data/near_duplicates", validation_alias=AliasChoices("LAURA_NEAR_DUPLICATE_STATE_DIR", "NEAR_DUPLICATE_STATE_DIR"))  # "" = solo en memoria
+    near_duplicate_save_interval_seconds: float = Field(30.0, validation_alias=AliasChoices("LAURA_NEAR_DUPLICATE_SAVE_INTERVAL_SECONDS", "NEAR_DUPLICATE_SAVE_INTERVAL_SECONDS"))
+
+    # Registro local de handles para deduplicar add_to_userhandles sin buscar en Zep
+    handle_registry_enabled: bool = Field(True, validation_alias=AliasChoices("LAURA_HANDLE_REGISTRY_ENABLED", "HANDLE_REGISTRY_ENABLED"))
+    handle_registry_capacity: int = Field(100000, validation_alias=AliasChoices("LAURA_HANDLE_REGISTRY_CAPACITY", "HANDLE_REGISTRY_CAPACITY"))
+    handle_registry_error_rate: float = Field(0.001, validation_alias=AliasChoices("LAURA_HANDLE_REGISTRY_ERROR_RATE", "HANDLE_REGISTRY_ERROR_RATE"))
+    handle_registry_seed_lastn: int = Field(10000, validation_alias=AliasChoices("LAURA_HANDLE_REGISTRY_SEED_LASTN", "HANDLE_REGISTRY_SEED_LASTN"))
+
+    # Índice de handles en disco (mmap) compartido entre workers; "" = solo en memoria
+    handle_index_path: str = Field("data/userhandles.idx", validation_alias=AliasChoices("LAURA_HANDLE_INDEX_PATH", "HANDLE_INDEX_PATH"))
+    handle_index_save_interval_seconds: float = Field(5.0, validation_alias=AliasChoices("LAURA_HANDLE_INDEX_SAVE_INTERVAL_SECONDS", "HANDLE_INDEX_SAVE_INTERVAL_SECONDS"))
+    handle_index_reload_seconds: float = Field(2.0, validation_alias=AliasChoices("LAURA_HANDLE_INDEX_RELOAD_SECONDS", "HANDLE_INDEX_RELOAD_SECONDS"))
+
+    # Índice difuso de trigramas (nombre y handle) consultado antes que Zep en search_userhandles
+    userhandles_fuzzy_enabled: bool = Field(True, validation_alias=AliasChoices("LAURA_USERHANDLES_FUZZY_ENABLED", "USERHANDLES_FUZZY_ENABLED"))
+    userhandles_fuzzy_min_score: float = Field(0.6, validation_alias=AliasChoices("LAURA_USERHANDLES_FUZZY_MIN_SCORE", "USERHANDLES_FUZZY_MIN_SCORE"))
+    # Puntuación desde la que el registro local responde sin consultar Zep
+    userhandles_local_min_score: float = Field(0.95, validation_alias=AliasChoices("LAURA_USERHANDLES_LOCAL_MIN_SCORE", "USERHANDLES_LOCAL_MIN_SCORE"))
+
+    # Capa read-your-writes para graph.add hasta que Zep procese el episodio
+    pending_writes_enabled: bool = Field(True, validation_alias=AliasChoices("LAURA_PENDING_WRITES_ENABLED", "PENDING_WRITES_ENABLED"))
+    pending_writes_ttl_seconds: float = Field(120.0, validation_alias=AliasChoices("LAURA_PENDING_WRITES_TTL_SECONDS", "PENDING_WRITES_TTL_SECONDS"))
+    pending_writes_max_entries: int = Field(1000, validation_alias=AliasChoices("LAURA_PENDING_WRITES_MAX_ENTRIES", "PENDING_WRITES_MAX_ENTRIES"))
+    pending_writes_poll_seconds: float = Field(2.0, validation_alias=AliasChoices("LAURA_PENDING_WRITES_POLL_SECONDS", "PENDING_WRITES_POLL_SECONDS"))
+
+    # Índice local (SQLite) de metadatos de las escrituras; "" = solo en memoria
+    metadata_store_enabled: bool = Field(True, validation_alias=AliasChoices("LAURA_METADATA_STORE_ENABLED", "METADATA_STORE_ENABLED"))
+    metadata_store_path: str = Field("data/metadata.db", validation_alias=AliasChoices("LAURA_METADATA_STORE_PATH", "METADATA_STORE_PATH"))
+    filtered_search_max_candidates: int = Field(2000, validation_alias=AliasChoices("LAURA_FILTERED_SEARCH_MAX_CANDIDATES", "FILTERED_SEARCH_MAX_CANDIDATES"))
+
+    # Ejecución concurrente de lotes en internal_interface.py
+    internal_batch_max_workers: int = Field(4, validation_alias=AliasChoices("LAURA_INTERNAL_BATCH_MAX_WORKERS", "INTERNAL_BATCH_MAX_WORKERS"))
+    # Comandos del worker persistente en curso a la vez (internal_interface.py --worker)
+    internal_worker_max_workers: int = Field(4, validation_alias=AliasChoices("LAURA_INTERNAL_WORKER_MAX_WORKERS", "INTERNAL_WORKER_MAX_WORKERS"))
+
+    # Circuit breaker y presupuesto de reintentos para llamadas a Zep
+    breaker_failure_threshold: int = Field(5, validation_alias=AliasChoices("LAURA_BREAKER_FAILURE_THRESHOLD", "BREAKER_FAILURE_THRESHOLD"))
+    breaker_reset_timeout_seconds: float = Field(30.0, validation_alias=AliasChoices("LAURA_BREAKER_RESET_TIMEOUT_SECONDS", "BREAKER_RESET_TIMEOUT_SECONDS"))
+    breaker_half_open_max_calls: int = Field(1, validation_alias=AliasChoices("LAURA_BREAKER_HALF_OPEN_MAX_CALLS", "BREAKER_HALF_OPEN_MAX_CALLS"))
+    retry_budget_ratio: float = Field(0.2, validation_alias=AliasChoices("LAURA_RETRY_BUDGET_RATIO", "RETRY_BUDGET_RATIO"))
+    retry_budget_min_per_second: float = Field(1.0, validation_alias=AliasChoices("LAURA_RETRY_BUDGET_MIN_PER_SECOND", "RETRY_BUDGET_MIN_PER_SECOND"))
+    retry_max_delay_seconds: float = Field(4.0, validation_alias=AliasChoices("LAURA_RETRY_MAX_DELAY_SECONDS", "RETRY_MAX_DELAY_SECONDS"))
+
+    # Búsqueda federada (memoria pública + PulsePolitics + UserHandles)
+    federated_search_deadline_ms: float = Field(1500.0, validation_alias=AliasChoices("LAURA_FEDERATED_SEARCH_DEADLINE_MS", "FEDERATED_SEARCH_DEADLINE_MS"))
+    federated_search_max_workers: int = Field(8, validation_alias=AliasChoices("LAURA_FEDERATED_SEARCH_MAX_WORKERS", "FEDERATED_SEARCH_MAX_WORKERS"))
+
+    # Lote de operaciones por petición (/api/laura-memory/batch)
+    batch_max_operations: int = Field(16, validation_alias=AliasChoices("LAURA_BATCH_MAX_OPERATIONS", "BATCH_MAX_OPERATIONS"))
+    batch_max_workers: int = Field(8, validation_alias=AliasChoices("LAURA_BATCH_MAX_WORKERS", "BATCH_MAX_WORKERS"))
+
+    # Modo asíncrono de process-tool-result (202 + estado del trabajo)
+    ingest_jobs_max_workers: int = Field(4, validation_alias=AliasChoices("LAURA_INGEST_JOBS_MAX_WORKERS", "INGEST_JOBS_MAX_WORKERS"))
+    ingest_jobs_max_pending: int = Field(256, validation_alias=AliasChoices("LAURA_INGEST_JOBS_MAX_PENDING", "INGEST_JOBS_MAX_PENDING"))
+    ingest_jobs_ttl_seconds: float = Field(900.0, validation_alias=AliasChoices("LAURA_INGEST_JOBS_TTL_SECONDS", "INGEST_JOBS_TTL_SECONDS"))
+    ingest_jobs_max_jobs: int = Field(10000, validation_alias=AliasChoices("LAURA_INGEST_JOBS_MAX_JOBS", "INGEST_JOBS_MAX_JOBS"))
+    ingest_jobs_callback_timeout_seconds: float = Field(5.0, validation_alias=AliasChoices("LAURA_INGEST_JOBS_CALLBACK_TIMEOUT_SECONDS", "INGEST_JOBS_CALLBACK_TIMEOUT_SECONDS"))
+    # Hosts a los que se permite enviar callback_url, separados por comas ("api.ejemplo.com,.interno.ejemplo.com"); vacío = sin callbacks
+    ingest_jobs_callback_allowed_hosts: str = Field("", validation_alias=AliasChoices("LAURA_INGEST_JOBS_CALLBACK_ALLOWED_HOSTS", "INGEST_JOBS_CALLBACK_ALLOWED_HOSTS"))
+    # Estado de los trabajos compartido entre workers ("" = solo en memoria del proceso)
+    ingest_jobs_store_path: str = Field("data/ingest_jobs.db", validation_alias=AliasChoices("LAURA_INGEST_JOBS_STORE_PATH", "INGEST_JOBS_STORE_PATH"))
+
+    # Servidor de producción (gunicorn.conf.py)
+    server_bind: str = Field("0.0.0.0:5001", validation_alias=AliasChoices("LAURA_SERVER_BIND", "SERVER_BIND"))
+    server_workers: int = Field(2, validation_alias=AliasChoices("LAURA_SERVER_WORKERS", "SERVER_WORKERS"))
+    server_threads: int = Field(8, validation_alias=AliasChoices("LAURA_SERVER_THREADS", "SERVER_THREADS"))
+    server_timeout_seconds: int = Field(60, validation_alias=AliasChoices("LAURA_SERVER_TIMEOUT_SECONDS", "SERVER_TIMEOUT_SECONDS"))
+    server_graceful_timeout_seconds: int = Field(30, validation_alias=AliasChoices("LAURA_SERVER_GRACEFUL_TIMEOUT_SECONDS", "SERVER_GRACEFUL_TIMEOUT_SECONDS"))
+    server_keepalive_seconds: int = Field(5, validation_alias=AliasChoices("LAURA_SERVER_KEEPALIVE_SECONDS", "SERVER_KEEPALIVE_SECONDS"))
+
+    # Métricas de varios workers: directorio compartido donde cada proceso publica las suyas ("" = desactivado)
+    metrics_multiprocess_dir: str = Field("", validation_alias=AliasChoices("LAURA_METRICS_MULTIPROCESS_DIR", "METRICS_MULTIPROCESS_DIR"))
+    metrics_snapshot_interval_seconds: float = Field(5.0, validation_alias=AliasChoices("LAURA_METRICS_SNAPSHOT_INTERVAL_SECONDS", "METRICS_SNAPSHOT_INTERVAL_SECONDS"))
+
     model_config = {
         "env_file": ".env",
         "case_sensitive": False,
-        "extra": "ignore"
+        "extra": "ignore",
+        "populate_by_name": True
     }
     
     @field_validator("zep_api_key")
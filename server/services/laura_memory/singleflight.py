@@ -0,0 +1,153 @@
+"""
+Coalescencia de llamadas idénticas concurrentes ("single-flight").
+
+Mientras una llamada con una clave dada está en vuelo, las demás llamadas con
+la misma clave esperan su resultado (o su excepción) en lugar de repetirla.
+"""
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Single-flight para código síncrono (hilos).
+
+    ``do(key, fn)`` ejecuta ``fn`` una sola vez por clave en vuelo; los hilos
+    que llegan mientras tanto reciben el mismo resultado. Una vez terminada la
+    llamada la clave se libera, así que no actúa como caché.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.executed = 0
+        self.shared = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Ejecuta ``fn`` o espera a la llamada en vuelo con la misma clave.
+
+        Raises:
+            La excepción lanzada por ``fn`` (también a quienes esperaban).
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self.executed += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+            call.done.set()
+
+    def forget(self, predicate: Callable[[Hashable], bool]) -> int:
+        """
+        Desvincula las llamadas en vuelo cuyas claves cumplan ``predicate``.
+
+        Quienes ya esperan siguen recibiendo su resultado, pero las llamadas
+        nuevas inician una consulta propia (p. ej. tras una escritura).
+
+        Returns:
+            Número de claves desvinculadas.
+        """
+        with self._lock:
+            keys = [key for key in self._calls if predicate(key)]
+            for key in keys:
+                del self._calls[key]
+            return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "in_flight": len(self._calls),
+                "executed": self.executed,
+                "shared": self.shared
+            }
+
+
+class AsyncSingleFlight:
+    """
+    Single-flight para corrutinas.
+
+    La llamada compartida corre en su propia tarea: cancelar a cualquiera de
+    quienes esperan, incluido quien la inició, no la cancela para los demás.
+    Las llamadas solo se comparten dentro del mismo event loop.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Tuple[int, Hashable], "asyncio.Task[Any]"] = {}
+        self.executed = 0
+        self.shared = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Ejecuta ``fn`` o espera a la corrutina en vuelo con la misma clave.
+        """
+        loop = asyncio.get_running_loop()
+        loop_key = (id(loop), key)
+
+        task = self._calls.get(loop_key)
+        if task is not None and task.get_loop() is loop:
+            self.shared += 1
+        else:
+            task = loop.create_task(fn())
+            self._calls[loop_key] = task
+            self.executed += 1
+
+            def _done(finished: "asyncio.Task[Any]") -> None:
+                if self._calls.get(loop_key) is finished:
+                    del self._calls[loop_key]
+                # Evita "exception was never retrieved" si nadie seguía esperando
+                if not finished.cancelled():
+                    finished.exception()
+
+            task.add_done_callback(_done)
+
+        # shield: cancelar a quien espera no debe cancelar la llamada compartida
+        return await asyncio.shield(task)
+
+    def forget(self, predicate: Callable[[Hashable], bool]) -> int:
+        """
+        Desvincula las llamadas en vuelo cuyas claves cumplan ``predicate``.
+        """
+        # Puede llamarse desde otro hilo (escrituras síncronas): iterar sobre una copia
+        keys = [loop_key for loop_key in list(self._calls) if predicate(loop_key[1])]
+        for loop_key in keys:
+            self._calls.pop(loop_key, None)
+        return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._calls),
+            "executed": self.executed,
+            "shared": self.shared
+        }
@@ -2,13 +2,34 @@
 Tests unitarios para Laura Memory usando pytest y vcr.py.
 """
 
+import asyncio
+import json
+import threading
+import time
+
 import pytest
 import vcr
-from unittest.mock import patch, MagicMock
-from datetime import datetime
+from unittest.mock import patch, MagicMock, AsyncMock
+from datetime import datetime, timedelta
 
+import memory
+import memory_async
+from cache import SearchCache
+from singleflight import SingleFlight
+from metrics import Histogram, NEAR_DUPLICATES_SKIPPED, ZEP_REQUEST_DURATION, ZEP_RETRIES, DETECTOR_DECISIONS, registry as metrics_registry
+from resilience import CircuitBreaker, CircuitOpenError, RetryBudget, is_retryable
+from zep_cloud.core.api_error import ApiError
+from ingest_queue import WriteBehindQueue
+from text_index import InvertedIndex, TrigramIndex
+from handle_index import SharedHandleIndex, write_handle_index
+from handle_registry import BloomFilter, HandleRegistry, normalize_handle, parse_handle_record
+from metadata_store import MetadataStore
+from near_duplicates import MinHashLSH
+from pending_writes import PendingWrites
+from novelty import NoveltyModel
 from memory import add_public_memory, search_public_memory, get_memory_stats, clear_memory
-from detectors import is_new_user, is_new_term, is_relevant_fact, should_save_to_memory
+from memory import add_to_pulsepolitics, search_pulsepolitics, add_to_userhandles, search_userhandles
+from detectors import is_new_user, is_new_term, is_relevant_fact, should_save_to_memory, should_save_to_memory_batch
 from integration import LauraMemoryIntegration
 
 
@@ -166,6 +187,1309 @@ class TestMemoryCore:
         )
 
 
+class TestSettings:
+    """Tests para la lectura de variables de entorno LAURA_*."""
+    
+    def test_prefixed_env_vars_override_defaults(self, monkeypatch):
+        """Test que las variables documentadas (LAURA_*) cambien la configuración."""
+        from settings import LauraMemorySettings
+        monkeypatch.setenv('LAURA_WRITE_BEHIND_ENABLED', 'true')
+        monkeypatch.setenv('LAURA_SERVER_WORKERS', '5')
+        monkeypatch.setenv('LAURA_SESSION_ID', 'public/global')
+    
+        loaded = LauraMemorySettings()
+    
+        assert loaded.write_behind_enabled is True
+        assert loaded.server_workers == 5
+        assert loaded.session_id == 'public/global'
+    
+    def test_unprefixed_names_still_accepted(self, monkeypatch):
+        """Test que los nombres sin prefijo sigan funcionando (compatibilidad)."""
+        from settings import LauraMemorySettings
+        monkeypatch.setenv('SERVER_BIND', '127.0.0.1:6001')
+    
+        assert LauraMemorySettings().server_bind == '127.0.0.1:6001'
+        assert LauraMemorySettings(zep_api_key='k', server_threads=3).server_threads == 3
+
+
+class TestSearchCache:
+    """Tests para la caché LRU + TTL de búsquedas."""
+    
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        memory._search_cache.clear()
+        yield
+        memory._search_cache.clear()
+    
+    def test_cache_lru_eviction(self):
+        """Test que se expulse la entrada menos usada al superar el límite."""
+        cache = SearchCache(max_entries=2, default_ttl=60)
+        cache.set(("public", "a", 5), ("A",))
+        cache.set(("public", "b", 5), ("B",))
+        cache.get(("public", "a", 5))
+        cache.set(("public", "c", 5), ("C",))
+        
+        assert cache.get(("public", "b", 5)) is None
+        assert cache.get(("public", "a", 5)) == ("A",)
+        assert cache.stats()['evictions'] == 1
+    
+    def test_cache_ttl_expiration(self):
+        """Test que las entradas expiren según el TTL de su store."""
+        cache = SearchCache(ttls={"public": 10})
+        with patch('cache.time.monotonic', return_value=100.0):
+            cache.set(("public", "a", 5), ("A",))
+        with patch('cache.time.monotonic', return_value=109.0):
+            assert cache.get(("public", "a", 5)) == ("A",)
+        with patch('cache.time.monotonic', return_value=111.0):
+            assert cache.get(("public", "a", 5)) is None
+    
+    def test_cache_key_normalization(self):
+        """Test que la clave ignore mayúsculas y espacios extra."""
+        assert SearchCache.make_key("public", "  Bernardo   Arévalo ", 5) == \
+            SearchCache.make_key("public", "bernardo arévalo", 5)
+    
+    def test_repeated_search_hits_cache(self, mock_zep_client):
+        """Test que una búsqueda repetida no vuelva a llamar a Zep."""
+        mock_episode = MagicMock()
+        mock_episode.data = "El Congreso aprobó el presupuesto"
+        mock_zep_client.graph.search.return_value = MagicMock(episodes=[mock_episode])
+        
+        first = search_pulsepolitics("congreso")
+        second = search_pulsepolitics("Congreso")
+        
+        assert first == second == ["El Congreso aprobó el presupuesto"]
+        mock_zep_client.graph.search.assert_called_once()
+        assert memory.get_search_cache_stats()['hits'] == 1
+    
+    def test_write_invalidates_store(self, mock_zep_client):
+        """Test que escribir en un store invalide sus búsquedas cacheadas."""
+        mock_zep_client.graph.search.return_value = MagicMock(episodes=[])
+        
+        search_pulsepolitics("congreso")
+        add_to_pulsepolitics("El Congreso aprobó el presupuesto")
+        search_pulsepolitics("congreso")
+        
+        assert mock_zep_client.graph.search.call_count == 2
+    
+    def test_set_discards_results_from_previous_generation(self):
+        """Test que no se guarde un resultado obtenido antes de invalidar el store."""
+        cache = SearchCache(default_ttl=60)
+        generation = cache.generation("public")
+        cache.invalidate_store("public")
+        assert cache.set(("public", "a", 5), ("A",), generation) is False
+        assert cache.get(("public", "a", 5)) is None
+        assert cache.set(("public", "a", 5), ("A",), cache.generation("public")) is True
+        assert cache.stats()['discarded'] == 1
+    
+    def test_search_in_flight_during_write_is_not_cached(self, mock_zep_client):
+        """Test que una búsqueda iniciada antes de una escritura no deje en caché resultados previos."""
+        import threading
+        from concurrent.futures import ThreadPoolExecutor
+        
+        entered, release = threading.Event(), threading.Event()
+        results = iter(["old-1", "new-1"])
+        
+        def search(**kwargs):
+            episode = MagicMock()
+            episode.data = next(results)
+            if episode.data == "old-1":
+                entered.set()
+                release.wait(timeout=5)
+            return MagicMock(episodes=[episode])
+        
+        mock_zep_client.graph.search.side_effect = search
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            blocked = pool.submit(search_pulsepolitics, "congreso")
+            assert entered.wait(timeout=5)
+            assert add_to_pulsepolitics("El Congreso aprobó el presupuesto") is True
+            release.set()
+            assert "old-1" in blocked.result(timeout=5)
+        
+        assert "new-1" in search_pulsepolitics("congreso")
+        assert mock_zep_client.graph.search.call_count == 2
+    
+    def test_errors_are_not_cached(self, mock_zep_client):
+        """Test que un error de Zep no deje resultados vacíos en caché."""
+        mock_episode = MagicMock()
+        mock_episode.data = "Resultado"
+        mock_zep_client.graph.search.side_effect = [
+            Exception("timeout"), Exception("timeout"), Exception("timeout"), Exception("timeout"),
+            MagicMock(episodes=[mock_episode])
+        ]
+        
+        with patch('memory.time.sleep'):
+            assert search_pulsepolitics("congreso") == []
+            assert search_pulsepolitics("congreso") == ["Resultado"]
+
+
+class TestSingleFlight:
+    """Tests para la coalescencia de búsquedas idénticas concurrentes."""
+    
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        memory._search_cache.clear()
+        yield
+        memory._search_cache.clear()
+    
+    def test_concurrent_identical_calls_share_one_execution(self):
+        """Test que N llamadas concurrentes con la misma clave ejecuten fn una vez."""
+        import threading
+        from concurrent.futures import ThreadPoolExecutor
+        
+        flights = SingleFlight()
+        release = threading.Event()
+        calls = []
+        
+        def fetch():
+            calls.append(1)
+            release.wait(timeout=5)
+            return ("resultado",)
+        
+        with ThreadPoolExecutor(max_workers=5) as pool:
+            futures = [pool.submit(flights.do, "k", fetch) for _ in range(5)]
+            while flights.stats()['shared'] < 4:
+                time.sleep(0.01)
+            release.set()
+            results = [f.result(timeout=5) for f in futures]
+        
+        assert calls == [1]
+        assert results == [("resultado",)] * 5
+        assert flights.stats() == {"in_flight": 0, "executed": 1, "shared": 4}
+    
+    def test_errors_are_shared_and_key_is_released(self):
+        """Test que el error se propague y la siguiente llamada vuelva a ejecutar."""
+        flights = SingleFlight()
+        with pytest.raises(RuntimeError):
+            flights.do("k", MagicMock(side_effect=RuntimeError("zep caído")))
+        assert flights.do("k", lambda: 42) == 42
+    
+    def test_concurrent_searches_hit_zep_once(self, mock_zep_client):
+        """Test que búsquedas idénticas concurrentes compartan una llamada a graph.search."""
+        import threading
+        from concurrent.futures import ThreadPoolExecutor
+        
+        release = threading.Event()
+        mock_episode = MagicMock()
+        mock_episode.data = "El Congreso aprobó el presupuesto"
+        
+        def slow_search(**kwargs):
+            release.wait(timeout=5)
+            return MagicMock(episodes=[mock_episode])
+        
+        mock_zep_client.graph.search.side_effect = slow_search
+        shared_before = memory._search_flights.stats()['shared']
+        
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            futures = [pool.submit(search_pulsepolitics, q) for q in ["congreso", "Congreso", " congreso ", "CONGRESO"]]
+            while memory._search_flights.stats()['shared'] - shared_before < 3:
+                time.sleep(0.01)
+            release.set()
+            results = [f.result(timeout=5) for f in futures]
+        
+        assert results == [["El Congreso aprobó el presupuesto"]] * 4
+        mock_zep_client.graph.search.assert_called_once()
+    
+    def test_async_concurrent_searches_hit_zep_once(self):
+        """Test que la API asíncrona también coalesca búsquedas idénticas."""
+        mock_episode = MagicMock()
+        mock_episode.data = "El Congreso aprobó el presupuesto"
+        client = MagicMock()
+        
+        async def slow_search(**kwargs):
+            await asyncio.sleep(0.05)
+            return MagicMock(episodes=[mock_episode])
+        
+        client.graph.search = AsyncMock(side_effect=slow_search)
+        
+        async def run():
+            with patch('memory_async._aget_zep_client', AsyncMock(return_value=client)):
+                return await asyncio.gather(*[memory_async.asearch_pulsepolitics("congreso") for _ in range(3)])
+        
+        results = asyncio.run(run())
+        assert results == [["El Congreso aprobó el presupuesto"]] * 3
+        client.graph.search.assert_awaited_once()
+    
+    def test_async_leader_cancellation_does_not_cancel_followers(self):
+        """Test que cancelar a quien inició la llamada no cancele a quienes esperan."""
+        from singleflight import AsyncSingleFlight
+        flights = AsyncSingleFlight()
+        calls = []
+        
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "resultado"
+        
+        async def run():
+            leader = asyncio.ensure_future(flights.do("clave", fetch))
+            await asyncio.sleep(0)
+            follower = asyncio.ensure_future(flights.do("clave", fetch))
+            await asyncio.sleep(0)
+            leader.cancel()
+            result = await follower
+            return leader.cancelled(), result
+        
+        assert asyncio.run(run()) == (True, "resultado")
+        assert calls == [1]
+        assert flights.stats() == {"in_flight": 0, "executed": 1, "shared": 1}
+
+
+class TestResilience:
+    """Tests para el circuit breaker y el presupuesto de reintentos."""
+    
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        memory._search_cache.clear()
+        yield
+        memory._search_cache.clear()
+        memory.reset_circuit_breakers()
+    
+    def test_breaker_opens_and_half_opens(self):
+        """Test que el breaker se abra tras N fallos y deje pasar una prueba al expirar."""
+        breaker = CircuitBreaker("graph.search", failure_threshold=2, reset_timeout=10)
+        with patch('resilience.time.monotonic', return_value=100.0):
+            breaker.record_failure()
+            breaker.record_failure()
+            assert breaker.state == CircuitBreaker.OPEN
+            with pytest.raises(CircuitOpenError):
+                breaker.before_call()
+        with patch('resilience.time.monotonic', return_value=111.0):
+            breaker.before_call()
+            with pytest.raises(CircuitOpenError):
+                breaker.before_call()
+            breaker.record_success()
+            assert breaker.state == CircuitBreaker.CLOSED
+    
+    def test_client_errors_are_not_retried(self, mock_zep_client):
+        """Test que un 4xx de Zep no se reintente ni cuente como fallo del breaker."""
+        mock_zep_client.graph.search.side_effect = ApiError(status_code=400, body="bad request")
+        
+        with patch('memory.time.sleep') as mock_sleep:
+            assert search_pulsepolitics("congreso") == []
+        
+        mock_zep_client.graph.search.assert_called_once()
+        mock_sleep.assert_not_called()
+        assert memory.get_resilience_stats()['circuit_breakers']['graph.search']['consecutive_failures'] == 0
+        assert is_retryable(ApiError(status_code=503, body=None))
+    
+    def test_open_circuit_fails_fast_and_serves_stale_cache(self, mock_zep_client):
+        """Test que con el circuito abierto no se llame a Zep y se sirva la caché expirada."""
+        mock_episode = MagicMock()
+        mock_episode.data = "El Congreso aprobó el presupuesto"
+        mock_zep_client.graph.search.return_value = MagicMock(episodes=[mock_episode])
+        
+        assert search_pulsepolitics("congreso") == ["El Congreso aprobó el presupuesto"]
+        
+        # Expirar la entrada cacheada y abrir el circuito
+        for key, (_, value) in list(memory._search_cache._entries.items()):
+            memory._search_cache._entries[key] = (0.0, value)
+        breaker = memory._get_breaker("graph.search")
+        for _ in range(breaker.failure_threshold):
+            breaker.record_failure()
+        
+        assert search_pulsepolitics("congreso") == ["El Congreso aprobó el presupuesto"]
+        assert search_pulsepolitics("otra consulta") == []
+        
+        mock_zep_client.graph.search.assert_called_once()
+        assert memory.get_search_cache_stats()['stale_hits'] == 1
+    
+    def test_retry_budget_limits_retries(self, mock_zep_client):
+        """Test que sin presupuesto de reintentos se falle tras el primer intento."""
+        mock_zep_client.graph.search.side_effect = Exception("timeout")
+        
+        with patch.object(memory, '_retry_budget', RetryBudget(ratio=0.0, min_per_second=0.0, max_tokens=1.0)):
+            with patch('memory.time.sleep'):
+                search_pulsepolitics("congreso")
+                search_pulsepolitics("presupuesto")
+        
+        # Primer búsqueda: 1 intento + 1 reintento; segunda: sin presupuesto
+        assert mock_zep_client.graph.search.call_count == 3
+
+
+class TestMetrics:
+    """Tests para las métricas expuestas en /metrics."""
+    
+    def test_histogram_renders_cumulative_buckets(self):
+        """Test que el histograma se exponga con buckets acumulados, _sum y _count."""
+        hist = Histogram("test_latency_seconds", "Latencia de prueba.", ("operation",), buckets=(0.1, 1.0))
+        hist.observe(0.05, operation="graph.search")
+        hist.observe(0.5, operation="graph.search")
+        hist.observe(3.0, operation="graph.search")
+        
+        lines = hist.render()
+        assert '# TYPE test_latency_seconds histogram' in lines
+        assert 'test_latency_seconds_bucket{operation="graph.search",le="0.1"} 1' in lines
+        assert 'test_latency_seconds_bucket{operation="graph.search",le="1"} 2' in lines
+        assert 'test_latency_seconds_bucket{operation="graph.search",le="+Inf"} 3' in lines
+        assert 'test_latency_seconds_count{operation="graph.search"} 3' in lines
+    
+    def test_zep_calls_and_retries_are_recorded(self, mock_zep_client):
+        """Test que cada intento a Zep se mida y los reintentos se cuenten."""
+        memory._search_cache.clear()
+        mock_zep_client.graph.search.side_effect = [Exception("timeout"), MagicMock(episodes=[])]
+        errors_before = ZEP_REQUEST_DURATION.count(operation="graph.search", outcome="error")
+        success_before = ZEP_REQUEST_DURATION.count(operation="graph.search", outcome="success")
+        retries_before = ZEP_RETRIES.value(operation="graph.search")
+        
+        with patch('memory.time.sleep'):
+            search_pulsepolitics("metricas")
+        
+        assert ZEP_REQUEST_DURATION.count(operation="graph.search", outcome="error") == errors_before + 1
+        assert ZEP_REQUEST_DURATION.count(operation="graph.search", outcome="success") == success_before + 1
+        assert ZEP_RETRIES.value(operation="graph.search") == retries_before + 1
+    
+    def test_detector_decisions_are_counted(self):
+        """Test que should_save_to_memory cuente sus decisiones."""
+        before = DETECTOR_DECISIONS.value(decision="skip", reason="too_short")
+        should_save_to_memory("corto")
+        assert DETECTOR_DECISIONS.value(decision="skip", reason="too_short") == before + 1
+    
+    def test_metrics_endpoint_exposes_routes_and_gauges(self):
+        """Test que /metrics incluya contadores por ruta y gauges de caché y cola."""
+        from server import app
+        client = app.test_client()
+        
+        assert client.get('/health').status_code == 200
+        response = client.get('/metrics')
+        body = response.get_data(as_text=True)
+        
+        assert response.status_code == 200
+        assert response.content_type.startswith('text/plain; version=0.0.4')
+        assert 'laura_memory_http_requests_total{route="/health",method="GET",status="200"}' in body
+        assert 'laura_memory_http_request_duration_seconds_bucket{route="/health",method="GET",le="+Inf"}' in body
+        assert 'laura_memory_search_cache_entries ' in body
+        assert 'laura_memory_write_queue_pending ' in body
+    
+    def test_cumulative_values_are_exported_as_counters(self):
+        """Test que los acumulados de caché, coalescencia y cola se expongan como contadores _total."""
+        body = metrics_registry.render()
+        
+        for name in ("laura_memory_search_cache_lookups_total", "laura_memory_search_coalesced_total",
+                     "laura_memory_write_queue_items_total"):
+            assert f"# TYPE {name} counter" in body
+        assert 'laura_memory_search_cache_lookups_total{result="hits"}' in body
+        assert "# TYPE laura_memory_search_cache_lookups gauge" not in body
+    
+    def test_multiprocess_render_merges_live_workers(self, tmp_path):
+        """Test que /metrics agregue las series de los workers vivos con la etiqueta worker."""
+        import os
+        import subprocess
+        import sys
+        from metrics import Counter, Registry
+        
+        local = Registry()
+        requests_total = local.register(Counter("test_requests_total", "Peticiones de prueba.", ("route",)))
+        requests_total.inc(route="/health")
+        
+        # Otro worker vivo (el proceso padre) y uno que ya terminó
+        other = os.getppid()
+        (tmp_path / f"{other}.json").write_text(json.dumps({"test_requests_total": {
+            "help": "Peticiones de prueba.", "type": "counter",
+            "samples": [f'test_requests_total{{route="/health",worker="{other}"}} 4']
+        }}))
+        finished = subprocess.Popen([sys.executable, "-c", "pass"])
+        finished.wait()
+        dead_file = tmp_path / f"{finished.pid}.json"
+        dead_file.write_text(json.dumps({"test_requests_total": {
+            "help": "Peticiones de prueba.", "type": "counter", "samples": ["test_requests_total 99"]
+        }}))
+        
+        local.start_multiprocess(str(tmp_path), interval=60)
+        try:
+            lines = local.render().splitlines()
+        finally:
+            local.stop_multiprocess()
+        
+        assert lines.count("# TYPE test_requests_total counter") == 1
+        assert f'test_requests_total{{route="/health",worker="{os.getpid()}"}} 1' in lines
+        assert f'test_requests_total{{route="/health",worker="{other}"}} 4' in lines
+        assert "test_requests_total 99" not in lines
+        assert not dead_file.exists()
+        assert not (tmp_path / f"{os.getpid()}.json").exists()
+
+
+class TestWriteBehindQueue:
+    """Tests para la cola write-behind de memoria pública."""
+    
+    def test_batches_by_size_and_session(self):
+        """Test que los mensajes se agrupen por sesión en lotes de tamaño máximo."""
+        sent = []
+        wbq = WriteBehindQueue(lambda key, batch: sent.append((key, list(batch))),
+                               max_batch_size=2, flush_interval_ms=10_000)
+        
+        wbq.put("s1", "a")
+        wbq.put("s2", "x")
+        wbq.put("s1", "b")
+        assert wbq.flush(timeout=5)
+        
+        assert ("s1", ["a", "b"]) in sent
+        assert ("s2", ["x"]) in sent
+        assert wbq.stats()['batches_sent'] == 2
+    
+    def test_flushes_after_interval(self):
+        """Test que un lote incompleto se envíe al cumplirse el intervalo."""
+        import threading
+        done = threading.Event()
+        wbq = WriteBehindQueue(lambda key, batch: done.set(), max_batch_size=100, flush_interval_ms=20)
+        
+        wbq.put("s1", "a")
+        
+        assert done.wait(timeout=5)
+    
+    def test_backpressure_when_full(self):
+        """Test que put lance queue.Full cuando no hay espacio."""
+        import queue
+        import threading
+        release = threading.Event()
+        wbq = WriteBehindQueue(lambda key, batch: release.wait(5), max_batch_size=1,
+                               flush_interval_ms=0, max_pending=1)
+        
+        wbq.put("s1", "a")
+        with pytest.raises(queue.Full):
+            wbq.put("s1", "b", timeout=0.05)
+        release.set()
+        assert wbq.close(timeout=5)
+    
+    def test_add_public_memory_enqueues_when_enabled(self, mock_zep_client):
+        """Test que add_public_memory envíe en un solo memory.add por lote."""
+        with patch.object(memory.settings, 'write_behind_enabled', True), \
+                patch.object(memory, '_public_write_queue', None):
+            add_public_memory("El Congreso aprobó la Ley X")
+            add_public_memory("El Congreso rechazó la Ley Y")
+            assert memory.flush_public_memory_queue(timeout=5)
+        
+        mock_zep_client.memory.add.assert_called_once()
+        assert len(mock_zep_client.memory.add.call_args[1]['messages']) == 2
+    
+    def test_failed_batch_is_retried_with_backoff(self):
+        """Test que un lote fallido se reencole y se envíe al recuperarse Zep."""
+        calls = []
+    
+        def flaky(key, batch):
+            calls.append(list(batch))
+            if len(calls) < 3:
+                raise ConnectionError("Zep no responde")
+    
+        wbq = WriteBehindQueue(flaky, max_batch_size=10, flush_interval_ms=0,
+                               retry_base_delay=0.01, retry_max_delay=0.02)
+        wbq.put("s1", "a")
+        assert wbq.flush(timeout=5)
+    
+        stats = wbq.stats()
+        assert calls == [["a"]] * 3
+        assert stats['items_sent'] == 1 and stats['items_retried'] == 2
+        assert stats['dead_letter_items'] == 0
+    
+    def test_exhausted_batches_go_to_dead_letter(self):
+        """Test que sin reintentos disponibles el lote quede en dead-letter y no se pierda en silencio."""
+        def failing(key, batch):
+            raise ConnectionError("Zep caído")
+    
+        wbq = WriteBehindQueue(failing, max_batch_size=10, flush_interval_ms=0, max_retries=2,
+                               retry_base_delay=0.01, retry_max_delay=0.02,
+                               retry_allowed=lambda: True, dead_letter_max=2)
+        wbq.put("s1", "a")
+        assert wbq.flush(timeout=5)
+        wbq.put("s1", "b")
+        wbq.put("s1", "c")
+        assert wbq.flush(timeout=5)
+    
+        letters = wbq.dead_letters()
+        assert [entry["items"] for entry in letters] == [["b", "c"]]
+        assert letters[0]["attempts"] == 3 and letters[0]["error"] == "Zep caído"
+        stats = wbq.stats()
+        assert stats['items_failed'] == 3 and stats['items_dropped'] == 1
+        assert stats['dead_letter_items'] == 2
+    
+    def test_denied_retry_budget_skips_retries(self):
+        """Test que sin presupuesto de reintentos el lote vaya directo a dead-letter."""
+        wbq = WriteBehindQueue(lambda key, batch: 1 / 0, flush_interval_ms=0, retry_allowed=lambda: False)
+        wbq.put("s1", "a")
+        assert wbq.flush(timeout=5)
+        assert wbq.stats()['items_retried'] == 0
+        assert wbq.dead_letters()[0]["items"] == ["a"]
+    
+    def test_dead_letters_reported_in_stats_and_readiness(self, mock_zep_client):
+        """Test que los mensajes perdidos aparezcan en queue-stats y en /ready."""
+        import server
+        mock_zep_client.memory.add.side_effect = ValueError("payload inválido")
+        with patch.object(memory.settings, 'write_behind_enabled', True), \
+                patch.object(memory, '_public_write_queue', None), \
+                patch('memory.time.sleep'):
+            add_public_memory("El Congreso aprobó la Ley X")
+            memory.flush_public_memory_queue(timeout=5)
+    
+            stats = memory.get_write_queue_stats()
+            assert stats['dead_letters'][0]['contents'] == ["El Congreso aprobó la Ley X"]
+            with patch('memory.warm_up'):
+                body = server.app.test_client().get('/ready').get_json()
+        assert body['write_behind']['dead_letter_items'] == 1
+        server._ready.clear()
+
+
+class TestPublicIndex:
+    """Tests para el índice invertido local de memoria pública."""
+    
+    @pytest.fixture(autouse=True)
+    def reset_state(self):
+        memory._search_cache.clear()
+        memory._public_index.clear()
+        yield
+        memory._search_cache.clear()
+        memory._public_index.clear()
+    
+    def test_index_matches_all_tokens_and_phrase(self):
+        """Test que el índice exija todos los tokens y la frase completa."""
+        index = InvertedIndex()
+        index.add("El Congreso aprobó la Ley X")
+        index.add("La ley fue aprobada por el congreso")
+        
+        assert index.search("congreso aprobó") == ["El Congreso aprobó la Ley X"]
+        assert len(index.search("congreso")) == 2
+        assert index.search("senado") == []
+    
+    def test_index_evicts_oldest_documents(self):
+        """Test que el índice respete el límite de documentos."""
+        index = InvertedIndex(max_documents=2)
+        for content in ["uno congreso", "dos congreso", "tres congreso"]:
+            index.add(content)
+        
+        assert index.search("congreso", limit=5) == ["dos congreso", "tres congreso"]
+    
+    def test_fallback_loads_session_once(self, mock_zep_client):
+        """Test que el fallback descargue la sesión una sola vez."""
+        mock_message = MagicMock()
+        mock_message.content = "El Congreso aprobó la Ley X"
+        mock_zep_client.memory.search.return_value = []
+        mock_zep_client.memory.get.return_value = MagicMock(messages=[mock_message])
+        
+        assert search_public_memory("congreso") == ["El Congreso aprobó la Ley X"]
+        assert search_public_memory("ley x") == ["El Congreso aprobó la Ley X"]
+        
+        mock_zep_client.memory.get.assert_called_once()
+    
+    def test_add_public_memory_updates_index(self, mock_zep_client):
+        """Test que las escrituras se reflejen en el índice local."""
+        memory._public_index.load([])
+        mock_zep_client.memory.search.return_value = []
+        
+        add_public_memory("Nuevo decreto de emergencia")
+        
+        assert search_public_memory("decreto") == ["Nuevo decreto de emergencia"]
+        mock_zep_client.memory.get.assert_not_called()
+
+
+class TestNoveltyModel:
+    """Tests para el modelo local de novedad."""
+    
+    def test_score_reflects_seen_shingles(self):
+        """Test que la novedad baje con el contenido ya registrado."""
+        model = NoveltyModel(shingle_size=3)
+        story = "el congreso aprobó el presupuesto general de la nación"
+        
+        assert model.score(story) == 1.0
+        model.add(story)
+        assert model.score(story.upper()) == 0.0
+        partial = model.score("el congreso aprobó el presupuesto con cambios inesperados hoy")
+        assert 0.0 < partial < 1.0
+    
+    def test_model_is_bounded(self):
+        """Test que el modelo descarte los shingles más antiguos al superar el límite."""
+        model = NoveltyModel(shingle_size=1, max_shingles=3)
+        for word in ("uno", "dos", "tres", "cuatro"):
+            model.add(word)
+        
+        assert model.stats()['shingles'] == 3
+        assert model.score("uno") == 1.0
+        assert model.score("cuatro") == 0.0
+    
+    def test_confirmed_writes_update_the_model(self, mock_zep_client):
+        """Test que add_public_memory alimente el modelo tras escribir en Zep."""
+        memory._public_novelty.clear()
+        content = "Nueva ley de transparencia aprobada por el Congreso"
+        
+        add_public_memory(content)
+        
+        assert memory.score_public_novelty(content) == 0.0
+        memory._public_novelty.clear()
+    
+    def test_warm_up_seeds_model_from_session(self, mock_zep_client):
+        """Test que al arrancar el modelo se siembre con la sesión pública (cada worker empieza vacío)."""
+        story = "El Congreso aprobó el presupuesto general de la nación para el próximo año"
+        message = MagicMock()
+        message.content = story
+        mock_zep_client.memory.get.return_value = MagicMock(messages=[message])
+        memory._public_index.clear()
+        memory._public_novelty.clear()
+        
+        try:
+            memory.warm_up()
+            assert memory.score_public_novelty(story) == 0.0
+        finally:
+            memory._public_index.clear()
+            memory._public_novelty.clear()
+        
+        mock_zep_client.memory.get.side_effect = Exception("Zep no responde")
+        memory.warm_up()
+
+
+class TestNearDuplicates:
+    """Tests para la supresión de casi-duplicados con MinHash/LSH."""
+    
+    STORY = ("El Congreso de Guatemala aprobó este martes el presupuesto general "
+             "de ingresos y egresos del Estado para el próximo año fiscal")
+    
+    def test_detects_rewording_but_not_unrelated(self):
+        """Test que una redacción casi igual se detecte y un texto distinto no."""
+        index = MinHashLSH(threshold=0.7)
+        index.add(self.STORY)
+        
+        reworded = self.STORY.replace("este martes", "el martes") + "."
+        unrelated = "El Tribunal Supremo Electoral publicó el calendario de las elecciones municipales"
+        
+        assert index.find(reworded) >= 0.7
+        assert index.find(unrelated) is None
+        assert index.stats()['duplicates'] == 1
+    
+    def test_signatures_are_bounded(self):
+        """Test que el boceto reemplace las firmas más antiguas al llenarse."""
+        index = MinHashLSH(max_signatures=2)
+        first, second, third = ("uno dos tres cuatro", "cinco seis siete ocho", "nueve diez once doce")
+        for text in (first, second, third):
+            index.add(text)
+        
+        assert len(index) == 2
+        assert index.find(first) is None
+        assert index.find(third) == 1.0
+    
+    def test_sketch_persists_atomically(self, tmp_path):
+        """Test que el boceto se guarde en disco y se recargue en otra instancia."""
+        path = str(tmp_path / "pulsepolitics.npz")
+        index = MinHashLSH(path=path)
+        index.add(self.STORY)
+        
+        assert index.save() is True
+        assert index.save() is False  # Sin cambios pendientes
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["pulsepolitics.npz", "pulsepolitics.npz.lock"]
+        
+        reloaded = MinHashLSH(path=path)
+        assert len(reloaded) == 1
+        assert reloaded.find(self.STORY) == 1.0
+        
+        # Un boceto con otros parámetros se descarta
+        assert len(MinHashLSH(path=path, num_perm=64, bands=16)) == 0
+    
+    def test_add_to_pulsepolitics_skips_near_duplicates(self, mock_zep_client):
+        """Test que add_to_pulsepolitics no pague dos veces la ingesta de la misma noticia."""
+        skipped_before = NEAR_DUPLICATES_SKIPPED.value(group="pulsepolitics")
+        
+        assert add_to_pulsepolitics(self.STORY) is True
+        assert add_to_pulsepolitics(self.STORY.upper() + ", informaron fuentes") is False
+        
+        mock_zep_client.graph.add.assert_called_once()
+        assert NEAR_DUPLICATES_SKIPPED.value(group="pulsepolitics") == skipped_before + 1
+        assert memory.get_near_duplicate_stats()['groups']['pulsepolitics']['signatures'] == 1
+    
+    def test_save_merges_signatures_from_other_workers(self, tmp_path):
+        """Test que un worker al guardar no pise las firmas que otro guardó en el mismo archivo."""
+        path = str(tmp_path / "pulsepolitics.npz")
+        other = "El Tribunal Supremo Electoral publicó el calendario de las elecciones municipales"
+        first, second = MinHashLSH(path=path), MinHashLSH(path=path)
+        first.add(self.STORY)
+        second.add(other)
+        
+        assert first.save() is True
+        assert second.save() is True
+        
+        reloaded = MinHashLSH(path=path)
+        assert len(reloaded) == 2
+        assert reloaded.find(self.STORY) == 1.0 and reloaded.find(other) == 1.0
+        # El worker que guardó último también conoce ya las firmas del otro
+        assert second.find(self.STORY) == 1.0
+    
+    def test_released_signature_is_not_persisted(self, tmp_path):
+        """Test que una firma liberada (escritura fallida) no vuelva a aparecer al recargar."""
+        path = str(tmp_path / "pulsepolitics.npz")
+        index = MinHashLSH(path=path)
+        assert index.claim(self.STORY)[0] is None
+        similarity, signature = index.claim("El Tribunal Supremo Electoral publicó el calendario")
+        assert similarity is None
+        assert index.claim(self.STORY) == (1.0, None)
+        
+        assert index.release(signature) is True
+        assert index.find("El Tribunal Supremo Electoral publicó el calendario") is None
+        index.save()
+        assert len(MinHashLSH(path=path)) == 1
+    
+    def test_concurrent_near_duplicates_are_written_once(self, mock_zep_client):
+        """Test que dos casi-duplicados enviados a la vez no pasen ambos la comprobación."""
+        from concurrent.futures import ThreadPoolExecutor
+        entered, release = threading.Event(), threading.Event()
+        
+        def slow_add(**kwargs):
+            entered.set()
+            release.wait(timeout=5)
+            return MagicMock()
+        
+        mock_zep_client.graph.add.side_effect = slow_add
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            first = pool.submit(add_to_pulsepolitics, self.STORY)
+            assert entered.wait(timeout=5)
+            assert add_to_pulsepolitics(self.STORY.upper() + ", informaron fuentes") is False
+            release.set()
+            assert first.result(timeout=5) is True
+        
+        mock_zep_client.graph.add.assert_called_once()
+    
+    def test_failed_write_does_not_record_signature(self, mock_zep_client):
+        """Test que un graph.add fallido no marque el contenido como ya enviado."""
+        mock_zep_client.graph.add.side_effect = [ValueError("fallo"), MagicMock()]
+        
+        assert add_to_pulsepolitics(self.STORY) is False
+        assert add_to_pulsepolitics(self.STORY) is True
+        assert mock_zep_client.graph.add.call_count == 2
+
+
+class TestHandleRegistry:
+    """Tests para el registro local de handles de UserHandles."""
+    
+    def test_normalize_handle(self):
+        """Test que las claves ignoren @, mayúsculas y formas Unicode."""
+        assert normalize_handle("@JuanPerez_GT") == "juanperez_gt"
+        assert normalize_handle(" ＠ＪｕａｎＰｅｒｅｚ_GT ") == "juanperez_gt"
+    
+    def test_parse_both_record_formats(self):
+        """Test que se reconozcan los formatos de integration e internal_interface."""
+        assert parse_handle_record("el usuario es @juanperez_gt") == {"handle": "juanperez_gt"}
+        assert parse_handle_record("Usuario: Juan Pérez (@juanperez_gt) - Diputado del Congreso") == {
+            "handle": "juanperez_gt", "full_name": "Juan Pérez", "description": "Diputado del Congreso"
+        }
+        assert parse_handle_record("Usuario: Juan Pérez (@juanperez_gt)") == {
+            "handle": "juanperez_gt", "full_name": "Juan Pérez"
+        }
+        assert parse_handle_record("El Congreso aprobó el presupuesto") is None
+    
+    def test_bloom_filter_has_no_false_negatives(self):
+        """Test que el filtro de Bloom nunca descarte una clave añadida."""
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        keys = [f"usuario_{i}" for i in range(1000)]
+        for key in keys:
+            bloom.add(key)
+        
+        assert all(key in bloom for key in keys)
+        false_positives = sum(1 for i in range(1000) if f"otro_{i}" in bloom)
+        assert false_positives < 50
+    
+    def test_upsert_only_changes_with_new_information(self):
+        """Test que upsert complete la ficha y se pueda revertir."""
+        registry = HandleRegistry(capacity=100)
+        
+        assert registry.upsert({"handle": "juanperez_gt"}) == (True, None)
+        assert registry.upsert({"handle": "JuanPerez_GT"})[0] is False
+        changed, previous = registry.upsert({"handle": "juanperez_gt", "full_name": "Juan Pérez"})
+        assert changed is True
+        assert registry.get("@JUANPEREZ_GT")["full_name"] == "Juan Pérez"
+        
+        registry.restore("juanperez_gt", previous)
+        assert "full_name" not in registry.get("juanperez_gt")
+        assert len(registry) == 1
+    
+    def test_add_to_userhandles_dedups_locally(self, mock_zep_client):
+        """Test que add_to_userhandles no busque en Zep y deduplique ambos formatos."""
+        mock_zep_client.graph.episode.get_by_group_id.return_value = MagicMock(episodes=[])
+        metadata = {"twitter_username": "juanperez_gt", "full_name": "Juan Pérez", "category": "politico"}
+        
+        assert add_to_userhandles("el usuario es @juanperez_gt", dict(metadata)) is True
+        assert add_to_userhandles("el usuario es @JuanPerez_GT", {"twitter_username": "JuanPerez_GT"}) is False
+        # El formato de internal_interface aporta descripción: se actualiza la ficha
+        assert add_to_userhandles("Usuario: Juan Pérez (@juanperez_gt) - Diputado", dict(metadata)) is True
+        assert add_to_userhandles("Usuario: Juan Pérez (@juanperez_gt) - Diputado", dict(metadata)) is False
+        
+        assert mock_zep_client.graph.add.call_count == 2
+        mock_zep_client.graph.search.assert_not_called()
+        mock_zep_client.graph.episode.get_by_group_id.assert_called_once()
+    
+    def test_registry_is_seeded_from_existing_episodes(self, mock_zep_client):
+        """Test que los handles ya guardados en Zep se reconozcan tras un reinicio."""
+        mock_zep_client.graph.episode.get_by_group_id.return_value = MagicMock(episodes=[
+            MagicMock(content="Usuario: Juan Pérez (@juanperez_gt)"),
+            MagicMock(content="el usuario es @congresogt")
+        ])
+        
+        assert add_to_userhandles("el usuario es @CongresoGT") is False
+        mock_zep_client.graph.add.assert_not_called()
+        assert memory.get_handle_registry_stats()['handles'] == 2
+    
+    def test_failed_write_is_reverted(self, mock_zep_client):
+        """Test que un graph.add fallido no deje el handle marcado como existente."""
+        mock_zep_client.graph.episode.get_by_group_id.return_value = MagicMock(episodes=[])
+        mock_zep_client.graph.add.side_effect = [ValueError("fallo"), MagicMock()]
+        
+        assert add_to_userhandles("el usuario es @juanperez_gt") is False
+        assert add_to_userhandles("el usuario es @juanperez_gt") is True
+    
+    def test_trigram_index_tolerates_accents_and_typos(self):
+        """Test que el índice de trigramas ordene por parecido."""
+        index = TrigramIndex()
+        index.set("barevalo", ["Bernardo Arévalo", "barevalo"])
+        index.set("marevalo", ["Mario Arévalo", "marevalo"])
+        index.set("sandratorres", ["Sandra Torres", "sandratorres"])
+        
+        assert index.search("bernardo arevalo")[0] == ("barevalo", 1.0)
+        assert [key for key, _ in index.search("Bernardo Arevlo", min_score=0.6)] == ["barevalo"]
+        assert {key for key, _ in index.search("Arévalo", min_score=0.6)} == {"barevalo", "marevalo"}
+        assert index.search("presidente del congreso", min_score=0.6) == []
+        
+        index.remove("barevalo")
+        assert [key for key, _ in index.search("bernardo arevalo", min_score=0.6)] == []
+    
+    def test_search_userhandles_answers_locally(self, mock_zep_client):
+        """Test que search_userhandles resuelva nombres conocidos sin graph.search."""
+        mock_zep_client.graph.episode.get_by_group_id.return_value = MagicMock(episodes=[
+            MagicMock(content="Usuario: Bernardo Arévalo (@BArevalodeLeon) - Presidente")
+        ])
+        add_to_userhandles("el usuario es @congresogt", {"twitter_username": "congresogt", "full_name": "Congreso de Guatemala"})
+        
+        assert search_userhandles("Bernardo Arevalo") == ["Usuario: Bernardo Arévalo (@BArevalodeLeon) - Presidente"]
+        assert search_userhandles("@congresogt") == ["Usuario: Congreso de Guatemala (@congresogt)"]
+        mock_zep_client.graph.search.assert_not_called()
+        
+        # Sin respuesta confiable se consulta Zep
+        mock_zep_client.graph.search.return_value = MagicMock(edges=[])
+        assert search_userhandles("Sandra Torres") == []
+        mock_zep_client.graph.search.assert_called_once()
+    
+    def test_partial_local_match_is_merged_with_zep_and_pending(self, mock_zep_client):
+        """Test que una coincidencia local parcial no evite Zep ni las escrituras pendientes."""
+        mock_zep_client.graph.episode.get_by_group_id.return_value = MagicMock(episodes=[
+            MagicMock(content="Usuario: Bernardo Arévalo (@BArevalodeLeon) - Presidente")
+        ])
+        add_to_userhandles("el usuario es @arevalo_fan", {"twitter_username": "arevalo_fan"})
+        mock_edge = MagicMock()
+        mock_edge.fact = "Bernardo Arévalo es presidente de Guatemala"
+        mock_zep_client.graph.search.return_value = MagicMock(edges=[mock_edge])
+        
+        with patch.object(memory.settings, 'userhandles_local_min_score', 1.01):
+            results = search_userhandles("el usuario arevalo", limit=5)
+        
+        mock_zep_client.graph.search.assert_called_once()
+        assert "Bernardo Arévalo es presidente de Guatemala" in results
+        assert "el usuario es @arevalo_fan" in results
+        assert len(results) == len(set(results))
+    
+    def test_falls_back_to_remote_search_without_registry(self, mock_zep_client):
+        """Test que sin registro sembrado se mantenga la verificación remota."""
+        mock_zep_client.graph.episode.get_by_group_id.side_effect = ValueError("sin acceso")
+        mock_edge = MagicMock()
+        mock_edge.fact = "el usuario es @juanperez_gt"
+        mock_zep_client.graph.search.return_value = MagicMock(edges=[mock_edge])
+        
+        assert add_to_userhandles("el usuario es @juanperez_gt", {"twitter_username": "juanperez_gt"}) is False
+        mock_zep_client.graph.add.assert_not_called()
+
+
+class TestSharedHandleIndex:
+    """Tests para el índice de handles mapeado en memoria."""
+    
+    RECORDS = [
+        {"handle": "BArevalodeLeon", "full_name": "Bernardo Arévalo", "description": "Presidente"},
+        {"handle": "congresogt", "full_name": "Congreso de Guatemala"},
+        {"handle": "juanperez_gt"}
+    ]
+    
+    def test_write_and_read_sorted_index(self, tmp_path):
+        """Test búsqueda exacta, Bloom y difusa sobre el archivo mapeado."""
+        path = str(tmp_path / "userhandles.idx")
+        write_handle_index(path, self.RECORDS, capacity=100)
+        index = SharedHandleIndex.open(path)
+        
+        assert len(index) == 3
+        assert index.get("@barevalodeleon")["full_name"] == "Bernardo Arévalo"
+        assert index.get("JUANPEREZ_GT") == {"handle": "juanperez_gt"}
+        assert index.get("otro_usuario") is None
+        assert index.might_contain("congresogt")
+        assert [record["handle"] for _, record, _ in index.search("Bernardo Arevalo", min_score=0.6)] == ["BArevalodeLeon"]
+        assert sorted(r["handle"] for r in index.records()) == ["BArevalodeLeon", "congresogt", "juanperez_gt"]
+        index.close()
+    
+    def test_missing_or_corrupt_index_is_ignored(self, tmp_path):
+        """Test que un archivo inexistente o inválido no rompa el arranque."""
+        assert SharedHandleIndex.open(str(tmp_path / "no-existe.idx")) is None
+        corrupt = tmp_path / "corrupto.idx"
+        corrupt.write_bytes(b"basura" * 20)
+        assert SharedHandleIndex.open(str(corrupt)) is None
+    
+    def test_atomic_swap_is_detected_by_readers(self, tmp_path):
+        """Test que un lector detecte la sustitución y siga leyendo la versión anterior."""
+        path = str(tmp_path / "userhandles.idx")
+        write_handle_index(path, self.RECORDS[:1], capacity=100)
+        reader = SharedHandleIndex.open(path)
+        
+        write_handle_index(path, self.RECORDS, capacity=100)
+        
+        assert reader.is_stale() is True
+        assert len(reader) == 1  # El mapeo anterior sigue siendo válido
+        assert len(SharedHandleIndex.open(path)) == 3
+        reader.close()
+    
+    def test_registry_layers_local_writes_over_shared_base(self, tmp_path):
+        """Test que el registro combine base compartida y capa local."""
+        path = str(tmp_path / "userhandles.idx")
+        write_handle_index(path, self.RECORDS, capacity=100)
+        registry = HandleRegistry(capacity=100)
+        registry.attach(SharedHandleIndex.open(path))
+        
+        assert registry.loaded is True
+        assert registry.upsert({"handle": "CongresoGT"})[0] is False
+        assert registry.upsert({"handle": "nuevo_gt", "full_name": "Nuevo Usuario"}) == (True, None)
+        changed, previous = registry.upsert({"handle": "juanperez_gt", "full_name": "Juan Pérez"})
+        assert changed is True and registry.pending == 2
+        assert len(registry) == 4
+        
+        registry.restore("juanperez_gt", previous)
+        assert registry.pending == 1
+        assert registry.get("juanperez_gt") == {"handle": "juanperez_gt"}
+        
+        write_handle_index(path, registry.snapshot(), capacity=100)
+        registry.attach(SharedHandleIndex.open(path))
+        assert registry.pending == 0
+        assert registry.get("nuevo_gt")["full_name"] == "Nuevo Usuario"
+    
+    def test_startup_uses_shared_index_without_zep(self, mock_zep_client, tmp_path, monkeypatch):
+        """Test que un proceso nuevo cargue el registro desde disco y no desde Zep."""
+        path = str(tmp_path / "userhandles.idx")
+        monkeypatch.setattr(memory.settings, 'handle_index_path', path)
+        mock_zep_client.graph.episode.get_by_group_id.return_value = MagicMock(episodes=[
+            MagicMock(content="el usuario es @congresogt")
+        ])
+        
+        # Primer worker: siembra desde Zep, escribe y persiste el índice
+        assert add_to_userhandles("el usuario es @juanperez_gt") is True
+        memory._persist_handle_index(force=True)
+        assert mock_zep_client.graph.episode.get_by_group_id.call_count == 1
+        
+        # Segundo worker (registro vacío): abre el índice compartido
+        memory._handle_registry.clear()
+        assert add_to_userhandles("el usuario es @JuanPerez_GT") is False
+        assert add_to_userhandles("el usuario es @congresogt") is False
+        assert mock_zep_client.graph.episode.get_by_group_id.call_count == 1
+        assert memory.get_handle_registry_stats()['shared_index']['entries'] == 2
+
+
+class TestPendingWrites:
+    """Tests para la capa read-your-writes de escrituras al grafo."""
+    
+    def test_merge_puts_pending_first_without_duplicates(self):
+        """Test que los pendientes coincidentes se antepongan a la respuesta de Zep."""
+        pending = PendingWrites()
+        pending.add("pulsepolitics", "Congreso aprueba presupuesto 2025")
+        pending.add("pulsepolitics", "TSE publica calendario electoral")
+        pending.add("userhandles", "Congreso de Guatemala (@congresogt)")
+    
+        merged = pending.merge("pulsepolitics", "presupuesto del congreso",
+                               ["Congreso aprueba presupuesto 2025", "Otro resultado"], limit=5)
+    
+        assert merged == ["Congreso aprueba presupuesto 2025", "Otro resultado"]
+        assert pending.match("pulsepolitics", "calendario") == ["TSE publica calendario electoral"]
+        assert pending.match("pulsepolitics", "municipales") == []
+    
+    def test_entries_expire_after_ttl(self):
+        """Test que las entradas se descarten al vencer el TTL."""
+        pending = PendingWrites(ttl_seconds=0.05)
+        pending.add("pulsepolitics", "Congreso aprueba presupuesto")
+    
+        assert pending.match("pulsepolitics", "presupuesto") == ["Congreso aprueba presupuesto"]
+        time.sleep(0.06)
+        assert pending.match("pulsepolitics", "presupuesto") == []
+        assert pending.stats()['expired'] == 1
+    
+    def test_poll_evicts_processed_episodes(self):
+        """Test que se eliminen solo los episodios que Zep confirma como procesados."""
+        processed = {"ep-1"}
+        pending = PendingWrites(poll_interval=0.01, confirm_fn=lambda uuid: uuid in processed)
+        pending.add("pulsepolitics", "Congreso aprueba presupuesto", episode_uuid="ep-1")
+        pending.add("pulsepolitics", "Congreso rechaza préstamo", episode_uuid="ep-2")
+    
+        deadline = time.monotonic() + 2
+        while len(pending) > 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    
+        assert pending.match("pulsepolitics", "congreso") == ["Congreso rechaza préstamo"]
+        assert pending.stats()['confirmed'] == 1
+        pending.clear()
+    
+    def test_search_returns_write_before_zep_indexes_it(self, mock_zep_client, monkeypatch):
+        """Test que search_pulsepolitics devuelva lo recién guardado aunque Zep aún no lo indexe."""
+        monkeypatch.setattr(memory._pending_writes, 'poll_interval', 60.0)
+        mock_zep_client.graph.add.return_value = MagicMock(uuid_="ep-1", processed=False)
+        mock_zep_client.graph.search.return_value = MagicMock(episodes=[])
+    
+        assert add_to_pulsepolitics("Congreso aprueba presupuesto 2025") is True
+    
+        assert search_pulsepolitics("presupuesto") == ["Congreso aprueba presupuesto 2025"]
+        assert memory.get_pending_writes_stats()['by_group'] == {"pulsepolitics": 1}
+    
+    def test_processed_episode_is_evicted(self, mock_zep_client, monkeypatch):
+        """Test que la entrada salga de la capa cuando graph.episode.get indica processed."""
+        monkeypatch.setattr(memory._pending_writes, 'poll_interval', 60.0)
+        mock_zep_client.graph.add.return_value = MagicMock(uuid_="ep-1", processed=False)
+        mock_zep_client.graph.episode.get.return_value = MagicMock(processed=True)
+    
+        assert add_to_pulsepolitics("Congreso aprueba presupuesto 2025") is True
+        memory._pending_writes.poll_interval = 0.0
+        assert memory._pending_writes.poll_once() == 1
+    
+        mock_zep_client.graph.episode.get.assert_called_with(uuid_="ep-1")
+        assert memory.get_pending_writes_stats()['pending'] == 0
+
+
+class TestMetadataStore:
+    """Tests para el índice local de metadatos de escrituras."""
+    
+    def test_filters_by_source_tags_and_time_range(self):
+        """Test que las consultas combinen fuente, tags y rango de fechas."""
+        store = MetadataStore()
+        store.record("pulsepolitics", "Congreso aprueba presupuesto",
+                     {"source": "perplexity_search", "tags": ["legal", "Politica"], "ts": "2025-01-10T12:00:00"})
+        store.record("pulsepolitics", "TSE publica calendario",
+                     {"source": "nitter_context", "tags": ["electoral"], "ts": "2025-01-11T12:00:00"})
+        store.record("pulsepolitics", "Corte admite amparo",
+                     {"source": "perplexity_search", "tags": ["legal"], "ts": "2025-01-12T12:00:00"})
+    
+        legal = store.query(store="pulsepolitics", source="perplexity_search", tags=["legal"])
+        assert [item["content"] for item in legal] == ["Corte admite amparo", "Congreso aprueba presupuesto"]
+        assert store.query(tags=["legal", "politica"])[0]["tags"] == ["legal", "politica"]
+    
+        in_range = store.query(since="2025-01-11T00:00:00", until="2025-01-12T00:00:00")
+        assert [item["content"] for item in in_range] == ["TSE publica calendario"]
+        assert store.count_by_source("pulsepolitics") == {"perplexity_search": 2, "nitter_context": 1}
+    
+    def test_same_content_updates_instead_of_duplicating(self):
+        """Test que registrar el mismo contenido actualice la fila existente."""
+        store = MetadataStore()
+        first = store.record("userhandles", "el usuario es @congresogt", {"tags": ["nuevo"]})
+        second = store.record("userhandles", "el usuario es @congresogt", {"tags": ["oficial"]},
+                              episode_uuid="ep-1")
+    
+        assert first == second
+        assert store.stats()["writes"] == 1
+        assert store.get_episode("ep-1")["tags"] == ["oficial"]
+        assert store.query(tags=["nuevo"]) == []
+    
+    def test_store_persists_on_disk(self, tmp_path):
+        """Test que el índice en disco se comparta entre instancias."""
+        path = str(tmp_path / "metadata.db")
+        writer = MetadataStore(path)
+        writer.record("pulsepolitics", "Congreso aprueba presupuesto", {"source": "perplexity_search"})
+    
+        reader = MetadataStore(path)
+        assert reader.count_by_source() == {"perplexity_search": 1}
+        writer.close()
+        reader.close()
+    
+    def test_graph_writes_are_indexed_by_episode(self, mock_zep_client):
+        """Test que add_to_pulsepolitics guarde los metadatos con el episodio de Zep."""
+        mock_zep_client.graph.add.return_value = MagicMock(uuid_="ep-1", processed=False)
+    
+        assert add_to_pulsepolitics("Congreso aprueba presupuesto 2025",
+                                    {"source": "nitter_context", "tags": ["politica"]}) is True
+    
+        item = memory._get_metadata_store().get_episode("ep-1")
+        assert item["store"] == "pulsepolitics"
+        assert item["tags"] == ["politica"]
+        assert item["metadata"]["source_system"] == "pulsepolitics"
+        assert memory.query_write_metadata(store="pulsepolitics", source="nitter_context")[0]["episode_uuid"] == "ep-1"
+        assert memory.get_metadata_store_stats()["by_source"] == {"nitter_context": 1}
+
+
+class TestFilteredPublicSearch:
+    """Tests para la búsqueda filtrada por tags, fuente y fechas en memoria pública."""
+    
+    @pytest.fixture(autouse=True)
+    def reset_state(self):
+        memory._search_cache.clear()
+        memory._public_index.clear()
+        yield
+        memory._search_cache.clear()
+        memory._public_index.clear()
+    
+    @staticmethod
+    def _hours_ago(hours):
+        return (datetime.utcnow() - timedelta(hours=hours)).isoformat()
+    
+    def test_filters_narrow_candidates_before_ranking(self, mock_zep_client):
+        """Test que solo se ordenen los candidatos que cumplen tags, fuente y fechas."""
+        mock_zep_client.memory.get.return_value = MagicMock(messages=[])
+        add_public_memory("La Corte admite amparo contra el decreto",
+                          {"source": "perplexity_search", "tags": ["legal"], "ts": self._hours_ago(2)})
+        add_public_memory("Amparo electoral pendiente en la Corte",
+                          {"source": "perplexity_search", "tags": ["electoral"], "ts": self._hours_ago(1)})
+        add_public_memory("Amparo contra el decreto de hace una semana",
+                          {"source": "perplexity_search", "tags": ["legal"], "ts": self._hours_ago(170)})
+        add_public_memory("Nitter: amparo contra el decreto",
+                          {"source": "nitter_context", "tags": ["legal"], "ts": self._hours_ago(1)})
+    
+        results = memory.search_public_memory_filtered(
+            "amparo decreto", tags=["legal"], source="perplexity_search", since=self._hours_ago(24)
+        )
+    
+        assert [item["content"] for item in results] == ["La Corte admite amparo contra el decreto"]
+        assert results[0]["score"] == 1.0
+        mock_zep_client.memory.search.assert_not_called()
+    
+    def test_session_messages_seed_the_metadata_index(self, mock_zep_client):
+        """Test que los mensajes ya guardados en Zep se puedan filtrar tras cargar la sesión."""
+        mock_message = MagicMock(content="Congreso aprueba reforma electoral",
+                                 metadata={"source": "nitter_context", "tags": ["electoral"]},
+                                 created_at=self._hours_ago(3))
+        mock_zep_client.memory.get.return_value = MagicMock(messages=[mock_message])
+    
+        results = memory.search_public_memory_filtered("", tags=["electoral"], since=self._hours_ago(6))
+    
+        assert [item["content"] for item in results] == ["Congreso aprueba reforma electoral"]
+        assert results[0]["source"] == "nitter_context"
+        assert memory.search_public_memory_filtered("", tags=["electoral"], since=self._hours_ago(1)) == []
+    
+    def test_search_endpoint_accepts_filters(self, mock_zep_client):
+        """Test que /api/laura-memory/search aplique los filtros y valide las fechas."""
+        from server import app
+        client = app.test_client()
+        mock_zep_client.memory.get.return_value = MagicMock(messages=[])
+        add_public_memory("La Corte admite amparo", {"source": "perplexity_search", "tags": ["legal"]})
+    
+        response = client.post('/api/laura-memory/search', json={
+            "query": "amparo", "tags": ["legal"], "source": "perplexity_search", "last_hours": 24
+        })
+        assert response.status_code == 200
+        assert response.get_json()["results"] == ["La Corte admite amparo"]
+        assert response.get_json()["items"][0]["tags"] == ["legal"]
+    
+        response = client.post('/api/laura-memory/search', json={"query": "amparo", "since": "ayer"})
+        assert response.status_code == 400
+
+
+class TestAsyncMemory:
+    """Tests para la API asíncrona de memoria."""
+    
+    @pytest.fixture
+    def mock_async_client(self):
+        memory._search_cache.clear()
+        mock_client = MagicMock()
+        mock_client.graph.search = AsyncMock()
+        mock_client.graph.add = AsyncMock()
+        mock_client.memory.add = AsyncMock()
+        with patch('memory_async._aget_zep_client', AsyncMock(return_value=mock_client)):
+            yield mock_client
+        memory._search_cache.clear()
+    
+    def test_asearch_pulsepolitics(self, mock_async_client):
+        """Test búsqueda asíncrona en PulsePolitics."""
+        mock_episode = MagicMock()
+        mock_episode.data = "El Congreso aprobó el presupuesto"
+        mock_async_client.graph.search.return_value = MagicMock(episodes=[mock_episode])
+        
+        results = asyncio.run(memory_async.asearch_pulsepolitics("congreso"))
+        
+        assert results == ["El Congreso aprobó el presupuesto"]
+        mock_async_client.graph.search.assert_awaited_once()
+    
+    def test_aretry_does_not_block_loop(self):
+        """Test que los reintentos usen asyncio.sleep."""
+        attempts = []
+        
+        async def flaky():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise Exception("timeout")
+            return "ok"
+        
+        with patch('memory_async.asyncio.sleep', AsyncMock()) as mock_sleep:
+            result = asyncio.run(memory_async._aretry_with_backoff(flaky))
+        
+        assert result == "ok"
+        assert mock_sleep.await_count == 2
+    
+    def test_aadd_public_memory_honours_write_behind(self, mock_async_client):
+        """Test que aadd_public_memory encole como add_public_memory con write-behind activo."""
+        write_queue = MagicMock()
+        with patch.object(memory.settings, 'write_behind_enabled', True), \
+                patch.object(memory, '_get_public_write_queue', return_value=write_queue):
+            asyncio.run(memory_async.aadd_public_memory("El Congreso aprobó la Ley X"))
+
+        write_queue.put.assert_called_once()
+        assert write_queue.put.call_args[0][1].content == "El Congreso aprobó la Ley X"
+        mock_async_client.memory.add.assert_not_awaited()
+
+    def test_aadd_to_userhandles_skips_existing(self, mock_async_client):
+        """Test que no se duplique un usuario existente."""
+        mock_async_client.graph.episode.get_by_group_id = AsyncMock(return_value=MagicMock(
+            episodes=[MagicMock(content="el usuario es @juanperez_gt")]
+        ))
+        
+        saved = asyncio.run(memory_async.aadd_to_userhandles(
+            "el usuario es @JuanPerez_GT", {"twitter_username": "JuanPerez_GT"}
+        ))
+        
+        assert saved is False
+        mock_async_client.graph.add.assert_not_awaited()
+        mock_async_client.graph.search.assert_not_awaited()
+    
+    def test_write_metadata_is_recorded_off_the_event_loop(self, mock_async_client):
+        """Test que el índice de metadatos (SQLite) se escriba fuera del hilo del event loop."""
+        threads = []
+        mock_async_client.graph.add.return_value = MagicMock(uuid_="ep-1")
+        
+        with patch('memory._record_write_metadata', side_effect=lambda *args: threads.append(threading.current_thread())):
+            saved = asyncio.run(memory_async.aadd_to_pulsepolitics("El Congreso aprobó el presupuesto de 2025"))
+        
+        assert saved is True
+        assert len(threads) == 1 and threads[0] is not threading.main_thread()
+    
+    def test_public_index_loads_off_the_event_loop(self, mock_async_client):
+        """Test que la carga del índice local de memoria pública no bloquee el event loop."""
+        threads = []
+        mock_async_client.memory.get = AsyncMock(return_value=MagicMock(messages=[]))
+        
+        with patch('memory._public_index_needs_load', return_value=True), \
+                patch('memory._load_public_index', side_effect=lambda session: threads.append(threading.current_thread())):
+            asyncio.run(memory_async._arefresh_public_index(mock_async_client))
+        
+        assert len(threads) == 1 and threads[0] is not threading.main_thread()
+    
+    def test_handle_index_refresh_runs_off_the_event_loop(self, mock_async_client, monkeypatch):
+        """Test que comprobar el índice en disco (os.stat/mmap) no se haga en el event loop."""
+        threads = []
+        monkeypatch.setattr(memory._handle_registry, 'loaded', True)
+        
+        async def lookups():
+            loop_thread = threading.current_thread()
+            for _ in range(3):
+                assert await memory_async._aensure_handle_registry(mock_async_client) is True
+            return loop_thread
+        
+        with patch('memory._claim_handle_index_refresh', side_effect=[True, False, False]), \
+                patch('memory._reload_stale_handle_index', side_effect=lambda: threads.append(threading.current_thread())):
+            loop_thread = asyncio.run(lookups())
+        
+        # Solo la llamada que reservó la comprobación la hace, y en un hilo
+        assert len(threads) == 1 and threads[0] is not loop_thread
+    
+    def test_aensure_handle_registry_seeds_once_under_concurrency(self, mock_async_client):
+        """Test que varias primeras llamadas concurrentes siembren el registro una sola vez."""
+        async def slow_episodes(**kwargs):
+            await asyncio.sleep(0.02)
+            return MagicMock(episodes=[MagicMock(content="el usuario es @juanperez_gt")])
+        
+        mock_async_client.graph.episode.get_by_group_id = AsyncMock(side_effect=slow_episodes)
+        
+        async def run():
+            return await asyncio.gather(*[memory_async._aensure_handle_registry(mock_async_client) for _ in range(5)])
+        
+        assert asyncio.run(run()) == [True] * 5
+        mock_async_client.graph.episode.get_by_group_id.assert_awaited_once()
+        assert memory.get_handle_registry_stats()['handles'] == 1
+
+
 class TestDetectors:
     """Tests para los detectores heurísticos."""
     
@@ -289,6 +1613,110 @@ class TestDetectors:
             assert tag in result['metadata']['tags']
 
 
+    def test_engine_matches_per_pattern_search(self):
+        """Test que el motor compilado coincida con re.search patrón a patrón."""
+        import random
+        import re
+        import detectors
+        
+        def legacy_hits(content_lower):
+            families = {
+                detectors.NEW_USER: detectors.NEW_USER_PATTERNS,
+                detectors.NEW_TERM: detectors.IMPORTANT_TERM_PATTERNS,
+                detectors.RELEVANT_FACT: detectors.FACT_PATTERNS,
+            }
+            families.update({tag: [pattern] for tag, pattern in detectors.CATEGORY_TAG_PATTERNS})
+            return frozenset(
+                family for family, patterns in families.items()
+                if any(re.search(pattern, content_lower) for pattern in patterns)
+            )
+        
+        fragments = [
+            "nuevo usuario", "usuarios", "persona", "personal", "descubrí", "encontré",
+            "ml discovery", "html discovery", "@", "@x", "#", "#tag", "ley", "leyes", "decreto",
+            "congreso", "política", "políticas", "aprobó", "nueva", "nuevo", "crisis", "estado",
+            "_ley", "1ley", "acuerdo", "problema", "elección", " ", "  ", "\n", "\t", ".", ",",
+            "-", "gt", "á", "İ", "ß", "@@", "@-", "@\n", "\n@", "##", "persona@",
+        ]
+        rng = random.Random(1234)
+        for _ in range(5000):
+            content = "".join(rng.choice(fragments) for _ in range(rng.randint(1, 16)))
+            content_lower = content.lower()
+            assert detectors._ENGINE.scan(content_lower) == legacy_hits(content_lower), repr(content)
+
+
+    def test_mention_rules_are_linear_on_long_lines(self):
+        """Test que muchos prefijos sin mención en una línea larga no sean cuadráticos."""
+        import detectors
+        content = "persona usuario " * 20000 + "\n@x"
+        
+        start = time.perf_counter()
+        hits = detectors._ENGINE.scan(content)
+        elapsed = time.perf_counter() - start
+        
+        assert detectors.NEW_USER not in hits
+        assert elapsed < 1.0
+    
+    def test_max_scan_chars_bounds_analysis(self):
+        """Test que solo se analicen los primeros detector_max_scan_chars caracteres."""
+        import detectors
+        content = "x" * 100 + " el congreso aprobó la ley"
+        
+        with patch.object(detectors.settings, 'detector_max_scan_chars', 50):
+            assert not is_relevant_fact(content)
+        with patch.object(detectors.settings, 'detector_max_scan_chars', 0):
+            assert is_relevant_fact(content)
+
+
+class TestDetectorBatch:
+    """Tests para la clasificación por lotes de los detectores."""
+    
+    CONTENTS = [
+        "El congreso aprobó la nueva ley de transparencia",
+        "hola",
+        "texto sin nada",
+        "Nuevo usuario @politico_gt es diputado. Crisis política.",
+        "Información importante",
+    ]
+    METADATAS = [None, None, None, None, {'source': 'nitter_context'}]
+    
+    @staticmethod
+    def _strip_ts(result):
+        result = dict(result)
+        if 'metadata' in result:
+            result['metadata'] = {k: v for k, v in result['metadata'].items() if k != 'ts'}
+            result['metadata']['tags'] = sorted(result['metadata']['tags'])
+        return result
+    
+    def test_batch_matches_single_calls_in_process(self):
+        """Test que el lote en proceso dé lo mismo que llamar uno a uno."""
+        batch = should_save_to_memory_batch(self.CONTENTS, self.METADATAS)
+        single = [should_save_to_memory(c, m) for c, m in zip(self.CONTENTS, self.METADATAS)]
+        
+        assert [self._strip_ts(r) for r in batch] == [self._strip_ts(r) for r in single]
+    
+    def test_batch_uses_process_pool_for_large_batches(self):
+        """Test que los lotes grandes se repartan en el pool de procesos y conserven el orden."""
+        import detectors
+        contents = self.CONTENTS * 20
+        metadatas = self.METADATAS * 20
+        
+        try:
+            batch = should_save_to_memory_batch(contents, metadatas, process_threshold=10,
+                                                max_workers=2, chunk_size=7)
+            assert detectors._process_pool is not None
+        finally:
+            detectors.shutdown_process_pool()
+        
+        single = [should_save_to_memory(c, m) for c, m in zip(contents, metadatas)]
+        assert [self._strip_ts(r) for r in batch] == [self._strip_ts(r) for r in single]
+    
+    def test_batch_rejects_mismatched_metadatas(self):
+        """Test que metadatas de distinta longitud se rechace."""
+        with pytest.raises(ValueError):
+            should_save_to_memory_batch(["uno", "dos"], [None])
+
+
 class TestIntegration:
     """Tests para la integración con el agente Laura."""
     
@@ -384,6 +1812,49 @@ class TestIntegration:
         assert 'reasons' in result
         mock_add_memory.assert_called_once()
     
+    @patch('integration.add_public_memory')
+    def test_process_tool_result_skips_redundant_content(self, mock_add_memory, integration):
+        """Test que el contenido ya presente en memoria no se vuelva a escribir."""
+        story = "El Congreso aprobó el presupuesto general de la nación para el próximo año"
+        memory._public_novelty.clear()
+        memory._public_novelty.add(story)
+        saves = lambda: sum(value for key, value in DETECTOR_DECISIONS._values.items() if key[0] == "save")
+        saves_before = saves()
+        skips_before = DETECTOR_DECISIONS.value(decision="skip", reason="low_novelty")
+        
+        try:
+            result = integration.process_tool_result(
+                'perplexity_search', {'content': story}, 'presupuesto'
+            )
+        finally:
+            memory._public_novelty.clear()
+        
+        assert result['saved'] is False
+        assert result['novelty'] < 0.2
+        mock_add_memory.assert_not_called()
+        # Una sola decisión por contenido: skip por baja novedad, no también save
+        assert DETECTOR_DECISIONS.value(decision="skip", reason="low_novelty") == skips_before + 1
+        assert saves() == saves_before
+    
+    def test_aprocess_tool_result_decides_off_the_event_loop(self, integration):
+        """Test que los detectores y la novedad no bloqueen el event loop."""
+        threads = []
+        decide = integration._decide_tool_result
+        
+        def recording_decide(*args):
+            threads.append(threading.current_thread())
+            return decide(*args)
+        
+        with patch.object(integration, '_decide_tool_result', side_effect=recording_decide), \
+                patch('memory_async.aadd_public_memory', AsyncMock()) as mock_add:
+            result = asyncio.run(integration.aprocess_tool_result(
+                'nitter_context', {'summary': 'Información relevante', 'tweets': [{'content': 'Tweet importante'}]}
+            ))
+        
+        assert result['saved'] is True
+        mock_add.assert_awaited_once()
+        assert len(threads) == 1 and threads[0] is not threading.main_thread()
+    
     @patch('integration.search_public_memory')
     def test_enhance_query_with_memory(self, mock_search, integration):
         """Test mejorar query con información de memoria."""
@@ -402,6 +1873,77 @@ class TestIntegration:
         assert result['memory_results'] == mock_search.return_value
         assert len(result['memory_results']) == 2
     
+    def test_federated_search_merges_and_dedups(self, integration):
+        """Test que la búsqueda federada combine fuentes sin duplicados."""
+        sources = {
+            "public_memory": lambda q, l: ["El congreso aprobó la ley", "Dato público"],
+            "pulsepolitics": lambda q, l: ["el congreso  aprobó la ley", "Dato político"],
+            "userhandles": lambda q, l: ["el usuario es @congresogt"]
+        }
+        with patch.dict('integration.FEDERATED_SOURCES', sources, clear=True):
+            result = integration.federated_search("congreso", limit=3)
+        
+        contents = [item['content'] for item in result['results']]
+        assert contents == ["El congreso aprobó la ley", "el usuario es @congresogt",
+                            "Dato público", "Dato político"]
+        assert result['results'][0]['sources'] == ["public_memory", "pulsepolitics"]
+        assert result['partial'] is False
+    
+    def test_federated_search_returns_partial_on_timeout(self, integration):
+        """Test que una fuente lenta no bloquee más allá del deadline."""
+        import threading
+        release = threading.Event()
+        
+        def slow_source(query, limit):
+            release.wait(5)
+            return ["tarde"]
+        
+        sources = {
+            "public_memory": lambda q, l: ["rápido"],
+            "pulsepolitics": slow_source
+        }
+        try:
+            with patch.dict('integration.FEDERATED_SOURCES', sources, clear=True):
+                result = integration.federated_search("congreso", deadline_ms=50)
+        finally:
+            release.set()
+        
+        assert [item['content'] for item in result['results']] == ["rápido"]
+        assert result['sources_status'] == {"public_memory": "ok", "pulsepolitics": "timeout"}
+        assert result['partial'] is True
+    
+    def test_federated_search_does_not_retry_zep_calls(self, integration):
+        """Test que las fuentes federadas llamen a Zep sin reintentos y con timeout del cliente."""
+        from memory import _retry_with_backoff, _zep_request_options
+        calls = []
+        
+        def flaky_source(query, limit):
+            def operation():
+                calls.append(_zep_request_options())
+                raise ConnectionError("Zep no responde")
+            return _retry_with_backoff(operation, base_delay=0.01, operation="graph.search")
+        
+        with patch.dict('integration.FEDERATED_SOURCES', {"pulsepolitics": flaky_source}, clear=True):
+            result = integration.federated_search("congreso", deadline_ms=1200)
+        
+        assert calls == [{"request_options": {"max_retries": 0, "timeout_in_seconds": 2}}]
+        assert result['sources_status'] == {"pulsepolitics": "error"}
+        assert _zep_request_options() == {}
+    
+    def test_federated_search_rejects_when_pool_saturated(self, integration, monkeypatch):
+        """Test que con el pool lleno no se encolen consultas nuevas."""
+        import integration as integration_module
+        source = MagicMock(return_value=["dato"])
+        monkeypatch.setattr(integration_module, "_federated_in_flight",
+                            integration_module.settings.federated_search_max_workers)
+        
+        with patch.dict('integration.FEDERATED_SOURCES', {"public_memory": source}, clear=True):
+            result = integration.federated_search("congreso")
+        
+        source.assert_not_called()
+        assert result['sources_status'] == {"public_memory": "saturated"}
+        assert result['partial'] is True
+    
     @patch('integration.add_public_memory')
     def test_save_user_discovery(self, mock_add_memory, integration):
         """Test guardar usuario descubierto."""
@@ -430,14 +1972,595 @@ class TestIntegration:
         assert metadata['twitter_username'] == 'juanperez_gt'
 
 
+class TestInternalInterface:
+    """Tests para la interfaz interna usada por internalMemoryClient.js."""
+    
+    def test_worker_answers_each_line_with_its_id(self):
+        """Test que el modo worker responda una línea por comando con su id."""
+        import io
+        import json
+        import internal_interface
+        
+        commands = "\n".join([
+            json.dumps({"id": 1, "function": "search_userhandles", "args": {"query": "@juan"}}),
+            "no es json",
+            json.dumps({"id": "x", "function": "search_pulsepolitics", "args": {"query": "congreso"}})
+        ]) + "\n"
+        stdout = io.StringIO()
+        
+        with patch('internal_interface._warm_up'), \
+                patch('internal_interface.search_userhandles', return_value=["el usuario es @juan"]), \
+                patch('internal_interface.search_pulsepolitics', return_value=[]), \
+                patch('sys.stdin', io.StringIO(commands)), patch('sys.stdout', stdout):
+            internal_interface.run_worker()
+        
+        responses = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        assert responses[0]['event'] == 'ready'
+        # Los comandos corren en paralelo: las respuestas se emparejan por id
+        by_id = {response['id']: response for response in responses[1:]}
+        assert len(responses) == 4
+        assert by_id[1]['results'] == ["el usuario es @juan"]
+        assert by_id[None]['success'] is False
+        assert by_id["x"]['count'] == 0
+    
+    def test_worker_runs_commands_concurrently(self):
+        """Test que un comando lento no bloquee al siguiente en el modo worker."""
+        import io
+        import json
+        import threading
+        import internal_interface
+        
+        barrier = threading.Barrier(2, timeout=5)
+        
+        def search(query, limit):
+            barrier.wait()  # Solo pasa si ambos comandos están en vuelo a la vez
+            return [f"resultado {query}"]
+        
+        commands = "".join(
+            json.dumps({"id": query, "function": "search_userhandles", "args": {"query": query}}) + "\n"
+            for query in ("a", "b")
+        )
+        stdout = io.StringIO()
+        
+        with patch('internal_interface._warm_up'), \
+                patch('internal_interface.search_userhandles', side_effect=search), \
+                patch.object(internal_interface.settings, 'internal_worker_max_workers', 2), \
+                patch('sys.stdin', io.StringIO(commands)), patch('sys.stdout', stdout):
+            internal_interface.run_worker()
+        
+        responses = {response['id']: response for response in map(json.loads, stdout.getvalue().splitlines()[1:])}
+        assert responses["a"]['results'] == ["resultado a"]
+        assert responses["b"]['results'] == ["resultado b"]
+
+
+    def test_execute_batch_runs_concurrently_in_order(self):
+        """Test que un lote corra en paralelo y conserve el orden de resultados."""
+        import threading
+        import internal_interface
+        
+        barrier = threading.Barrier(2, timeout=5)
+        
+        def search(query, limit):
+            barrier.wait()  # Solo pasa si ambas búsquedas están en vuelo a la vez
+            return [f"resultado {query}"]
+        
+        with patch('internal_interface.search_userhandles', side_effect=search), \
+                patch.object(internal_interface.settings, 'internal_batch_max_workers', 2), \
+                patch.object(internal_interface, '_batch_executor', None):
+            result = internal_interface.execute_batch([
+                {"function": "search_userhandles", "args": {"query": "a"}},
+                {"function": "search_userhandles", "args": {"query": "b"}},
+                {"function": "desconocida"}
+            ])
+        
+        assert [r.get('results') for r in result['results'][:2]] == [["resultado a"], ["resultado b"]]
+        assert result['results'][2]['success'] is False
+        assert result['success'] is False
+
+
+class TestServing:
+    """Tests para el modo de servicio en producción (readiness, apagado y fork)."""
+    
+    @pytest.fixture(autouse=True)
+    def server_state(self):
+        import server
+        server._ready.clear()
+        server._shutting_down.clear()
+        yield server
+        server._ready.clear()
+        server._shutting_down.clear()
+    
+    def test_ready_after_initialize_and_not_while_draining(self, server_state):
+        """Test que /ready responda 503 al arrancar con error y durante el apagado."""
+        client = server_state.app.test_client()
+    
+        with patch('memory.warm_up', side_effect=ValueError("ZEP_API_KEY no está configurada")):
+            response = client.get('/ready')
+        assert response.status_code == 503
+        assert response.get_json()['status'] == 'starting'
+    
+        with patch('memory.warm_up'):
+            assert client.get('/ready').status_code == 200
+    
+        with patch('memory.shutdown', return_value=True) as shutdown:
+            assert server_state.begin_shutdown(timeout=1) is True
+        shutdown.assert_called_once_with(1)
+        response = client.get('/ready')
+        assert response.status_code == 503
+        assert response.get_json()['status'] == 'shutting_down'
+    
+    def test_shutdown_flushes_queue_and_persists_indexes(self):
+        """Test que el apagado vacíe la cola write-behind y guarde los índices."""
+        with patch('memory.flush_public_memory_queue', return_value=True) as flush, \
+                patch('memory.save_near_duplicate_indexes') as save_sketches, \
+                patch('memory._persist_handle_index') as persist_handles:
+            assert memory.shutdown(timeout=2) is True
+    
+        flush.assert_called_once_with(2)
+        save_sketches.assert_called_once()
+        persist_handles.assert_called_once_with(force=True)
+    
+    def test_child_reopens_client_without_recreating_groups(self, monkeypatch):
+        """Test que un worker tras fork abra su propio cliente sin volver a crear grupos."""
+        parent_client = MagicMock()
+        monkeypatch.setattr(memory, '_zep', parent_client)
+        monkeypatch.setattr(memory, '_zep_groups_ready', True)
+    
+        memory._reset_after_fork()
+        with patch('memory.Zep') as zep_cls:
+            child_client = memory._get_zep_client()
+    
+        assert child_client is zep_cls.return_value
+        assert child_client is not parent_client
+        child_client.group.add.assert_not_called()
+
+
+
+class TestAsgiServer:
+    """Tests para el servidor ASGI sobre memory_async."""
+    
+    @pytest.fixture
+    def asgi(self):
+        import asgi_server
+        memory._search_cache.clear()
+        asgi_server._state.update(ready=False, shutting_down=False)
+        yield asgi_server
+        asgi_server._state.update(ready=False, shutting_down=False)
+        memory._search_cache.clear()
+    
+    def test_routes_keep_flask_shapes(self, asgi):
+        """Test que las rutas respondan con los mismos cuerpos que server.py."""
+        from starlette.testclient import TestClient
+        client = TestClient(asgi.app)
+    
+        response = client.post('/api/laura-memory/search', json={})
+        assert response.status_code == 400
+        assert response.json() == {"error": "Falta el campo 'query'"}
+    
+        with patch('memory_async.asearch_public_memory', AsyncMock(return_value=["hecho"])):
+            response = client.post('/api/laura-memory/search', json={"query": "congreso"})
+        assert response.json() == {"results": ["hecho"]}
+    
+        with patch('memory_async.asearch_userhandles', AsyncMock(return_value=["@diputado"])):
+            response = client.post('/api/laura-memory/search-userhandles', json={"query": "diputado"})
+        assert response.json() == {"results": ["@diputado"], "source": "userhandles_shared_group"}
+    
+        assert client.get('/health').json() == {"status": "healthy", "service": "laura-memory"}
+        assert 'route="/health"' in client.get('/metrics').text
+    
+    def test_metadata_stats_query_runs_off_the_event_loop(self, asgi):
+        """Test que /metadata-stats consulte SQLite fuera del hilo del event loop."""
+        from starlette.testclient import TestClient
+        threads = []
+        
+        def stats():
+            threads.append(threading.current_thread())
+            return {"rows": 0}
+        
+        with patch('memory_async.awarm_up', AsyncMock()), patch('memory.shutdown', return_value=True), \
+                patch('memory.get_metadata_store_stats', side_effect=stats), TestClient(asgi.app) as client:
+            loop_thread = client.portal.call(lambda: threading.current_thread())
+            assert client.get('/api/laura-memory/metadata-stats').json() == {"rows": 0}
+        
+        assert len(threads) == 1 and threads[0] is not loop_thread
+    
+    def test_malformed_json_and_stats_match_flask(self, asgi):
+        """Test que JSON malformado y /stats respondan igual en ambos servidores."""
+        from starlette.testclient import TestClient
+        from server import app
+        asgi_client = TestClient(asgi.app)
+        flask_client = app.test_client()
+        
+        for path in ('/api/laura-memory/search', '/api/laura-memory/process-tool-result'):
+            asgi_response = asgi_client.post(path, content=b"{no es json", headers={"Content-Type": "application/json"})
+            flask_response = flask_client.post(path, data=b"{no es json", content_type="application/json")
+            assert asgi_response.status_code == flask_response.status_code == 400
+            assert asgi_response.json() == flask_response.get_json()
+        
+        session = MagicMock(messages=["a", "b"], created_at="2024-01-01", updated_at="2024-01-02")
+        client = MagicMock()
+        client.memory.get = AsyncMock(return_value=session)
+        with patch('memory._get_zep_client') as get_client, \
+                patch('memory_async._aget_zep_client', AsyncMock(return_value=client)):
+            get_client.return_value.memory.get.return_value = session
+            async_stats = asyncio.run(memory_async.aget_memory_stats())
+            sync_stats = memory.get_memory_stats()
+        # Los contadores de resiliencia avanzan entre llamadas: se compara el resto
+        assert set(async_stats) == set(sync_stats)
+        assert {k: v for k, v in async_stats.items() if k != "resilience"} == \
+            {k: v for k, v in sync_stats.items() if k != "resilience"}
+        
+        with patch('memory._get_zep_client', side_effect=ValueError("sin clave")), \
+                patch('memory_async._aget_zep_client', AsyncMock(side_effect=ValueError("sin clave"))):
+            sync_error = memory.get_memory_stats()
+            async_error = asyncio.run(memory_async.aget_memory_stats())
+        assert set(sync_error) == set(async_error) == {"error", "resilience"}
+        assert sync_error["error"] == async_error["error"]
+    
+    def test_ready_follows_lifespan(self, asgi):
+        """Test que /ready responda 200 tras arrancar y el apagado vacíe la cola."""
+        from starlette.testclient import TestClient
+    
+        with patch('memory_async.awarm_up', AsyncMock()), \
+                patch('memory.shutdown', return_value=True) as shutdown:
+            with TestClient(asgi.app) as client:
+                assert client.get('/ready').json()['status'] == 'ready'
+            shutdown.assert_called_once()
+        assert asgi._state == {"ready": False, "shutting_down": True}
+    
+    def test_slow_searches_share_one_event_loop(self, asgi):
+        """Test que un proceso atienda muchas búsquedas lentas de Zep a la vez."""
+        import httpx
+        mock_episode = MagicMock()
+        mock_episode.data = "El Congreso aprobó el presupuesto"
+        client = MagicMock()
+    
+        async def slow_search(**kwargs):
+            await asyncio.sleep(0.2)
+            return MagicMock(episodes=[mock_episode])
+    
+        client.graph.search = AsyncMock(side_effect=slow_search)
+    
+        async def run():
+            transport = httpx.ASGITransport(app=asgi.app)
+            async with httpx.AsyncClient(transport=transport, base_url='http://laura') as http:
+                return await asyncio.gather(*[
+                    http.post('/api/laura-memory/search-pulsepolitics', json={"query": f"congreso {i}"})
+                    for i in range(20)
+                ])
+    
+        started = time.perf_counter()
+        with patch('memory_async._aget_zep_client', AsyncMock(return_value=client)):
+            responses = asyncio.run(run())
+        elapsed = time.perf_counter() - started
+    
+        assert [r.json()['results'] for r in responses] == [["El Congreso aprobó el presupuesto"]] * 20
+        assert client.graph.search.await_count == 20
+        assert elapsed < 2.0
+
+
+
+class TestBatchEndpoint:
+    """Tests para el endpoint de lotes /api/laura-memory/batch."""
+    
+    OPERATIONS = [
+        {"id": "lenta", "operation": "search", "args": {"query": "lenta"}},
+        {"id": "rapida", "operation": "search", "args": {"query": "rapida"}},
+        {"id": "sin-query", "operation": "enhance-query", "args": {}},
+        {"id": "otra", "operation": "borrar-todo", "args": {}}
+    ]
+    
+    @staticmethod
+    def _lines(text):
+        return [json.loads(line) for line in text.splitlines() if line]
+    
+    def _assert_ordered(self, lines):
+        assert [line["index"] for line in lines] == [0, 1, 2, 3]
+        assert [line["id"] for line in lines] == ["lenta", "rapida", "sin-query", "otra"]
+        assert lines[0] == {"index": 0, "id": "lenta", "operation": "search", "status": 200,
+                            "result": {"results": ["resultado lenta"]}}
+        assert lines[2]["status"] == 400 and lines[2]["error"] == "Falta el campo 'query'"
+        assert lines[3]["status"] == 400 and "desconocida" in lines[3]["error"]
+    
+    def test_flask_runs_concurrently_and_streams_in_order(self):
+        """Test que el lote corra las operaciones a la vez y responda en orden."""
+        import server
+    
+        def search(query, limit):
+            time.sleep(0.3 if query == "lenta" else 0.0)
+            return [f"resultado {query}"]
+    
+        client = server.app.test_client()
+        started = time.perf_counter()
+        with patch('memory.search_public_memory', side_effect=search):
+            response = client.post('/api/laura-memory/batch', json={"operations": self.OPERATIONS})
+            lines = self._lines(response.get_data(as_text=True))
+        elapsed = time.perf_counter() - started
+    
+        assert response.status_code == 200
+        assert response.content_type == 'application/x-ndjson'
+        self._assert_ordered(lines)
+        assert elapsed < 0.6
+    
+    def test_asgi_runs_operations_as_coroutines(self):
+        """Test que el servidor ASGI ejecute el lote en el event loop."""
+        import asgi_server
+        from starlette.testclient import TestClient
+    
+        async def search(query, limit):
+            await asyncio.sleep(0.3 if query == "lenta" else 0.0)
+            return [f"resultado {query}"]
+    
+        with patch('memory_async.asearch_public_memory', side_effect=search):
+            response = TestClient(asgi_server.app).post('/api/laura-memory/batch',
+                                                        json={"operations": self.OPERATIONS})
+    
+        assert response.status_code == 200
+        self._assert_ordered(self._lines(response.text))
+    
+    def test_rejects_empty_or_oversized_batch(self, monkeypatch):
+        """Test que un lote vacío o demasiado grande se rechace con 400."""
+        import server
+        monkeypatch.setattr(memory.settings, 'batch_max_operations', 2)
+        client = server.app.test_client()
+    
+        assert client.post('/api/laura-memory/batch', json={}).status_code == 400
+        response = client.post('/api/laura-memory/batch', json={"operations": self.OPERATIONS})
+        assert response.status_code == 400
+        assert response.get_json() == {"error": "Máximo 2 operaciones por lote"}
+
+
+
+class TestIngestJobs:
+    """Tests para el modo asíncrono de process-tool-result (202 + estado del trabajo)."""
+    
+    @pytest.fixture(autouse=True)
+    def fresh_jobs(self, monkeypatch):
+        import integration
+        monkeypatch.setattr(integration, '_ingest_jobs', None)
+        monkeypatch.setattr(integration.settings, 'ingest_jobs_store_path', '')
+        monkeypatch.setattr(integration.settings, 'ingest_jobs_callback_allowed_hosts', '127.0.0.1')
+        yield integration
+        integration.close_ingest_jobs(timeout=5)
+    
+    @staticmethod
+    def _wait_finished(jobs, job_id, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            job = jobs.get(job_id)
+            if job["status"] in ("done", "failed"):
+                return job
+            time.sleep(0.01)
+        raise AssertionError(f"El trabajo {job_id} no terminó")
+    
+    def test_pool_reports_status_and_bounds_queue(self):
+        """Test que el pool informe el estado, registre errores y rechace si está lleno."""
+        import queue as queue_module
+        from ingest_jobs import IngestJobs
+        release = threading.Event()
+    
+        def run(payload):
+            release.wait(5)
+            if payload.get("fail"):
+                raise RuntimeError("Zep no responde")
+            return {"saved": True, "content": payload["content"]}
+    
+        jobs = IngestJobs(run, max_workers=1, max_pending=1)
+        first = jobs.submit({"content": "A"})
+        assert first["status"] == "queued"
+        while jobs.get(first["job_id"])["status"] != "running":
+            time.sleep(0.01)
+        second = jobs.submit({"fail": True})
+        with pytest.raises(queue_module.Full):
+            jobs.submit({"content": "C"})
+    
+        release.set()
+        assert self._wait_finished(jobs, first["job_id"])["result"] == {"saved": True, "content": "A"}
+        failed = self._wait_finished(jobs, second["job_id"])
+        assert failed["status"] == "failed" and failed["error"] == "Zep no responde"
+        assert jobs.close(timeout=5) is True
+        assert jobs.stats()["rejected"] == 1
+    
+    def test_async_request_returns_before_ingestion(self, fresh_jobs):
+        """Test que con "async" la respuesta no espere la escritura a Zep."""
+        import server
+        client = server.app.test_client()
+        body = {"tool_name": "nitter_context", "tool_result": {"tweets": []}, "user_query": "congreso", "async": True}
+    
+        def slow_process(tool_name, tool_result, user_query=""):
+            time.sleep(0.5)
+            return {"saved": True, "tool_name": tool_name}
+    
+        with patch.object(fresh_jobs.laura_memory_integration, 'process_tool_result', side_effect=slow_process):
+            started = time.perf_counter()
+            response = client.post('/api/laura-memory/process-tool-result', json=body)
+            elapsed = time.perf_counter() - started
+    
+            assert response.status_code == 202
+            assert elapsed < 0.25
+            job = response.get_json()
+            assert response.headers['Location'] == job['status_url'] == f"/api/laura-memory/jobs/{job['job_id']}"
+    
+            finished = self._wait_finished(fresh_jobs.get_ingest_jobs(), job['job_id'])
+        assert finished["result"] == {"saved": True, "tool_name": "nitter_context"}
+        assert client.get(job['status_url']).get_json()["status"] == "done"
+        assert client.get('/api/laura-memory/jobs/desconocido').status_code == 404
+    
+    def test_asgi_submits_and_polls_job_off_the_event_loop(self, fresh_jobs):
+        """Test que el servidor ASGI encole y consulte trabajos (SQLite) fuera del event loop."""
+        import asgi_server
+        from starlette.testclient import TestClient
+        threads = []
+        
+        def recording(fn):
+            def wrapper(*args):
+                threads.append(threading.current_thread())
+                return fn(*args)
+            return wrapper
+        
+        body = {"tool_name": "nitter_context", "tool_result": {"tweets": []}, "async": True}
+        try:
+            with patch.object(fresh_jobs.laura_memory_integration, 'process_tool_result', return_value={"saved": True}), \
+                    patch('asgi_server.accept_tool_result_job', recording(fresh_jobs.accept_tool_result_job)), \
+                    patch('asgi_server.get_ingest_job', recording(fresh_jobs.get_ingest_job)), \
+                    patch('memory_async.awarm_up', AsyncMock()), patch('memory.shutdown', return_value=True), \
+                    TestClient(asgi_server.app) as client:
+                loop_thread = client.portal.call(threading.current_thread)
+                response = client.post('/api/laura-memory/process-tool-result', json=body)
+                assert response.status_code == 202
+                job = response.json()
+                assert response.headers['location'] == job['status_url']
+                
+                deadline = time.monotonic() + 5
+                while client.get(job['status_url']).json()["status"] != "done":
+                    assert time.monotonic() < deadline
+                    time.sleep(0.01)
+                assert client.get(job['status_url']).json()["result"] == {"saved": True}
+                assert client.get('/api/laura-memory/jobs/desconocido').status_code == 404
+        finally:
+            asgi_server._state.update(ready=False, shutting_down=False)
+        
+        assert len(threads) >= 3 and all(thread is not loop_thread for thread in threads)
+    
+    def test_callback_receives_outcome(self, fresh_jobs):
+        """Test que el estado final se envíe por POST a la callback_url."""
+        from http.server import BaseHTTPRequestHandler, HTTPServer
+        received = []
+    
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                received.append(json.loads(self.rfile.read(int(self.headers['Content-Length']))))
+                self.send_response(204)
+                self.end_headers()
+    
+            def log_message(self, *args):
+                pass
+    
+        httpd = HTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=httpd.handle_request, daemon=True).start()
+        callback_url = f"http://127.0.0.1:{httpd.server_port}/laura/jobs"
+    
+        with patch.object(fresh_jobs.laura_memory_integration, 'process_tool_result', return_value={"saved": False}):
+            status, job = fresh_jobs.accept_tool_result_job(
+                {"tool_name": "nitter_context", "tool_result": {}, "callback_url": callback_url}
+            )
+            assert status == 202
+            assert fresh_jobs.close_ingest_jobs(timeout=5) is True
+        httpd.server_close()
+    
+        assert received and received[0]["job_id"] == job["job_id"]
+        assert received[0]["status"] == "done" and received[0]["result"] == {"saved": False}
+        assert fresh_jobs.get_ingest_job(job["job_id"])["callback_status"] == "sent"
+        assert fresh_jobs.accept_tool_result_job(
+            {"tool_name": "x", "tool_result": {}, "callback_url": "file:///etc/passwd"}
+        )[0] == 400
+    
+    def test_job_state_is_shared_between_workers(self, tmp_path):
+        """Test que un trabajo encolado en un worker se pueda consultar desde otro."""
+        import sqlite3
+        import subprocess
+        import sys
+        from ingest_jobs import IngestJobs, JobStore
+        path = str(tmp_path / "ingest_jobs.db")
+        release = threading.Event()
+        owner = IngestJobs(lambda payload: release.wait(5) and {"saved": True}, store=JobStore(path))
+        other = IngestJobs(lambda payload: None, store=JobStore(path))
+    
+        job = owner.submit({"content": "A"})
+        while other.get(job["job_id"])["status"] != "running":
+            time.sleep(0.01)
+        release.set()
+        assert self._wait_finished(other, job["job_id"])["result"] == {"saved": True}
+        assert other.get("desconocido") is None
+        assert owner.close(timeout=5) is True
+    
+        # Un trabajo sin terminar cuyo worker ya no existe se informa como fallido
+        stuck = IngestJobs(lambda payload: release.wait(5), store=JobStore(path))
+        release.clear()
+        orphan = stuck.submit({"content": "B"})
+        dead = subprocess.Popen([sys.executable, "-c", "pass"])
+        dead.wait()
+        with sqlite3.connect(path) as conn:
+            conn.execute("UPDATE ingest_jobs SET worker_pid = ? WHERE job_id = ?", (dead.pid, orphan["job_id"]))
+        reported = other.get(orphan["job_id"])
+        assert reported["status"] == "failed" and "worker" in reported["error"]
+        release.set()
+        assert stuck.close(timeout=5) is True
+    
+    def test_callback_only_to_allowed_hosts(self, fresh_jobs, monkeypatch):
+        """Test que la callback_url solo acepte hosts permitidos y no siga redirecciones."""
+        from http.server import BaseHTTPRequestHandler, HTTPServer
+        from ingest_jobs import callback_host_allowed
+        assert callback_host_allowed("hooks.ejemplo.com", ["*.ejemplo.com"])
+        assert callback_host_allowed("ejemplo.com", [".ejemplo.com"])
+        assert not callback_host_allowed("ejemplo.com.evil.net", [".ejemplo.com"])
+        assert not callback_host_allowed("169.254.169.254", [""])
+    
+        body = {"tool_name": "x", "tool_result": {}, "callback_url": "http://169.254.169.254/latest/meta-data"}
+        status, error = fresh_jobs.accept_tool_result_job(body)
+        assert status == 400 and "169.254.169.254" in error["error"]
+        monkeypatch.setattr(fresh_jobs.settings, 'ingest_jobs_callback_allowed_hosts', '')
+        monkeypatch.setattr(fresh_jobs, '_ingest_jobs', None)
+        assert fresh_jobs.accept_tool_result_job(dict(body, callback_url="http://127.0.0.1/x"))[0] == 400
+    
+        followed = []
+    
+        class Internal(BaseHTTPRequestHandler):
+            def do_GET(self):
+                followed.append(self.path)
+                self.send_response(200)
+                self.end_headers()
+    
+            def log_message(self, *args):
+                pass
+    
+        internal = HTTPServer(('127.0.0.1', 0), Internal)
+        internal.timeout = 2
+        threading.Thread(target=internal.handle_request, daemon=True).start()
+    
+        class Redirect(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.send_response(302)
+                self.send_header('Location', f"http://localhost:{internal.server_port}/interno")
+                self.end_headers()
+    
+            def log_message(self, *args):
+                pass
+    
+        httpd = HTTPServer(('127.0.0.1', 0), Redirect)
+        threading.Thread(target=httpd.handle_request, daemon=True).start()
+        monkeypatch.setattr(fresh_jobs.settings, 'ingest_jobs_callback_allowed_hosts', '127.0.0.1')
+        monkeypatch.setattr(fresh_jobs, '_ingest_jobs', None)
+        with patch.object(fresh_jobs.laura_memory_integration, 'process_tool_result', return_value={}):
+            status, job = fresh_jobs.accept_tool_result_job(
+                dict(body, callback_url=f"http://127.0.0.1:{httpd.server_port}/laura/jobs")
+            )
+            assert status == 202
+            assert fresh_jobs.close_ingest_jobs(timeout=5) is True
+        httpd.server_close()
+        internal.server_close()
+        assert fresh_jobs.get_ingest_job(job["job_id"])["callback_status"] == "failed"
+        assert followed == []
+
+
 # Configuración de pytest
 @pytest.fixture(autouse=True)
-def setup_environment():
+def setup_environment(monkeypatch):
     """Setup para todos los tests."""
     import os
     os.environ['ZEP_API_KEY'] = 'test_key'
     os.environ['ZEP_URL'] = 'https://api.getzep.com'
     os.environ['LAURA_SESSION_ID'] = 'test/session'
+    memory.reset_circuit_breakers()
+    # Bocetos de casi-duplicados solo en memoria (no escribir en el repo)
+    monkeypatch.setattr(memory.settings, 'near_duplicate_state_dir', '')
+    memory.reset_near_duplicate_indexes()
+    monkeypatch.setattr(memory.settings, 'handle_index_path', '')
+    memory._handle_registry.clear()
+    memory._pending_writes.clear()
+    monkeypatch.setattr(memory.settings, 'metadata_store_path', '')
+    memory.reset_metadata_store()
+    monkeypatch.setattr(memory.settings, 'ingest_jobs_store_path', '')
 
 
 if __name__ == '__main__':
@@ -0,0 +1,283 @@
+"""
+Índices de texto en proceso para búsquedas sin Zep: índice invertido de
+tokens y índice difuso de trigramas.
+"""
+
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Divide un texto en tokens alfanuméricos en minúsculas.
+    """
+    return _TOKEN_RE.findall(text.lower())
+
+
+class InvertedIndex:
+    """
+    Índice invertido token → documentos, acotado a ``max_documents``.
+
+    Responde búsquedas devolviendo los documentos que contienen todos los
+    tokens de la consulta como palabras completas y, además, la consulta
+    completa como subcadena. Al superar el límite se descartan los
+    documentos más antiguos.
+    """
+
+    def __init__(self, max_documents: int = 50000):
+        self.max_documents = max_documents
+        self._docs: "OrderedDict[int, str]" = OrderedDict()
+        self._doc_ids: Dict[str, int] = {}
+        self._postings: Dict[str, Set[int]] = {}
+        self._next_id = 0
+        self._lock = threading.RLock()
+        self.loaded_at: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def add(self, content: str) -> Optional[int]:
+        """
+        Indexa un documento. Los documentos idénticos se indexan una sola vez.
+
+        Returns:
+            Id interno del documento o None si el contenido está vacío.
+        """
+        if not content:
+            return None
+
+        with self._lock:
+            existing = self._doc_ids.get(content)
+            if existing is not None:
+                return existing
+
+            doc_id = self._next_id
+            self._next_id += 1
+            self._docs[doc_id] = content
+            self._doc_ids[content] = doc_id
+            for token in set(tokenize(content)):
+                self._postings.setdefault(token, set()).add(doc_id)
+
+            while len(self._docs) > self.max_documents:
+                self._evict_oldest()
+
+            return doc_id
+
+    def _evict_oldest(self) -> None:
+        doc_id, content = self._docs.popitem(last=False)
+        self._doc_ids.pop(content, None)
+        for token in set(tokenize(content)):
+            postings = self._postings.get(token)
+            if postings is not None:
+                postings.discard(doc_id)
+                if not postings:
+                    del self._postings[token]
+
+    def load(self, contents: Iterable[str]) -> int:
+        """
+        Añade ``contents`` al índice (sin duplicar) y marca el momento de carga.
+
+        Returns:
+            Número de documentos en el índice.
+        """
+        with self._lock:
+            for content in contents:
+                self.add(content)
+            self.loaded_at = time.monotonic()
+            return len(self._docs)
+
+    def clear(self) -> None:
+        """
+        Vacía el índice.
+        """
+        with self._lock:
+            self._docs.clear()
+            self._doc_ids.clear()
+            self._postings.clear()
+            self.loaded_at = None
+
+    def search(self, query: str, limit: int = 5) -> List[str]:
+        """
+        Busca documentos que contengan la consulta, en orden de inserción.
+
+        Args:
+            query: Texto a buscar.
+            limit: Número máximo de resultados.
+
+        Returns:
+            Lista de documentos coincidentes.
+        """
+        query_lower = query.lower()
+        tokens = set(tokenize(query_lower))
+
+        with self._lock:
+            if tokens:
+                postings = [self._postings.get(token) for token in tokens]
+                if any(p is None for p in postings):
+                    return []
+                postings.sort(key=len)
+                candidates = set(postings[0])
+                for other in postings[1:]:
+                    candidates &= other
+                    if not candidates:
+                        return []
+                candidate_ids: Iterable[int] = sorted(candidates)
+            else:
+                candidate_ids = list(self._docs)
+
+            results = []
+            for doc_id in candidate_ids:
+                content = self._docs[doc_id]
+                if query_lower in content.lower():
+                    results.append(content)
+                    if len(results) >= limit:
+                        break
+            return results
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Devuelve el tamaño del índice.
+        """
+        with self._lock:
+            return {
+                "documents": len(self._docs),
+                "tokens": len(self._postings),
+                "max_documents": self.max_documents,
+                "loaded": self.loaded_at is not None
+            }
+
+
+def fold(text: str) -> str:
+    """
+    Minúsculas sin acentos (NFKD sin marcas combinantes): "Arévalo" → "arevalo".
+    """
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def trigrams(text: str) -> Set[str]:
+    """
+    Trigramas de caracteres por palabra, con relleno al estilo de pg_trgm
+    (dos espacios al inicio y uno al final de cada palabra).
+    """
+    grams: Set[str] = set()
+    for word in tokenize(fold(text)):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def trigram_score(query_grams: Set[str], grams: Set[str]) -> float:
+    """
+    Media entre la cobertura de la consulta y el coeficiente de Dice.
+    """
+    if not query_grams or not grams:
+        return 0.0
+    shared = len(query_grams & grams)
+    coverage = shared / len(query_grams)
+    dice = 2 * shared / (len(query_grams) + len(grams))
+    return (coverage + dice) / 2
+
+
+def min_shared_trigrams(size: int, min_score: float) -> int:
+    """
+    Trigramas compartidos mínimos para que una consulta de ``size`` trigramas
+    pueda alcanzar ``min_score`` (con s compartidos la puntuación es como
+    mucho (s/q + 2s/(q+s)) / 2).
+    """
+    min_shared = 1
+    while min_shared < size and (min_shared / size + 2 * min_shared / (size + min_shared)) / 2 < min_score:
+        min_shared += 1
+    return min_shared
+
+
+class TrigramIndex:
+    """
+    Índice difuso de trigramas: clave → uno o varios textos (p. ej. nombre y handle).
+
+    ``search`` puntúa cada texto con ``trigram_score`` (media entre la
+    cobertura de la consulta y el coeficiente de Dice) y devuelve por clave la
+    mejor puntuación. Tolera acentos, mayúsculas y
+    erratas pequeñas.
+    """
+
+    def __init__(self):
+        self._texts: Dict[Hashable, List[Set[str]]] = {}
+        self._postings: Dict[str, Set[Hashable]] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def set(self, key: Hashable, texts: Iterable[str]) -> None:
+        """
+        Reemplaza los textos indexados para ``key``.
+        """
+        grams = [g for g in (trigrams(text) for text in texts if text) if g]
+        with self._lock:
+            self._remove(key)
+            if not grams:
+                return
+            self._texts[key] = grams
+            for gram in set().union(*grams):
+                self._postings.setdefault(gram, set()).add(key)
+
+    def remove(self, key: Hashable) -> None:
+        with self._lock:
+            self._remove(key)
+
+    def _remove(self, key: Hashable) -> None:
+        grams = self._texts.pop(key, None)
+        if not grams:
+            return
+        for gram in set().union(*grams):
+            postings = self._postings.get(gram)
+            if postings is not None:
+                postings.discard(key)
+                if not postings:
+                    del self._postings[gram]
+
+    def search(self, query: str, limit: int = 5, min_score: float = 0.0) -> List[Tuple[Hashable, float]]:
+        """
+        Busca las claves más parecidas a ``query``.
+
+        Returns:
+            Lista de (clave, puntuación entre 0 y 1) ordenada de mayor a menor.
+        """
+        query_grams = trigrams(query)
+        if not query_grams:
+            return []
+        size = len(query_grams)
+        min_shared = min_shared_trigrams(size, min_score)
+
+        with self._lock:
+            # Filtro de prefijo: quien comparta min_shared trigramas comparte al
+            # menos uno de los size - min_shared + 1 más raros
+            postings = sorted((self._postings.get(gram, ()) for gram in query_grams), key=len)
+            candidates: Set[Hashable] = set()
+            for keys in postings[:size - min_shared + 1]:
+                candidates.update(keys)
+
+            scored = []
+            for key in candidates:
+                best = max(trigram_score(query_grams, grams) for grams in self._texts[key])
+                if best >= min_score:
+                    scored.append((key, best))
+
+        scored.sort(key=lambda item: (-item[1], str(item[0])))
+        return scored[:limit]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._texts.clear()
+            self._postings.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"keys": len(self._texts), "trigrams": len(self._postings)}